@@ -1,5 +1,10 @@
 import pandas as pd
 import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[4]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.split import split_points
 # ================================================================
 # Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
 # Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
@@ -22,17 +27,12 @@ output_folder = "Clustered_Files"
 os.makedirs(output_folder, exist_ok=True)
 
 # Daten in separate Dateien je Klasse speichern
-for cluster_id in df["Color Cluster"].unique():
-    # Filtere die Punkte für die aktuelle Klasse
-    cluster_df = df[df["Color Cluster"] == cluster_id]
-
-    # Dateiname für die Klasse
-    output_file = os.path.join(output_folder, f"PW_Klasse_{int(cluster_id)}.txt")
-
-    # Speichern ohne Header
-    cluster_df.to_csv(output_file, sep=";", index=False, decimal=".", header=False)
-
-    print(f"Datei gespeichert: {output_file}")
+# Ein Durchgang: Labels einmal sortieren, jede Klasse parallel schreiben (punktwolke/split.py)
+summary = split_points(
+    df, "Color Cluster",
+    path_for=lambda cluster_id: os.path.join(output_folder, f"PW_Klasse_{int(cluster_id)}.txt"),
+    progress=lambda cluster_id, n: print(f"Datei gespeichert: PW_Klasse_{int(cluster_id)}.txt ({n} Punkte)"),
+)
 
 print("Alle Cluster-Dateien wurden erfolgreich erstellt!")
 
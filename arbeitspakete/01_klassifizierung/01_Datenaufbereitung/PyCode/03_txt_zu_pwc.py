@@ -0,0 +1,51 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[4]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.schema import get_layout
+from punktwolke.spatial import build_spatial_index
+from punktwolke.store import convert_txt, read_schema
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Einmalige Konvertierung der ";"-TXT-Punktwolken ins binäre .pwc-Format
+(siehe punktwolke/store.py). Die Skripte laden danach mit load_points()
+direkt den .pwc-Ordner statt den Text neu zu parsen.
+"""
+
+# === EINSTELLUNGEN ===
+input_folder = Path(r"arbeitspakete\01_klassifizierung\01_Datenaufbereitung\output")  # Ordner mit den TXT-Dateien
+output_folder = input_folder  # .pwc-Ordner landen neben den TXT-Dateien
+
+# Spaltenlayout der Dateien (siehe punktwolke/schema.py, LAYOUTS)
+# None → Layout wird pro Datei aus Spaltenanzahl und Wertebereich erkannt
+columns = get_layout("normalisiert")
+
+# Räumlicher Index (siehe punktwolke/spatial.py): Punkte nach Zellen dieser Grösse in m
+# sortieren, damit Box-, Radius- und Kachelabfragen nur die betroffenen Bereiche lesen.
+# Achtung: die Punktreihenfolge im .pwc weicht danach von der TXT-Datei ab (order.npy).
+# None → keine Sortierung
+index_zellgroesse = None
+
+# === ALLE .txt-DATEIEN IM ORDNER KONVERTIEREN ===
+start_time = time.time()
+for input_file in sorted(input_folder.glob("*.txt")):
+    loop_start = time.time()
+    output_path = output_folder / f"{input_file.stem}.pwc"
+    convert_txt(input_file, output_path, columns=columns)
+    n_points = read_schema(output_path)["n_points"]
+    if index_zellgroesse is not None:
+        index = build_spatial_index(output_path, cell_size=index_zellgroesse)
+        print(f"  räumlicher Index: {len(index.cells)} Zellen à {index_zellgroesse} m")
+    print(f"✔ {input_file.name} → {output_path.name} ({n_points} Punkte, {time.time() - loop_start:.1f} s)")
+
+# Laufzeit berechnen und ausgeben
+elapsed_time = time.time() - start_time
+minutes = int(elapsed_time // 60)
+seconds = elapsed_time % 60
+print(f"Gesamtlaufzeit: {minutes} Minuten und {seconds:.2f} Sekunden")
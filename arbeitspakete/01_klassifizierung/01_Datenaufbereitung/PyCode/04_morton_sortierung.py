@@ -0,0 +1,102 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from scipy.stats import binned_statistic_2d
+from sklearn.cluster import DBSCAN
+
+sys.path.append(str(Path(__file__).resolve().parents[4]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.spatial import build_spatial_index
+from punktwolke.store import convert_txt, is_pwc, open_points
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Sortiert alle Punktwolken eines Ordners entlang der Z-Kurve (Morton-Reihenfolge, siehe
+punktwolke/spatial.py). Die Punkte liegen danach räumlich geordnet statt in Scan- bzw.
+Exportreihenfolge im .pwc-Ordner, mit Zellverzeichnis für Box-/Radiusabfragen und
+order.npy, um Labels zurück in die Originalreihenfolge zu bringen (to_original_order).
+
+Optional wird für die erste Datei vorher/nachher gemessen: DBSCAN auf der Lage,
+cKDTree.query (k Nachbarn) und das CHM-Raster des Watershed-Ablaufs.
+"""
+
+# === EINSTELLUNGEN ===
+input_folder = Path(r"arbeitspakete\01_klassifizierung\01_Datenaufbereitung\output")  # .txt oder .pwc
+muster = "*.pwc"           # "*.txt" → wird zuerst nach .pwc konvertiert
+zellgroesse = 10.0         # [m] Zellen des Verzeichnisses (Box-/Kachelabfragen)
+aufloesung = 0.25          # [m] Rasterweite der Sortierung innerhalb der Zellen
+
+benchmark = True           # vorher/nachher messen (erste Datei)
+benchmark_punkte = 500_000  # zufällige Teilmenge für die Messung, None = alle
+eps = 0.8                  # DBSCAN wie in 0_250427_Final_Watershed.py
+min_samples = 130
+k = 20                     # Nachbarn für cKDTree.query
+chm_res = 1.0              # [m] CHM-Rasterweite
+
+
+def messen(xyz):
+    """Laufzeiten der drei Nachbarschafts-Schritte auf xyz in der gegebenen Reihenfolge."""
+    zeiten = {}
+    t = time.time()
+    labels = DBSCAN(eps=eps, min_samples=min_samples).fit_predict(xyz[:, :2])
+    zeiten["DBSCAN"] = time.time() - t
+    t = time.time()
+    cKDTree(xyz).query(xyz, k=k)
+    zeiten[f"cKDTree.query (k={k})"] = time.time() - t
+    t = time.time()
+    bins = np.ceil(np.ptp(xyz[:, :2], axis=0) / chm_res).astype(int)
+    binned_statistic_2d(xyz[:, 0], xyz[:, 1], xyz[:, 2], statistic="max", bins=bins)
+    zeiten["CHM (binned max)"] = time.time() - t
+    return zeiten, labels.max() + 1
+
+
+start_time = time.time()
+dateien = sorted(input_folder.glob(muster))
+tabelle = []
+for i, input_file in enumerate(dateien):
+    loop_start = time.time()
+    if not is_pwc(input_file):
+        input_file = convert_txt(input_file)
+    if benchmark and i == 0:
+        # Originalreihenfolge vor der Sortierung festhalten
+        xyz_vorher = open_points(input_file).xyz()
+        auswahl = np.arange(len(xyz_vorher))
+        if benchmark_punkte is not None and benchmark_punkte < len(auswahl):
+            auswahl = np.sort(np.random.default_rng(42).choice(len(auswahl), benchmark_punkte, replace=False))
+
+    index = build_spatial_index(input_file, cell_size=zellgroesse, resolution=aufloesung)
+    print(f"✔ {input_file.name}: {len(index)} Punkte sortiert, {len(index.cells)} Zellen à {zellgroesse} m "
+          f"({time.time() - loop_start:.1f} s)")
+
+    if benchmark and i == 0:
+        # dieselben Punkte, einmal in Scanreihenfolge und einmal in Z-Reihenfolge
+        rang = np.empty(len(index), dtype=np.int64)
+        rang[np.asarray(index.order)] = np.arange(len(index))
+        xyz_nachher = index.points.xyz()[np.sort(rang[auswahl])]
+        vorher, n_vorher = messen(xyz_vorher[auswahl])
+        nachher, n_nachher = messen(xyz_nachher)
+        for schritt in vorher:
+            tabelle.append({"Schritt": schritt, "Scanreihenfolge_s": round(vorher[schritt], 2),
+                            "Morton_s": round(nachher[schritt], 2),
+                            "Faktor": round(vorher[schritt] / max(nachher[schritt], 1e-9), 2)})
+        print(f"  DBSCAN-Cluster vorher / nachher: {n_vorher} / {n_nachher}")
+        del xyz_vorher, xyz_nachher
+
+if tabelle:
+    tabelle = pd.DataFrame(tabelle)
+    print(f"\nMessung auf {dateien[0].name} ({len(auswahl)} Punkte):")
+    print(tabelle.to_string(index=False))
+    tabelle.to_csv(input_folder / "morton_benchmark.csv", sep=";", index=False)
+
+# Laufzeit berechnen und ausgeben
+elapsed_time = time.time() - start_time
+minutes = int(elapsed_time // 60)
+seconds = elapsed_time % 60
+print(f"Gesamtlaufzeit: {minutes} Minuten und {seconds:.2f} Sekunden")
@@ -1,7 +1,11 @@
 import pandas as pd
-import colorsys
 import numpy as np
+import sys
 import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[4]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.normalize import rgb_to_hsv
 
 # ================================================================
 # Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
@@ -33,7 +37,7 @@ end_rgb = time.time()
 # RGB → HSV (vektorisiert)
 start_hsv = time.time()
 rgb_norm = df[["R_norm", "G_norm", "B_norm"]].to_numpy()
-hsv = np.apply_along_axis(lambda x: colorsys.rgb_to_hsv(*x), 1, rgb_norm)
+hsv = np.column_stack(rgb_to_hsv(rgb_norm[:, 0], rgb_norm[:, 1], rgb_norm[:, 2]))  # identisch zu colorsys
 df[["Hue_norm", "Saturation_norm", "Value_norm"]] = pd.DataFrame(hsv, index=df.index)
 end_hsv = time.time()
 
@@ -1,10 +1,20 @@
-import pandas as pd
-import numpy as np
+import sys
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+
+sys.path.append(str(Path(__file__).resolve().parents[4]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.orientation import read_normals, split_orientation, sweep_thresholds
 
 # === EINSTELLUNGEN ===
 input_file = "PW_KOO_RGB_norm.txt"
 upright_thresh = 0.985 # Waagrechte Flächenabweichung
 flat_thresh = 0.25 # Senkrechte Flächenabweichung
+thresholds = [flat_thresh, upright_thresh]  # beliebig viele aufsteigende Grenzwerte für |nz| möglich
+columns = ["X", "Y", "Z", "R", "G", "B", "X scan dir", "Y scan dir", "Z scan dir"]
+
+# Schwellenwert-Studie: nur Punkte zählen, ohne Dateien zu schreiben (leer = aus)
+sweep = [(0.2, 0.98), (0.25, 0.985), (0.3, 0.99)]
 """
 Z       	Winkel zur XY-Ebene (°)	Bedeutung der Normale
 1.00	        0.00°	            exakt senkrecht / aufrecht  --> zb Boden
@@ -15,53 +25,48 @@ Z       	Winkel zur XY-Ebene (°)	Bedeutung der Normale
 0.20	        78.46°	            nahezu waagrecht
 0.00	        90.00°	            exakt waagrecht            --> zb Fassade
 """
-# === DATEN EINLESEN ===
-df = pd.read_csv(input_file, sep=";", header=None, decimal=".")
-
-# === SPALTEN BENENNEN ===
-df.columns = ["X", "Y", "Z", "R", "G", "B", "X scan dir", "Y scan dir", "Z scan dir"]
-
-# === FUNKTIONEN ===
-def classify_orientation(z_val, upright_thresh=0.85, flat_thresh=0.05):
-    z_abs = abs(z_val)
-    if z_abs >= upright_thresh:
-        return "aufrecht"
-    elif z_abs <= flat_thresh:
-        return "waagrecht"
-    else:
-        return "schräg"
-
-def angle_to_xy_plane(z_component):
-    z_abs = abs(z_component)
-    angle_rad = np.arccos(z_abs)
-    angle_deg = np.degrees(angle_rad)
-    return round(angle_deg, 2)
+# === DATEINAMEN PRO ORIENTIERUNG ===
+def output_file(index, name):
+    if name == "aufrecht":
+        return f"punkte_aufrecht_{upright_thresh}.txt"
+    if name == "waagrecht":
+        return f"punkte_waagrecht_{flat_thresh}.txt"
+    if name == "schräg":
+        return f"punkte_schraeg_{flat_thresh}_{upright_thresh}.txt"
+    return f"punkte_{name}.txt"
 
 
-
-# === ORIENTIERUNG UND WINKEL BERECHNEN ===
-df["Orientation"] = df["Z scan dir"].apply(lambda z: classify_orientation(z, upright_thresh, flat_thresh))
-df["Winkel (°)"] = df["Z scan dir"].apply(angle_to_xy_plane)
-
-# === DATEN AUFTEILEN ===
-df_aufrecht = df[df["Orientation"] == "aufrecht"]
-df_waagrecht = df[df["Orientation"] == "waagrecht"]
-df_schraeg = df[df["Orientation"] == "schräg"]
-
-print(df[["X", "Y", "Z", "R", "G", "B", "X scan dir", "Y scan dir", "Z scan dir", "Winkel (°)", "Orientation"]].head(100))
+# === ORIENTIERUNG, WINKEL UND AUFTEILEN IN EINEM DURCHGANG ===
+# |nz| wird vektorisiert mit np.digitize eingeteilt, jede Klasse direkt in ihre Datei geschrieben
+summary, histogram = split_orientation(
+    input_file, output_file, thresholds, columns=columns,
+    histogram_path=f"winkel_histogramm_{flat_thresh}_{upright_thresh}.csv",
+)
 
 # === AUSGABE DER VERTEILUNG ===
 print("Orientierungs-Verteilung:")
-print(df["Orientation"].value_counts())
-print("\nBeispielhafte Zeilen:")
-print(df.head())
-
-# === DATEIEN SPEICHERN ===
-df_aufrecht.to_csv(f"punkte_aufrecht_{upright_thresh}.txt", sep=";", index=False, header=False, decimal=".")
-df_waagrecht.to_csv(f"punkte_waagrecht_{flat_thresh}.txt", sep=";", index=False, header=False, decimal=".")
-df_schraeg.to_csv(f"punkte_schraeg_{flat_thresh}_{upright_thresh}.txt", sep=";", index=False, header=False, decimal=".")
+print(summary[["Orientation", "Winkel von (°)", "Winkel bis (°)", "Punkte", "Anteil (%)"]].to_string(index=False))
 
 print("\nDateien wurden gespeichert:")
-print(f"- aufrecht → punkte_aufrecht_{upright_thresh}.txt")
-print(f"- waagrecht → punkte_waagrecht_{flat_thresh}.txt")
-print(f"- schräg → punkte_schraeg_{flat_thresh}_{upright_thresh}.txt")
\ No newline at end of file
+for _, row in summary.iterrows():
+    print(f"- {row['Orientation']} → {row['Datei']}")
+
+# === WINKEL-HISTOGRAMM ===
+plt.figure(figsize=(10, 4))
+plt.bar(histogram["Winkel von (°)"], histogram["Punkte"],
+        width=histogram["Winkel bis (°)"] - histogram["Winkel von (°)"], align="edge")
+for _, row in summary.iloc[1:].iterrows():
+    plt.axvline(row["Winkel bis (°)"], color="red", linestyle="--")
+plt.xlabel("Winkel der Normale zur XY-Ebene (°)")
+plt.ylabel("Anzahl Punkte")
+plt.title("Winkel-Histogramm")
+plt.tight_layout()
+plt.savefig(f"winkel_histogramm_{flat_thresh}_{upright_thresh}.png", dpi=150)
+plt.show()
+
+# === SCHWELLENWERT-STUDIE ===
+# Normalen-Spalte gleich gelesen wie beim Aufteilen (gleiche Zählungen), einmal sortiert
+if sweep:
+    nz = read_normals(input_file, columns=columns)
+    print("\nPunkte pro Orientierung je Grenzwert-Kombination:")
+    print(sweep_thresholds(nz, sweep).to_string(index=False))
@@ -1,64 +1,98 @@
-import pandas as pd
+import sys
+import time
+from pathlib import Path
+
+import joblib
 import numpy as np
-import glob
-from sklearn.svm import SVC
 import open3d as o3d
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.cluster import sample_features
+from punktwolke.inference import run_inference
+from punktwolke.store import iter_points, load_points
+from punktwolke.svm import fit_svm
 # ================================================================
 # Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
 # Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
 # Version:          GPT-4, Juni 2025
 # Autor:            Marco Stampfli und Vania Fernandes Pereira
 # ================================================================
-# -----------------------------------
-# 1. Trainingsdaten aus mehreren Dateien laden
-# -----------------------------------
+# === EINSTELLUNGEN ===
+columns = ["X", "Y", "Z", "R", "G", "B", "X scan dir", "Y scan dir", "Z scan dir"]
+features = columns  # alle 9 Spalten wie bisher
+header_out = ["x", "y", "z", "r", "g", "b", "nx", "ny", "nz", "predicted_label"]
 
-all_dfs = []
-for i in range(7):  # 7 Klassen, class_0.txt bis class_6.txt
-    filename = f"class_{i}.txt"
-    df = pd.read_csv(filename, sep=";", header=None)
-    df["label"] = i  # Klasse hinzufügen
-    all_dfs.append(df)
+# SVM-Modus (punktwolke/svm.py)
+# "nystroem" / "rff" = RBF-Kern approximiert + linearer Löser, "exact" = SVC auf der Stichprobe
+modus = "nystroem"
+C = 10
+gamma = 0.1  # bezieht sich auf standardisierte Merkmale
+n_components = 2000  # Stützpunkte (Nyström) bzw. Fourier-Merkmale (RFF)
+budget_pro_klasse = 20_000  # klassenbalancierte Trainingsstichprobe
 
-train_df = pd.concat(all_dfs, ignore_index=True)
+model_path = "svm_model.pkl"
+label_path = "unclassified_labels.pwc"  # Vorhersagen als uint8-Spalte, gleiche Reihenfolge wie die Eingabe
+block_size = 500_000  # Punkte pro Block bei der Vorhersage
+max_memory_mb = 1024  # Arbeitsspeicher pro Worker, bestimmt die Blockgrösse (None = block_size)
+max_workers = None  # Anzahl Prozesse, None = CPU-Kerne
+visualisieren = True
 
-# Spaltennamen zuweisen
-train_df.columns = ["x", "y", "z", "r", "g", "b", "nx", "ny", "nz", "label"]
+if __name__ == "__main__":  # nötig für den Prozesspool unter Windows
+    start_time = time.time()
 
-X_train = train_df[["x", "y", "z", "r", "g", "b", "nx", "ny", "nz"]]
-y_train = train_df["label"]
+    # -----------------------------------
+    # 1. Trainingsdaten aus mehreren Dateien laden
+    # -----------------------------------
+    # pro Klasse nur eine Zufallsstichprobe (Budget), nicht die ganze Datei
+    X_parts, y_parts = [], []
+    for i in range(7):  # 7 Klassen, class_0.txt bis class_6.txt
+        filename = f"class_{i}.txt"
+        X_class = sample_features(filename, features, budget_pro_klasse, columns=columns)
+        X_parts.append(X_class)
+        y_parts.append(np.full(len(X_class), i))  # Klasse hinzufügen
 
-# -----------------------------------
-# 2. SVM trainieren
-# -----------------------------------
-model = SVC(kernel="rbf", C=10, gamma=0.1)
-model.fit(X_train, y_train)
+    X_train = np.concatenate(X_parts)
+    y_train = np.concatenate(y_parts)
 
-# -----------------------------------
-# 3. Neue, unklassifizierte Punktwolke laden
-# -----------------------------------
-unclassified_df = pd.read_csv("unclassified.txt", sep=";", header=None)
-unclassified_df.columns = ["x", "y", "z", "r", "g", "b", "nx", "ny", "nz"]
+    # -----------------------------------
+    # 2. SVM trainieren
+    # -----------------------------------
+    model = fit_svm(X_train, y_train, mode=modus, budget=budget_pro_klasse, C=C, gamma=gamma,
+                    n_components=n_components)
+    joblib.dump(model, model_path)
+    print(f"SVM ({modus}) trainiert auf {len(X_train)} Punkten: {time.time() - start_time:.1f} s")
 
-X_test = unclassified_df[["x", "y", "z", "r", "g", "b", "nx", "ny", "nz"]]
-y_pred = model.predict(X_test)
+    # -----------------------------------
+    # 3. Neue, unklassifizierte Punktwolke kachelweise klassifizieren
+    # -----------------------------------
+    y_pred, stats = run_inference(model_path, "unclassified.txt", features, output_path=label_path,
+                                  columns=columns, block_size=block_size, max_memory_mb=max_memory_mb,
+                                  max_workers=max_workers)
+    stats["Worker_Tabelle"].to_csv("inferenz_worker.csv", sep=";", index=False)
 
-# -----------------------------------
-# 4. Ergebnis speichern
-# -----------------------------------
-unclassified_df["predicted_label"] = y_pred
-unclassified_df.to_csv("classified_result.txt", sep=";", index=False)
+    # -----------------------------------
+    # 4. Ergebnis speichern (blockweise, gleiche Spalten wie bisher)
+    # -----------------------------------
+    with open("classified_result.txt", "w", encoding="utf-8", newline="") as f:
+        f.write(";".join(header_out) + "\n")
+        offset = 0
+        for chunk in iter_points("unclassified.txt", columns=columns, chunksize=block_size):
+            chunk["predicted_label"] = y_pred[offset:offset + len(chunk)]
+            chunk.to_csv(f, sep=";", index=False, header=False)
+            offset += len(chunk)
 
-# -----------------------------------
-# 5. Optional: Visualisierung
-# -----------------------------------
-color_map = [
-    [1, 0, 0], [0, 1, 0], [0, 0, 1], 
-    [1, 1, 0], [1, 0, 1], [0, 1, 1], [0.5, 0.5, 0.5]
-]
-colors = np.array([color_map[label % len(color_map)] for label in y_pred])
+    # -----------------------------------
+    # 5. Optional: Visualisierung
+    # -----------------------------------
+    if visualisieren:
+        unclassified_df = load_points("unclassified.txt", columns=columns)
+        color_map = np.array([
+            [1, 0, 0], [0, 1, 0], [0, 0, 1],
+            [1, 1, 0], [1, 0, 1], [0, 1, 1], [0.5, 0.5, 0.5]
+        ])
+        colors = color_map[y_pred % len(color_map)]
 
-pcd = o3d.geometry.PointCloud()
-pcd.points = o3d.utility.Vector3dVector(X_test[["x", "y", "z"]].values)
-pcd.colors = o3d.utility.Vector3dVector(colors)
-o3d.visualization.draw_geometries([pcd])
+        pcd = o3d.geometry.PointCloud()
+        pcd.points = o3d.utility.Vector3dVector(unclassified_df[["X", "Y", "Z"]].to_numpy())
+        pcd.colors = o3d.utility.Vector3dVector(colors)
+        o3d.visualization.draw_geometries([pcd])
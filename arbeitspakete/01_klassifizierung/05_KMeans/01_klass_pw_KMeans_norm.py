@@ -1,11 +1,18 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import time
+from pathlib import Path
 from tqdm import tqdm
-from sklearn.cluster import KMeans
 import matplotlib.pyplot as plt
 # import open3d as o3d
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.cluster import compare_with_kmeans, fit_kmeans, predict_labels
+from punktwolke.schema import get_layout
+from punktwolke.split import split_points
+from punktwolke.store import open_points
 # ================================================================
 # Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
 # Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
@@ -15,32 +22,47 @@ import matplotlib.pyplot as plt
 # Startzeit für die Laufzeitmessung
 start_time = time.time()
 
-# Datei mit bereits berechneten HSV-Werten laden
+# Datei mit bereits berechneten HSV-Werten laden (.txt oder .pwc)
 file_path = r"C:\Users\st1174360\Documents\BTh_04\250327_Normalisieren\output\PW_P3_normalisiert.txt"  
-df = pd.read_csv(file_path, delimiter=";", decimal=".", header=None)
 
 # Spaltennamen basierend auf der erweiterten Datei setzen
-df.columns = ["X coordinate", "Y coordinate", "Z coordinate",
-            "Red (0-1)", "Green (0-1)", "Blue (0-1)",
-            "Hue (0-1)", "Saturation (0-1)", "Value (0-1)",
-            "X scan dir", "Y scan dir", "Z scan dir"]
+# Spalten werden als memmap geöffnet (TXT wird einmalig nach .pwc konvertiert)
+pts = open_points(file_path, columns=get_layout("normalisiert"))
 
 # Anzahl der Cluster definieren
 num_clusters = 3  # Kann auf 6-10 angepasst werden
-fit = df[["Hue (0-1)", "Z scan dir"]] # Fit Variablen
+features = ["Hue (0-1)", "Z scan dir"] # Fit Variablen
 fitcode = "HZ"
 
-# Progressbar für K-Means
-print("Starte K-Means Clustering...")
-with tqdm(total=100, desc="Clustering") as pbar:
-    kmeans = KMeans(n_clusters=num_clusters, random_state=42, n_init=10)
-    df["Color Cluster"] = kmeans.fit_predict(fit)
-    pbar.update(100)
+# KMeans-Modus (punktwolke/cluster.py)
+# "full"      = KMeans auf allen Punkten (wie bisher, n_init=10)
+# "minibatch" = MiniBatchKMeans auf allen Punkten
+# "streaming" = blockweise partial_fit aus dem .pwc-Store, Speicherbedarf durch chunksize begrenzt
+# "histogram" = gewichtetes KMeans auf einem feinen 2D-Raster der Fit-Variablen (hist_bins x hist_bins)
+modus = "full"
+batch_size = 100_000  # Punkte pro Mini-Batch (minibatch / streaming)
+chunksize = 2_000_000  # Punkte pro gelesenem Block (streaming, histogram und Label-Zuweisung)
+hist_bins = 256  # Rasterzellen pro Fit-Variable (histogram)
+vergleich_toleranz = 0.01  # histogram: max. Anteil abweichender Labels ggü. KMeans (Stichprobe), None = kein Vergleich
+
+# Fit (1. Durchgang) und Label-Zuweisung (2. Durchgang, blockweise)
+print(f"Starte K-Means Clustering ({modus})...")
+kmeans, timings = fit_kmeans(pts, features, num_clusters, mode=modus, n_init=10,
+                             batch_size=batch_size, chunksize=chunksize, random_state=42,
+                             hist_bins=hist_bins)
+if modus == "histogram" and vergleich_toleranz is not None:
+    agreement, shift = compare_with_kmeans(kmeans, pts, features, n_init=10, random_state=42)
+    print(f"Vergleich mit KMeans (Stichprobe): {agreement:.2%} gleiche Labels, Zentren max. {shift:.4f} verschoben")
+    if 1 - agreement > vergleich_toleranz:
+        print(f"⚠️ Abweichung {1 - agreement:.2%} grösser als Toleranz {vergleich_toleranz:.2%}, hist_bins erhöhen")
+labels = predict_labels(kmeans, pts, features, chunksize=chunksize)
+print(f"Fit: {timings['Dauer_s'].sum():.1f} s in {len(timings)} Batches")
 
 
 # Neue Datei speichern (mit Farbklassen, ohne Header)
 output_folder = r"arbeitspakete\01_klassifizierung\05_KMeans\output\KMeans_Clustered_Files"+f"_{num_clusters}_fit_{fitcode}"
 os.makedirs(output_folder, exist_ok=True)
+timings.to_csv(os.path.join(output_folder, f"kmeans_zeiten_{modus}.csv"), index=False)
 # output_path = os.path.join(output_folder, f"kmeans_clustered_{fitcode}_punktwolke.txt")
 # df.to_csv(output_path, sep=";", index=False, decimal=".", header=False)
 
@@ -48,10 +70,13 @@ os.makedirs(output_folder, exist_ok=True)
 
 # Fortschrittsbalken für das Speichern der Cluster-Dateien
 print("Speichere Cluster-Dateien...")
-for cluster_id in tqdm(df["Color Cluster"].unique(), desc="Speichern der Cluster"):
-    cluster_df = df[df["Color Cluster"] == cluster_id]
-    output_file = os.path.join(output_folder, f"PW_Klasse_{int(cluster_id)}_kmeans_fit_{fitcode}.txt")
-    cluster_df.to_csv(output_file, sep=";", index=False, decimal=".", header=False)
+# Ein Durchgang statt einer Filterung der ganzen Tabelle pro Cluster (punktwolke/split.py)
+with tqdm(total=num_clusters, desc="Speichern der Cluster") as pbar:
+    split_points(
+        pts, labels, label_column="Color Cluster",
+        path_for=lambda cluster_id: os.path.join(output_folder, f"PW_Klasse_{int(cluster_id)}_kmeans_fit_{fitcode}.txt"),
+        progress=lambda cluster_id, n: pbar.update(1),
+    )
 
 print("Alle KMeans-Cluster-Dateien wurden erfolgreich erstellt!")
 
@@ -1,12 +1,18 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import time
 from tqdm import tqdm
 from sklearn.cluster import KMeans
 import matplotlib.pyplot as plt
 from pathlib import Path
 # import open3d as o3d
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.schema import get_layout
+from punktwolke.split import split_points
+from punktwolke.store import open_points
 # ================================================================
 # Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
 # Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
@@ -18,12 +24,11 @@ start_time = time.time()
 
 # Datei mit bereits berechneten HSV-Werten laden
 file_path = "arbeitspakete\02_segmentierung\03_Segm_Dach_Fassade\input\cluster_1.csv"  # Falls der Name anders ist, bitte anpassen
-df = pd.read_csv(file_path, delimiter=";", decimal=".", header=None)
 
 # Spaltennamen basierend auf der erweiterten Datei setzen
-df.columns = ["X coordinate", "Y coordinate", "Z coordinate", 
-              "Red color (0-1)", "Green color (0-1)", "Blue color (0-1)", 
-              "X scan dir", "Y scan dir", "Z scan dir","Klasse"]
+# Spalten werden als memmap geöffnet, nur die Fit-Variablen kommen in den RAM
+pts = open_points(file_path, columns=get_layout("rgb01_klasse"))
+df = pd.DataFrame(index=pd.RangeIndex(len(pts)))
 
 # Anzahl der Cluster definieren
 num_clusters = 2  # Kann auf kleine Werte (3-5) = mehr generalisierte Klassen, grosse Werte mehre clusters einer Klasse
@@ -32,7 +37,7 @@ code = "GB3" # fit Funktion auf diese Variablen
 print("Starte K-Means Clustering...")
 with tqdm(total=100, desc="Clustering") as pbar:
     kmeans = KMeans(n_clusters=num_clusters, random_state=42, n_init=10)
-    df["Color Cluster"] = kmeans.fit_predict(df[["Green color (0-1)", "Blue color (0-1)"]])
+    df["Color Cluster"] = kmeans.fit_predict(pts.stack(["Green color (0-1)", "Blue color (0-1)"]))
     pbar.update(100)
 
 # Neue Datei speichern (mit Farbklassen, ohne Header)
@@ -45,10 +50,13 @@ os.makedirs(output_folder, exist_ok=True)
 
 # Fortschrittsbalken für das Speichern der Cluster-Dateien
 print("Speichere Cluster-Dateien...")
-for cluster_id in tqdm(df["Color Cluster"].unique(), desc="Speichern der Cluster"):
-    cluster_df = df[df["Color Cluster"] == cluster_id]
-    output_file = os.path.join(output_folder, f"13_PW_{code}_Klasse_{int(cluster_id)}_kmeans.txt")
-    cluster_df.to_csv(output_file, sep=";", index=False, decimal=".", header=False)
+# Ein Durchgang: Labels einmal sortieren, pro Cluster nur dessen Zeilen aus der memmap lesen
+with tqdm(total=num_clusters, desc="Speichern der Cluster") as pbar:
+    split_points(
+        pts, df["Color Cluster"], label_column="Color Cluster",
+        path_for=lambda cluster_id: os.path.join(output_folder, f"13_PW_{code}_Klasse_{int(cluster_id)}_kmeans.txt"),
+        progress=lambda cluster_id, n: pbar.update(1),
+    )
 
 print("Alle KMeans-Cluster-Dateien wurden erfolgreich erstellt!")
 
@@ -1,8 +1,11 @@
-import pandas as pd
-import numpy as np
-import colorsys
+import sys
+import time
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.schema import get_layout
+from punktwolke.normalize import normalize_file
+
 # === EINSTELLUNGEN ===
 input_file = Path(r"arbeitspakete\01_klassifizierung\06_Normalisieren\input\P3A1_Gebaeude.txt")
 # input_folder = Path("250331_KMeans_advance\KMeans_input")  # Ordner mit den TXT-Dateien
@@ -10,38 +13,16 @@ output_folder = Path("./output")  # Zielordner für die normalisierten Dateien
 # input_folder = Path("./input")  # Ordner mit den TXT-Dateien
 # output_folder = Path("./output")  # Zielordner für die normalisierten Dateien
 output_folder.mkdir(exist_ok=True)
+chunksize = 1_000_000  # Punkte pro Block, begrenzt den Speicherbedarf
 
 # # === ALLE .txt-DATEIEN IM ORDNER VERARBEITEN ===
 # for input_file in input_folder.glob("*.txt"):
-df = pd.read_csv(input_file, sep=";", header=None, decimal=".")
-
-# === SPALTEN BENENNEN ===
-df.columns = [
-    "X coordinate", "Y coordinate", "Z coordinate",
-    "Red", "Green", "Blue",
-    "X scan dir", "Y scan dir", "Z scan dir"
-]
-
-# === RGB Normalisieren (schnell via Vektorisierung) ===
-df["Red (0-1)"] = df["Red"] / 255.0
-df["Green (0-1)"] = df["Green"] / 255.0
-df["Blue (0-1)"] = df["Blue"] / 255.0
-
-# === RGB → HSV Umrechnen (schnell mit NumPy + List Comprehension) ===
-rgb_array = df[["Red (0-1)", "Green (0-1)", "Blue (0-1)"]].to_numpy()
-hsv_array = np.array([colorsys.rgb_to_hsv(r, g, b) for r, g, b in rgb_array])
-df[["Hue (0-1)", "Saturation (0-1)", "Value (0-1)"]] = hsv_array
-
-# === SPALTEN IN GEWÜNSCHTER REIHENFOLGE ANORDNEN ===
-df = df[[
-    "X coordinate", "Y coordinate", "Z coordinate",
-    "Red (0-1)", "Green (0-1)", "Blue (0-1)",
-    "Hue (0-1)", "Saturation (0-1)", "Value (0-1)",
-    "X scan dir", "Y scan dir", "Z scan dir"
-]]
-
-# === AUSGABEDATEI SPEICHERN ===
+# === RGB NORMALISIEREN + RGB → HSV (vektorisiert, blockweise von Datei zu Datei) ===
+# Eingabe:  X,Y,Z, Red,Green,Blue (0-255), X/Y/Z scan dir               (.txt oder .pwc)
+# Ausgabe:  X,Y,Z, RGB (0-1), HSV (0-1), X/Y/Z scan dir  (Endung .pwc → binär, .txt → Text)
+start_time = time.time()
 output_file = output_folder / f"{input_file.stem}_normalisiert.txt"
-df.to_csv(output_file, sep=";", index=False, header=False, decimal=".")
+n_points = normalize_file(input_file, output_file, columns=get_layout("roh"), chunksize=chunksize,
+                          progress=lambda n: print(f"  {n} Punkte normalisiert ...", end="\r"))
 
-print(f"✔ {input_file.name} → gespeichert als {output_file.name}")
+print(f"✔ {input_file.name} → gespeichert als {output_file.name} ({n_points} Punkte, {time.time() - start_time:.1f} s)")
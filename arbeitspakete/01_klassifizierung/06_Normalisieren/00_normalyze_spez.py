@@ -1,50 +1,28 @@
-import pandas as pd
-import colorsys
+import sys
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.schema import get_layout
+from punktwolke.normalize import normalize_batch
+
 # === EINSTELLUNGEN ===
 input_folder = Path("./input")  # Ordner mit den TXT-Dateien
 output_folder = Path("./output")  # Zielordner für die normalisierten Dateien
-output_folder.mkdir(exist_ok=True)
-
-# === RGB Normalisieren ===
-def rgb_normalize(row):
-    r, g, b = row["Red"], row["Green"], row["Blue"]
-    return pd.Series([r / 255.0, g / 255.0, b / 255.0])
-
-# === RGB → HSV umrechnen ===
-def rgb_to_hsv(row):
-    r, g, b = row["Red"] / 255.0, row["Green"] / 255.0, row["Blue"] / 255.0
-    h, s, v = colorsys.rgb_to_hsv(r, g, b)
-    return pd.Series([h, s, v])
+max_workers = None  # Anzahl Prozesse, None = so viele wie Dateien (max. CPU-Kerne)
 
 # === ALLE .txt-DATEIEN IM ORDNER VERARBEITEN ===
-for input_file in input_folder.glob("*.txt"):
-    df = pd.read_csv(input_file, sep=";", header=None, decimal=".")
-    file_name = input_file.stem
-    klass = file_name.split(sep="_")[-1]
-
-    # === SPALTEN BENENNEN ===
-    df.columns = [
-        "X coordinate", "Y coordinate", "Z coordinate",
-        "Red", "Green", "Blue",
-        "X scan dir", "Y scan dir", "Z scan dir"
-    ]
-
-    # === Neue Spalten berechnen ===
-    df[["Red (0-1)", "Green (0-1)", "Blue (0-1)"]] = df.apply(rgb_normalize, axis=1)
-    df[["Hue (0-1)", "Saturation (0-1)", "Value (0-1)"]] = df.apply(rgb_to_hsv, axis=1)
-
-    # === SPALTEN IN GEWÜNSCHTER REIHENFOLGE ANORDNEN ===
-    df = df[[
-        "X coordinate", "Y coordinate", "Z coordinate",
-        "Red (0-1)", "Green (0-1)", "Blue (0-1)",
-        "Hue (0-1)", "Saturation (0-1)", "Value (0-1)",
-        "X scan dir", "Y scan dir", "Z scan dir"
-    ]]
-
-    # === AUSGABEDATEI SPEICHERN ===
-    output_file = output_folder / f"PW_Klass_P3A1_{klass}_normalisiert.txt"
-    df.to_csv(output_file, sep=";", index=False, header=False, decimal=".")
-
-    print(f"✔ {input_file.name} → gespeichert als {output_file.name}")
+# RGB (0-255) → RGB (0-1) + HSV (0-1), vektorisiert und blockweise (punktwolke/normalize.py)
+# Jede Klassendatei wird in einem eigenen Prozess normalisiert.
+if __name__ == "__main__":  # nötig für den Prozesspool unter Windows
+    output_folder.mkdir(exist_ok=True)
+
+    jobs = []
+    for input_file in sorted(input_folder.glob("*.txt")):
+        klass = input_file.stem.split(sep="_")[-1]
+        output_file = output_folder / f"PW_Klass_P3A1_{klass}_normalisiert.txt"
+        jobs.append((input_file, output_file))
+
+    # === PARALLEL NORMALISIEREN + MANIFEST SPEICHERN ===
+    manifest = normalize_batch(jobs, columns=get_layout("roh"), max_workers=max_workers,
+                               manifest_path=output_folder / "manifest_normalisierung.csv")
+    print(manifest.to_string(index=False))
@@ -0,0 +1,130 @@
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import matplotlib.pyplot as plt
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import ConfusionMatrixDisplay, classification_report
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.inference import run_inference
+from punktwolke.schema import get_layout
+from punktwolke.training import prepare_training_data, train_partial_fit
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Out-of-core-Variante des Trainings aus 250523_SGDClassifier.ipynb. Die Trainingsplatten
+werden blockweise gelesen, der StandardScaler inkrementell gefittet und der SGDClassifier
+mit partial_fit über mehrere Epochen trainiert (Blöcke pro Epoche gemischt, Klassengewichte
+"balanced"). Nach jeder Epoche wird ein Checkpoint gespeichert. Modell, Scaler und
+Label-Mapping liegen am Schluss unter den gleichen Namen wie im Notebook, so dass der
+Anwendungsteil des Notebooks unverändert weiterverwendet werden kann. Zusätzlich können
+Platten direkt kachelweise im Prozesspool klassifiziert werden (punktwolke/inference.py).
+"""
+
+# === EINSTELLUNGEN ===
+# mehrere Platten möglich, Layout: normalisiert + Klassenname (Text)
+input_dateien = [
+    "PW_Klass_P3A1_gesamt_normalisiert.txt",
+]
+columns = get_layout("normalisiert_klassenname")
+label_column = "Klassenname"
+features = get_layout("normalisiert")  # alle 12 Merkmale
+# features = ["Hue (0-1)", "Z scan dir"]  # Beispiel mit zwei Merkmalen
+
+output_path = "output"
+model_name = "v5_stream"
+result_dir = os.path.join(output_path, f"Resultate_SGDClassifier_{model_name}")
+cache_dir = os.path.join(result_dir, "cache")
+
+epochs = 10
+block_size = 200_000  # Punkte pro Block (Einheit des Mischens)
+validation_fraction = 0.1  # Anteil Blöcke für die Validierung
+
+# Hyperparameter (z.B. aus der Optuna-Studie im Notebook übernehmen)
+sgd_params = dict(loss="log_loss", penalty="l2", alpha=1e-4, class_weight="balanced", random_state=42)
+
+# Anwendung: Platten, die nach dem Training klassifiziert werden (leer = keine)
+anwendung_dateien = [
+    # "PW_P3A2_normalisiert.txt",
+]
+anwendung_columns = get_layout("normalisiert")
+max_memory_mb = 1024  # Arbeitsspeicher pro Worker, bestimmt die Blockgrösse
+max_workers = None  # Anzahl Prozesse, None = CPU-Kerne
+
+if __name__ == "__main__":  # nötig für den Prozesspool unter Windows
+    os.makedirs(result_dir, exist_ok=True)
+    start_time = time.time()
+
+    # === 1. DURCHGANG: KLASSEN ZÄHLEN, SCALER FITTEN, CACHE SCHREIBEN ===
+    data = prepare_training_data(input_dateien, features, label_column, cache_dir, columns=columns)
+    print("Punkte pro Klasse:")
+    for code, count in enumerate(data["counts"]):
+        print(f"  {data['label_mapping'][code]}: {count}")
+
+    plt.bar([str(c) for c in data["classes"]], data["counts"])
+    plt.title("Label Verteilung")
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(os.path.join(result_dir, "label_verteilung.png"))
+    plt.close()
+
+    # === 2. TRAINING ÜBER EPOCHEN (partial_fit, Checkpoint pro Epoche) ===
+    model = SGDClassifier(**sgd_params)
+    model, history, (X_val, y_val) = train_partial_fit(
+        model, data, epochs=epochs, block_size=block_size, validation_fraction=validation_fraction,
+        checkpoint_dir=os.path.join(result_dir, "checkpoints"),
+    )
+    history.to_csv(os.path.join(result_dir, "trainingsverlauf.csv"), index=False)
+
+    plt.plot(history["Epoche"], history["Validierung_Score"], "o-")
+    plt.title("Validation Score pro Epoche")
+    plt.xlabel("Epoche")
+    plt.ylabel("Score")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(result_dir, "validation_score_plot.png"))
+    plt.close()
+
+    # === 3. AUSWERTUNG AUF DEN VALIDIERUNGSBLÖCKEN ===
+    names = [str(c) for c in data["classes"]]
+    y_pred = model.predict(X_val)
+    with open(os.path.join(result_dir, "training_scores.txt"), "w") as f:
+        f.write(f"Validierungs-Score: {model.score(X_val, y_val):.4f}\n")
+    report = classification_report(y_val, y_pred, labels=range(len(names)), target_names=names, zero_division=0)
+    with open(os.path.join(result_dir, "klassifikationsbericht.txt"), "w", encoding="utf-8") as f:
+        f.write(report)
+    disp = ConfusionMatrixDisplay.from_predictions(y_val, y_pred, labels=range(len(names)), display_labels=names,
+                                                   cmap="Blues", xticks_rotation=45)
+    disp.figure_.savefig(os.path.join(result_dir, "confusion_matrix.png"))
+    plt.close()
+
+    # === MODELL, SCALER, MAPPING SPEICHERN (gleiche Namen wie im Notebook) ===
+    joblib.dump(model, os.path.join(result_dir, "sgd_model.pkl"))
+    joblib.dump(data["scaler"], os.path.join(result_dir, "scaler.pkl"))
+    with open(os.path.join(result_dir, "label_mapping.pkl"), "wb") as f:
+        pickle.dump(data["label_mapping"], f)
+
+    # === 4. ANWENDUNG: PLATTEN KACHELWEISE KLASSIFIZIEREN ===
+    # Labels als uint8-Spalte (Code → Klasse über label_mapping.pkl), gleiche Reihenfolge wie die Eingabe
+    for datei in anwendung_dateien:
+        label_path = os.path.join(result_dir, f"{Path(datei).stem}_labels.pwc")
+        _, stats = run_inference(os.path.join(result_dir, "sgd_model.pkl"), datei, features, output_path=label_path,
+                                 scaler_path=os.path.join(result_dir, "scaler.pkl"), columns=anwendung_columns,
+                                 max_memory_mb=max_memory_mb, max_workers=max_workers)
+        stats["Worker_Tabelle"].to_csv(os.path.join(result_dir, f"{Path(datei).stem}_inferenz_worker.csv"),
+                                       sep=";", index=False)
+
+    # Zeit anzeigen
+    elapsed = time.time() - start_time
+    h, rem = divmod(elapsed, 3600)
+    m, s = divmod(rem, 60)
+    print(f"Laufzeit: {int(h):02d}:{int(m):02d}:{s:05.2f} (Std:Min:Sek)")
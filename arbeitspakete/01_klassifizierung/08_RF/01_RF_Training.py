@@ -0,0 +1,156 @@
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import matplotlib.pyplot as plt
+import pandas as pd
+from sklearn.metrics import ConfusionMatrixDisplay
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.forest import (
+    class_report, confusion_table, feature_importances, make_forest, sample_training_data,
+)
+from punktwolke.geometry import feature_columns, geometric_features
+from punktwolke.inference import run_inference
+from punktwolke.schema import get_layout
+from punktwolke.store import append_columns
+from punktwolke.training import prepare_training_data
+from punktwolke.voxel import multiscale_features, pyramid_columns
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Klassifikation mit Random Forest bzw. Histogram Gradient Boosting auf den gleichen
+12 Merkmalen wie der SGDClassifier (07_SDG). Die Trainingsplatten werden einmal in den
+binären Cache geschrieben, daraus wird eine klassenbalancierte Stichprobe gezogen und das
+Modell auf allen Kernen trainiert (Merkmale in Quantil-Klassen, float32). Ausgegeben werden
+Zeiten und Qualität pro Klasse, Merkmalswichtigkeiten und die Confusion Matrix. Danach
+werden die Anwendungsplatten kachelweise im Prozesspool klassifiziert.
+Optional kommen Nachbarschaftsmerkmale (Linearity, Planarity, ... pro Radius) dazu. Der
+kNN-Graph dafür wird pro Platte einmal gebaut und neben der Datei gespeichert (<name>.knn).
+Grössere Radien werden günstiger auf einer Voxel-Pyramide berechnet (punktwolke/voxel.py).
+"""
+
+# === EINSTELLUNGEN ===
+# mehrere Platten möglich, Layout: normalisiert + Klassenname (Text)
+input_dateien = [
+    "PW_Klass_P3A1_gesamt_normalisiert.txt",
+]
+columns = get_layout("normalisiert_klassenname")
+label_column = "Klassenname"
+features = get_layout("normalisiert")  # alle 12 Merkmale
+geometrie_radien = []  # z.B. [0.5, 1.0, 2.0] → Nachbarschaftsmerkmale (punktwolke/geometry.py)
+geometrie_k = 20  # Nachbarn pro Punkt im kNN-Graphen
+pyramide_stufen = []  # z.B. [(0.25, 0.5), (0.5, 1.0), (1.0, 2.0)] → (Voxelgrösse, Radius) in m
+
+output_path = "output"
+modus = "rf"  # "rf" = RandomForest, "hgb" = HistGradientBoosting
+model_name = f"{modus}_v1"
+result_dir = os.path.join(output_path, f"Resultate_RF_{model_name}")
+cache_dir = os.path.join(result_dir, "cache")
+
+budget_pro_klasse = 200_000  # klassenbalancierte Trainingsstichprobe
+validierung_punkte = 500_000  # zufällige Validierungsstichprobe aus den übrigen Punkten
+forest_params = dict(n_estimators=200, max_depth=None, min_samples_leaf=5, n_bins=255, n_jobs=-1, random_state=42)
+
+# Anwendung: Platten, die nach dem Training klassifiziert werden (leer = keine)
+anwendung_dateien = [
+    # "PW_P3A2_normalisiert.txt",
+]
+anwendung_columns = get_layout("normalisiert")
+max_memory_mb = 1024  # Arbeitsspeicher pro Worker, bestimmt die Blockgrösse
+max_workers = None  # Anzahl Prozesse, None = CPU-Kerne
+
+if __name__ == "__main__":  # nötig für den Prozesspool unter Windows
+    os.makedirs(result_dir, exist_ok=True)
+    start_time = time.time()
+
+    # === 0. OPTIONAL: NACHBARSCHAFTSMERKMALE ANHÄNGEN (Graph wird wiederverwendet) ===
+    zusatz_columns = feature_columns(geometrie_radien) + pyramid_columns(pyramide_stufen)
+    if zusatz_columns:
+        os.makedirs(cache_dir, exist_ok=True)
+        for dateien, endung, spalten in ((input_dateien, ".txt", columns), (anwendung_dateien, ".pwc", anwendung_columns)):
+            for i, datei in enumerate(dateien):
+                tabellen = []
+                if geometrie_radien:
+                    tabellen.append(geometric_features(datei, radii=geometrie_radien, k=geometrie_k, columns=spalten))
+                if pyramide_stufen:
+                    tabellen.append(multiscale_features(datei, levels=pyramide_stufen, k=geometrie_k, columns=spalten))
+                ziel = os.path.join(cache_dir, f"{Path(datei).stem}_geometrie{endung}")
+                append_columns(datei, ziel, pd.concat(tabellen, axis=1), columns=spalten)
+                dateien[i] = ziel
+        columns = columns + zusatz_columns
+        anwendung_columns = anwendung_columns + zusatz_columns
+        features = features + zusatz_columns
+
+    # === 1. TRAININGS-CACHE SCHREIBEN (einmal parsen) ===
+    data = prepare_training_data(input_dateien, features, label_column, cache_dir, columns=columns)
+    names = [str(c) for c in data["classes"]]
+
+    # === 2. KLASSENBALANCIERTE STICHPROBE ===
+    print("Stichprobe pro Klasse:")
+    X_train, y_train, X_val, y_val, timing = sample_training_data(
+        data, budget=budget_pro_klasse, validation_size=validierung_punkte)
+
+    # === 3. TRAINING (alle Kerne) ===
+    model = make_forest(modus, **forest_params)
+    fit_start = time.time()
+    model.fit(X_train, y_train)
+    fit_time = time.time() - fit_start
+    print(f"{modus} trainiert auf {len(y_train)} Punkten: {fit_time:.1f} s")
+
+    # === 4. AUSWERTUNG ===
+    report, y_pred = class_report(model, X_val, y_val, names)
+    report = timing.merge(report.drop(columns="Punkte"), on="Klasse")
+    report.to_csv(os.path.join(result_dir, "klassen_zeiten_qualitaet.csv"), sep=";", index=False)
+    print(report.to_string(index=False))
+
+    importances = feature_importances(model, features, X_val, y_val)
+    importances.to_csv(os.path.join(result_dir, "merkmal_wichtigkeit.csv"), sep=";", index=False)
+    print(importances.to_string(index=False))
+
+    plt.barh(importances["Merkmal"][::-1], importances["Wichtigkeit"][::-1])
+    plt.title(f"Merkmalswichtigkeit ({importances['Methode'][0]})")
+    plt.tight_layout()
+    plt.savefig(os.path.join(result_dir, "merkmal_wichtigkeit.png"))
+    plt.close()
+
+    confusion_table(y_val, y_pred, names).to_csv(os.path.join(result_dir, "confusion_matrix.csv"), sep=";")
+    disp = ConfusionMatrixDisplay.from_predictions(y_val, y_pred, labels=range(len(names)), display_labels=names,
+                                                   cmap="Blues", xticks_rotation=45)
+    disp.figure_.savefig(os.path.join(result_dir, "confusion_matrix.png"))
+    plt.close()
+
+    with open(os.path.join(result_dir, "training_scores.txt"), "w") as f:
+        f.write(f"Modus: {modus}\n")
+        f.write(f"Trainingspunkte: {len(y_train)}\n")
+        f.write(f"Trainingszeit: {fit_time:.1f} s\n")
+        f.write(f"Validierungs-Score: {(y_pred == y_val).mean():.4f}\n")
+
+    # === MODELL UND MAPPING SPEICHERN (Pipeline mit Quantisierung, kein Scaler nötig) ===
+    model_path = os.path.join(result_dir, f"{modus}_model.pkl")
+    joblib.dump(model, model_path)
+    with open(os.path.join(result_dir, "label_mapping.pkl"), "wb") as f:
+        pickle.dump(data["label_mapping"], f)
+
+    # === 5. ANWENDUNG: PLATTEN KACHELWEISE KLASSIFIZIEREN ===
+    # Labels als uint8-Spalte (Code → Klasse über label_mapping.pkl), gleiche Reihenfolge wie die Eingabe
+    for datei in anwendung_dateien:
+        label_path = os.path.join(result_dir, f"{Path(datei).stem}_labels.pwc")
+        _, stats = run_inference(model_path, datei, features, output_path=label_path, columns=anwendung_columns,
+                                 max_memory_mb=max_memory_mb, max_workers=max_workers)
+        stats["Worker_Tabelle"].to_csv(os.path.join(result_dir, f"{Path(datei).stem}_inferenz_worker.csv"),
+                                       sep=";", index=False)
+
+    # Zeit anzeigen
+    elapsed = time.time() - start_time
+    h, rem = divmod(elapsed, 3600)
+    m, s = divmod(rem, 60)
+    print(f"Laufzeit: {int(h):02d}:{int(m):02d}:{s:05.2f} (Std:Min:Sek)")
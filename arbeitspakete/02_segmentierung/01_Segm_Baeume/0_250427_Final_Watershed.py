@@ -23,26 +23,28 @@ Zusätzlich werden für jede Verarbeitungsstufe Visualisierungen erzeugt (siehe
 '''
 
 import os
+import sys
 import time
+from pathlib import Path
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.stats import binned_statistic_2d
 from scipy import ndimage as ndi
 from sklearn.cluster import DBSCAN
-from scipy.spatial import ConvexHull
 from skimage.feature import peak_local_max
 from skimage.segmentation import watershed
-from scipy.ndimage import center_of_mass
-from tqdm import tqdm
 import open3d as o3d
 from utils import visualize_processing_steps, verify_tree_positions, zeit
-# from open3d import SetViewPoint
 
-# -------------------------------------------
-# Startzeit zur Laufzeitmessung
-# -------------------------------------------
-start = time.time()
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.crowns import tiled_segment_crowns
+from punktwolke.dbscan import dbscan_grid
+from punktwolke.groups import diameter_mask
+from punktwolke.raster import grid_extent, raster_grid, rasterize, region_properties
+from punktwolke.schema import get_layout
+from punktwolke.store import load_points
+from punktwolke.tiling import dbscan_grid_xy, dbscan_xy, run_tiled
+# from open3d import SetViewPoint
 
 # -------------------------------------------
 # Parameterdefinition (Tuningmöglichkeiten)
@@ -55,178 +57,168 @@ eps = 0.8              # DBSCAN: Radius
 min_samples = 130   # DBSCAN: Mindestpunkte pro Cluster
 diameter_min = 2.5    # [m] minimaler Kronendurchmesser
 diameter_max = 11   # [m] maximaler Kronendurchmesser
+raster_ursprung = None  # [m] fester CHM-Ursprung (Spalte 0, Spalte 1), None = Minimum der Punkte wie bisher (E/N vergleichbar)
+dbscan_raster = True   # DBSCAN über Raster + Zusammenhangskomponenten (gleiche Labels wie sklearn, schneller)
+kachel_groesse = None  # [m] DBSCAN in Kacheln (ganze Platte, Rand 2 * eps), None = ohne Kacheln
+ws_kachel_groesse = None  # [Pixel] Gipfel + Watershed in CHM-Kacheln (ganze Platte), None = ohne Kacheln
+ws_rand = 32  # [Pixel] Rand der Watershed-Kacheln (≥ Kronenradius), wird an Konfliktstellen verdoppelt
+max_workers = None  # Prozesse für die Kacheln, None = CPU-Kerne
 # -------------------------------------------
 datum = "20250517_final4"
 RunID = f"Parameter_res{res}_minPix{min_distance}_sig{sigma}_minH{min_height}_eps{eps}_minSam{min_samples}_DM{diameter_min}bis{diameter_max}"
-# ----------------------
-# 0. Output-Ordner
-# ----------------------
-output_dir = fr"arbeitspakete\02_segmentierung\01_Segm_Baeume\output\{datum}"
-os.makedirs(output_dir, exist_ok=True)
-print(f"Output-Ordner: {output_dir}")
-
-# ----------------------
-# 1. Punktwolke laden (TXT)
-# ----------------------
-print("Lade Punktwolke ...")
-txt_path = r"arbeitspakete\02_segmentierung\01_Segm_Baeume\input\PW_Baeume_o_Boden_o_Rauschen.txt"
-df_txt = pd.read_csv(txt_path, delimiter= ";", decimal= ".", header=None)
-df_txt.columns = ['X', 'Y', 'Z']
-points = df_txt[['X', 'Y', 'Z']].values
-start_time = zeit(start, msg="1. Punktwolke geladen – ")
-# ----------------------
-# 2. Vorfilterung & Clustering
-# ----------------------
-print("Führe DBSCAN-Clustering durch ...")
-veg_points = points[points[:, 2] > min_height]
-
-db = DBSCAN(eps=eps, min_samples=min_samples)
-labels = db.fit_predict(veg_points[:, :2])
-
-filtered_points = []
-filtered_labels = []
-
-for label in np.unique(labels):
-    if label == -1:
-        continue
-    cluster = veg_points[labels == label]
-    if len(cluster) < 5:
-        continue
-    try:
-        hull = ConvexHull(cluster[:, :2])
-        area = hull.area
-        diameter = np.sqrt(4 * area / np.pi)
-        if diameter_min <= diameter <= diameter_max:
-            filtered_points.append(cluster)
-            filtered_labels.extend([label] * len(cluster))
-    except:
-        continue
-
-if not filtered_points:
-    raise ValueError("Keine gültigen Cluster gefunden!")
-
-filtered_points = np.vstack(filtered_points)
-filtered_labels = np.array(filtered_labels)
-
-print(f"Punkte nach Durchmesserfilter: {filtered_points.shape[0]}")
-
-start_time = zeit(start_time, msg="2. DBSCAN – ")
-# ----------------------
-# 3. CHM erstellen
-# ----------------------
-print("Erzeuge Canopy Height Model (CHM) ...")
-x_min, x_max = filtered_points[:, 1].min(), filtered_points[:, 1].max()
-y_min, y_max = filtered_points[:, 0].min(), filtered_points[:, 0].max()
-x_bins = int(np.ceil((x_max - x_min) / res))
-y_bins = int(np.ceil((y_max - y_min) / res))
-
-# ACHTUNG: Bins [y, x] Reihenfolge wichtig
-chm_stat, _, _, _ = binned_statistic_2d(
-    filtered_points[:, 0], 
-    filtered_points[:, 1], 
-    filtered_points[:, 2],
-    statistic='max', 
-    bins=[y_bins, x_bins]
-)
-chm = np.nan_to_num(chm_stat, nan=0)
-start_time = zeit(start_time, msg="3. Canopy Height Model – ")
-# ----------------------
-# 4. Lokale Maxima
-# ----------------------
-print("Suche Baumgipfel ...")
-chm_smooth = ndi.gaussian_filter(chm, sigma=sigma)
-local_max = peak_local_max(chm_smooth, min_distance=int(min_distance), labels=chm > 0)
-
-valid = chm[local_max[:, 0], local_max[:, 1]] > min_height
-local_max = local_max[valid]
-print(f"Lokale Maxima (gefiltert): {len(local_max)}")
-start_time = zeit(start_time, msg="4. Lokale Maxima – ")
-# ----------------------
-# 5. Watershed-Segmentierung
-# ----------------------
-print("Segmentiere Kronen mit Watershed ...")
-markers = np.zeros_like(chm, dtype=int)
-for i, coord in enumerate(local_max):
-    markers[coord[0], coord[1]] = i + 1
-
-elevation = -chm_smooth
-labels = watershed(elevation, markers, mask=chm > 0)
-print(f"Segmente gefunden: {labels.max()}")
-start_time = zeit(start_time, msg="5. Watershed-Segmentierung – ")
-# ----------------------
-# 6. Baumdaten extrahieren
-# ----------------------
-print("Extrahiere Baumdaten ...")
-tree_data = []
-
-for region_label in tqdm(np.unique(labels), desc="Bäume analysieren"):
-    if region_label == 0:
-        continue
-    mask = labels == region_label
-    if np.sum(mask) < 3:
-        continue
-
-    z_vals = chm[mask]
-    height = z_vals.max()
-    crown_area = np.sum(mask) * res * res
-    crown_diameter = np.sqrt(4 * crown_area / np.pi)
-
-    cy, cx = center_of_mass(mask)
-    N = x_min + cx * res  # Nordwert
-    E = y_min + cy * res  # Ostwert       
-
-    tree_data.append({
-        "Tree_ID": region_label,
-        "E": E,
-        "N": N,
-        "Height_m": round(height, 2),
-        "Crown_Diameter_m": round(crown_diameter, 2)
-    })
 
-tqdm._instances.clear()
-
-df = pd.DataFrame(tree_data)
-# # Spalten umbenennen und E/N tauschen
-# df = pd.DataFrame(tree_data)
-# df = df.rename(columns={"X": "E", "Y": "N"})
-# df = df[["Tree_ID", "E", "N", "Height_m", "Crown_Diameter_m"]]
-# Speichern
-csv_path = os.path.join(output_dir, f"baumdaten_watershed_RunID_{datum}.csv")
-df.to_csv(csv_path, decimal=".", columns=["Tree_ID", "E", "N", "Height_m", "Crown_Diameter_m"], index=False)
-print(f"CSV gespeichert: {csv_path}")
-start_time = zeit(start_time, msg="6. Baumdaten extrahieren und speichern – ")
-
-# ----------------------
-# 7. Visualisierungen erstellen
-# ----------------------
-# Plots zu den Arbeitsstritten erstellen
-visualize_processing_steps(
-    filtered_points=filtered_points,
-    filtered_labels=filtered_labels,
-    chm=chm,
-    chm_smooth=chm_smooth,
-    local_max=local_max,
-    labels_ws=labels,
-    output_dir=output_dir,
-    df=df,
-    x_min=x_min, x_max=x_max, 
-    y_min=y_min, y_max=y_max, 
-    res=res, RunID=RunID
-    )
-
-start_time = zeit(start_time, msg="7. Visualisierungen erstellt – ")
-
-# ----------------------
-# 9. Laufzeit anzeigen
-# ----------------------
-zeit(start, msg="Gesamtlaufzeit – ")
-
-# ----------------------
-# 10. PW mit gelabelten Bäumen darstellen (Matplotlib)
-# ----------------------
-
-verify_tree_positions(output_dir=output_dir, txt_path=txt_path, csv_path=csv_path)
-
-# ----------------------
-# 11. PW mit gelabelten Bäumen darstellen interaktiv (Open3D)
-# ----------------------
\ No newline at end of file
+if __name__ == "__main__":  # nötig für den Prozesspool unter Windows
+    # -------------------------------------------
+    # Startzeit zur Laufzeitmessung
+    # -------------------------------------------
+    start = time.time()
+
+    # ----------------------
+    # 0. Output-Ordner
+    # ----------------------
+    output_dir = fr"arbeitspakete\02_segmentierung\01_Segm_Baeume\output\{datum}"
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Output-Ordner: {output_dir}")
+
+    # ----------------------
+    # 1. Punktwolke laden (TXT)
+    # ----------------------
+    print("Lade Punktwolke ...")
+    txt_path = r"arbeitspakete\02_segmentierung\01_Segm_Baeume\input\PW_Baeume_o_Boden_o_Rauschen.txt"
+    df_txt = load_points(txt_path, columns=get_layout("xyz"))  # .txt oder .pwc, Spalten X, Y, Z
+    points = df_txt[['X', 'Y', 'Z']].values
+    start_time = zeit(start, msg="1. Punktwolke geladen – ")
+    # ----------------------
+    # 2. Vorfilterung & Clustering
+    # ----------------------
+    print("Führe DBSCAN-Clustering durch ...")
+    veg_points = points[points[:, 2] > min_height]
+
+    if kachel_groesse is None:
+        if dbscan_raster:
+            labels = dbscan_grid(veg_points[:, :2], eps=eps, min_samples=min_samples)
+        else:
+            db = DBSCAN(eps=eps, min_samples=min_samples)
+            labels = db.fit_predict(veg_points[:, :2])
+    else:
+        # Kacheln mit Rand im Prozesspool, Cluster über Kachelgrenzen werden zusammengeführt
+        stage = dbscan_grid_xy if dbscan_raster else dbscan_xy
+        labels, kacheln = run_tiled(stage, veg_points[:, :2], tile_size=kachel_groesse, halo=2 * eps,
+                                    max_workers=max_workers, eps=eps, min_samples=min_samples)
+
+    # Durchmesser aus der konvexen Hülle pro Cluster (einmal nach Label sortiert, siehe punktwolke/groups.py),
+    # wie bisher aus ConvexHull(...).area, das in 2D der Umfang ist
+    keep, kronen = diameter_mask(veg_points, labels, diameter_min, diameter_max, measure="perimeter")
+    # Reihenfolge wie bisher: Cluster nach Label, innerhalb in Punktreihenfolge
+    auswahl = np.flatnonzero(keep)
+    auswahl = auswahl[np.argsort(labels[auswahl], kind="stable")]
+    filtered_points = veg_points[auswahl]
+    filtered_labels = labels[auswahl]
+    print(f"Cluster nach Durchmesserfilter: {int(kronen['Behalten'].sum())} von {len(kronen)}")
+
+    if len(filtered_points) == 0:
+        raise ValueError("Keine gültigen Cluster gefunden!")
+
+    print(f"Punkte nach Durchmesserfilter: {filtered_points.shape[0]}")
+
+    start_time = zeit(start_time, msg="2. DBSCAN – ")
+    # ----------------------
+    # 3. CHM erstellen
+    # ----------------------
+    print("Erzeuge Canopy Height Model (CHM) ...")
+    # Raster-Ursprung wie bisher im Minimum der Punkte, Zellen genau res gross, siehe punktwolke/raster.py
+    # ACHTUNG: Zeilen aus Spalte 0, Spalten aus Spalte 1 der Punkte (wie bisher [y, x])
+    grid = raster_grid(filtered_points, res, origin=raster_ursprung)
+    rasters, grid = rasterize(filtered_points, grid=grid, stats=("max",))
+    chm = rasters["max"]
+    y_min, y_max, x_min, x_max = grid_extent(grid)
+    start_time = zeit(start_time, msg="3. Canopy Height Model – ")
+    # ----------------------
+    # 4. Lokale Maxima
+    # ----------------------
+    if ws_kachel_groesse is None:
+        print("Suche Baumgipfel ...")
+        chm_smooth = ndi.gaussian_filter(chm, sigma=sigma)
+        local_max = peak_local_max(chm_smooth, min_distance=int(min_distance), labels=chm > 0)
+
+        valid = chm[local_max[:, 0], local_max[:, 1]] > min_height
+        local_max = local_max[valid]
+        print(f"Lokale Maxima (gefiltert): {len(local_max)}")
+        start_time = zeit(start_time, msg="4. Lokale Maxima – ")
+        # ----------------------
+        # 5. Watershed-Segmentierung
+        # ----------------------
+        print("Segmentiere Kronen mit Watershed ...")
+        markers = np.zeros_like(chm, dtype=int)
+        for i, coord in enumerate(local_max):
+            markers[coord[0], coord[1]] = i + 1
+
+        elevation = -chm_smooth
+        labels = watershed(elevation, markers, mask=chm > 0)
+    else:
+        # 4. + 5. in CHM-Kacheln mit Rand im Prozesspool, gleiche Gipfel und Kronen-IDs wie oben,
+        # Kronen über Kachelgrenzen werden über den Rand abgeglichen (siehe punktwolke/crowns.py)
+        print("Suche Baumgipfel und segmentiere Kronen in Kacheln ...")
+        labels, local_max, chm_smooth, ws_kacheln = tiled_segment_crowns(
+            chm, min_distance=min_distance, sigma=sigma, min_height=min_height,
+            tile_size=ws_kachel_groesse, halo=ws_rand, max_workers=max_workers)
+        print(f"Lokale Maxima (gefiltert): {len(local_max)}")
+    print(f"Segmente gefunden: {labels.max()}")
+    start_time = zeit(start_time, msg="5. Watershed-Segmentierung – ")
+    # ----------------------
+    # 6. Baumdaten extrahieren
+    # ----------------------
+    print("Extrahiere Baumdaten ...")
+    # alle Kronen in einem Durchgang (np.bincount statt einer Maske pro Krone), siehe punktwolke/raster.py
+    regionen = region_properties(labels, chm, res, min_pixels=3)
+    df = pd.DataFrame({
+        "Tree_ID": regionen["Label"],
+        "E": y_min + regionen["Zeile"] * res,  # Ostwert
+        "N": x_min + regionen["Spalte"] * res,  # Nordwert
+        "Height_m": regionen["Hoehe_max"].round(2),
+        "Crown_Diameter_m": regionen["Durchmesser_m"].round(2),
+    })
+    # # Spalten umbenennen und E/N tauschen
+    # df = pd.DataFrame(tree_data)
+    # df = df.rename(columns={"X": "E", "Y": "N"})
+    # df = df[["Tree_ID", "E", "N", "Height_m", "Crown_Diameter_m"]]
+    # Speichern
+    csv_path = os.path.join(output_dir, f"baumdaten_watershed_RunID_{datum}.csv")
+    df.to_csv(csv_path, decimal=".", columns=["Tree_ID", "E", "N", "Height_m", "Crown_Diameter_m"], index=False)
+    print(f"CSV gespeichert: {csv_path}")
+    start_time = zeit(start_time, msg="6. Baumdaten extrahieren und speichern – ")
+
+    # ----------------------
+    # 7. Visualisierungen erstellen
+    # ----------------------
+    # Plots zu den Arbeitsstritten erstellen
+    visualize_processing_steps(
+        filtered_points=filtered_points,
+        filtered_labels=filtered_labels,
+        chm=chm,
+        chm_smooth=chm_smooth,
+        local_max=local_max,
+        labels_ws=labels,
+        output_dir=output_dir,
+        df=df,
+        x_min=x_min, x_max=x_max, 
+        y_min=y_min, y_max=y_max, 
+        res=res, RunID=RunID
+        )
+
+    start_time = zeit(start_time, msg="7. Visualisierungen erstellt – ")
+
+    # ----------------------
+    # 9. Laufzeit anzeigen
+    # ----------------------
+    zeit(start, msg="Gesamtlaufzeit – ")
+
+    # ----------------------
+    # 10. PW mit gelabelten Bäumen darstellen (Matplotlib)
+    # ----------------------
+
+    verify_tree_positions(output_dir=output_dir, txt_path=txt_path, csv_path=csv_path)
+
+    # ----------------------
+    # 11. PW mit gelabelten Bäumen darstellen interaktiv (Open3D)
+    # ----------------------
\ No newline at end of file
@@ -0,0 +1,81 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Parameterstudie zu 0_250427_Final_Watershed.py: Statt die Konstanten anzupassen und das ganze
+Skript neu zu starten, werden alle Kombinationen eines Parameterrasters gerechnet. Punktwolke,
+DBSCAN, CHM, Gipfel und Watershed werden pro Parameterstand einmal im Cache-Ordner gespeichert
+und von allen Läufen (auch späteren Studien) wiederverwendet, siehe punktwolke/sweep.py.
+
+Pro Lauf entsteht ein Ordner output/<datum>_<Nr> mit baumdaten_watershed_RunID_<Ordner>.csv
+und <RunID>_Lauf.json, wie ihn 5_250520_create_HTML_report.py erwartet. Optional werden die
+Plots aus utils.visualize_processing_steps erzeugt.
+"""
+
+import sys
+import time
+from pathlib import Path
+import pandas as pd
+from utils import visualize_processing_steps, zeit
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.raster import grid_extent
+from punktwolke.schema import get_layout
+from punktwolke.sweep import load_run, parameter_grid, run_id, run_sweep, tree_table
+
+# -------------------------------------------
+# Parameterraster (Wert oder Liste von Werten)
+# -------------------------------------------
+raster = {
+    "res": [0.5, 1],             # [m] CHM Rasterauflösung
+    "min_distance": [2, 3, 4],   # [Pixel] Abstand lokaler Maxima
+    "sigma": [0, 1],             # Glättung (Gauss-Filter)
+    "min_height": 1,             # Mindesthöhe für Punkte
+    "eps": [0.8, 0.9],           # DBSCAN: Radius
+    "min_samples": [100, 130],   # DBSCAN: Mindestpunkte pro Cluster
+    "diameter_min": 2.5,         # [m] minimaler Kronendurchmesser
+    "diameter_max": 11,          # [m] maximaler Kronendurchmesser
+}
+datum = "20250610_studie"   # Präfix der Laufordner
+plots = False               # Plots pro Lauf (step1 ... step5), langsam bei vielen Läufen
+max_workers = None          # Prozesse, None = CPU-Kerne
+# -------------------------------------------
+txt_path = r"arbeitspakete\02_segmentierung\01_Segm_Baeume\input\PW_Baeume_o_Boden_o_Rauschen.txt"
+output_dir = r"arbeitspakete\02_segmentierung\01_Segm_Baeume\output"
+cache_dir = r"arbeitspakete\02_segmentierung\01_Segm_Baeume\cache"  # nicht im Output-Ordner (Report)
+
+if __name__ == "__main__":  # nötig für den Prozesspool unter Windows
+    start = time.time()
+    print(f"{len(parameter_grid(raster))} Läufe, Cache: {cache_dir}")
+
+    studie = run_sweep(txt_path, raster, output_dir, datum, cache_dir, columns=get_layout("xyz"),
+                       max_workers=max_workers)
+    print(studie[["Lauf", "RunID", "Baeume", "Fehler", "Schritte_neu"]].to_string(index=False))
+    start_time = zeit(start, msg="Parameterstudie – ")
+
+    if plots:
+        for params, lauf in zip(parameter_grid(raster), studie.itertuples()):
+            if pd.notna(lauf.Fehler):  # Lauf ohne gültige Cluster
+                continue
+            daten = load_run(cache_dir, params, txt_path)
+            y_min, y_max, x_min, x_max = grid_extent(daten["grid"])
+            visualize_processing_steps(
+                filtered_points=daten["filtered_points"],
+                filtered_labels=daten["filtered_labels"],
+                chm=daten["chm"],
+                chm_smooth=daten["chm_smooth"],
+                local_max=daten["local_max"],
+                labels_ws=daten["labels_ws"],
+                output_dir=str(Path(output_dir) / lauf.Lauf),
+                df=tree_table(daten["labels_ws"], daten["chm"], daten["grid"]),
+                x_min=x_min, x_max=x_max,
+                y_min=y_min, y_max=y_max,
+                res=params["res"], RunID=run_id(params)
+                )
+        zeit(start_time, msg="Visualisierungen erstellt – ")
+
+    zeit(start, msg="Gesamtlaufzeit – ")
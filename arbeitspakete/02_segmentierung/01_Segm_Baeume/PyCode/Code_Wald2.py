@@ -1,16 +1,18 @@
 import os
+import sys
 import time
+from pathlib import Path
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.stats import binned_statistic_2d
 from scipy import ndimage as ndi
 from skimage.feature import peak_local_max
 from skimage.segmentation import watershed
-from scipy.ndimage import center_of_mass
-from tqdm import tqdm
 import open3d as o3d
 
+sys.path.append(str(Path(__file__).resolve().parents[4]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.raster import grid_extent, rasterize, region_properties
+
 # -------------------------------------------
 # Startzeit zur Laufzeitmessung
 # -------------------------------------------
@@ -52,20 +54,12 @@ print(f"Punkte nach Höhenfilter (> {min_height} m): {points.shape[0]}")
 # 2. CHM erstellen
 # ----------------------
 print("Erzeuge Canopy Height Model (CHM) ...")
-x_min, x_max = points[:, 1].min(), points[:, 1].max()
-y_min, y_max = points[:, 0].min(), points[:, 0].max()
-x_bins = int(np.ceil((x_max - x_min) / res))
-y_bins = int(np.ceil((y_max - y_min) / res))
-
-# ACHTUNG: Reihenfolge der Bins [y_bins, x_bins] ist wichtig!
-chm_stat, _, _, _ = binned_statistic_2d(
-    points[:, 0],  # X
-    points[:, 1],  # Y
-    points[:, 2],  # Z
-    statistic='max',
-    bins=[y_bins, x_bins]
-)
-chm = np.nan_to_num(chm_stat, nan=0)
+# Raster mit Ursprung im Minimum der Punkte (wie bisher), Zellen genau res gross, siehe punktwolke/raster.py
+# ACHTUNG: Zeilen aus Spalte 0, Spalten aus Spalte 1 der Punkte (wie bisher [y_bins, x_bins])
+rasters, grid = rasterize(points, res=res, stats=("max",))
+chm = rasters["max"]
+y_min, y_max, x_min, x_max = grid_extent(grid)
+y_bins, x_bins = grid["shape"]
 print(f"CHM: {x_bins} x {y_bins} Zellen, Auflösung {res} m")
 
 # ----------------------
@@ -96,33 +90,14 @@ print(f"Baumsegmente erkannt: {labels.max()}")
 # 5. Baumdaten extrahieren
 # ----------------------
 print("Extrahiere Baumdaten ...")
-tree_data = []
-
-for region_label in tqdm(np.unique(labels), desc="Bäume analysieren"):
-    if region_label == 0:
-        continue
-    mask = labels == region_label
-    if np.sum(mask) < 3:
-        continue
-
-    z_vals = chm[mask]
-    height = z_vals.max()
-    crown_area = np.sum(mask) * res * res
-    crown_diameter = np.sqrt(4 * crown_area / np.pi)
-
-    cy, cx = center_of_mass(mask)
-    y = y_min + cy * res
-    x = x_min + cx * res
-
-    tree_data.append({
-        "Tree_ID": region_label,
-        "X": x,
-        "Y": y,
-        "Height_m": round(height, 2),
-        "Crown_Diameter_m": round(crown_diameter, 2)
-    })
-
-df = pd.DataFrame(tree_data)
+regionen = region_properties(labels, chm, res, min_pixels=3)  # alle Kronen auf einmal
+df = pd.DataFrame({
+    "Tree_ID": regionen["Label"],
+    "X": x_min + regionen["Spalte"] * res,
+    "Y": y_min + regionen["Zeile"] * res,
+    "Height_m": regionen["Hoehe_max"].round(2),
+    "Crown_Diameter_m": regionen["Durchmesser_m"].round(2),
+})
 csv_path = os.path.join(output_dir, f"baumdaten_watershed_Run_ID_{id}.csv")
 df.to_csv(csv_path, index=False)
 print(f"CSV gespeichert: {csv_path} ({len(df)} Bäume)")
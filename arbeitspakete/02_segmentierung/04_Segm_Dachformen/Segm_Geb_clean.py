@@ -4,6 +4,8 @@ import pandas as pd
 import numpy as np
 from tqdm import tqdm
 import os
+import sys
+from pathlib import Path
 import matplotlib.pyplot as plt
 import open3d as o3d
 
@@ -13,6 +15,10 @@ from sklearn.decomposition import PCA
 import networkx as nx
 from shapely.geometry import Polygon
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.schema import get_layout
+from punktwolke.store import open_points
+
 # === Parameter ===
 # input_path = r"arbeitspakete\02_segmentierung\02_Segm_Gebäude\input\P3A1_Gebaeude.txt"
 # num_kmeans_clusters = 150 # falls Gebàude noch zusammen, dann héher gehen
@@ -56,24 +62,22 @@ def get_pca_aligned_obb(points_np):
     obb = o3d.geometry.OrientedBoundingBox(obb_center, R, extent)
     return obb
 
-# === Daten einlesen ===
-df = pd.read_csv(input_path, delimiter=";", decimal=".", header=None)
-df.columns = ["X coordinate", "Y coordinate", "Z coordinate",
-              "Red color (0-1)", "Green color (0-1)", "Blue color (0-1)",
-              "Hue (0-1)", "Saturation (0-1)", "Value (0-1)",
-              "X scan dir", "Y scan dir", "Z scan dir"]
+# === Daten einlesen (.txt oder .pwc, spaltenweise als memmap) ===
+pts = open_points(input_path, columns=get_layout("normalisiert_color"))
+xyz = pts.xyz()  # Koordinaten einmal als float64 (Open3D / OBB), wird unten wiederverwendet
+df = pd.DataFrame(index=pd.RangeIndex(len(pts)))  # nur noch Labels, keine 12 Spalten im RAM
 
 # === KMeans Clustering ===
 print("Starte KMeans-Vorsegmentierung...")
 kmeans = KMeans(n_clusters=num_kmeans_clusters, random_state=42, n_init=10)
-df["Color Cluster"] = kmeans.fit_predict(df[["X coordinate", "Y coordinate", "Z coordinate", "Hue (0-1)", "Z scan dir"]])
+df["Color Cluster"] = kmeans.fit_predict(pts.stack(["X coordinate", "Y coordinate", "Z coordinate", "Hue (0-1)", "Z scan dir"]))
 
 # === OBB-Berechnung ===
 cluster_ids = sorted(df["Color Cluster"].unique())
 cluster_features = []
 cluster_obb = {}
 for cid in cluster_ids:
-    points_np = df[df["Color Cluster"] == cid][["X coordinate", "Y coordinate", "Z coordinate"]].to_numpy()
+    points_np = xyz[df["Color Cluster"].to_numpy() == cid]
     centroid = points_np.mean(axis=0)
     cluster_features.append(centroid)
     obb = get_pca_aligned_obb(points_np)
@@ -111,7 +115,7 @@ def obb_to_lineset(obb, color=(1, 0, 0)):
     obb.color = color
     return obb
 
-def show_obb_boxes_colored(df, cluster_obb, reclump_labels):
+def show_obb_boxes_colored(xyz, cluster_obb, reclump_labels):
     geometries = []
     cmap = plt.get_cmap("tab20")
     max_label = max(reclump_labels.values()) if reclump_labels else 1
@@ -122,9 +126,8 @@ def show_obb_boxes_colored(df, cluster_obb, reclump_labels):
         line_obb = obb_to_lineset(obb, color=color)
         geometries.append(line_obb)
 
-    points = df[["X coordinate", "Y coordinate", "Z coordinate"]].to_numpy()
     pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(points)
+    pcd.points = o3d.utility.Vector3dVector(xyz)
     pcd.paint_uniform_color([0.3, 0.3, 0.3])
     geometries.append(pcd)
 
@@ -137,7 +140,7 @@ os.makedirs(output_dir, exist_ok=True)
 
 # 1. Vor Clustering: Punktwolke grau
 pcd_raw = o3d.geometry.PointCloud()
-pcd_raw.points = o3d.utility.Vector3dVector(df[["X coordinate", "Y coordinate", "Z coordinate"]].to_numpy())
+pcd_raw.points = o3d.utility.Vector3dVector(xyz)
 pcd_raw.paint_uniform_color([0.5, 0.5, 0.5])
 # o3d.io.write_point_cloud(os.path.join(output_dir, f"{code}01_raw_punktwolke.ply"), pcd_raw)
 
@@ -158,7 +161,7 @@ labels = df["Reclump_Adjazenz"].to_numpy()
 norm_labels = (labels - labels.min()) / (labels.max() - labels.min() + 1e-5)
 colors = plt.cm.jet(norm_labels)[:, :3]
 pcd_clustered = o3d.geometry.PointCloud()
-pcd_clustered.points = o3d.utility.Vector3dVector(df[["X coordinate", "Y coordinate", "Z coordinate"]].to_numpy())
+pcd_clustered.points = o3d.utility.Vector3dVector(xyz)
 pcd_clustered.colors = o3d.utility.Vector3dVector(colors)
 # o3d.io.write_point_cloud(os.path.join(output_dir, f"{code}03_clustered_points.ply"), pcd_clustered)
 
@@ -170,8 +173,8 @@ pcd_clustered.colors = o3d.utility.Vector3dVector(colors)
 #         os.path.join(cluster_dir, f"cluster_{int(cluster_id)}.csv"), sep=";", index=False, decimal=".")
 
 # 5. Komplette Punktwolke mit Cluster-ID als Spalte "ID"
-df_with_id = df.copy()
-df_with_id.rename(columns={"Reclump_Adjazenz": "ID"}, inplace=True)
+# df_with_id = pts.to_frame()
+# df_with_id["ID"] = df["Reclump_Adjazenz"].to_numpy()
 # df_with_id.to_csv(os.path.join(output_dir, f"{code}04_punktwolke_mit_ID.csv"), sep=";", index=False, decimal=".")
 
 # === Screenshot-Funktion ===
@@ -191,7 +194,7 @@ labels_kmeans = df["Color Cluster"].to_numpy()
 norm_kmeans = (labels_kmeans - labels_kmeans.min()) / (labels_kmeans.max() - labels_kmeans.min() + 1e-5)
 colors_kmeans = plt.cm.jet(norm_kmeans)[:, :3]
 pcd_kmeans = o3d.geometry.PointCloud()
-pcd_kmeans.points = o3d.utility.Vector3dVector(df[["X coordinate", "Y coordinate", "Z coordinate"]].to_numpy())
+pcd_kmeans.points = o3d.utility.Vector3dVector(xyz)
 pcd_kmeans.colors = o3d.utility.Vector3dVector(colors_kmeans)
 take_screenshot([pcd_kmeans], f"{code}screenshot_00_kmeans_clustering.png")
 # Screenshot 1: raw point cloud
@@ -223,4 +226,4 @@ print("3. Eingefärbte Punkte (Reclump)")
 
 # # 3. Eingefärbte Punkte nach Reclump
 # o3d.visualization.draw_geometries([pcd_clustered], window_name="03 Reclumped Points")
-# show_obb_boxes_colored(df, cluster_obb, reclump_labels_graph)
+# show_obb_boxes_colored(xyz, cluster_obb, reclump_labels_graph)
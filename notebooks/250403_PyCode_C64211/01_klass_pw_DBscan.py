@@ -1,12 +1,17 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import time
+from pathlib import Path
 from tqdm import tqdm
 from sklearn.cluster import DBSCAN
 import matplotlib.pyplot as plt
 # import open3d as o3d
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # Repo-Root, für das Modul punktwolke
+from punktwolke.split import split_points
+
 # Startzeit für die Laufzeitmessung
 start_time = time.time()
 
@@ -43,15 +48,13 @@ os.makedirs(output_folder, exist_ok=True)
 
 # Fortschrittsbalken für das Speichern der Cluster-Dateien
 print("Speichere Cluster-Dateien...")
-for cluster_id in tqdm(df["Color Cluster"].unique(), desc="Speichern der Cluster"):
-    # Filtere die Punkte für die aktuelle Klasse
-    cluster_df = df[df["Color Cluster"] == cluster_id]
-    
-    # Dateiname für die Klasse
-    output_file = os.path.join(output_folder, f"PW_Klasse_{int(cluster_id)}_dbscan.txt")
-    
-    # Speichern ohne Header
-    cluster_df.to_csv(output_file, sep=";", index=False, decimal=".", header=False)
+# Ein Durchgang: Labels einmal sortieren, jede Klasse parallel schreiben (punktwolke/split.py)
+with tqdm(total=df["Color Cluster"].nunique(), desc="Speichern der Cluster") as pbar:
+    split_points(
+        df, "Color Cluster",
+        path_for=lambda cluster_id: os.path.join(output_folder, f"PW_Klasse_{int(cluster_id)}_dbscan.txt"),
+        progress=lambda cluster_id, n: pbar.update(1),
+    )
 
 print("Alle DBSCAN-Cluster-Dateien wurden erfolgreich erstellt!")
 
@@ -71,20 +74,13 @@ summary_file = os.path.join(output_folder, "cluster_summary.txt")
 summary_data = []
 
 print("Berechne Min/Max-Werte für jede Klasse...")
-for cluster_id in tqdm(df["Color Cluster"].unique(), desc="Berechnung"):
-    cluster_df = df[df["Color Cluster"] == cluster_id]
-    
-    min_red, max_red = cluster_df["Red color (0-255)"].min(), cluster_df["Red color (0-255)"].max()
-    min_green, max_green = cluster_df["Green color (0-255)"].min(), cluster_df["Green color (0-255)"].max()
-    min_blue, max_blue = cluster_df["Blue color (0-255)"].min(), cluster_df["Blue color (0-255)"].max()
-    min_hue, max_hue = cluster_df["Hue (°)"].min(), cluster_df["Hue (°)"].max()
-    min_sat, max_sat = cluster_df["Saturation (%)"].min(), cluster_df["Saturation (%)"].max()
-    min_val, max_val = cluster_df["Value (%)"].min(), cluster_df["Value (%)"].max()
-    
-    summary_data.append([
-        cluster_id,
-        f"[{min_red}, {max_red}]", f"[{min_green}, {max_green}]", f"[{min_blue}, {max_blue}]",
-        f"[{min_hue}, {max_hue}]", f"[{min_sat}, {max_sat}]", f"[{min_val}, {max_val}]"
+# Min/Max aller Klassen in einem groupby statt einer Filterung pro Klasse
+ranges = df.groupby("Color Cluster", sort=False).agg(["min", "max"])
+for cluster_id, row in tqdm(ranges.iterrows(), total=len(ranges), desc="Berechnung"):
+    summary_data.append([cluster_id] + [
+        f"[{row[(col, 'min')]}, {row[(col, 'max')]}]"
+        for col in ["Red color (0-255)", "Green color (0-255)", "Blue color (0-255)",
+                    "Hue (°)", "Saturation (%)", "Value (%)"]
     ])
 
 summary_df = pd.DataFrame(summary_data, columns=[
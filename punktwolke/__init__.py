@@ -0,0 +1,37 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Gemeinsame Hilfsmodule für die Skripte in arbeitspakete/.
+
+Die Skripte liegen in Unterordnern und binden das Paket über den Repo-Root ein:
+
+    import sys
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).resolve().parents[3]))  # Repo-Root
+    from punktwolke.store import load_points, save_points
+
+Module:
+cluster     : KMeans-Backend (full / minibatch / streaming / histogram), Warmstart, k-Auswahl (Elbow)
+crowns      : Baumgipfel + Watershed auf dem CHM, auch kachelweise im Prozesspool (Abgleich an Nahtstellen)
+dbscan      : DBSCAN in 2D über Raster eps/√2 + Zusammenhangskomponenten (Labels wie sklearn)
+forest      : Random Forest / HistGradientBoosting (Quantil-Klassen float32, balancierte Stichprobe, Auswertung)
+geometry    : kNN-Graph pro Kachel (gespeichert) + Eigenwert-Merkmale für mehrere Radien
+groups      : Geometrie pro Cluster-Label in einem Durchgang (Hülle, Bounding Box, Durchmesserfilter)
+inference   : kachelweise Vorhersage beliebiger Modelle im Prozesspool (uint8-Labels, Punkte/s, Speichergrenze)
+normalize   : RGB → HSV vektorisiert, blockweise Normalisierung ganzer Platten (auch parallel)
+orientation : Aufteilen nach |nz| mit beliebigen Grenzwerten + Winkel-Histogramm
+raster      : CHM-Raster mit festem Ursprung (max/min/mean/count/Perzentile) + Regionseigenschaften
+schema      : Spaltenlayouts, Wertebereiche und kompakte dtypes (Layout-Erkennung)
+spatial     : Persistenter räumlicher Index (Morton-Sortierung, Zellverzeichnis, Box-/Radiusabfragen, Permutation)
+split       : Aufteilen in eine Datei pro Klasse in einem Durchgang (argsort, parallel)
+store       : binäres, spaltenweises Punktwolkenformat (.pwc) + TXT-Konverter
+svm         : skalierbare SVM (Nyström / Random Fourier Features + linearer Löser)
+sweep       : Parameterstudie Baum-Workflow mit Zwischenständen pro Schritt (Cache, parallel, Report-kompatibel)
+tiling      : Kacheln mit Rand im Prozesspool, Objekt-IDs über Kachelgrenzen zusammengeführt
+training    : Out-of-core-Training mit partial_fit (Cache, Scaler, Epochen, Checkpoints)
+voxel       : Voxel-Pyramide (Schwerpunkt + Anzahl), grobe Merkmale auf alle Punkte zurückverteilt
+"""
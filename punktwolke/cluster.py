@@ -0,0 +1,579 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+KMeans-Backend für die Farb-/Normalen-Klassifizierung (z.B. Fit auf Hue + Z scan dir).
+Vier Modi (MODES):
+- "full"      : sklearn KMeans auf allen Punkten (wie bisher, ganze Merkmalsmatrix im RAM)
+- "minibatch" : MiniBatchKMeans auf allen Punkten (Merkmale im RAM, Fit viel schneller)
+- "streaming" : MiniBatchKMeans.partial_fit blockweise aus der Datei / dem .pwc-Store,
+                nur ein Block Merkmale liegt gleichzeitig im RAM
+- "histogram" : Punkte in ein feines Raster einteilen (z.B. 256 x 256 Zellen für Hue / Z scan dir),
+                gewichtetes KMeans nur auf den besetzten Zellen, Labels über den Zellindex
+                zurück auf die Punkte; Aufwand hängt von der Zahl der Zellen ab, nicht von N
+Die Labels werden in einem zweiten Durchgang blockweise zugewiesen (predict_labels).
+fit_kmeans_series() fittet mehrere k nacheinander mit Warmstart: die Zentren von k-1
+werden übernommen und um ein k-means++-Zentrum ergänzt.
+
+Für die Wahl von k (Elbow) fittet kmeans_sweep() alle Kandidaten parallel auf einer
+geschichteten Stichprobe. Die Stichprobe ist über ein Raster im Merkmalsraum geschichtet
+(seltene Farben bleiben vertreten), jeder Punkt trägt das Gewicht Zellgrösse / gezogene Punkte.
+Damit ist die gewichtete WCSS der Stichprobe eine Hochrechnung auf die ganze Platte.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from punktwolke.store import PointColumns, is_pwc, iter_points, open_points
+
+MODES = ("full", "minibatch", "streaming", "histogram")
+
+# Obergrenze für die Anzahl Rasterzellen im Modus "histogram" (bins ** Anzahl Merkmale)
+MAX_HIST_CELLS = 10_000_000
+
+
+def iter_features(source, features, chunksize=1_000_000, columns=None, dtype=np.float64):
+    """
+    Liest nur die Merkmalsspalten blockweise.
+
+    Parameter:
+    source    : Pfad (.txt / .pwc), PointColumns (open_points) oder DataFrame
+    features  : Liste der Merkmalsspalten, z.B. ["Hue (0-1)", "Z scan dir"]
+    chunksize : Punkte pro Block
+    columns   : Spaltennamen der Datei (nur für TXT / .pwc-Pfade)
+    dtype     : dtype der Blöcke
+
+    Rückgabe:
+    Generator von Arrays der Form (n_block, len(features))
+    """
+    features = list(features)
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source[features].iloc[start:start + chunksize].to_numpy(dtype=dtype)
+        return
+    if not isinstance(source, PointColumns) and is_pwc(source):
+        source = open_points(source, columns=columns)
+    if isinstance(source, PointColumns):
+        # memmap: pro Block nur die Merkmalsspalten dekodieren
+        for start in range(0, len(source), chunksize):
+            sl = slice(start, start + chunksize)
+            yield np.column_stack([np.asarray(source[n][sl], dtype=dtype) for n in features])
+        return
+    for chunk in iter_points(source, columns=columns, chunksize=chunksize):
+        yield chunk[features].to_numpy(dtype=dtype)
+
+
+def _stack_features(source, features, columns=None, dtype=np.float64):
+    if isinstance(source, pd.DataFrame):
+        return source[list(features)].to_numpy(dtype=dtype)
+    return np.concatenate(list(iter_features(source, features, columns=columns, dtype=dtype)))
+
+
+def _log_batch(log, rows, batch, n_points, seconds, shift):
+    rows.append({"Batch": batch, "Punkte": n_points, "Dauer_s": round(seconds, 4), "Zentren_Verschiebung": shift})
+    if log is not None:
+        log(f"  Batch {batch}: {n_points} Punkte, {seconds:.3f} s, Verschiebung Zentren {shift:.2e}")
+
+
+def fit_kmeans(source, features, n_clusters, mode="streaming", init="k-means++", n_init=10,
+               batch_size=100_000, chunksize=1_000_000, epochs=1, random_state=42,
+               columns=None, log=print, hist_bins=256):
+    """
+    Fittet KMeans im gewählten Modus.
+
+    Parameter:
+    source       : Pfad (.txt / .pwc), PointColumns oder DataFrame
+    features     : Liste der Merkmalsspalten
+    n_clusters   : Anzahl Cluster k
+    mode         : "full", "minibatch", "streaming" oder "histogram" (siehe MODES)
+    init         : "k-means++" oder Array (k, n_features) mit Startzentren (Warmstart)
+    n_init       : Anzahl Initialisierungen (nur ohne Startzentren)
+    batch_size   : Grösse der Mini-Batches (minibatch / streaming)
+    chunksize    : Punkte pro gelesenem Block (streaming)
+    epochs       : Anzahl Durchgänge über die Datei (streaming)
+    hist_bins    : Rasterzellen pro Merkmal (histogram)
+    random_state : Zufallsstartwert
+    columns      : Spaltennamen der Datei (nur für TXT / .pwc-Pfade)
+    log          : Funktion für die Zeitprotokoll-Zeilen pro Batch, None = still
+
+    Rückgabe:
+    model   : gefittetes KMeans / MiniBatchKMeans / BinnedKMeans (cluster_centers_, predict)
+    timings : DataFrame mit Batch, Punkte, Dauer_s, Zentren_Verschiebung
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unbekannter Modus '{mode}', erlaubt: {MODES}")
+    if not isinstance(init, str):
+        init = np.asarray(init, dtype=np.float64)
+        n_init = 1
+    rows = []
+
+    if mode == "histogram":
+        model = BinnedKMeans(n_clusters, bins=hist_bins, init=init, n_init=n_init, random_state=random_state)
+        model.fit(source, features, chunksize=chunksize, columns=columns)
+        for step, (n_points, seconds) in enumerate(model.timings_):
+            _log_batch(log, rows, step, n_points, seconds, 0.0)
+        return model, pd.DataFrame(rows)
+
+    if mode in ("full", "minibatch"):
+        start = time.time()
+        X = _stack_features(source, features, columns=columns)
+        if mode == "full":
+            model = KMeans(n_clusters=n_clusters, init=init, n_init=n_init, random_state=random_state)
+        else:
+            model = MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=n_init,
+                                    batch_size=batch_size, random_state=random_state)
+        model.fit(X)
+        _log_batch(log, rows, 0, len(X), time.time() - start, 0.0)
+        return model, pd.DataFrame(rows)
+
+    # streaming: partial_fit auf Mini-Batches aus jedem gelesenen Block
+    model = MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=n_init,
+                            batch_size=batch_size, random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    batch = 0
+    for _ in range(epochs):
+        for X in iter_features(source, features, chunksize=chunksize, columns=columns):
+            # Reihenfolge im Block mischen (Dateien sind räumlich sortiert)
+            X = X[rng.permutation(len(X))]
+            for start in range(0, len(X), batch_size):
+                Xb = X[start:start + batch_size]
+                if len(Xb) < n_clusters and not hasattr(model, "cluster_centers_"):
+                    continue  # erster Batch muss mindestens k Punkte haben
+                t0 = time.time()
+                before = getattr(model, "cluster_centers_", None)
+                before = None if before is None else before.copy()
+                model.partial_fit(Xb)
+                shift = 0.0 if before is None else float(np.abs(model.cluster_centers_ - before).max())
+                _log_batch(log, rows, batch, len(Xb), time.time() - t0, shift)
+                batch += 1
+    if not hasattr(model, "cluster_centers_"):
+        raise ValueError(f"Zu wenige Punkte für {n_clusters} Cluster")
+    return model, pd.DataFrame(rows)
+
+
+class BinnedKMeans:
+    """
+    KMeans auf einem feinen Raster im Merkmalsraum (Modus "histogram").
+
+    Jede besetzte Rasterzelle wird durch den Mittelwert ihrer Punkte vertreten und mit der
+    Punktanzahl gewichtet. Die Labels gelten pro Zelle und werden über den Zellindex auf
+    die Punkte übertragen (predict). Aus den Summen und Quadratsummen pro Zelle ergibt sich
+    die WCSS aller Punkte exakt, ohne die Punkte nochmals zu lesen.
+
+    Parameter:
+    n_clusters   : Anzahl Cluster k
+    bins         : Rasterzellen pro Merkmal
+    init         : "k-means++" oder Startzentren
+    n_init       : Anzahl Initialisierungen des gewichteten KMeans
+    random_state : Zufallsstartwert
+    """
+
+    def __init__(self, n_clusters, bins=256, init="k-means++", n_init=10, random_state=42):
+        self.n_clusters = n_clusters
+        self.bins = bins
+        self.init = init
+        self.n_init = n_init
+        self.random_state = random_state
+
+    def _cells(self, X):
+        idx = np.clip(((X - self.lo_) / self.width_).astype(np.int64), 0, self.bins - 1)
+        return np.ravel_multi_index(idx.T, (self.bins,) * X.shape[1])
+
+    def fit(self, source, features, chunksize=1_000_000, columns=None):
+        """Zwei Durchgänge über die Merkmale: Wertebereich, dann Zellsummen; danach KMeans auf den Zellen."""
+        features = list(features)
+        n_cells = self.bins ** len(features)
+        if n_cells > MAX_HIST_CELLS:
+            raise ValueError(f"{self.bins}^{len(features)} = {n_cells} Rasterzellen, Maximum {MAX_HIST_CELLS}")
+        self.timings_ = []
+
+        start = time.time()
+        lo = np.full(len(features), np.inf)
+        hi = np.full(len(features), -np.inf)
+        for X in iter_features(source, features, chunksize=chunksize, columns=columns):
+            lo = np.minimum(lo, X.min(axis=0))
+            hi = np.maximum(hi, X.max(axis=0))
+        if not np.all(np.isfinite(lo)):
+            raise ValueError("Keine Punkte für das Clustering")
+        self.lo_ = lo
+        self.width_ = np.where(hi > lo, (hi - lo) / self.bins, 1.0)
+
+        counts = np.zeros(n_cells, dtype=np.int64)
+        sums = np.zeros((n_cells, len(features)))
+        sq_sums = np.zeros(n_cells)
+        for X in iter_features(source, features, chunksize=chunksize, columns=columns):
+            cells = self._cells(X)
+            counts += np.bincount(cells, minlength=n_cells)
+            for j in range(len(features)):
+                sums[:, j] += np.bincount(cells, weights=X[:, j], minlength=n_cells)
+            sq_sums += np.bincount(cells, weights=(X ** 2).sum(axis=1), minlength=n_cells)
+        n_points = int(counts.sum())
+        self.timings_.append((n_points, time.time() - start))
+
+        start = time.time()
+        occupied = np.flatnonzero(counts)
+        if len(occupied) < self.n_clusters:
+            raise ValueError(f"Nur {len(occupied)} besetzte Rasterzellen für {self.n_clusters} Cluster, bins erhöhen")
+        means = sums[occupied] / counts[occupied, None]
+        model = KMeans(n_clusters=self.n_clusters, init=self.init, n_init=self.n_init,
+                       random_state=self.random_state)
+        model.fit(means, sample_weight=counts[occupied])
+        self.cluster_centers_ = model.cluster_centers_
+        self.n_cells_ = len(occupied)
+
+        # Label pro Rasterzelle; leere Zellen erhalten das nächste Zentrum ihres Zellmittelpunkts
+        self.lookup_ = np.empty(n_cells, dtype=np.int32)
+        self.lookup_[occupied] = model.labels_
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            idx = np.array(np.unravel_index(empty, (self.bins,) * len(features))).T
+            self.lookup_[empty] = model.predict(self.lo_ + (idx + 0.5) * self.width_)
+
+        # WCSS exakt aus den Zellsummen: Σx² - 2·c·Σx + n·c²
+        c = self.cluster_centers_[self.lookup_[occupied]]
+        self.inertia_ = float((sq_sums[occupied] - 2 * (c * sums[occupied]).sum(axis=1)
+                               + counts[occupied] * (c ** 2).sum(axis=1)).sum())
+        self.timings_.append((len(occupied), time.time() - start))
+        return self
+
+    def predict(self, X):
+        """Label pro Punkt über den Zellindex."""
+        return self.lookup_[self._cells(np.asarray(X, dtype=np.float64))]
+
+    def score(self, X):
+        """Negative WCSS von X (wie sklearn KMeans.score)."""
+        X = np.asarray(X, dtype=np.float64)
+        return -float(((X - self.cluster_centers_[self.predict(X)]) ** 2).sum())
+
+
+def label_agreement(labels, reference):
+    """
+    Anteil gleich zugeordneter Punkte nach bester Zuordnung der Cluster-Nummern
+    (Ungarische Methode auf der Kreuztabelle).
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    labels = np.asarray(labels)
+    reference = np.asarray(reference)
+    _, a = np.unique(labels, return_inverse=True)
+    _, b = np.unique(reference, return_inverse=True)
+    table = np.zeros((a.max() + 1, b.max() + 1), dtype=np.int64)
+    np.add.at(table, (a, b), 1)
+    rows, cols = linear_sum_assignment(-table)
+    return table[rows, cols].sum() / len(labels)
+
+
+def compare_with_kmeans(model, source, features, sample_size=200_000, n_init=10, random_state=42,
+                        columns=None):
+    """
+    Vergleicht ein Modell (z.B. "histogram") mit normalem KMeans auf einer Stichprobe.
+
+    Rückgabe:
+    agreement : Anteil gleich zugeordneter Punkte (0-1, siehe label_agreement)
+    shift     : grösste Abweichung zwischen zugeordneten Zentren
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    X = sample_features(source, features, sample_size, random_state, columns=columns)
+    reference = KMeans(n_clusters=len(model.cluster_centers_), n_init=n_init, random_state=random_state).fit(X)
+    agreement = label_agreement(model.predict(X), reference.labels_)
+    d = ((model.cluster_centers_[:, None, :] - reference.cluster_centers_[None, :, :]) ** 2).sum(axis=2)
+    rows, cols = linear_sum_assignment(d)
+    return float(agreement), float(np.sqrt(d[rows, cols].max()))
+
+
+def predict_labels(model, source, features, chunksize=1_000_000, columns=None):
+    """
+    Zweiter Durchgang: weist jedem Punkt blockweise das nächste Zentrum zu.
+
+    Rückgabe:
+    int32-Array mit einem Label pro Punkt (Reihenfolge wie in source)
+    """
+    parts = [model.predict(X).astype(np.int32)
+             for X in iter_features(source, features, chunksize=chunksize, columns=columns)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+
+def inertia(model, source, features, chunksize=1_000_000, columns=None):
+    """WCSS (Summe der quadrierten Abstände zum Zentrum) über alle Punkte, blockweise."""
+    return float(sum(-model.score(X) for X in iter_features(source, features, chunksize=chunksize, columns=columns)))
+
+
+def warm_start_centers(centers, X_sample, random_state=42):
+    """
+    Startzentren für k+1 aus den Zentren von k: ein zusätzliches Zentrum wird wie bei
+    k-means++ mit Wahrscheinlichkeit proportional zum quadrierten Abstand gezogen.
+
+    Parameter:
+    centers  : Array (k, n_features) der bisherigen Zentren
+    X_sample : Stichprobe der Merkmale (n, n_features)
+    """
+    centers = np.asarray(centers, dtype=np.float64)
+    X_sample = np.asarray(X_sample, dtype=np.float64)
+    d2 = ((X_sample[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+    rng = np.random.default_rng(random_state)
+    if d2.sum() > 0:
+        new = X_sample[rng.choice(len(X_sample), p=d2 / d2.sum())]
+    else:
+        new = X_sample[rng.integers(len(X_sample))]
+    return np.vstack([centers, new])
+
+
+def fit_kmeans_series(source, features, k_values, mode="streaming", sample_size=100_000,
+                      random_state=42, columns=None, log=print, **kwargs):
+    """
+    Fittet mehrere k aufsteigend mit Warmstart (Zentren von k-1 + ein k-means++-Zentrum).
+
+    Parameter:
+    source, features, mode, columns : wie fit_kmeans
+    k_values    : aufsteigende Liste der Clusteranzahlen
+    sample_size : Stichprobe für das Ziehen der neuen Startzentren
+    kwargs      : weitere Parameter für fit_kmeans (batch_size, chunksize, epochs, ...)
+
+    Rückgabe:
+    dict k → (model, timings)
+    """
+    k_values = sorted(int(k) for k in k_values)
+    X_sample = sample_features(source, features, sample_size, random_state, columns=columns)
+    results = {}
+    centers = None
+    for k in k_values:
+        if centers is None or len(centers) >= k:
+            init = "k-means++"
+        else:
+            init = centers
+            while len(init) < k:
+                init = warm_start_centers(init, X_sample, random_state=random_state + len(init))
+        if log is not None:
+            log(f"k = {k} ({'Warmstart' if not isinstance(init, str) else 'k-means++'})")
+        model, timings = fit_kmeans(source, features, k, mode=mode, init=init, random_state=random_state,
+                                    columns=columns, log=log, **kwargs)
+        centers = model.cluster_centers_
+        results[k] = (model, timings)
+    return results
+
+
+def sample_features(source, features, sample_size, random_state=42, columns=None):
+    """
+    Gleichmässige Zufallsstichprobe der Merkmale in einem Durchgang: jeder Punkt erhält
+    einen Zufallsschlüssel, behalten werden die sample_size kleinsten Schlüssel.
+    """
+    rng = np.random.default_rng(random_state)
+    pool = np.empty((0, len(features)))
+    keys = np.empty(0)
+    for X in iter_features(source, features, columns=columns):
+        pool = np.concatenate([pool, X])
+        keys = np.concatenate([keys, rng.random(len(X))])
+        if len(pool) > sample_size:
+            keep = np.argpartition(keys, sample_size)[:sample_size]
+            pool, keys = pool[keep], keys[keep]
+    return pool
+
+
+# ================================================================
+# Wahl von k: geschichtete Stichprobe + parallele Fits
+# ================================================================
+def stratified_sample(source, features, sample_size=200_000, bins=16, min_per_stratum=1,
+                      random_state=42, columns=None):
+    """
+    Geschichtete Stichprobe über ein Raster (bins pro Merkmal) im Merkmalsraum.
+
+    Jede besetzte Rasterzelle erhält eine feste Quote proportional zu ihrer Grösse (gerundet,
+    mindestens min_per_stratum bzw. 1, höchstens alle Punkte der Zelle), gezogen ohne
+    Zurücklegen. Drei Durchgänge über die Merkmalsspalten: Wertebereich, Zellgrössen, Auswahl.
+    Gezählt werden nur besetzte Zellen (np.unique), der Speicher wächst also nicht mit
+    bins ** Anzahl Merkmale.
+
+    Parameter:
+    source          : Pfad (.txt / .pwc), PointColumns oder DataFrame
+    features        : Liste der Merkmalsspalten
+    sample_size     : angestrebte Stichprobengrösse
+    bins            : Rasterzellen pro Merkmal
+    min_per_stratum : Mindestanzahl Punkte pro besetzter Zelle
+    random_state    : Zufallsstartwert
+    columns         : Spaltennamen der Datei (nur für TXT / .pwc-Pfade)
+
+    Rückgabe:
+    X       : Stichprobe (n, len(features))
+    weights : Gewicht pro Stichprobenpunkt = Zellgrösse / Quote (Summe = Anzahl Punkte der Platte)
+    """
+    lo = np.full(len(features), np.inf)
+    hi = np.full(len(features), -np.inf)
+    for X in iter_features(source, features, columns=columns):
+        lo = np.minimum(lo, X.min(axis=0))
+        hi = np.maximum(hi, X.max(axis=0))
+    if not np.all(np.isfinite(lo)):
+        raise ValueError("Keine Punkte für die Stichprobe")
+    width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+
+    def cell_of(X):
+        idx = np.clip(((X - lo) / width).astype(np.int64), 0, bins - 1)
+        return np.ravel_multi_index(idx.T, (bins,) * len(features))
+
+    # besetzte Zellen und ihre Grösse
+    found, sizes = [], []
+    for X in iter_features(source, features, columns=columns):
+        u, c = np.unique(cell_of(X), return_counts=True)
+        found.append(u)
+        sizes.append(c)
+    cells, inverse = np.unique(np.concatenate(found), return_inverse=True)
+    counts = np.bincount(inverse.reshape(-1), weights=np.concatenate(sizes)).astype(np.int64)
+    n_total = int(counts.sum())
+
+    quota = np.rint(counts * sample_size / n_total).astype(np.int64)
+    quota = np.minimum(np.maximum(quota, max(min_per_stratum, 1)), counts)
+
+    # pro Zelle quota Ränge (Reihenfolge der Punkte in der Zelle) ohne Zurücklegen ziehen
+    rng = np.random.default_rng(random_state)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    chosen = np.sort(np.concatenate([offsets[i] + rng.choice(counts[i], quota[i], replace=False)
+                                     for i in range(len(cells))]))
+
+    seen = np.zeros(len(cells), dtype=np.int64)
+    parts, weights = [], []
+    for X in iter_features(source, features, columns=columns):
+        ci = np.searchsorted(cells, cell_of(X))
+        order = np.argsort(ci, kind="stable")
+        _, starts, group = np.unique(ci[order], return_index=True, return_counts=True)
+        rank = np.empty(len(X), dtype=np.int64)
+        rank[order] = np.arange(len(X)) - np.repeat(starts, group)
+        pos = offsets[ci] + seen[ci] + rank
+        seen += np.bincount(ci, minlength=len(cells))
+        hit = np.minimum(np.searchsorted(chosen, pos), len(chosen) - 1)
+        keep = chosen[hit] == pos
+        parts.append(X[keep])
+        weights.append(counts[ci[keep]] / quota[ci[keep]])
+    return np.concatenate(parts), np.concatenate(weights)
+
+
+def find_elbow(k_values, wcss):
+    """Elbow = Punkt mit grösstem Abstand zur Geraden durch ersten und letzten WCSS-Wert."""
+    k_values = np.asarray(k_values, dtype=np.float64)
+    wcss = np.asarray(wcss, dtype=np.float64)
+    p1 = np.array([k_values[0], wcss[0]])
+    p2 = np.array([k_values[-1], wcss[-1]])
+    d = p2 - p1
+    norm = np.linalg.norm(d)
+    if norm == 0:
+        return 0
+    distances = np.abs(d[0] * (p1[1] - wcss) - d[1] * (p1[0] - k_values)) / norm
+    return int(distances.argmax())
+
+
+def _fit_k(job):
+    """Worker: KMeans für ein k auf der gewichteten Stichprobe."""
+    k, X, weights, n_init, silhouette_size, random_state = job
+    start = time.time()
+    model = KMeans(n_clusters=k, n_init=n_init, random_state=random_state)
+    model.fit(X, sample_weight=weights)
+    fit_time = time.time() - start
+    silhouette = np.nan
+    if 1 < k < len(X):
+        silhouette = silhouette_score(X, model.labels_, sample_size=min(silhouette_size, len(X)),
+                                      random_state=random_state)
+    return {
+        "k": k,
+        "WCSS": float(model.inertia_),
+        "Silhouette": float(silhouette),
+        "Dauer_Fit_s": round(fit_time, 3),
+        "Dauer_s": round(time.time() - start, 3),
+    }
+
+
+def kmeans_sweep(source, features, k_values, sample_size=200_000, bins=16, n_init=4,
+                 silhouette_size=10_000, max_workers=None, random_state=42, columns=None,
+                 table_path=None):
+    """
+    Fittet alle k parallel auf einer geschichteten, gewichteten Stichprobe (Elbow-Tabelle).
+
+    Parameter:
+    source          : Pfad (.txt / .pwc), PointColumns oder DataFrame
+    features        : Liste der Merkmalsspalten
+    k_values        : zu prüfende Clusteranzahlen
+    sample_size     : Grösse der Stichprobe (siehe stratified_sample)
+    bins            : Rasterzellen pro Merkmal für die Schichtung
+    n_init          : Initialisierungen pro KMeans
+    silhouette_size : Punkte für den Silhouettenkoeffizienten (aus der Stichprobe)
+    max_workers     : Anzahl Prozesse, Standard: min(Anzahl k, CPU-Kerne)
+    random_state    : Zufallsstartwert
+    columns         : Spaltennamen der Datei (nur für TXT / .pwc-Pfade)
+    table_path      : optionaler Pfad (.csv) für die Tabelle
+
+    Rückgabe:
+    DataFrame mit k, WCSS (auf alle Punkte hochgerechnet), Silhouette, Dauer_s, Elbow
+    (True beim gefundenen Elbow), Stichprobe (Anzahl Punkte) und Dauer der Stichprobe
+    """
+    k_values = sorted(int(k) for k in k_values)
+    start = time.time()
+    X, weights = stratified_sample(source, features, sample_size=sample_size, bins=bins,
+                                   random_state=random_state, columns=columns)
+    sample_time = time.time() - start
+    if max_workers is None:
+        max_workers = min(len(k_values), os.cpu_count() or 1)
+
+    jobs = [(k, X, weights, n_init, silhouette_size, random_state) for k in k_values]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        rows = list(pool.map(_fit_k, jobs))
+
+    table = pd.DataFrame(rows)
+    table["Elbow"] = False
+    table.loc[find_elbow(table["k"], table["WCSS"]), "Elbow"] = True
+    table["Stichprobe"] = len(X)
+    table["Dauer_Stichprobe_s"] = round(sample_time, 3)
+    table = table[["k", "WCSS", "Silhouette", "Elbow", "Dauer_Fit_s", "Dauer_s",
+                   "Stichprobe", "Dauer_Stichprobe_s"]]
+    if table_path is not None:
+        table.to_csv(table_path, index=False)
+    return table
+
+
+def elbow_table(source, features, k_values, table_path, columns=None, log=print, **sweep_kwargs):
+    """
+    Elbow-Tabelle aus table_path laden oder mit kmeans_sweep() neu berechnen.
+
+    Neben der Tabelle liegt <table_path>.json mit den Eingaben (Quelle, Merkmale, k-Werte,
+    weitere Parameter von kmeans_sweep). Neu gerechnet wird, wenn die Tabelle fehlt, die
+    Eingaben abweichen oder die Quelle neuer ist als die Tabelle.
+
+    Parameter:
+    source       : Pfad zur Punktwolke (.txt / .pwc)
+    features     : Liste der Merkmalsspalten
+    k_values     : zu prüfende Clusteranzahlen
+    table_path   : Pfad (.csv) der Tabelle
+    columns      : Spaltennamen der Datei
+    sweep_kwargs : weitere Parameter für kmeans_sweep (z.B. sample_size)
+
+    Rückgabe:
+    DataFrame wie kmeans_sweep()
+    """
+    table_path = Path(table_path)
+    meta_path = table_path.with_suffix(".json")
+    meta = {"source": str(Path(source).resolve()), "features": list(features),
+            "k_values": sorted(int(k) for k in k_values), **sweep_kwargs}
+    if table_path.is_file() and meta_path.is_file() \
+            and table_path.stat().st_mtime >= Path(source).stat().st_mtime:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f) == meta:
+                if log is not None:
+                    log(f"Elbow-Tabelle aus {table_path.name} geladen")
+                return pd.read_csv(table_path)
+    if log is not None:
+        log(f"Berechne Elbow-Tabelle {table_path.name} ...")
+    table_path.parent.mkdir(parents=True, exist_ok=True)
+    table = kmeans_sweep(open_points(source, columns=columns), features, k_values, table_path=table_path,
+                         **sweep_kwargs)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return table
@@ -0,0 +1,244 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Kronensegmentierung auf dem CHM (Baumgipfel mit peak_local_max, Kronen mit Watershed),
+einmal in einem Stück wie in 0_250427_Final_Watershed.py (segment_crowns) und kachelweise
+im Prozesspool für ganze Platten (tiled_segment_crowns).
+
+Ablauf von tiled_segment_crowns():
+1. Glätten (Gauss) auf dem ganzen CHM; das ist günstig und macht die Kacheln exakt.
+2. Gipfel pro Kachel inkl. Rand von 2 * min_distance + 1 Pixeln; übernommen werden nur die
+   Gipfel im Kern. Alle Gipfel werden global wie bei peak_local_max nach Höhe sortiert und
+   nummeriert, die Marker-IDs stimmen damit mit dem Lauf in einem Stück überein.
+3. Watershed pro Kachel mit Rand (halo) und allen Markern in diesem Ausschnitt. Jede
+   Kachel liefert die Labels ihres Kerns; eine Krone über eine Kachelgrenze hat auf beiden
+   Seiten dieselbe ID, solange ihr Gipfel im Ausschnitt beider Kacheln liegt.
+4. Abgleich an den Nahtstellen: In der inneren Hälfte des Rands jeder Kachel werden die
+   eigenen Labels mit den Kern-Labels der Nachbarn verglichen. Widersprechen sie sich,
+   reichte der Rand nicht aus; die beteiligten Kacheln werden mit doppeltem Rand neu
+   gerechnet (bis max_halo).
+
+Bei genügend Rand ist das Resultat identisch zum Lauf in einem Stück. Ausgenommen sind
+Gipfel und Pixel mit exakt gleich hohen Nachbarn (z.B. gerundetes CHM): dort hängt die
+Reihenfolge von der Scanreihenfolge ab, und die Labels können auch ohne offene Konflikte
+abweichen. Die Zusammenfassung zählt diese Pixel pro Kachel (Gleiche_Hoehe_px).
+Unter Windows muss der Aufruf im Skript unter  if __name__ == "__main__":  stehen.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from scipy import ndimage as ndi
+from skimage.feature import peak_local_max
+from skimage.segmentation import watershed
+
+
+def find_peaks(chm, chm_smooth, min_distance=2, min_height=1.0, threshold_abs=None):
+    """
+    Baumgipfel wie im Baum-Workflow: lokale Maxima auf dem geglätteten CHM, nur wo das
+    CHM höher als min_height ist.
+
+    Rückgabe:
+    (k, 2) Pixelkoordinaten, absteigend nach Höhe im geglätteten CHM
+    """
+    local_max = peak_local_max(chm_smooth, min_distance=int(min_distance), labels=chm > 0,
+                               threshold_abs=threshold_abs)
+    return local_max[chm[local_max[:, 0], local_max[:, 1]] > min_height]
+
+
+def markers_from_peaks(shape, local_max):
+    """Marker-Raster mit ID i + 1 für den i-ten Gipfel."""
+    markers = np.zeros(shape, dtype=int)
+    markers[local_max[:, 0], local_max[:, 1]] = np.arange(1, len(local_max) + 1)
+    return markers
+
+
+def segment_crowns(chm, min_distance=2, sigma=0, min_height=1.0):
+    """
+    Gipfel + Watershed in einem Stück (Referenz für tiled_segment_crowns).
+
+    Parameter:
+    chm          : Canopy Height Model (0 = kein Baum)
+    min_distance : [Pixel] Abstand lokaler Maxima
+    sigma        : Gauss-Glättung
+    min_height   : Mindesthöhe eines Gipfels im CHM
+
+    Rückgabe:
+    labels     : Kronen-ID pro Pixel (0 = Hintergrund)
+    local_max  : Gipfel (k, 2), Gipfel i hat die ID i + 1
+    chm_smooth : geglättetes CHM
+    """
+    chm_smooth = ndi.gaussian_filter(chm, sigma=sigma)
+    local_max = find_peaks(chm, chm_smooth, min_distance=min_distance, min_height=min_height)
+    labels = watershed(-chm_smooth, markers_from_peaks(chm.shape, local_max), mask=chm > 0)
+    return labels, local_max, chm_smooth
+
+
+def make_raster_tiles(shape, tile_size):
+    """Kerne der Kacheln als Liste von (Zeile_von, Zeile_bis, Spalte_von, Spalte_bis)."""
+    return [(r, min(r + tile_size, shape[0]), c, min(c + tile_size, shape[1]))
+            for r in range(0, shape[0], tile_size) for c in range(0, shape[1], tile_size)]
+
+
+def _extent(core, halo, shape):
+    r0, r1, c0, c1 = core
+    return max(r0 - halo, 0), min(r1 + halo, shape[0]), max(c0 - halo, 0), min(c1 + halo, shape[1])
+
+
+def tied_pixels(values, mask):
+    """
+    Pixel in mask mit einem gleich hohen Nachbarn (8er-Nachbarschaft) in mask. Nur dort hängt
+    das Resultat von Gipfelsuche / Watershed von der Scanreihenfolge ab.
+    """
+    tied = np.zeros(values.shape, dtype=bool)
+    for a, b in (((slice(None), slice(None, -1)), (slice(None), slice(1, None))),
+                 ((slice(None, -1), slice(None)), (slice(1, None), slice(None))),
+                 ((slice(None, -1), slice(None, -1)), (slice(1, None), slice(1, None))),
+                 ((slice(None, -1), slice(1, None)), (slice(1, None), slice(None, -1)))):
+        same = (values[a] == values[b]) & mask[a] & mask[b]
+        tied[a] |= same
+        tied[b] |= same
+    return tied
+
+
+def _tile_peaks(job):
+    """Worker: Gipfel im Kern einer Kachel (Ausschnitt mit Rand)."""
+    i, chm, smooth, offset, core, min_distance, min_height, threshold = job
+    start = time.time()
+    peaks = find_peaks(chm, smooth, min_distance=min_distance, min_height=min_height, threshold_abs=threshold)
+    peaks = peaks + offset
+    r0, r1, c0, c1 = core
+    inside = (peaks[:, 0] >= r0) & (peaks[:, 0] < r1) & (peaks[:, 1] >= c0) & (peaks[:, 1] < c1)
+    return i, peaks[inside], time.time() - start
+
+
+def _tile_watershed(job):
+    """Worker: Watershed auf einer Kachel mit Rand."""
+    i, smooth, markers, mask = job
+    start = time.time()
+    return i, watershed(-smooth, markers, mask=mask).astype(np.int32), time.time() - start
+
+
+def _run_pool(func, jobs, max_workers):
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for job in jobs:
+            pending.add(pool.submit(func, job))
+            # höchstens 2 Kacheln pro Worker gleichzeitig unterwegs (Speicher begrenzen)
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    i, *rest = f.result()
+                    results[i] = rest
+        for f in pending:
+            i, *rest = f.result()
+            results[i] = rest
+    return results
+
+
+def tiled_segment_crowns(chm, min_distance=2, sigma=0, min_height=1.0, tile_size=512, halo=32,
+                         max_halo=None, max_workers=None, log=print):
+    """
+    Gipfel + Watershed kachelweise im Prozesspool, mit Abgleich an den Nahtstellen.
+
+    Parameter:
+    chm, min_distance, sigma, min_height : wie segment_crowns()
+    tile_size   : [Pixel] Kantenlänge der Kacheln
+    halo        : [Pixel] Rand für den Watershed, sollte mindestens einen Kronenradius betragen
+    max_halo    : grösster Rand beim Abgleich, Standard: tile_size
+    max_workers : Anzahl Prozesse, Standard: CPU-Kerne
+
+    Rückgabe:
+    labels, local_max, chm_smooth wie segment_crowns() und
+    summary : DataFrame pro Kachel mit Zeile, Spalte, Gipfel, Rand_px, Konflikte,
+              Gleiche_Hoehe_px, Dauer_s. Konflikte = 0 ist keine Garantie für Gleichheit
+              mit segment_crowns(): bei Pixeln mit gleich hohem Nachbarn (Gleiche_Hoehe_px,
+              z.B. auf 0.1 m gerundetes CHM) hängt die Zuordnung von der Scanreihenfolge der
+              Kachel ab.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_halo is None:
+        max_halo = tile_size
+    start = time.time()
+    chm = np.asarray(chm)
+    chm_smooth = ndi.gaussian_filter(chm, sigma=sigma)
+    threshold = chm_smooth.min()  # wie peak_local_max auf dem ganzen Raster
+    tiles = make_raster_tiles(chm.shape, tile_size)
+
+    # Gipfel: Rand 2 * min_distance + 1 reicht für Maximumfilter und Randausschluss
+    peak_halo = 2 * int(min_distance) + 1
+    jobs = []
+    for i, core in enumerate(tiles):
+        r0, r1, c0, c1 = _extent(core, peak_halo, chm.shape)
+        jobs.append((i, chm[r0:r1, c0:c1], chm_smooth[r0:r1, c0:c1], np.array([r0, c0]), core,
+                     min_distance, min_height, threshold))
+    peak_results = _run_pool(_tile_peaks, jobs, max_workers)
+    peaks = np.vstack([peak_results[i][0] for i in range(len(tiles))])
+    # Reihenfolge wie peak_local_max: absteigend nach Höhe, bei gleicher Höhe nach Zeile, Spalte
+    order = np.lexsort((peaks[:, 1], peaks[:, 0], -chm_smooth[peaks[:, 0], peaks[:, 1]]))
+    local_max = peaks[order]
+    markers = markers_from_peaks(chm.shape, local_max)
+    mask = chm > 0
+
+    halos = [halo] * len(tiles)
+    durations = [peak_results[i][1] for i in range(len(tiles))]
+    conflicts = [0] * len(tiles)
+    tile_labels = {}
+    labels = np.zeros(chm.shape, dtype=np.int32)
+    todo = list(range(len(tiles)))
+    rounds = 0
+    while todo:
+        rounds += 1
+        jobs = []
+        for i in todo:
+            r0, r1, c0, c1 = _extent(tiles[i], halos[i], chm.shape)
+            jobs.append((i, chm_smooth[r0:r1, c0:c1], markers[r0:r1, c0:c1], mask[r0:r1, c0:c1]))
+        for i, (result, duration) in _run_pool(_tile_watershed, jobs, max_workers).items():
+            tile_labels[i] = result
+            durations[i] += duration
+            r0, r1, c0, c1 = tiles[i]
+            e0, _, f0, _ = _extent(tiles[i], halos[i], chm.shape)
+            labels[r0:r1, c0:c1] = result[r0 - e0:r1 - e0, c0 - f0:c1 - f0]
+
+        # Nahtstellen: Rand jeder Kachel gegen die Kerne der Nachbarn
+        affected = set()
+        n_tile_cols = -(-chm.shape[1] // tile_size)
+        for i, core in enumerate(tiles):
+            # nur die innere Hälfte des Rands: am äusseren Rand fehlt der Kachel der Zusammenhang
+            e0, e1, f0, f1 = _extent(core, halos[i] // 2, chm.shape)
+            g0, _, h0, _ = _extent(core, halos[i], chm.shape)
+            own = tile_labels[i][e0 - g0:e1 - g0, f0 - h0:f1 - h0]
+            diff = own != labels[e0:e1, f0:f1]
+            conflicts[i] = int(diff.sum())
+            if conflicts[i] and halos[i] < max_halo:
+                rows, cols = np.nonzero(diff)
+                owners = np.unique((rows + e0) // tile_size * n_tile_cols + (cols + f0) // tile_size)
+                affected.update([i] + owners.tolist())
+        todo = sorted(j for j in affected if halos[j] < max_halo)
+        for j in todo:
+            halos[j] = min(2 * halos[j], max_halo)
+
+    tied = tied_pixels(chm_smooth, mask)
+    summary = pd.DataFrame([{
+        "Zeile": core[0] // tile_size, "Spalte": core[2] // tile_size,
+        "Gipfel": len(peak_results[i][0]), "Rand_px": halos[i], "Konflikte": conflicts[i],
+        "Gleiche_Hoehe_px": int(tied[core[0]:core[1], core[2]:core[3]].sum()),
+        "Dauer_s": round(durations[i], 2),
+    } for i, core in enumerate(tiles)])
+    if log is not None:
+        log(f"{len(tiles)} Kacheln à {tile_size} px: {len(local_max)} Gipfel, {rounds} Durchgänge, "
+            f"{int(summary['Konflikte'].sum())} offene Konflikte, {time.time() - start:.1f} s")
+        if tied.any():
+            log(f"  {int(tied.sum())} Pixel mit gleich hohem Nachbarn: dort können die Kronen auch ohne "
+                f"Konflikte vom Lauf in einem Stück abweichen (Reihenfolge bei Gleichstand)")
+    return labels.astype(int), local_max, chm_smooth, summary
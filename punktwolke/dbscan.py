@@ -0,0 +1,208 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+DBSCAN für 2D-Lagekoordinaten über ein Raster, z.B. für die Baumkronen
+(DBSCAN(eps=0.8, min_samples=130) auf veg_points[:, :2]). sklearn sucht für jeden Punkt
+alle Nachbarn und hält diese Listen gleichzeitig im Speicher; bei dichter Vegetation sind
+das hunderte Nachbarn pro Punkt. Hier wird stattdessen ein Raster mit Zellgrösse
+eps / √2 verwendet, in dem alle Punkte einer Zelle höchstens eps voneinander entfernt sind:
+
+1. Kernpunkte: Zellen mit mindestens min_samples Punkten bestehen nur aus Kernpunkten.
+   Übrige Punkte, deren 21 Nachbarzellen zusammen weniger als min_samples Punkte haben,
+   sind sicher keine Kernpunkte. Nur der Rest wird exakt gezählt (cKDTree).
+2. Cluster: Zellen mit Kernpunkten sind Knoten. Zwei Nachbarzellen werden verbunden, wenn
+   ein Kernpunkt der einen höchstens eps von einem Kernpunkt der anderen entfernt ist
+   (nächster Nachbar pro Zellpaar). Die Cluster sind die Zusammenhangskomponenten
+   (wie Union-Find, siehe tiling.stitch_labels).
+3. Randpunkte übernehmen wie bei sklearn den Cluster mit der kleinsten Nummer unter
+   allen Kernpunkten im Umkreis eps; die Nummern folgen dem ersten Kernpunkt jedes
+   Clusters in der Eingabereihenfolge.
+
+Die Labels sind damit identisch zu sklearn.cluster.DBSCAN (bis auf Abstände, die auf die
+letzte Gleitkommastelle genau eps betragen). Speicher und Laufzeit wachsen etwa linear
+mit der Punktanzahl. Für tiling.run_tiled() gibt es den Arbeitsschritt
+tiling.dbscan_grid_xy(), der zusätzlich die Kernpunkte liefert.
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+# Versatz der Nachbarzellen mit Mindestabstand < eps (5 x 5 ohne die vier Ecken)
+NEIGHBOR_OFFSETS = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if abs(dx) + abs(dy) < 4]
+
+
+def _grid(xy, eps):
+    """
+    Rasterzelle pro Punkt (Seitenlänge eps / √2).
+
+    Rückgabe:
+    keys   : eindeutiger Zellschlüssel ix * stride + iy (Versätze -2..+2 überlappen nicht)
+    local  : Lage innerhalb der Zelle (0 ≤ local < Seitenlänge)
+    stride : Faktor für ix im Schlüssel
+    size   : Seitenlänge
+    """
+    size = eps / np.sqrt(2)
+    shifted = xy - xy.min(axis=0)
+    cell = np.floor(shifted / size).astype(np.int64)
+    stride = int(cell[:, 1].max()) + 5
+    return cell[:, 0] * stride + cell[:, 1], shifted - cell * size, stride, size
+
+
+def _gap(local, size, dx, dy):
+    """Abstand jedes Punkts zum Rechteck der Nachbarzelle (dx, dy)."""
+    gaps = []
+    for d, pos in ((dx, local[:, 0]), (dy, local[:, 1])):
+        if d > 0:
+            gaps.append(np.maximum((d - 1) * size + size - pos, 0.0))
+        elif d < 0:
+            gaps.append(np.maximum((-d - 1) * size + pos, 0.0))
+        else:
+            gaps.append(np.zeros(len(pos)))
+    return np.hypot(*gaps)
+
+
+def _nearest_in_cell(tree, xy, keys, eps):
+    """
+    Index des nächsten Punkts im Baum innerhalb der Zelle keys, len(tree.data) falls
+    keiner höchstens eps entfernt ist. Der Baum enthält den Zellschlüssel als dritte
+    Koordinate (Abstand 2 * eps pro Schlüssel), eine Abfrage findet so nur Punkte dieser Zelle.
+    """
+    limit = np.nextafter(eps, np.inf)
+    _, idx = tree.query(np.column_stack([xy, keys * (2.0 * eps)]), k=1, distance_upper_bound=limit)
+    return idx
+
+
+def _core(xy, keys, stride, eps, min_samples):
+    """Kernpunkte für nach keys sortierte Punkte."""
+    uniq, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    per_point = np.repeat(counts, counts)
+    core = per_point >= min_samples
+    # Obergrenze der Nachbarn: Summe der Punkte in den 21 Nachbarzellen
+    upper = np.zeros(len(uniq), dtype=np.int64)
+    for dx, dy in NEIGHBOR_OFFSETS:
+        target = uniq + dx * stride + dy
+        pos = np.minimum(np.searchsorted(uniq, target), len(uniq) - 1)
+        upper += np.where(uniq[pos] == target, counts[pos], 0)
+    todo = np.flatnonzero(~core & (np.repeat(upper, counts) >= min_samples))
+    if len(todo):
+        n = cKDTree(xy).query_ball_point(xy[todo], r=eps, return_length=True)
+        core[todo] = n >= min_samples
+    return core
+
+
+def core_mask(xy, eps=0.8, min_samples=130):
+    """
+    Kernpunkte wie bei DBSCAN (mindestens min_samples Punkte inkl. sich selbst im Umkreis eps).
+
+    Parameter:
+    xy          : (n, 2) Lagekoordinaten
+    eps         : Radius in m
+    min_samples : Mindestanzahl Punkte im Umkreis
+
+    Rückgabe:
+    Bool-Array (n,)
+    """
+    xy = np.asarray(xy, dtype=np.float64)[:, :2]
+    keys, _, stride, _ = _grid(xy, eps)
+    order = np.argsort(keys, kind="stable")
+    core = np.empty(len(xy), dtype=bool)
+    core[order] = _core(xy[order], keys[order], stride, eps, min_samples)
+    return core
+
+
+def dbscan_grid(xy, eps=0.8, min_samples=130, return_core=False):
+    """
+    DBSCAN auf 2D-Lagekoordinaten, gleiche Labels wie sklearn.cluster.DBSCAN.
+
+    Parameter:
+    xy          : (n, ≥2) Koordinaten, verwendet werden die ersten beiden Spalten
+    eps         : Radius in m
+    min_samples : Mindestanzahl Punkte im Umkreis eps (inkl. Punkt selbst)
+    return_core : zusätzlich die Kernpunkt-Maske zurückgeben (z.B. für tiling.run_tiled)
+
+    Rückgabe:
+    labels : (n,) Cluster-IDs 0..k-1 in der Nummerierung von sklearn, -1 = Rauschen
+    core   : (n,) Bool-Maske der Kernpunkte, nur mit return_core=True
+    """
+    xy = np.asarray(xy, dtype=np.float64)[:, :2]
+    labels = np.full(len(xy), -1, dtype=np.int64)
+    if len(xy) == 0:
+        return (labels, np.zeros(0, dtype=bool)) if return_core else labels
+    # nach Zellen sortiert rechnen (Punkte einer Zelle liegen im Speicher beieinander)
+    keys, local, stride, size = _grid(xy, eps)
+    order = np.argsort(keys, kind="stable")
+    xy, keys, local = xy[order], keys[order], local[order]
+    core = _core(xy, keys, stride, eps, min_samples)
+    core_idx = np.flatnonzero(core)
+    if len(core_idx) == 0:
+        return (labels, np.zeros(len(xy), dtype=bool)) if return_core else labels
+
+    core_keys = keys[core_idx]
+    cells, cell_of_core = np.unique(core_keys, return_inverse=True)
+    cell_of_core = cell_of_core.reshape(-1)
+    tree = cKDTree(np.column_stack([xy[core_idx], core_keys * (2.0 * eps)]))
+    reach = eps * (1 + 1e-9)  # Vorfilter über die Zellrechtecke, mit Reserve für Rundung
+
+    # Nachbarzellen mit Kernpunkten verbinden (jedes Paar in einer Richtung reicht)
+    rows, cols = [], []
+    for dx, dy in NEIGHBOR_OFFSETS:
+        if (dx, dy) <= (0, 0):
+            continue
+        target = core_keys + dx * stride + dy
+        pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        sel = np.flatnonzero((cells[pos] == target) & (_gap(local[core_idx], size, dx, dy) <= reach))
+        if len(sel) == 0:
+            continue
+        hit = _nearest_in_cell(tree, xy[core_idx[sel]], target[sel], eps)
+        found = hit < len(core_idx)
+        rows.append(cell_of_core[sel[found]])
+        cols.append(cell_of_core[hit[found]])
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+    graph = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(cells), len(cells)))
+    _, component = connected_components(graph, directed=False)
+
+    # Nummerierung wie sklearn: Reihenfolge des ersten Kernpunkts jedes Clusters (Originalindex)
+    first = np.full(component.max() + 1, len(xy), dtype=np.int64)
+    np.minimum.at(first, component[cell_of_core], order[core_idx])
+    rank = np.empty_like(first)
+    rank[np.argsort(first)] = np.arange(len(first))
+    cell_label = rank[component]
+    sorted_labels = np.full(len(xy), -1, dtype=np.int64)
+    sorted_labels[core_idx] = cell_label[cell_of_core]
+
+    # Randpunkte: kleinste Cluster-ID unter den Kernpunkten im Umkreis eps
+    other = np.flatnonzero(~core)
+    if len(other):
+        none = np.iinfo(np.int64).max
+        # eigene Zelle mit Kernpunkten: ganze Zelle liegt innerhalb eps
+        pos = np.minimum(np.searchsorted(cells, keys[other]), len(cells) - 1)
+        best = np.where(cells[pos] == keys[other], cell_label[pos], none)
+        for dx, dy in NEIGHBOR_OFFSETS:
+            if (dx, dy) == (0, 0):
+                continue
+            target = keys[other] + dx * stride + dy
+            pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+            # nur prüfen, wenn die Zelle eine kleinere ID bringen könnte
+            sel = np.flatnonzero((cells[pos] == target) & (cell_label[pos] < best)
+                                 & (_gap(local[other], size, dx, dy) <= reach))
+            if len(sel) == 0:
+                continue
+            hit = _nearest_in_cell(tree, xy[other[sel]], target[sel], eps)
+            found = hit < len(core_idx)
+            best[sel[found]] = cell_label[pos[sel[found]]]
+        border = best < none
+        sorted_labels[other[border]] = best[border]
+    labels[order] = sorted_labels
+    if return_core:
+        core_orig = np.empty(len(xy), dtype=bool)
+        core_orig[order] = core
+        return labels, core_orig
+    return labels
@@ -0,0 +1,218 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Baumbasierte Klassifikation (Random Forest / Histogram Gradient Boosting) auf den
+gleichen 12 Merkmalen wie der SGDClassifier.
+- Merkmale werden vor dem Training in höchstens n_bins Quantil-Klassen eingeteilt und als
+  float32 weitergegeben (BinQuantizer). Bäume suchen Schwellen dann nur noch zwischen
+  wenigen Werten, und float32 ist der interne Datentyp von scikit-learn-Bäumen (keine Kopie).
+- Trainiert wird auf einer klassenbalancierten Stichprobe aus dem Trainings-Cache
+  (punktwolke/training.py), validiert auf einer zufälligen Stichprobe der übrigen Punkte.
+- RandomForest trainiert mit n_jobs auf allen Kernen, HistGradientBoosting nutzt OpenMP.
+- Gespeichert wird die ganze Pipeline (BinQuantizer → Modell). Sie klassifiziert rohe
+  Merkmale und kann direkt an punktwolke/inference.py übergeben werden.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import confusion_matrix, precision_recall_fscore_support
+from sklearn.pipeline import make_pipeline
+
+from punktwolke.store import open_points
+from punktwolke.svm import balanced_sample
+from punktwolke.training import LABEL_CODE
+
+FOREST_MODES = ("rf", "hgb")
+
+
+class BinQuantizer(BaseEstimator, TransformerMixin):
+    """
+    Teilt jedes Merkmal in höchstens n_bins Quantil-Klassen und gibt die Klassennummern
+    als float32 zurück (bei weniger verschiedenen Werten entsprechend weniger Klassen).
+
+    Parameter:
+    n_bins       : Anzahl Klassen pro Merkmal (höchstens 255, wie bei HistGradientBoosting)
+    subsample    : Anzahl Punkte zum Bestimmen der Quantile
+    random_state : Zufallsstartwert für die Teilstichprobe
+    """
+
+    def __init__(self, n_bins=255, subsample=200_000, random_state=42):
+        self.n_bins = n_bins
+        self.subsample = subsample
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float32)
+        if not 2 <= self.n_bins <= 255:
+            raise ValueError(f"n_bins muss zwischen 2 und 255 liegen, nicht {self.n_bins}")
+        if len(X) > self.subsample:
+            rng = np.random.default_rng(self.random_state)
+            X = X[rng.choice(len(X), self.subsample, replace=False)]
+        quantiles = np.linspace(0, 1, self.n_bins + 1)[1:-1]
+        # innere Grenzen, doppelte Quantile (z.B. viele gleiche Farbwerte) zusammengefasst
+        self.edges_ = [np.unique(np.quantile(X[:, j], quantiles)).astype(np.float32) for j in range(X.shape[1])]
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[1] != len(self.edges_):
+            raise ValueError(f"{X.shape[1]} Merkmale übergeben, trainiert auf {len(self.edges_)}")
+        out = np.empty(X.shape, dtype=np.float32)
+        for j, edges in enumerate(self.edges_):
+            out[:, j] = np.searchsorted(edges, X[:, j], side="right")
+        return out
+
+
+def make_forest(mode="rf", n_estimators=200, max_depth=None, min_samples_leaf=5, n_bins=255,
+                n_jobs=-1, random_state=42):
+    """
+    Baut die Pipeline BinQuantizer → RandomForest bzw. HistGradientBoosting.
+
+    Parameter:
+    mode             : "rf" (RandomForestClassifier) oder "hgb" (HistGradientBoostingClassifier)
+    n_estimators     : Anzahl Bäume (rf) bzw. Boosting-Iterationen (hgb)
+    max_depth        : maximale Baumtiefe, None = unbeschränkt
+    min_samples_leaf : minimale Punktanzahl pro Blatt
+    n_bins           : Quantil-Klassen pro Merkmal
+    n_jobs           : Anzahl Kerne für den Random Forest (-1 = alle)
+
+    Rückgabe:
+    sklearn-Pipeline mit fit / predict
+    """
+    if mode not in FOREST_MODES:
+        raise ValueError(f"Unbekannter Modus '{mode}', erlaubt: {FOREST_MODES}")
+    quantizer = BinQuantizer(n_bins=n_bins, random_state=random_state)
+    if mode == "rf":
+        model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                       min_samples_leaf=min_samples_leaf, n_jobs=n_jobs,
+                                       random_state=random_state)
+    else:
+        model = HistGradientBoostingClassifier(max_iter=n_estimators, max_depth=max_depth,
+                                               min_samples_leaf=min_samples_leaf, max_bins=n_bins,
+                                               early_stopping=False, random_state=random_state)
+    return make_pipeline(quantizer, model)
+
+
+def sample_training_data(data, budget=200_000, validation_size=500_000, random_state=42, log=print):
+    """
+    Klassenbalancierte Trainingsstichprobe und zufällige Validierungsstichprobe aus dem Cache.
+
+    Parameter:
+    data            : Rückgabe von training.prepare_training_data()
+    budget          : höchstens so viele Trainingspunkte pro Klasse (kleinere Klassen vollständig)
+    validation_size : Anzahl Validierungspunkte aus den übrigen Punkten (Verteilung wie in den Daten)
+
+    Rückgabe:
+    X_train, y_train, X_val, y_val : float32-Merkmale und Klassencodes
+    timing                         : DataFrame pro Klasse mit Klasse, Punkte, Training,
+                                     Validierung, Dauer_Stichprobe_s
+    """
+    features = data["features"]
+    caches = [open_points(c) for c in data["caches"]]
+    y_all = np.concatenate([data["remap"][np.asarray(c.raw(LABEL_CODE), dtype=np.int64)] for c in caches])
+    bounds = np.cumsum([0] + [len(c) for c in caches])
+
+    rng = np.random.default_rng(random_state)
+    train_index = balanced_sample(y_all, budget, random_state=random_state)
+    rest = np.ones(len(y_all), dtype=bool)
+    rest[train_index] = False
+    rest = np.flatnonzero(rest)
+    val_index = np.sort(rng.choice(rest, min(validation_size, len(rest)), replace=False))
+
+    def read(index):
+        # sortierte globale Indizes → Zeilen aus den einzelnen Caches
+        parts = []
+        for i, cache in enumerate(caches):
+            local = index[(index >= bounds[i]) & (index < bounds[i + 1])] - bounds[i]
+            if len(local):
+                parts.append(cache.take(local, usecols=features).to_numpy(dtype=np.float32))
+        return np.concatenate(parts) if parts else np.empty((0, len(features)), dtype=np.float32)
+
+    rows = []
+    X_train = []
+    for code, name in data["label_mapping"].items():
+        start = time.time()
+        members = train_index[y_all[train_index] == code]
+        X_train.append(read(members))
+        rows.append({"Klasse": name, "Punkte": int(data["counts"][code]), "Training": len(members),
+                     "Validierung": int(np.count_nonzero(y_all[val_index] == code)),
+                     "Dauer_Stichprobe_s": round(time.time() - start, 2)})
+        if log is not None:
+            log(f"  {name}: {len(members)} von {data['counts'][code]} Punkten ({time.time() - start:.1f} s)")
+    y_train = np.concatenate([np.full(r["Training"], code) for code, r in enumerate(rows)])
+    return np.concatenate(X_train), y_train, read(val_index), y_all[val_index], pd.DataFrame(rows)
+
+
+def class_report(model, X_val, y_val, class_names):
+    """
+    Qualität und Vorhersagezeit pro Klasse auf der Validierungsstichprobe.
+
+    Rückgabe:
+    report : DataFrame mit Klasse, Precision, Recall, F1, Punkte, Dauer_Vorhersage_s, Punkte_pro_s
+    y_pred : Vorhersagen für y_val (für die Confusion Matrix)
+    """
+    labels = np.arange(len(class_names))
+    y_pred = np.empty(len(y_val), dtype=np.int64)
+    durations = []
+    for code in labels:
+        mask = y_val == code
+        start = time.time()
+        if mask.any():
+            y_pred[mask] = model.predict(X_val[mask])
+        durations.append(time.time() - start)
+    precision, recall, f1, support = precision_recall_fscore_support(y_val, y_pred, labels=labels, zero_division=0)
+    report = pd.DataFrame({
+        "Klasse": list(class_names),
+        "Precision": precision.round(4),
+        "Recall": recall.round(4),
+        "F1": f1.round(4),
+        "Punkte": support,
+        "Dauer_Vorhersage_s": np.round(durations, 3),
+        "Punkte_pro_s": [round(n / d) if d > 0 else np.nan for n, d in zip(support, durations)],
+    })
+    return report, y_pred
+
+
+def feature_importances(model, features, X_val=None, y_val=None, n_repeats=5, max_points=50_000,
+                        n_jobs=-1, random_state=42):
+    """
+    Wichtigkeit der Merkmale, absteigend sortiert.
+
+    Random Forest: Gini-Wichtigkeit (feature_importances_). HistGradientBoosting hat keine
+    eingebaute Wichtigkeit, dort wird die Permutations-Wichtigkeit auf höchstens max_points
+    Validierungspunkten berechnet.
+
+    Rückgabe:
+    DataFrame mit Merkmal, Wichtigkeit, Methode
+    """
+    estimator = model[-1]
+    if hasattr(estimator, "feature_importances_"):
+        values, method = estimator.feature_importances_, "Gini"
+    else:
+        if X_val is None:
+            raise ValueError("Für die Permutations-Wichtigkeit werden X_val und y_val benötigt")
+        if len(X_val) > max_points:
+            rng = np.random.default_rng(random_state)
+            index = rng.choice(len(X_val), max_points, replace=False)
+            X_val, y_val = X_val[index], y_val[index]
+        result = permutation_importance(model, X_val, y_val, n_repeats=n_repeats, n_jobs=n_jobs,
+                                        random_state=random_state)
+        values, method = result.importances_mean, "Permutation"
+    table = pd.DataFrame({"Merkmal": list(features), "Wichtigkeit": np.round(values, 5), "Methode": method})
+    return table.sort_values("Wichtigkeit", ascending=False, ignore_index=True)
+
+
+def confusion_table(y_val, y_pred, class_names):
+    """Confusion Matrix als DataFrame (Zeilen = wahr, Spalten = vorhergesagt)."""
+    matrix = confusion_matrix(y_val, y_pred, labels=np.arange(len(class_names)))
+    return pd.DataFrame(matrix, index=pd.Index(class_names, name="wahr"), columns=list(class_names))
@@ -0,0 +1,264 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Nachbarschaftsmerkmale für die Klassifikation (Dach, Fassade, Baum, Wasser ...). Aus der
+Kovarianz der Nachbarpunkte werden die Eigenwerte λ1 ≥ λ2 ≥ λ3 bestimmt:
+- Linearity   (λ1 - λ2) / λ1
+- Planarity   (λ2 - λ3) / λ1
+- Sphericity  λ3 / λ1
+- Verticality 1 - |nz| der lokalen Normalen (Eigenvektor zu λ3)
+- Height range  Zmax - Zmin der Nachbarschaft
+- Density       Nachbarn pro m³ (Kugel mit Radius r)
+
+Ablauf:
+1. neighbor_graph(): kNN-Graph mit k Nachbarn pro Punkt. Die Platte wird in quadratische
+   Kacheln geteilt, pro Kachel wird ein cKDTree über Kachel + Rand (halo = grösster Radius)
+   gebaut, damit Nachbarschaften an Kachelgrenzen vollständig sind. Indizes (int32) und
+   Distanzen (float16) werden als .npy neben der Punktwolke gespeichert (<name>.knn) und
+   bei weiteren Merkmalssätzen und Klassifikator-Läufen nur noch gemappt.
+2. eigen_features(): pro Radius werden die Nachbarn innerhalb r aus dem Graphen maskiert
+   und die Merkmale blockweise vektorisiert berechnet (np.linalg.eigh auf (b, 3, 3)).
+Nachbarschaften sind auf die k nächsten Punkte begrenzt. Der Anteil der Punkte, bei denen
+alle k Nachbarn innerhalb r liegen (Nachbarschaft "gesättigt"), wird gemeldet.
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from punktwolke.store import XYZ_NAMES, append_columns, is_pwc, iter_points, open_points
+
+GEOMETRY_FEATURES = ["Linearity", "Planarity", "Sphericity", "Verticality", "Height range", "Density"]
+GRAPH_FILE = "graph.json"
+
+
+def feature_columns(radii):
+    """Spaltennamen der Merkmale pro Radius, z.B. "Planarity (r=1)"."""
+    return [f"{name} (r={r:g})" for r in radii for name in GEOMETRY_FEATURES]
+
+
+def load_xyz(source, columns=None, chunksize=2_000_000):
+    """
+    Koordinaten als float32 relativ zu einem float64-Ursprung (wie PointColumns.xyz(local=True)).
+
+    TXT-Dateien werden blockweise gelesen, damit auch Dateien mit Textspalten
+    (z.B. Klassenname) funktionieren, die nicht nach .pwc konvertiert werden können.
+
+    Rückgabe:
+    xyz    : (n, 3) float32
+    offset : (3,) float64
+    """
+    if is_pwc(source):
+        pts = open_points(source, columns=columns)
+        return np.asarray(pts.xyz(local=True), dtype=np.float32), pts.xyz_offset()
+    parts, offset = [], None
+    for chunk in iter_points(source, columns=columns, chunksize=chunksize):
+        names = next((list(n) for n in XYZ_NAMES if all(c in chunk for c in n)), None)
+        if names is None:
+            raise KeyError(f"Keine X/Y/Z-Spalten in {Path(source).name}")
+        xyz = chunk[names].to_numpy(dtype=np.float64)
+        if offset is None:
+            offset = np.floor(xyz.min(axis=0))
+        parts.append((xyz - offset).astype(np.float32))
+    if offset is None:
+        raise ValueError(f"{source} enthält keine Punkte")
+    return np.concatenate(parts), offset
+
+
+def build_neighbor_graph(xyz, k=20, tile_size=50.0, halo=2.0, log=print):
+    """
+    kNN-Graph mit einem cKDTree pro Kachel (Kachel + halo als Suchraum).
+
+    Parameter:
+    xyz       : (n, 3) lokale Koordinaten
+    k         : Anzahl Nachbarn pro Punkt (inkl. Punkt selbst)
+    tile_size : Kantenlänge der Kacheln in m
+    halo      : Rand um jede Kachel in m, Nachbarn bis zu dieser Distanz sind exakt
+
+    Rückgabe:
+    indices   : (n, k) int32, fehlende Nachbarn (kleine Kacheln) zeigen auf den Punkt selbst
+    distances : (n, k) float16, fehlende Nachbarn mit inf
+    """
+    if halo > tile_size:
+        raise ValueError(f"halo ({halo}) darf nicht grösser als tile_size ({tile_size}) sein")
+    n = len(xyz)
+    indices = np.empty((n, k), dtype=np.int32)
+    distances = np.empty((n, k), dtype=np.float16)
+    cell = np.floor((xyz[:, :2] - xyz[:, :2].min(axis=0)) / tile_size).astype(np.int64)
+    n_cols = int(cell[:, 1].max()) + 1 if n else 1
+    tile = cell[:, 0] * n_cols + cell[:, 1]
+    order = np.argsort(tile, kind="stable")
+    ids, starts, counts = np.unique(tile[order], return_index=True, return_counts=True)
+    lookup = {int(t): (s, s + c) for t, s, c in zip(ids, starts, counts)}
+
+    start = time.time()
+    for t, (s, e) in lookup.items():
+        tx, ty = divmod(t, n_cols)
+        core = order[s:e]
+        # Nachbarkacheln sammeln und auf Kachel + halo zuschneiden
+        cand = [order[slice(*lookup[nb])] for nb in
+                ((tx + dx) * n_cols + ty + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                 if 0 <= ty + dy < n_cols) if nb in lookup]
+        cand = np.concatenate(cand)
+        lo = xyz[core, :2].min(axis=0) - halo
+        hi = xyz[core, :2].max(axis=0) + halo
+        inside = np.all((xyz[cand, :2] >= lo) & (xyz[cand, :2] <= hi), axis=1)
+        cand = cand[inside]
+        tree = cKDTree(xyz[cand])
+        kk = min(k, len(cand))
+        d, i = tree.query(xyz[core], k=kk, workers=-1)
+        d, i = d.reshape(len(core), kk), i.reshape(len(core), kk)
+        indices[core, :kk] = cand[i]
+        distances[core, :kk] = d
+        if kk < k:
+            indices[core, kk:] = core[:, None]
+            distances[core, kk:] = np.inf
+    if log is not None:
+        log(f"kNN-Graph: {n} Punkte, k={k}, {len(lookup)} Kacheln à {tile_size} m, {time.time() - start:.1f} s")
+    return indices, distances
+
+
+def neighbor_graph(source, k=20, radius=2.0, tile_size=50.0, graph_dir=None, columns=None, log=print):
+    """
+    Lädt den gespeicherten kNN-Graphen einer Punktwolke oder baut und speichert ihn.
+
+    Der Graph wird wiederverwendet, solange Punktanzahl, k und Kachelung passen, der Rand
+    mindestens radius beträgt und die Quelle nicht neuer ist.
+
+    Parameter:
+    source    : Punktwolke (.txt oder .pwc)
+    k         : Anzahl Nachbarn pro Punkt
+    radius    : grösster Radius, der mit dem Graphen ausgewertet wird (= halo)
+    tile_size : Kantenlänge der Kacheln in m
+    graph_dir : Ordner für den Graphen, Standard: <source ohne Endung>.knn
+
+    Rückgabe:
+    xyz, indices, distances (indices / distances als read-only memmap)
+    """
+    source = Path(source)
+    graph_dir = Path(graph_dir) if graph_dir is not None else source.with_suffix(".knn")
+    meta_path = graph_dir / GRAPH_FILE
+    xyz, offset = load_xyz(source, columns=columns)
+
+    meta = {"n_points": len(xyz), "k": k, "tile_size": tile_size, "halo": radius}
+    if meta_path.is_file() and meta_path.stat().st_mtime >= source.stat().st_mtime:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if (stored["n_points"], stored["k"], stored["tile_size"]) == (len(xyz), k, tile_size) \
+                and stored["halo"] >= radius:
+            if log is not None:
+                log(f"kNN-Graph aus {graph_dir.name} geladen")
+            return (xyz, np.load(graph_dir / "indices.npy", mmap_mode="r"),
+                    np.load(graph_dir / "distances.npy", mmap_mode="r"))
+
+    indices, distances = build_neighbor_graph(xyz, k=k, tile_size=tile_size, halo=radius, log=log)
+    graph_dir.mkdir(parents=True, exist_ok=True)
+    np.save(graph_dir / "indices.npy", indices)
+    np.save(graph_dir / "distances.npy", distances)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(dict(meta, offset=offset.tolist()), f, indent=2)
+    return xyz, indices, distances
+
+
+def eigen_features(xyz, indices, distances, radius, batch_size=100_000):
+    """
+    Eigenwert-Merkmale für einen Radius aus dem kNN-Graphen (blockweise vektorisiert).
+
+    Parameter:
+    xyz, indices, distances : Rückgabe von neighbor_graph()
+    radius                  : Nachbarn mit Distanz <= radius werden verwendet
+    batch_size              : Punkte pro Block
+
+    Rückgabe:
+    features  : (n, 6) float32 in der Reihenfolge von GEOMETRY_FEATURES
+                (weniger als 3 Nachbarn → Formmerkmale 0)
+    saturated : Anteil Punkte, deren k Nachbarn alle innerhalb radius liegen
+    """
+    n = len(xyz)
+    out = np.empty((n, len(GEOMETRY_FEATURES)), dtype=np.float32)
+    volume = 4.0 / 3.0 * np.pi * radius ** 3
+    n_saturated = 0
+    for s in range(0, n, batch_size):
+        idx = np.asarray(indices[s:s + batch_size])
+        w = np.asarray(distances[s:s + batch_size], dtype=np.float32) <= radius
+        P = xyz[idx].astype(np.float64)  # (b, k, 3)
+        cnt = w.sum(axis=1)
+        n_saturated += int(np.count_nonzero(w[:, -1]))
+
+        wf = w.astype(np.float64)
+        mean = np.einsum("bk,bki->bi", wf, P) / np.maximum(cnt, 1)[:, None]
+        D = P - mean[:, None, :]
+        cov = np.einsum("bk,bki,bkj->bij", wf, D, D) / np.maximum(cnt, 1)[:, None, None]
+        vals, vecs = np.linalg.eigh(cov)  # aufsteigend: λ3, λ2, λ1
+        l3, l2, l1 = np.clip(vals[:, 0], 0, None), vals[:, 1], vals[:, 2]
+        valid = (cnt >= 3) & (l1 > 0)
+        l1_safe = np.where(valid, l1, 1.0)
+
+        z = P[:, :, 2]
+        block = out[s:s + batch_size]
+        block[:, 0] = np.where(valid, (l1 - l2) / l1_safe, 0)
+        block[:, 1] = np.where(valid, (l2 - l3) / l1_safe, 0)
+        block[:, 2] = np.where(valid, l3 / l1_safe, 0)
+        block[:, 3] = np.where(valid, 1 - np.abs(vecs[:, 2, 0]), 0)
+        block[:, 4] = np.where(w, z, -np.inf).max(axis=1) - np.where(w, z, np.inf).min(axis=1)
+        block[:, 5] = cnt / volume
+    return out, n_saturated / max(n, 1)
+
+
+def geometric_features(source, radii=(0.5, 1.0, 2.0), k=20, tile_size=50.0, graph_dir=None,
+                       batch_size=100_000, columns=None, log=print):
+    """
+    Alle Nachbarschaftsmerkmale einer Punktwolke für mehrere Radien.
+
+    Parameter:
+    source     : Punktwolke (.txt oder .pwc)
+    radii      : Radien in m
+    k          : Nachbarn pro Punkt im Graphen (begrenzt die Nachbarschaft)
+    tile_size  : Kantenlänge der Kacheln für die KD-Bäume
+    graph_dir  : Ordner des gespeicherten Graphen (siehe neighbor_graph)
+    batch_size : Punkte pro Rechenblock
+    columns    : Spaltennamen der Quelle, ohne Angabe wird das Layout erkannt
+
+    Rückgabe:
+    DataFrame mit den Spalten feature_columns(radii), gleiche Reihenfolge wie source
+    """
+    radii = list(radii)
+    xyz, indices, distances = neighbor_graph(source, k=k, radius=max(radii), tile_size=tile_size,
+                                             graph_dir=graph_dir, columns=columns, log=log)
+    blocks = []
+    for r in radii:
+        start = time.time()
+        values, saturated = eigen_features(xyz, indices, distances, r, batch_size=batch_size)
+        blocks.append(values)
+        if log is not None:
+            log(f"  Radius {r:g} m: {time.time() - start:.1f} s, {saturated:.1%} der Nachbarschaften "
+                f"gesättigt (k={k})")
+    return pd.DataFrame(np.hstack(blocks), columns=feature_columns(radii))
+
+
+def append_geometric_features(source, output_path, radii=(0.5, 1.0, 2.0), columns=None,
+                              chunksize=1_000_000, **kwargs):
+    """
+    Schreibt die Punktwolke mit angehängten Nachbarschaftsmerkmalen neu (.pwc oder ";"-TXT).
+
+    Parameter:
+    source      : Punktwolke (.txt oder .pwc)
+    output_path : Zieldatei, Textspalten (z.B. Klassenname) nur mit TXT-Ziel
+    radii       : Radien in m
+    columns     : Spaltennamen der Quelle, ohne Angabe wird das Layout erkannt
+    kwargs      : weitere Parameter für geometric_features (k, tile_size, graph_dir ...)
+
+    Rückgabe:
+    Spaltenliste der Ausgabedatei
+    """
+    features = geometric_features(source, radii=radii, columns=columns, **kwargs)
+    return append_columns(source, output_path, features, columns=columns, chunksize=chunksize)
@@ -0,0 +1,149 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Geometrie pro Gruppe (Cluster-Label) in einem Durchgang, z.B. der Durchmesserfilter nach
+DBSCAN im Baum-Workflow. Statt pro Cluster eine Bool-Maske über alle Punkte zu bilden
+(Aufwand Cluster x Punkte), werden die Punkte einmal nach Label sortiert; jede Gruppe ist
+danach ein zusammenhängender Abschnitt. Punktanzahl und Bounding Box kommen vektorisiert
+aus reduceat, die konvexe Hülle (Fläche, Umfang) wird pro Abschnitt berechnet, bei Bedarf
+in einem Prozesspool.
+
+Hinweis: scipy.spatial.ConvexHull(...).area ist in 2D der Umfang, .volume die Fläche.
+Der bisherige Filter in 0_250427_Final_Watershed.py rechnet den Durchmesser aus .area,
+also aus dem Umfang (measure="perimeter" behält dieses Verhalten bei).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import ConvexHull, QhullError
+
+GROUP_COLUMNS = ["Punkte", "Flaeche_m2", "Umfang_m", "X_min", "X_max", "Y_min", "Y_max"]
+
+
+def group_slices(labels, ignore=-1):
+    """
+    Sortiert die Punkte einmal nach Label.
+
+    Parameter:
+    labels : (n,) Gruppen-IDs
+    ignore : Label ohne Gruppe (z.B. -1 = Rauschen), None = alle verwenden
+
+    Rückgabe:
+    order  : Punktindizes nach Label sortiert (stabil, ohne ignore)
+    groups : Labels der Gruppen (aufsteigend)
+    starts : Beginn jeder Gruppe in order (Ende = nächster Beginn bzw. len(order))
+    """
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    if ignore is not None:
+        order = order[labels[order] != ignore]
+    groups, starts = np.unique(labels[order], return_index=True)
+    return order, groups, starts
+
+
+def _hulls(job):
+    """Worker: Fläche und Umfang der konvexen Hülle für mehrere Abschnitte."""
+    xy, bounds, min_points = job
+    out = np.full((len(bounds), 2), np.nan)
+    for i, (s, e) in enumerate(bounds):
+        if e - s < min_points:
+            continue
+        try:
+            hull = ConvexHull(xy[s:e])
+        except QhullError:  # alle Punkte auf einer Linie / identisch
+            continue
+        out[i] = hull.volume, hull.area  # 2D: volume = Fläche, area = Umfang
+    return out
+
+
+def group_geometry(xy, labels, min_points=5, ignore=-1, max_workers=1, groups_per_job=500):
+    """
+    Punktanzahl, Bounding Box und konvexe Hülle pro Gruppe.
+
+    Parameter:
+    xy             : (n, ≥2) Koordinaten, verwendet werden die ersten beiden Spalten
+    labels         : (n,) Gruppen-IDs
+    min_points     : kleinere Gruppen erhalten keine Hülle (NaN)
+    ignore         : Label ohne Gruppe, None = alle verwenden
+    max_workers    : Prozesse für die Hüllen, 1 = ohne Prozesspool, None = CPU-Kerne
+    groups_per_job : Gruppen pro Auftrag im Prozesspool
+
+    Rückgabe:
+    DataFrame mit Index = Label und den Spalten GROUP_COLUMNS. Fläche/Umfang sind NaN, wenn
+    die Gruppe zu klein oder die Hülle entartet ist (Punkte auf einer Linie).
+    """
+    xy = np.asarray(xy, dtype=np.float64)[:, :2]
+    order, groups, starts = group_slices(labels, ignore=ignore)
+    if len(groups) == 0:
+        return pd.DataFrame(columns=GROUP_COLUMNS, index=pd.Index([], name="Label"))
+    xy = xy[order]
+    ends = np.r_[starts[1:], len(order)]
+    bounds = np.column_stack([starts, ends])
+
+    jobs = [(xy[bounds[i, 0]:bounds[min(i + groups_per_job, len(bounds)) - 1, 1]],
+             bounds[i:i + groups_per_job] - bounds[i, 0], min_points)
+            for i in range(0, len(bounds), groups_per_job)]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            hulls = np.vstack(list(pool.map(_hulls, jobs)))
+    else:
+        hulls = np.vstack([_hulls(job) for job in jobs])
+
+    table = pd.DataFrame({
+        "Punkte": ends - starts,
+        "Flaeche_m2": hulls[:, 0],
+        "Umfang_m": hulls[:, 1],
+        "X_min": np.minimum.reduceat(xy[:, 0], starts),
+        "X_max": np.maximum.reduceat(xy[:, 0], starts),
+        "Y_min": np.minimum.reduceat(xy[:, 1], starts),
+        "Y_max": np.maximum.reduceat(xy[:, 1], starts),
+    }, index=pd.Index(groups, name="Label"))
+    return table
+
+
+def crown_diameter(table, measure="perimeter"):
+    """
+    Kronendurchmesser pro Gruppe aus group_geometry().
+
+    Parameter:
+    measure : "area"      → Durchmesser des flächengleichen Kreises sqrt(4 * Fläche / π)
+              "perimeter" → sqrt(4 * Umfang / π), wie bisher mit ConvexHull(...).area
+    """
+    if measure == "area":
+        return np.sqrt(4 * table["Flaeche_m2"] / np.pi)
+    if measure == "perimeter":
+        return np.sqrt(4 * table["Umfang_m"] / np.pi)
+    raise ValueError(f"Unbekanntes Mass '{measure}' (area, perimeter)")
+
+
+def diameter_mask(xy, labels, diameter_min, diameter_max, measure="perimeter", min_points=5,
+                  max_workers=1):
+    """
+    Behält nur Punkte von Gruppen, deren Durchmesser im Bereich liegt.
+
+    Parameter:
+    xy, labels                 : Koordinaten und Cluster-IDs (-1 = Rauschen, wird verworfen)
+    diameter_min, diameter_max : zulässiger Bereich in m (Grenzen eingeschlossen)
+    measure                    : siehe crown_diameter()
+    min_points                 : kleinere Gruppen werden verworfen
+
+    Rückgabe:
+    keep  : Bool-Maske (n,) der behaltenen Punkte
+    table : group_geometry() mit den Spalten Durchmesser_m und Behalten
+    """
+    labels = np.asarray(labels)
+    table = group_geometry(xy, labels, min_points=min_points, max_workers=max_workers)
+    table["Durchmesser_m"] = crown_diameter(table, measure)
+    table["Behalten"] = table["Durchmesser_m"].between(diameter_min, diameter_max)  # NaN → False
+    kept = table.index[table["Behalten"]].to_numpy()
+    return np.isin(labels, kept), table
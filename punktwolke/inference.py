@@ -0,0 +1,265 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Kachelweise Klassifikation ganzer Platten in einem Prozesspool, für jedes gespeicherte
+Modell mit predict() (SVM, SGDClassifier, RandomForest, Pipelines ...). Statt eines
+einzigen model.predict() über alle Punkte wird die Punktwolke in Blöcke fester Grösse
+zerlegt. Jeder Worker lädt Modell (und optional Scaler) mit joblib einmal und
+klassifiziert danach Block für Block. Bei .pwc-Eingaben liest jeder Worker seinen Block
+selbst aus der memmap, bei ";"-TXT liest der Hauptprozess blockweise und verteilt die
+Merkmale.
+
+Die Vorhersagen werden als kompakte uint8-Spalte "predicted_label" in derselben
+Reihenfolge wie die Eingabe geschrieben (.pwc oder TXT, eine Zeile pro Punkt).
+Mit max_memory_mb wird die Blockgrösse so gewählt, dass der Arbeitsspeicher eines
+Blocks (Merkmale + Zwischenresultate von predict) pro Worker unter der Grenze bleibt.
+
+Unter Windows muss der Aufruf im Skript unter  if __name__ == "__main__":  stehen.
+"""
+
+import os
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import joblib
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from punktwolke.cluster import iter_features
+from punktwolke.store import is_pwc, open_points, open_writer
+
+PREDICTED_LABEL = "predicted_label"  # Spaltenname der Vorhersagen (uint8, siehe schema.py)
+
+# Modell und Scaler pro Worker-Prozess (werden von _init_worker einmal geladen)
+_MODEL = None
+_SCALER = None
+
+
+def _load(model_path, scaler_path=None):
+    model = joblib.load(model_path)
+    # parallel wird über die Prozesse, nicht innerhalb eines Workers (sonst Überbelegung der Kerne)
+    n_jobs = {k: 1 for k in model.get_params() if k.endswith("n_jobs")} if hasattr(model, "get_params") else {}
+    if n_jobs:
+        model.set_params(**n_jobs)
+    scaler = joblib.load(scaler_path) if scaler_path is not None else None
+    return model, scaler
+
+
+def _init_worker(model_path, scaler_path=None):
+    global _MODEL, _SCALER
+    threadpool_limits(1)  # auch BLAS / OpenMP nur ein Thread pro Worker
+    _MODEL, _SCALER = _load(model_path, scaler_path)
+
+
+def to_label_codes(pred):
+    """
+    Prüft Vorhersagen auf Klassencodes 0-255 und gibt sie als uint8 zurück.
+
+    Raises:
+    ValueError, wenn das Modell Texte oder Werte ausserhalb 0-255 liefert
+    """
+    pred = np.asarray(pred)
+    if pred.dtype.kind not in "biuf" or (pred.dtype.kind == "f" and not np.array_equal(pred, np.round(pred))):
+        raise ValueError(f"Vorhersagen vom Typ {pred.dtype} sind keine Klassencodes, "
+                         "Modell auf codierte Labels (0-255) trainieren")
+    if len(pred) and (pred.min() < 0 or pred.max() > 255):
+        raise ValueError(f"Klassencodes {pred.min()}..{pred.max()} passen nicht in uint8 (0-255)")
+    return pred.astype(np.uint8)
+
+
+def _predict(X, model=None, scaler=None):
+    if model is None:
+        model, scaler = _MODEL, _SCALER
+    if scaler is not None:
+        X = scaler.transform(X)
+    return to_label_codes(model.predict(X))
+
+
+def _predict_array(job):
+    """Worker: Merkmale liegen bereits im Auftrag (TXT-Eingabe)."""
+    index, X = job
+    start = time.time()
+    labels = _predict(X)
+    return index, labels, os.getpid(), time.time() - start
+
+
+def _predict_slice(job):
+    """Worker: liest seinen Block selbst aus dem .pwc-Store."""
+    index, path, columns, features, start, end = job
+    t0 = time.time()
+    pts = open_points(path, columns=columns)
+    X = np.column_stack([np.asarray(pts[n][start:end], dtype=np.float64) for n in features])
+    labels = _predict(X)
+    return index, labels, os.getpid(), time.time() - t0
+
+
+def _jobs(source, features, block_size, columns):
+    if is_pwc(source):
+        n_points = len(open_points(source, columns=columns))
+        for i, start in enumerate(range(0, n_points, block_size)):
+            yield _predict_slice, (i, str(source), columns, list(features), start, min(start + block_size, n_points))
+    else:
+        for i, X in enumerate(iter_features(source, features, chunksize=block_size, columns=columns)):
+            yield _predict_array, (i, X)
+
+
+def _first_rows(source, features, n_rows, columns):
+    """Die ersten n_rows Merkmalszeilen (für die Speichermessung)."""
+    if is_pwc(source):
+        pts = open_points(source, columns=columns)
+        return np.column_stack([np.asarray(pts[n][:n_rows], dtype=np.float64) for n in features])
+    return next(iter_features(source, features, chunksize=n_rows, columns=columns))
+
+
+def bytes_per_point(model_path, X_probe, scaler_path=None):
+    """
+    Misst den Arbeitsspeicher pro Punkt für Skalieren + predict auf einem Probeblock.
+
+    Gemessen wird die Spitze der numpy-Allokationen (tracemalloc), dazu kommt der
+    Merkmalsblock selbst (float64). Der Grundbedarf des Worker-Prozesses (Python,
+    sklearn, geladenes Modell) ist nicht enthalten.
+
+    Parameter:
+    model_path  : mit joblib.dump gespeichertes Modell
+    X_probe     : Probeblock der Merkmale, z.B. 10'000 Punkte
+    scaler_path : optional gespeicherter Scaler (transform vor predict)
+
+    Rückgabe:
+    Bytes pro Punkt
+    """
+    model, scaler = _load(model_path, scaler_path)
+    X_probe = np.asarray(X_probe, dtype=np.float64)
+    tracemalloc.start()
+    try:
+        with threadpool_limits(1):  # wie im Worker
+            _predict(X_probe, model, scaler)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / max(len(X_probe), 1) + X_probe.shape[1] * 8
+
+
+def block_size_for_memory(max_memory_mb, per_point, min_block=1_000):
+    """Blockgrösse, deren Arbeitsspeicher (per_point Bytes pro Punkt) unter max_memory_mb bleibt."""
+    return max(min_block, int(max_memory_mb * 2**20 / per_point))
+
+
+def run_inference(model_path, source, features, output_path=None, scaler_path=None, columns=None,
+                  block_size=500_000, max_memory_mb=None, max_workers=None, probe_size=10_000, log=print):
+    """
+    Klassifiziert eine Punktwolke blockweise in einem Prozesspool.
+
+    Parameter:
+    model_path    : mit joblib.dump gespeichertes Modell (predict auf Merkmals-Arrays,
+                    Klassencodes 0-255)
+    source        : Pfad zur Punktwolke (.txt oder .pwc)
+    features      : Liste der Merkmalsspalten in der Reihenfolge des Trainings
+    output_path   : Ziel für die Spalte "predicted_label" (.pwc → uint8, sonst ";"-TXT),
+                    gleiche Punktreihenfolge wie source; None = nur zurückgeben
+    scaler_path   : optional gespeicherter Scaler (z.B. scaler.pkl des SGD-Trainings)
+    columns       : Spaltennamen der Datei, ohne Angabe wird das Layout erkannt
+    block_size    : Punkte pro Block (wird bei max_memory_mb ignoriert)
+    max_memory_mb : Obergrenze Arbeitsspeicher pro Worker und Block in MB, die
+                    Blockgrösse wird aus einem Probeblock von probe_size Punkten bestimmt
+    max_workers   : Anzahl Prozesse, Standard: CPU-Kerne
+    log           : Ausgabefunktion für den Fortschritt, None = still
+
+    Rückgabe:
+    labels : uint8-Array der Vorhersagen in der Reihenfolge der Eingabe
+    stats  : dict mit Punkte, Bloecke, Block_Punkte, Worker, Dauer_s, Punkte_pro_s und
+             Worker_Tabelle (DataFrame: Worker_PID, Bloecke, Punkte, Dauer_s, Punkte_pro_s)
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    model_path = str(model_path)
+    scaler_path = str(scaler_path) if scaler_path is not None else None
+    if max_memory_mb is not None:
+        per_point = bytes_per_point(model_path, _first_rows(source, features, probe_size, columns), scaler_path)
+        block_size = block_size_for_memory(max_memory_mb, per_point)
+        if log is not None:
+            log(f"Speicher: {per_point:.0f} Bytes/Punkt → Blockgrösse {block_size} für {max_memory_mb} MB pro Worker")
+
+    start = time.time()
+    writer = open_writer(output_path, [PREDICTED_LABEL]) if output_path is not None else None
+    results = {}
+    labels = []
+    per_worker = defaultdict(lambda: [0, 0, 0.0])  # PID → Blöcke, Punkte, Sekunden
+    n_done = 0
+
+    def collect(done):
+        # Ergebnisse in Eingabereihenfolge übernehmen (fertige Blöcke können überholen)
+        nonlocal n_done
+        for f in done:
+            index, block_labels, pid, duration = f.result()
+            results[index] = block_labels
+            per_worker[pid][0] += 1
+            per_worker[pid][1] += len(block_labels)
+            per_worker[pid][2] += duration
+        while len(labels) in results:
+            block_labels = results.pop(len(labels))
+            labels.append(block_labels)
+            if writer is not None:
+                writer.write(block_labels[:, None])
+            n_done += len(block_labels)
+        if log is not None and done:
+            log(f"  {n_done} Punkte klassifiziert ({n_done / max(time.time() - start, 1e-9):,.0f} Punkte/s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(model_path, scaler_path)) as pool:
+            pending = set()
+            for func, job in _jobs(source, features, block_size, columns):
+                pending.add(pool.submit(func, job))
+                # höchstens 2 Blöcke pro Worker gleichzeitig unterwegs (Speicher begrenzen)
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(pending)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close()
+
+    labels = np.concatenate(labels) if labels else np.empty(0, dtype=np.uint8)
+    elapsed = time.time() - start
+    worker_table = pd.DataFrame(
+        [{"Worker_PID": pid, "Bloecke": b, "Punkte": n, "Dauer_s": round(s, 2),
+          "Punkte_pro_s": round(n / s) if s > 0 else np.nan}
+         for pid, (b, n, s) in sorted(per_worker.items())],
+        columns=["Worker_PID", "Bloecke", "Punkte", "Dauer_s", "Punkte_pro_s"],
+    )
+    stats = {
+        "Punkte": len(labels),
+        "Bloecke": int(worker_table["Bloecke"].sum()),
+        "Block_Punkte": block_size,
+        "Worker": max_workers,
+        "Dauer_s": round(elapsed, 2),
+        "Punkte_pro_s": round(len(labels) / elapsed) if elapsed > 0 else np.nan,
+        "Worker_Tabelle": worker_table,
+    }
+    if log is not None:
+        log(f"✔ {stats['Punkte']} Punkte in {elapsed:.1f} s ({stats['Punkte_pro_s']:,} Punkte/s, "
+            f"{stats['Bloecke']} Blöcke à {block_size}, {max_workers} Worker)")
+    return labels, stats
+
+
+def predict_tiled(model_path, source, features, block_size=500_000, max_workers=None, columns=None):
+    """
+    Kurzform von run_inference() ohne Ausgabedatei und ohne Fortschrittsmeldungen.
+
+    Rückgabe:
+    uint8-Array der vorhergesagten Labels in der Reihenfolge der Eingabe
+    """
+    labels, _ = run_inference(model_path, source, features, block_size=block_size,
+                              max_workers=max_workers, columns=columns, log=None)
+    return labels
@@ -0,0 +1,204 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Normalisierung der Punktwolke (RGB 0-255 → RGB 0-1 + HSV 0-1) für ganze Platten.
+Die HSV-Umrechnung ist ein vektorisierter NumPy-Kernel, der Schritt für Schritt
+colorsys.rgb_to_hsv nachbildet (identische Werte), aber ohne Python-Schleife pro Punkt.
+Die Datei wird blockweise gelesen, umgerechnet und sofort wieder geschrieben, so dass
+der Speicherbedarf unabhängig von der Punktanzahl durch die Blockgrösse begrenzt ist.
+
+Mit normalize_batch() werden mehrere Dateien (z.B. die Klassendateien einer Platte)
+parallel in einem Prozesspool normalisiert; jede Datei wird in ihrem eigenen Worker
+gelesen und geschrieben, am Schluss entsteht ein Manifest mit Punktzahlen und Laufzeiten.
+
+Eingabe:  Layout "roh"          X,Y,Z, Red,Green,Blue (0-255), X/Y/Z scan dir (+ z.B. Klasse)
+Ausgabe:  Layout "normalisiert" X,Y,Z, RGB (0-1), HSV (0-1), X/Y/Z scan dir (+ Zusatzspalten)
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from punktwolke.schema import (
+    HSV_01, NORMALS, RGB_01, RGB_255, RGB_255_COLOR, XYZ, XYZ_SHORT,
+)
+from punktwolke.store import iter_points, open_writer
+
+
+def rgb_to_hsv(r, g, b):
+    """
+    Vektorisierte Version von colorsys.rgb_to_hsv (gleiche Rechenschritte → gleiche Werte).
+
+    Parameter:
+    r, g, b : Arrays mit Werten 0-1 (float64)
+
+    Rückgabe:
+    h, s, v als Arrays (0-1)
+    """
+    r = np.asarray(r, dtype=np.float64)
+    g = np.asarray(g, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    rangec = maxc - minc
+    v = maxc
+    grau = minc == maxc  # colorsys: h = s = 0 bei Grauwerten
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(grau, 0.0, rangec / maxc)
+        rc = (maxc - r) / rangec
+        gc = (maxc - g) / rangec
+        bc = (maxc - b) / rangec
+        # gleiche Reihenfolge der Fallunterscheidung wie colorsys (r vor g vor b)
+        h = np.where(r == maxc, bc - gc,
+                     np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+        h = np.where(grau, 0.0, np.mod(h / 6.0, 1.0))
+    return h, s, v
+
+
+def _find(columns, *candidates):
+    for names in candidates:
+        if all(n in columns for n in names):
+            return list(names)
+    raise KeyError(f"Keine der Spaltengruppen {candidates} in {list(columns)}")
+
+
+def output_columns(columns):
+    """Spaltennamen der normalisierten Ausgabe zu den Eingabespalten."""
+    xyz = _find(columns, XYZ, XYZ_SHORT)
+    rgb = _find(columns, RGB_255, RGB_255_COLOR)
+    extra = [c for c in columns if c not in xyz + rgb + NORMALS]
+    return XYZ + RGB_01 + HSV_01 + NORMALS + extra
+
+
+def normalize_chunk(df):
+    """
+    Normalisiert einen Block (DataFrame im Layout "roh", ggf. mit Zusatzspalten).
+
+    Rückgabe:
+    DataFrame in der Spaltenreihenfolge von output_columns()
+    """
+    xyz = _find(df.columns, XYZ, XYZ_SHORT)
+    rgb = _find(df.columns, RGB_255, RGB_255_COLOR)
+    extra = [c for c in df.columns if c not in xyz + rgb + NORMALS]
+
+    r = df[rgb[0]].to_numpy(dtype=np.float64) / 255.0
+    g = df[rgb[1]].to_numpy(dtype=np.float64) / 255.0
+    b = df[rgb[2]].to_numpy(dtype=np.float64) / 255.0
+    h, s, v = rgb_to_hsv(r, g, b)
+
+    out = {}
+    for src, dst in zip(xyz, XYZ):
+        out[dst] = df[src].to_numpy()
+    for dst, arr in zip(RGB_01 + HSV_01, (r, g, b, h, s, v)):
+        out[dst] = arr
+    for name in NORMALS + extra:
+        out[name] = df[name].to_numpy()
+    return pd.DataFrame(out, index=df.index)
+
+
+def normalize_file(input_path, output_path, columns=None, chunksize=1_000_000, progress=None):
+    """
+    Normalisiert eine Punktwolke blockweise von Datei zu Datei.
+
+    Parameter:
+    input_path  : ";"-TXT oder .pwc im Layout "roh"
+    output_path : Zieldatei, Endung .pwc → binär, sonst ";"-TXT
+    columns     : Spaltennamen der Eingabe, ohne Angabe wird das Layout erkannt
+    chunksize   : Anzahl Punkte pro Block (bestimmt den Speicherbedarf)
+    progress    : optionale Funktion progress(n_punkte_bisher), z.B. für tqdm
+
+    Rückgabe:
+    Anzahl verarbeiteter Punkte
+    """
+    writer = None
+    try:
+        for chunk in iter_points(input_path, columns=columns, chunksize=chunksize):
+            out = normalize_chunk(chunk)
+            if writer is None:
+                writer = open_writer(output_path, out.columns)
+            writer.write(out)
+            if progress is not None:
+                progress(writer.n_points)
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is None:
+        raise ValueError(f"{input_path} enthält keine Punkte")
+    writer.close()
+    return writer.n_points
+
+
+# ================================================================
+# Batch: mehrere Dateien parallel
+# ================================================================
+def _normalize_job(job):
+    """Worker: normalisiert eine Datei und liefert eine Zeile für das Manifest."""
+    input_path, output_path, columns, chunksize = job
+    start = time.time()
+    n_points = normalize_file(input_path, output_path, columns=columns, chunksize=chunksize)
+    return {
+        "Eingabe": str(input_path),
+        "Ausgabe": str(output_path),
+        "Punkte": n_points,
+        "Dauer_s": round(time.time() - start, 3),
+        "Worker_PID": os.getpid(),
+    }
+
+
+def normalize_batch(jobs, columns=None, chunksize=1_000_000, max_workers=None, manifest_path=None):
+    """
+    Normalisiert mehrere Dateien parallel (ein Worker-Prozess pro Datei).
+
+    Unter Windows muss der Aufruf im Skript unter  if __name__ == "__main__":  stehen.
+
+    Parameter:
+    jobs          : Liste von (input_path, output_path)
+    columns       : Spaltennamen der Eingaben, ohne Angabe wird das Layout erkannt
+    chunksize     : Punkte pro Block innerhalb eines Workers
+    max_workers   : Anzahl Prozesse, Standard: min(Anzahl Dateien, CPU-Kerne)
+    manifest_path : optionaler Pfad für das Manifest (.csv)
+
+    Rückgabe:
+    DataFrame (Manifest) mit Eingabe, Ausgabe, Punkte, Dauer_s, Worker_PID;
+    die letzte Zeile "GESAMT" enthält Summe der Punkte und die Wandzeit
+    """
+    jobs = [(Path(i), Path(o)) for i, o in jobs]
+    if not jobs:
+        raise ValueError("Keine Dateien zum Normalisieren")
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+
+    start = time.time()
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_normalize_job, (i, o, columns, chunksize)): i for i, o in jobs}
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            print(f"✔ {Path(row['Eingabe']).name} → {Path(row['Ausgabe']).name} "
+                  f"({row['Punkte']} Punkte, {row['Dauer_s']:.1f} s)")
+
+    manifest = pd.DataFrame(rows).sort_values("Eingabe").reset_index(drop=True)
+    total = {
+        "Eingabe": "GESAMT",
+        "Ausgabe": f"{max_workers} Worker",
+        "Punkte": int(manifest["Punkte"].sum()),
+        "Dauer_s": round(time.time() - start, 3),
+        "Worker_PID": -1,
+    }
+    manifest = pd.concat([manifest, pd.DataFrame([total])], ignore_index=True)
+    if manifest_path is not None:
+        manifest.to_csv(manifest_path, index=False)
+    return manifest
@@ -0,0 +1,198 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Aufteilen der Punktwolke nach Orientierung der Normalen (|Z scan dir|), vektorisiert.
+Statt classify_orientation() / angle_to_xy_plane() pro Zeile mit apply aufzurufen und
+die Tabelle danach für jede Orientierung neu zu filtern, wird |nz| mit np.digitize in
+Klassen eingeteilt. Es sind beliebig viele Grenzwerte möglich, nicht nur flat/upright.
+Die Datei wird blockweise gelesen, jede Klasse direkt in ihre Zieldatei geschrieben und
+nebenbei ein Winkel-Histogramm aufsummiert (ein einziger Durchgang).
+
+Für Schwellenwert-Studien zählt sweep_thresholds() die Punkte pro Klasse für viele
+Kombinationen von Grenzwerten aus einer einmal sortierten |nz|-Spalte, ohne neu zu lesen.
+
+|nz|    Winkel zur XY-Ebene (°)    Bedeutung der Normale
+1.00        0.00°                  exakt senkrecht / aufrecht  --> zb Boden
+0.87       29.50°                  leicht geneigt (schräg)     --> zb Schrägdach
+0.00       90.00°                  exakt waagrecht             --> zb Fassade
+"""
+
+import numpy as np
+import pandas as pd
+
+from punktwolke.split import group_labels
+from punktwolke.store import iter_points, open_writer
+
+# Namen bei zwei Grenzwerten [flat_thresh, upright_thresh] (wie 000_splitt_angle.py)
+ORIENTATION_NAMES = ["waagrecht", "schräg", "aufrecht"]
+
+
+def _check_thresholds(thresholds):
+    thresholds = np.asarray(thresholds, dtype=np.float64).ravel()
+    if len(thresholds) == 0:
+        raise ValueError("Mindestens ein Grenzwert für |nz| nötig")
+    if np.any(thresholds < 0) or np.any(thresholds > 1):
+        raise ValueError(f"Grenzwerte für |nz| müssen zwischen 0 und 1 liegen: {thresholds.tolist()}")
+    if np.any(np.diff(thresholds) <= 0):
+        raise ValueError(f"Grenzwerte müssen aufsteigend sortiert sein: {thresholds.tolist()}")
+    return thresholds
+
+
+def bucket_names(thresholds, names=None):
+    """
+    Namen der Orientierungsklassen zu den Grenzwerten (eine Klasse mehr als Grenzwerte).
+
+    Parameter:
+    thresholds : aufsteigende Grenzwerte für |nz|
+    names      : optionale eigene Namen; ohne Angabe bei zwei Grenzwerten ORIENTATION_NAMES,
+                 sonst "nz_<von>_<bis>"
+    """
+    thresholds = _check_thresholds(thresholds)
+    if names is not None:
+        names = list(names)
+        if len(names) != len(thresholds) + 1:
+            raise ValueError(f"{len(thresholds)} Grenzwerte brauchen {len(thresholds) + 1} Namen, erhalten: {names}")
+        return names
+    if len(thresholds) == 2:
+        return list(ORIENTATION_NAMES)
+    edges = [0.0] + thresholds.tolist() + [1.0]
+    return [f"nz_{lo:g}_{hi:g}" for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def angle_to_xy_plane(nz):
+    """Winkel der Normale zur XY-Ebene in Grad (0° = senkrecht, 90° = waagrecht), vektorisiert."""
+    z_abs = np.clip(np.abs(np.asarray(nz, dtype=np.float64)), 0.0, 1.0)
+    return np.degrees(np.arccos(z_abs))
+
+
+def orientation_index(nz, thresholds):
+    """
+    Klassennummer pro Punkt aus |nz| (0 = unterste Klasse, len(thresholds) = oberste).
+
+    Grenzwerte gehören zur oberen Klasse, ausser der kleinste: wie bisher gilt
+    |nz| <= flat_thresh → waagrecht und |nz| >= upright_thresh → aufrecht.
+    """
+    thresholds = _check_thresholds(thresholds)
+    z_abs = np.abs(np.asarray(nz, dtype=np.float64))
+    index = np.digitize(z_abs, thresholds)
+    index[z_abs == thresholds[0]] = 0
+    return index
+
+
+def split_orientation(input_path, path_for, thresholds, names=None, columns=None,
+                      normal_column="Z scan dir", add_columns=True, chunksize=1_000_000,
+                      hist_step=1.0, histogram_path=None):
+    """
+    Teilt eine Punktwolke in einem Durchgang nach |nz| in Dateien auf.
+
+    Parameter:
+    input_path     : ";"-TXT oder .pwc
+    path_for       : Funktion path_for(klassen_nr, name) → Zieldatei (.txt oder .pwc)
+    thresholds     : aufsteigende Grenzwerte für |nz|, z.B. [flat_thresh, upright_thresh]
+    names          : optionale Klassennamen (siehe bucket_names)
+    columns        : Spaltennamen der Eingabe, ohne Angabe wird das Layout erkannt
+    normal_column  : Spalte mit der Z-Komponente der Normale
+    add_columns    : hängt "Orientation" und "Winkel (°)" an (wie bisher, Text nur für TXT-Ausgabe)
+    chunksize      : Punkte pro Block
+    hist_step      : Klassenbreite des Winkel-Histogramms in Grad
+    histogram_path : optionaler Pfad (.csv) für das Histogramm
+
+    Rückgabe:
+    summary   : DataFrame pro Orientierungsklasse (Grenzen, Winkel, Punkte, Anteil, Datei)
+    histogram : DataFrame mit Winkel von/bis (°) und Punkte
+    """
+    thresholds = _check_thresholds(thresholds)
+    names = bucket_names(thresholds, names)
+    name_array = np.asarray(names, dtype=object)
+    edges = np.arange(0.0, 90.0 + hist_step, hist_step)
+    edges[-1] = 90.0
+    hist = np.zeros(len(edges) - 1, dtype=np.int64)
+    counts = np.zeros(len(names), dtype=np.int64)
+    paths = [path_for(i, name) for i, name in enumerate(names)]
+
+    writers = []
+    try:
+        for chunk in iter_points(input_path, columns=columns, chunksize=chunksize):
+            nz = chunk[normal_column].to_numpy(dtype=np.float64)
+            index = orientation_index(nz, thresholds)
+            angle = angle_to_xy_plane(nz)
+            hist += np.histogram(angle, bins=edges)[0]
+            if add_columns:
+                # Spaltenreihenfolge wie bisher: Orientation, dann Winkel (°)
+                chunk = chunk.assign(**{"Orientation": name_array[index], "Winkel (°)": np.round(angle, 2)})
+            if not writers:
+                # alle Dateien anlegen, auch leere Klassen bekommen eine (leere) Datei
+                writers = [open_writer(path, chunk.columns) for path in paths]
+            ids, order, starts, ends = group_labels(index)
+            for i, start, end in zip(ids, starts, ends):
+                writers[i].write(chunk.iloc[order[start:end]])
+                counts[i] += end - start
+    except Exception:
+        for writer in writers:
+            writer.abort()
+        raise
+    if not writers:
+        raise ValueError(f"{input_path} enthält keine Punkte")
+    for writer in writers:
+        writer.close()
+
+    lower = np.r_[0.0, thresholds]
+    upper = np.r_[thresholds, 1.0]
+    total = max(int(counts.sum()), 1)
+    summary = pd.DataFrame({
+        "Orientation": names,
+        "|nz| von": lower,
+        "|nz| bis": upper,
+        "Winkel von (°)": np.round(angle_to_xy_plane(upper), 2),
+        "Winkel bis (°)": np.round(angle_to_xy_plane(lower), 2),
+        "Punkte": counts,
+        "Anteil (%)": np.round(100.0 * counts / total, 2),
+        "Datei": [str(p) for p in paths],
+    })
+    histogram = pd.DataFrame({"Winkel von (°)": edges[:-1], "Winkel bis (°)": edges[1:], "Punkte": hist})
+    if histogram_path is not None:
+        histogram.to_csv(histogram_path, index=False)
+    return summary, histogram
+
+
+def read_normals(input_path, columns=None, normal_column="Z scan dir", chunksize=1_000_000):
+    """
+    Z-Komponenten der Normalen, blockweise gelesen wie in split_orientation() (iter_points).
+    Eingabe für sweep_thresholds(), damit die Studie dieselben Werte einteilt wie die Aufteilung.
+    """
+    parts = [chunk[normal_column].to_numpy(dtype=np.float64)
+             for chunk in iter_points(input_path, columns=columns, chunksize=chunksize)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.float64)
+
+
+def sweep_thresholds(nz, threshold_sets, names=None):
+    """
+    Punkte pro Orientierungsklasse für viele Grenzwert-Kombinationen, ohne neu zu lesen.
+
+    |nz| wird einmal sortiert; jede Kombination kostet danach nur ein searchsorted.
+
+    Parameter:
+    nz             : Z-Komponenten der Normalen (z.B. read_normals(input_path, columns))
+    threshold_sets : Liste von Grenzwert-Listen, z.B. [(0.25, 0.985), (0.2, 0.98)]
+    names          : optionale Klassennamen (gleiche Anzahl Grenzwerte in allen Kombinationen)
+
+    Rückgabe:
+    DataFrame mit einer Zeile pro Kombination: Grenzwerte + Punkte pro Klasse
+    """
+    z_sorted = np.sort(np.abs(np.asarray(nz, dtype=np.float64)))
+    rows = []
+    for thresholds in threshold_sets:
+        thresholds = _check_thresholds(thresholds)
+        # kleinster Grenzwert gehört zur unteren Klasse (siehe orientation_index)
+        cuts = np.r_[np.searchsorted(z_sorted, thresholds[0], side="right"),
+                     np.searchsorted(z_sorted, thresholds[1:], side="left")]
+        bounds = np.r_[0, cuts, len(z_sorted)]
+        row = {"Grenzwerte": tuple(thresholds.tolist())}
+        row.update(zip(bucket_names(thresholds, names), np.diff(bounds).tolist()))
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,243 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Rasterung von Punkten zu Höhenmodellen (z.B. CHM) in einem Durchgang. Jeder Punkt erhält
+einen flachen Zellindex; max / min werden mit np.maximum.at / np.minimum.at, count / sum /
+mean mit np.bincount reduziert. Perzentile (z.B. p95 statt max gegen Ausreisser) brauchen
+eine Sortierung nach (Zelle, Höhe) und werden danach pro Abschnitt interpoliert wie
+np.percentile.
+
+Das Raster ist georeferenziert: Ursprung und Auflösung sind fest, die Zellen sind genau
+res gross (binned_statistic_2d legt die Kanten über Minimum/Maximum der Punkte, die
+Zellgrösse weicht dabei leicht von res ab). Standard-Ursprung ist wie bisher das Minimum
+der Punkte, damit E/N der Baumdaten mit früheren Läufen vergleichbar bleiben. Mit
+snap=True wird der Ursprung auf ein Vielfaches von res abgerundet; CHMs aus verschiedenen
+Läufen oder Ausschnitten liegen dann pixelgenau übereinander und können zwischengespeichert
+werden (save_rasters / load_rasters).
+
+Achsen wie im Baum-Workflow: Zeile = erste Koordinatenspalte, Spalte = zweite
+(raster[i, j] mit i aus points[:, 0]).
+
+region_properties() berechnet für ein Label-Raster (z.B. Watershed-Kronen) Fläche,
+Maximalhöhe, Schwerpunkt, flächengleichen Durchmesser und Bounding Box aller Regionen in
+einem Durchgang.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+STATISTICS = ("max", "min", "mean", "count", "sum")
+
+
+def raster_grid(xy, res, origin=None, shape=None, snap=False):
+    """
+    Georeferenziertes Raster für die Punkte.
+
+    Parameter:
+    xy     : (n, ≥2) Koordinaten, verwendet werden die ersten beiden Spalten
+    res    : Zellgrösse in m
+    origin : (o0, o1) untere Ecke, Standard: Minimum der Punkte (wie binned_statistic_2d)
+    shape  : (n0, n1) Anzahl Zellen, Standard: bis zum Maximum der Punkte
+    snap   : Standard-Ursprung auf ein Vielfaches von res abrunden (gleiches Pixelraster
+             für verschiedene Ausschnitte)
+
+    Rückgabe:
+    dict mit origin, res, shape
+    """
+    xy = np.asarray(xy)
+    lo = np.array([xy[:, 0].min(), xy[:, 1].min()])
+    if origin is None:
+        origin = np.floor(lo / res) * res if snap else lo
+    origin = np.asarray(origin, dtype=np.float64)
+    if shape is None:
+        hi = np.array([xy[:, 0].max(), xy[:, 1].max()])
+        shape = np.floor((hi - origin) / res).astype(np.int64) + 1
+    return {"origin": origin.tolist(), "res": float(res), "shape": [int(s) for s in shape]}
+
+
+def grid_extent(grid):
+    """Grenzen des Rasters (min0, max0, min1, max1), z.B. für imshow-Extents."""
+    o0, o1 = grid["origin"]
+    n0, n1 = grid["shape"]
+    return o0, o0 + n0 * grid["res"], o1, o1 + n1 * grid["res"]
+
+
+def cell_index(xy, grid):
+    """
+    Flacher Zellindex pro Punkt.
+
+    Rückgabe:
+    flat   : Zellindex i * n1 + j der Punkte innerhalb des Rasters
+    inside : Bool-Maske der Punkte innerhalb des Rasters
+    """
+    xy = np.asarray(xy)
+    n0, n1 = grid["shape"]
+    # spaltenweise rechnen, ohne (n, 2)-Zwischenarrays
+    i = np.floor((xy[:, 0] - grid["origin"][0]) / grid["res"]).astype(np.int64)
+    j = np.floor((xy[:, 1] - grid["origin"][1]) / grid["res"]).astype(np.int64)
+    inside = (i >= 0) & (i < n0) & (j >= 0) & (j < n1)
+    if inside.all():
+        return i * n1 + j, inside
+    return i[inside] * n1 + j[inside], inside
+
+
+def _segment_percentiles(flat, values, n_cells, percentiles):
+    """Perzentile pro Zelle (lineare Interpolation wie np.percentile)."""
+    # nach Höhe, danach stabil nach Zelle sortieren (schneller als np.lexsort)
+    order = np.argsort(values)
+    order = order[np.argsort(flat[order], kind="stable")]
+    flat, values = flat[order], values[order]
+    cells, starts, counts = np.unique(flat, return_index=True, return_counts=True)
+    out = {}
+    for q in percentiles:
+        pos = q / 100.0 * (counts - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, counts - 1)
+        a, b = values[starts + lo], values[starts + hi]
+        grid = np.full(n_cells, np.nan)
+        grid[cells] = a + (b - a) * (pos - lo)
+        out[f"p{q:g}"] = grid
+    return out
+
+
+def rasterize(points, res=None, grid=None, stats=("max",), percentiles=(), fill=0.0):
+    """
+    Rastert Punkte mit mehreren Statistiken in einem Durchgang.
+
+    Parameter:
+    points      : (n, 3) Koordinaten, Statistiken über die dritte Spalte (Höhe)
+    res         : Zellgrösse in m (ohne grid: Raster aus raster_grid(points, res))
+    grid        : festes Raster aus raster_grid(), Punkte ausserhalb werden ignoriert
+    stats       : Auswahl aus STATISTICS
+    percentiles : z.B. (50, 95) → Raster "p50", "p95"
+    fill        : Wert für leere Zellen (0 wie np.nan_to_num im CHM, np.nan möglich),
+                  count ist in leeren Zellen immer 0
+
+    Rückgabe:
+    rasters : dict Name → (n0, n1)-Array
+    grid    : verwendetes Raster
+    """
+    points = np.asarray(points)
+    unknown = set(stats) - set(STATISTICS)
+    if unknown:
+        raise ValueError(f"Unbekannte Statistik {sorted(unknown)}, möglich: {STATISTICS}")
+    if grid is None:
+        if res is None:
+            raise ValueError("res oder grid angeben")
+        grid = raster_grid(points, res)
+    n_cells = grid["shape"][0] * grid["shape"][1]
+    flat, inside = cell_index(points, grid)
+    z = points[:, 2] if inside.all() else points[inside, 2]
+    z = z.astype(np.float64)
+
+    count = np.bincount(flat, minlength=n_cells)
+    empty = count == 0
+    rasters = {}
+    if "max" in stats:
+        out = np.full(n_cells, -np.inf)
+        np.maximum.at(out, flat, z)
+        rasters["max"] = out
+    if "min" in stats:
+        out = np.full(n_cells, np.inf)
+        np.minimum.at(out, flat, z)
+        rasters["min"] = out
+    if "sum" in stats or "mean" in stats:
+        total = np.bincount(flat, weights=z, minlength=n_cells)
+        if "sum" in stats:
+            rasters["sum"] = total
+        if "mean" in stats:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rasters["mean"] = total / count
+    if percentiles:
+        rasters.update(_segment_percentiles(flat, z, n_cells, percentiles))
+
+    for name, out in rasters.items():
+        out[empty] = fill
+    if "count" in stats:
+        rasters["count"] = count
+    return {name: out.reshape(grid["shape"]) for name, out in rasters.items()}, grid
+
+
+def save_rasters(path, rasters, grid):
+    """Speichert Raster + Rasterdefinition als .npz (z.B. CHM-Zwischenstand)."""
+    np.savez_compressed(path, _grid=json.dumps(grid), **rasters)
+
+
+def load_rasters(path):
+    """
+    Lädt Raster aus save_rasters().
+
+    Rückgabe:
+    rasters : dict Name → Array
+    grid    : Rasterdefinition
+    """
+    with np.load(path) as data:
+        grid = json.loads(str(data["_grid"]))
+        rasters = {name: data[name] for name in data.files if name != "_grid"}
+    return rasters, grid
+
+
+# ================================================================
+# Regionen eines Label-Rasters (z.B. Watershed-Kronen)
+# ================================================================
+REGION_COLUMNS = ["Label", "Pixel", "Flaeche_m2", "Hoehe_max", "Zeile", "Spalte", "Durchmesser_m",
+                  "Zeile_min", "Zeile_max", "Spalte_min", "Spalte_max"]
+
+
+def region_properties(labels, values, res, min_pixels=1):
+    """
+    Eigenschaften aller Regionen auf einmal (np.bincount statt einer Maske pro Region).
+
+    Parameter:
+    labels     : (n0, n1) Label-Raster, 0 = Hintergrund
+    values     : (n0, n1) Werte für das Maximum pro Region (z.B. CHM)
+    res        : Zellgrösse in m
+    min_pixels : kleinere Regionen werden weggelassen
+
+    Rückgabe:
+    DataFrame mit REGION_COLUMNS, aufsteigend nach Label. Zeile / Spalte sind der Schwerpunkt
+    in Pixeln (wie scipy.ndimage.center_of_mass), Durchmesser_m der flächengleiche Kreis.
+    """
+    labels = np.asarray(labels)
+    flat = labels.ravel()
+    fg = np.flatnonzero(flat > 0)
+    lab = flat[fg]
+    n = int(lab.max()) + 1 if len(lab) else 1
+    rows, cols = np.divmod(fg, labels.shape[1])
+
+    pixels = np.bincount(lab, minlength=n)
+    height = np.full(n, -np.inf)
+    np.maximum.at(height, lab, np.asarray(values).ravel()[fg])
+    bounds = []
+    for idx, fill in ((rows, labels.shape[0]), (cols, labels.shape[1])):
+        lo = np.full(n, fill, dtype=np.int64)
+        hi = np.full(n, -1, dtype=np.int64)
+        np.minimum.at(lo, lab, idx)
+        np.maximum.at(hi, lab, idx)
+        bounds += [lo, hi]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        row_c = np.bincount(lab, weights=rows, minlength=n) / pixels
+        col_c = np.bincount(lab, weights=cols, minlength=n) / pixels
+
+    keep = np.flatnonzero((pixels >= max(min_pixels, 1)) & (np.arange(n) > 0))
+    area = pixels[keep] * res * res
+    return pd.DataFrame({
+        "Label": keep,
+        "Pixel": pixels[keep],
+        "Flaeche_m2": area,
+        "Hoehe_max": height[keep],
+        "Zeile": row_c[keep],
+        "Spalte": col_c[keep],
+        "Durchmesser_m": np.sqrt(4 * area / np.pi),
+        "Zeile_min": bounds[0][keep],
+        "Zeile_max": bounds[1][keep],
+        "Spalte_min": bounds[2][keep],
+        "Spalte_max": bounds[3][keep],
+    }, columns=REGION_COLUMNS)
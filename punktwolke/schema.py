@@ -0,0 +1,238 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Zentrale Ablage der Spaltenlayouts, die bisher in jedem Skript von Hand als
+df.columns = [...] gesetzt werden. Pro Spaltenname sind Wertebereich und
+kompakte Kodierung hinterlegt:
+
+| Spalten                      | Bereich   | gespeichert (.pwc)          | pandas  |
+| ---------------------------- | --------- | --------------------------- | ------- |
+| X/Y/Z coordinate, X/Y/Z      | beliebig  | float32 + float64-Offset *  | float64 |
+| Red/Green/Blue (0-255)       | 0 - 255   | uint8                       | uint8   |
+| Red/Green/Blue (0-1)         | 0 - 1     | uint8, divisor 255          | float32 |
+| Hue/Saturation/Value (0-1)   | 0 - 1     | float32                     | float32 |
+| Hue (°), Saturation/Value (%)| 0-360/100 | float32                     | float32 |
+| X/Y/Z scan dir (Normalen)    | -1 - 1    | float32                     | float32 |
+| Klasse, Color Cluster, ...   | ganzzahlig| int32                       | int32   |
+
+* Die Nachkommastellen der Quelle werden gespeichert und beim Lesen wiederhergestellt
+  (verlustfrei, sonst float64), siehe punktwolke/store.py.
+
+Das Layout einer Datei ohne Header wird über die Spaltenanzahl und die
+Wertebereiche erkannt (detect_layout). Passt ein angegebenes Layout nicht zu den
+Daten, bricht check_ranges mit einer Fehlermeldung ab, statt falsch benannte
+Spalten stillschweigend weiterzugeben.
+"""
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------
+# Spaltengruppen
+# -------------------------------------------
+XYZ = ["X coordinate", "Y coordinate", "Z coordinate"]
+XYZ_SHORT = ["X", "Y", "Z"]
+RGB_255 = ["Red", "Green", "Blue"]
+RGB_255_COLOR = ["Red color (0-255)", "Green color (0-255)", "Blue color (0-255)"]
+RGB_01 = ["Red (0-1)", "Green (0-1)", "Blue (0-1)"]
+RGB_01_COLOR = ["Red color (0-1)", "Green color (0-1)", "Blue color (0-1)"]
+HSV_01 = ["Hue (0-1)", "Saturation (0-1)", "Value (0-1)"]
+HSV_GRAD = ["Hue (°)", "Saturation (%)", "Value (%)"]
+NORMALS = ["X scan dir", "Y scan dir", "Z scan dir"]
+
+# -------------------------------------------
+# Layouts, wie sie in den Arbeitsschritten vorkommen
+# (Reihenfolge = Priorität, falls mehrere Layouts zu den Daten passen)
+# -------------------------------------------
+LAYOUTS = {
+    # Export aus Leica 3Dr (01_Datenaufbereitung)
+    "roh": XYZ + RGB_255 + NORMALS,
+    # normalisiert mit HSV (06_Normalisieren, Input für KMeans/SVM/SGD)
+    "normalisiert": XYZ + RGB_01 + HSV_01 + NORMALS,
+    "normalisiert_color": XYZ + RGB_01_COLOR + HSV_01 + NORMALS,
+    "normalisiert_cluster": XYZ + RGB_01 + HSV_01 + NORMALS + ["Color Cluster"],
+    # HSV in Grad/Prozent (02_Datenerkundung)
+    "hsv_grad": XYZ + RGB_255_COLOR + NORMALS + HSV_GRAD,
+    "hsv_grad_cluster": XYZ + RGB_255_COLOR + NORMALS + HSV_GRAD + ["Color Cluster"],
+    "hsv_grad_klasse": XYZ + RGB_01_COLOR + HSV_GRAD + NORMALS + ["Klasse"],
+    # Klassen-Exporte mit Klassennummer
+    "roh_klasse": XYZ + RGB_255_COLOR + NORMALS + ["Klasse"],
+    "rgb01_klasse": XYZ + RGB_01_COLOR + NORMALS + ["Klasse"],
+    # Trainingsdaten mit Klassennamen als Text (z.B. PW_Klass_P3A1_gesamt_normalisiert.txt)
+    "normalisiert_klassenname": XYZ + RGB_01 + HSV_01 + NORMALS + ["Klassenname"],
+    # nur Koordinaten (z.B. PW_Baeume_o_Boden_o_Rauschen.txt)
+    "xyz": XYZ_SHORT,
+}
+
+# Name → (min, max, ganzzahlig)
+_RANGES = {}
+for _names, _rng in [
+    (RGB_255 + RGB_255_COLOR, (0, 255, True)),
+    (RGB_01 + RGB_01_COLOR + HSV_01, (0, 1, False)),
+    (["Hue (°)"], (0, 360, False)),
+    (["Saturation (%)", "Value (%)"], (0, 100, False)),
+    (NORMALS, (-1, 1, False)),
+    (["Color Cluster", "Klasse", "ID", "Label", "Reclump_Adjazenz"], (-1, None, True)),
+    (["predicted_label"], (0, 255, True)),
+]:
+    for _n in _names:
+        _RANGES[_n] = _rng
+
+# Toleranz für Rundungen im Textexport (z.B. Normalen 1.0000001)
+RANGE_TOL = 1e-4
+
+COORDINATE_COLUMNS = set(XYZ + XYZ_SHORT)
+# "R", "G", "B" kommen je nach Schritt als 0-255 oder 0-1 vor → bleiben float32
+COLOR_COLUMNS_255 = set(RGB_255 + RGB_255_COLOR)
+COLOR_COLUMNS_01 = set(RGB_01 + RGB_01_COLOR)
+NORMAL_COLUMNS = set(NORMALS)
+LABEL_COLUMNS = {"Color Cluster", "Klasse", "ID", "Label", "Reclump_Adjazenz"}
+# vorhergesagte Klassencodes (punktwolke/inference.py), höchstens 256 Klassen
+PREDICTION_COLUMNS = {"predicted_label"}
+# Textspalten (nur im ";"-TXT, nicht im .pwc-Format speicherbar)
+TEXT_COLUMNS = {"Klassenname", "Orientation"}
+
+
+def get_layout(name):
+    """Spaltenliste eines Layouts aus LAYOUTS (Kopie)."""
+    if name not in LAYOUTS:
+        raise KeyError(f"Unbekanntes Layout '{name}', vorhanden: {list(LAYOUTS)}")
+    return list(LAYOUTS[name])
+
+
+def column_encoding(name):
+    """
+    Kompakte Kodierung einer Spalte für das .pwc-Format.
+
+    Parameter:
+    name : Spaltenname (z.B. "X coordinate", "Red (0-1)")
+
+    Rückgabe:
+    dict mit dtype (numpy-String), divisor, ob ein Offset bestimmt werden soll und optional
+    decimals (Nachkommastellen der Quelle bestimmen und beim Lesen wiederherstellen)
+    """
+    if name in TEXT_COLUMNS:
+        raise ValueError(f"Textspalte '{name}' kann nicht im .pwc-Format gespeichert werden, Labels vorher codieren")
+    if name in COORDINATE_COLUMNS:
+        return {"dtype": "<f4", "divisor": 1.0, "use_offset": True, "decimals": True}
+    if name in COLOR_COLUMNS_255:
+        return {"dtype": "|u1", "divisor": 1.0, "use_offset": False}
+    if name in COLOR_COLUMNS_01:
+        return {"dtype": "|u1", "divisor": 255.0, "use_offset": False}
+    if name in NORMAL_COLUMNS:
+        # float32 statt float16: Normalen werden in TXT-Exporte zurückgeschrieben
+        return {"dtype": "<f4", "divisor": 1.0, "use_offset": False}
+    if name in LABEL_COLUMNS:
+        return {"dtype": "<i4", "divisor": 1.0, "use_offset": False}
+    if name in PREDICTION_COLUMNS:
+        return {"dtype": "|u1", "divisor": 1.0, "use_offset": False}
+    return {"dtype": "<f4", "divisor": 1.0, "use_offset": False}
+
+
+def pandas_dtypes(columns):
+    """
+    dtypes für pd.read_csv: Koordinaten float64 (absolut), Textspalten str, alles andere float32.
+    Ganzzahlige Spalten werden erst nach check_ranges() mit apply_dtypes() verkleinert.
+    """
+    dtypes = {}
+    for name in columns:
+        if name in TEXT_COLUMNS:
+            dtypes[name] = str
+        elif name in COORDINATE_COLUMNS:
+            dtypes[name] = np.float64
+        else:
+            dtypes[name] = np.float32
+    return dtypes
+
+
+def _violations(values, name):
+    """Liste der Verletzungen des Wertebereichs einer Spalte (leer = ok)."""
+    if name in TEXT_COLUMNS or name not in _RANGES or len(values) == 0:
+        return []
+    lo, hi, integral = _RANGES[name]
+    try:
+        values = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # z.B. Text "Dach" an der Stelle von "Color Cluster" → Layout passt nicht
+        return [f"'{name}': enthält nicht-numerische Werte"]
+    vmin, vmax = np.nanmin(values), np.nanmax(values)
+    problems = []
+    if lo is not None and vmin < lo - RANGE_TOL:
+        problems.append(f"'{name}': Minimum {vmin:g} < {lo}")
+    if hi is not None and vmax > hi + RANGE_TOL:
+        problems.append(f"'{name}': Maximum {vmax:g} > {hi}")
+    if integral and not np.all(np.isnan(values) | (values == np.round(values))):
+        problems.append(f"'{name}': enthält nicht-ganzzahlige Werte")
+    return problems
+
+
+def check_ranges(df, columns=None):
+    """
+    Prüft, ob die Werte zu den Spaltennamen passen (z.B. Farben 0-1 vs. 0-255).
+
+    Parameter:
+    df      : DataFrame oder 2D-Array
+    columns : Spaltennamen, falls df ein Array ist oder positionsweise benannt werden soll
+
+    Raises:
+    ValueError mit allen gefundenen Verletzungen
+    """
+    if columns is None:
+        columns = list(df.columns)
+    data = df.to_numpy() if isinstance(df, pd.DataFrame) else np.asarray(df)
+    if data.shape[1] != len(columns):
+        raise ValueError(f"{data.shape[1]} Spalten in den Daten, {len(columns)} Namen angegeben")
+    problems = []
+    for j, name in enumerate(columns):
+        problems += _violations(data[:, j], name)
+    if problems:
+        raise ValueError("Spaltenlayout passt nicht zu den Daten:\n  " + "\n  ".join(problems))
+
+
+def detect_layout(sample):
+    """
+    Erkennt das Layout einer Datei ohne Header anhand Spaltenanzahl und Wertebereich.
+
+    Parameter:
+    sample : DataFrame oder 2D-Array mit den ersten Zeilen der Datei
+
+    Rückgabe:
+    (layout_name, spaltenliste)
+    """
+    data = sample.to_numpy() if isinstance(sample, pd.DataFrame) else np.asarray(sample)
+    n_cols = data.shape[1]
+    candidates = [name for name, cols in LAYOUTS.items() if len(cols) == n_cols]
+    if not candidates:
+        raise ValueError(f"Kein bekanntes Layout mit {n_cols} Spalten (bekannt: "
+                         f"{sorted({len(c) for c in LAYOUTS.values()})})")
+
+    problems = {}
+    for name in candidates:
+        cols = LAYOUTS[name]
+        found = []
+        for j, col in enumerate(cols):
+            found += _violations(data[:, j], col)
+        if not found:
+            return name, list(cols)
+        problems[name] = found
+
+    details = "\n".join(f"  {name}: {'; '.join(p)}" for name, p in problems.items())
+    raise ValueError(f"Keines der Layouts mit {n_cols} Spalten passt zu den Daten:\n{details}")
+
+
+def apply_dtypes(df):
+    """
+    Verkleinert ganzzahlige Spalten (Farben 0-255 und Vorhersagen → uint8, Labels → int32) in-place.
+    Voraussetzung: check_ranges() war erfolgreich.
+    """
+    for name in df.columns:
+        if name in COLOR_COLUMNS_255 or name in PREDICTION_COLUMNS:
+            df[name] = df[name].astype(np.uint8)
+        elif name in LABEL_COLUMNS:
+            df[name] = df[name].astype(np.int32)
+    return df
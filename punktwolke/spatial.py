@@ -0,0 +1,295 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Persistenter räumlicher Index für .pwc-Punktwolken. Die Punkte werden nach Zellen eines
+2D-Rasters (cell_size) in Morton-Reihenfolge (Z-Kurve) sortiert gespeichert, so dass alle
+Punkte einer Zelle hintereinander liegen und benachbarte Zellen meist nahe beieinander.
+Im .pwc-Ordner liegen zusätzlich:
+    spatial.json  Zellgrösse, Ursprung, Anzahl Zellen
+    cells.npy     Zellverzeichnis (Morton-Code, ix, iy, Start, Ende), nach Code sortiert
+    order.npy     ursprünglicher Index jedes Punkts (Labels zurück in die Originalreihenfolge)
+
+Mit resolution werden die Punkte auch innerhalb der Zellen entlang der Z-Kurve sortiert
+(Morton-Sortierung). Nachbarschaftsabfragen (cKDTree, DBSCAN) greifen danach auf nahe
+beieinander liegende Speicherbereiche zu. morton_order() liefert dieselbe Reihenfolge für
+Arrays im Speicher.
+
+Abfragen (Bounding Box, Radius, Kachel) bestimmen zuerst die betroffenen Zellen aus dem
+Verzeichnis, fassen benachbarte Zellen zu zusammenhängenden Bereichen zusammen und lesen nur
+diese Byte-Bereiche aus den Spaltendateien. Danach wird exakt gefiltert.
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from punktwolke.store import SCHEMA_FILE, PointColumns, _decode, convert_txt, is_pwc
+
+SPATIAL_FILE = "spatial.json"
+CELLS_FILE = "cells.npy"
+ORDER_FILE = "order.npy"
+
+
+def _spread_bits(v):
+    """Verteilt die unteren 32 Bit von v auf die geraden Bitpositionen (uint64)."""
+    v = np.asarray(v, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton_2d(ix, iy):
+    """Morton-Code (Z-Kurve) aus ganzzahligen Zellindizes ≥ 0."""
+    return _spread_bits(ix) | (_spread_bits(iy) << np.uint64(1))
+
+
+def write_permuted(path, output_path, order, chunksize=5_000_000):
+    """
+    Schreibt einen .pwc-Ordner in neuer Punktreihenfolge (Rohwerte, ohne Neukodierung).
+
+    Parameter:
+    path        : Quelle (.pwc)
+    output_path : Ziel (.pwc), wird überschrieben
+    order       : Punktindizes der Quelle in der neuen Reihenfolge
+    chunksize   : Punkte pro Kopierblock
+    """
+    pts = PointColumns(path)
+    output_path = Path(output_path)
+    if output_path.exists():
+        shutil.rmtree(output_path)
+    output_path.mkdir(parents=True)
+    for spec in pts.schema["columns"]:
+        raw = pts.raw(spec["name"])
+        with open(output_path / spec["file"], "wb") as f:
+            for start in range(0, len(order), chunksize):
+                raw[order[start:start + chunksize]].tofile(f)
+    with open(output_path / SCHEMA_FILE, "w", encoding="utf-8") as f:
+        json.dump(pts.schema, f, indent=2, ensure_ascii=False)
+
+
+def morton_order(xy, resolution=0.5, origin=None):
+    """
+    Punktreihenfolge entlang der Z-Kurve eines feinen Rasters.
+
+    Nach der Sortierung liegen räumlich benachbarte Punkte auch im Speicher nahe
+    beieinander, KD-Baum-Abfragen und DBSCAN springen weniger durch den Speicher.
+
+    Parameter:
+    xy         : (n, ≥2) Koordinaten, verwendet werden die ersten beiden Spalten
+    resolution : Rasterweite der Sortierung in m (Punkte innerhalb einer Rasterzelle
+                 behalten ihre Reihenfolge)
+    origin     : Ursprung des Rasters, Standard: abgerundetes Minimum
+
+    Rückgabe:
+    order : Indizes in Z-Reihenfolge (xy[order] ist sortiert)
+    codes : Morton-Code jedes Punkts (Reihenfolge der Eingabe)
+    """
+    xy = np.asarray(xy)[:, :2].astype(np.float64)
+    if origin is None:
+        origin = np.floor(xy.min(axis=0)) if len(xy) else np.zeros(2)
+    cell = np.floor((xy - origin) / resolution).astype(np.int64)
+    codes = morton_2d(cell[:, 0], cell[:, 1])
+    return np.argsort(codes, kind="stable"), codes
+
+
+def build_spatial_index(path, output_path=None, cell_size=10.0, resolution=None):
+    """
+    Sortiert eine .pwc-Punktwolke nach Morton-Zellen und legt das Zellverzeichnis dazu.
+
+    Die Punktreihenfolge ändert sich dabei; order.npy führt zurück zur Reihenfolge der
+    Quelle (z.B. für Labels, die zur TXT-Datei passen müssen).
+
+    Parameter:
+    path        : .pwc-Ordner oder ";"-TXT (wird zuerst nach .pwc konvertiert)
+    output_path : Ziel, Standard: der .pwc-Ordner selbst (wird ersetzt)
+    cell_size   : Kantenlänge der Indexzellen in m
+    resolution  : optionale feinere Sortierung innerhalb der Zellen in m (Z-Kurve bis
+                  auf diese Rasterweite, für Nachbarschaftsabfragen). Wird auf
+                  cell_size / 2^k abgerundet, damit jede Indexzelle zusammenhängend bleibt.
+
+    Rückgabe:
+    SpatialIndex auf dem sortierten Ordner
+    """
+    path = Path(path)
+    if not is_pwc(path):
+        path = convert_txt(path)
+    pts = PointColumns(path)
+    xy = pts.xyz()[:, :2]
+    origin = np.floor(xy.min(axis=0))
+    # Z-Kurve ist hierarchisch: Code der Zelle = Code des feinen Rasters ohne die unteren 2k Bit
+    levels = 0 if resolution is None else max(0, int(np.ceil(np.log2(cell_size / resolution))))
+    fine = np.floor((xy - origin) / (cell_size / 2 ** levels)).astype(np.int64)
+    del xy
+    order = np.argsort(morton_2d(fine[:, 0], fine[:, 1]), kind="stable")
+    cell = fine[order] >> levels
+    del fine
+
+    target = Path(output_path) if output_path is not None else path
+    tmp = target.with_name(target.name + ".tmp")
+    write_permuted(path, tmp, order)
+
+    sorted_codes = morton_2d(cell[:, 0], cell[:, 1])
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    cells = np.column_stack([sorted_codes[starts].astype(np.int64), cell[starts, 0], cell[starts, 1],
+                             starts, ends]).astype(np.int64)
+    # Originalreihenfolge einer bereits sortierten Quelle weiterführen
+    if (path / ORDER_FILE).is_file():
+        order = np.load(path / ORDER_FILE)[order]
+    np.save(tmp / CELLS_FILE, cells)
+    np.save(tmp / ORDER_FILE, order.astype(np.int64))
+    with open(tmp / SPATIAL_FILE, "w", encoding="utf-8") as f:
+        json.dump({"cell_size": cell_size, "resolution": cell_size / 2 ** levels, "origin": origin.tolist(),
+                   "n_cells": len(cells), "n_points": len(order)}, f, indent=2)
+
+    if target.exists():
+        shutil.rmtree(target)
+    tmp.rename(target)
+    return SpatialIndex(target)
+
+
+def to_original_order(values, order):
+    """
+    Bringt Werte pro Punkt (z.B. Labels aus dem sortierten Ordner) zurück in die
+    Reihenfolge der Quelle.
+
+    Parameter:
+    values : (n, ...) Werte in sortierter Reihenfolge
+    order  : Permutation aus order.npy bzw. SpatialIndex.order
+    """
+    values = np.asarray(values)
+    out = np.empty_like(values)
+    out[np.asarray(order)] = values
+    return out
+
+
+def has_spatial_index(path):
+    """Prüft, ob ein .pwc-Ordner einen räumlichen Index enthält."""
+    return (Path(path) / SPATIAL_FILE).is_file()
+
+
+class SpatialIndex:
+    """
+    Abfragen auf einem nach Morton-Zellen sortierten .pwc-Ordner.
+
+    Parameter:
+    path    : .pwc-Ordner mit spatial.json (siehe build_spatial_index)
+    columns : optionale Spaltennamen, ersetzen die gespeicherten positionsweise
+
+    Beispiel:
+    index = SpatialIndex("PW_P3A1.pwc")
+    df = index.query_bbox(2611300, 1267400, 2611400, 1267500, usecols=["X coordinate", "Y coordinate"])
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = Path(path)
+        if not has_spatial_index(self.path):
+            raise FileNotFoundError(f"Kein räumlicher Index in {self.path} (build_spatial_index)")
+        with open(self.path / SPATIAL_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.points = PointColumns(self.path, columns=columns)
+        if meta["n_points"] != len(self.points):
+            raise ValueError(f"{self.path.name}: Index passt nicht zur Punktanzahl, neu aufbauen")
+        self.cell_size = meta["cell_size"]
+        self.origin = np.asarray(meta["origin"], dtype=np.float64)
+        self.cells = np.load(self.path / CELLS_FILE)
+        self.order = np.load(self.path / ORDER_FILE, mmap_mode="r")
+        self._codes = self.cells[:, 0].astype(np.uint64)
+
+    def __len__(self):
+        return len(self.points)
+
+    def ranges_in_bbox(self, xmin, ymin, xmax, ymax):
+        """
+        Zusammenhängende Punktbereiche (start, end) aller Zellen, die die Box berühren.
+        """
+        # kleiner Zuschlag gegen Rundung an den Zellgrenzen (exakt gefiltert wird danach)
+        pad = 1e-6 * self.cell_size
+        lo = np.floor((np.array([xmin, ymin]) - pad - self.origin) / self.cell_size).astype(np.int64)
+        hi = np.floor((np.array([xmax, ymax]) + pad - self.origin) / self.cell_size).astype(np.int64)
+        lo = np.maximum(lo, 0)
+        if np.any(hi < lo):
+            return np.empty((0, 2), dtype=np.int64)
+        if np.prod(hi - lo + 1) > len(self.cells):
+            # grosse Box: direkt im Verzeichnis filtern statt alle Codes aufzuzählen
+            ix, iy = self.cells[:, 1], self.cells[:, 2]
+            pos = np.flatnonzero((ix >= lo[0]) & (ix <= hi[0]) & (iy >= lo[1]) & (iy <= hi[1]))
+        else:
+            ix, iy = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1), indexing="ij")
+            codes = np.sort(morton_2d(ix.ravel(), iy.ravel()))
+            pos = np.minimum(np.searchsorted(self._codes, codes), len(self._codes) - 1)
+            pos = pos[self._codes[pos] == codes]
+        found = self.cells[pos][:, 3:5]
+        if len(found) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        # aufeinanderfolgende Zellen zu einem Lesebereich zusammenfassen
+        new = np.r_[True, found[1:, 0] != found[:-1, 1]]
+        starts = found[new, 0]
+        ends = found[np.r_[new[1:], True], 1]
+        return np.column_stack([starts, ends])
+
+    def _read(self, ranges, names):
+        out = {}
+        for name in names:
+            spec = self.points._spec(name)
+            raw = self.points.raw(name)
+            values = np.concatenate([raw[s:e] for s, e in ranges]) if len(ranges) else raw[:0]
+            out[name] = _decode(spec, values)
+        index = np.concatenate([np.arange(s, e) for s, e in ranges]) if len(ranges) else np.empty(0, np.int64)
+        return index, out
+
+    def query_bbox(self, xmin, ymin, xmax, ymax, usecols=None, return_index=False):
+        """
+        Punkte innerhalb einer Box (Lage, Grenzen eingeschlossen).
+
+        Parameter:
+        xmin, ymin, xmax, ymax : Box in Landeskoordinaten
+        usecols                : Spalten der Rückgabe, Standard: alle
+        return_index           : zusätzlich die Punktindizes im sortierten Ordner zurückgeben
+                                 (über index.order[...] in die Originalreihenfolge)
+
+        Rückgabe:
+        DataFrame (und Indexarray)
+        """
+        names = self.points.columns if usecols is None else list(usecols)
+        xyz_names = self.points.xyz_names()
+        ranges = self.ranges_in_bbox(xmin, ymin, xmax, ymax)
+        index, values = self._read(ranges, list(dict.fromkeys(xyz_names[:2] + names)))
+        x, y = values[xyz_names[0]], values[xyz_names[1]]
+        mask = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+        df = pd.DataFrame({n: np.asarray(values[n])[mask] for n in names})
+        return (df, index[mask]) if return_index else df
+
+    def query_radius(self, center, radius, usecols=None, return_index=False):
+        """
+        Punkte im Umkreis radius um center (2D: (x, y), 3D: (x, y, z)).
+        """
+        center = np.asarray(center, dtype=np.float64)
+        names = self.points.columns if usecols is None else list(usecols)
+        xyz_names = self.points.xyz_names()[:len(center)]
+        df, index = self.query_bbox(center[0] - radius, center[1] - radius, center[0] + radius,
+                                    center[1] + radius, usecols=list(dict.fromkeys(xyz_names + names)),
+                                    return_index=True)
+        d2 = ((df[xyz_names].to_numpy(dtype=np.float64) - center) ** 2).sum(axis=1)
+        mask = d2 <= radius ** 2
+        df = df.loc[mask, names].reset_index(drop=True)
+        return (df, index[mask]) if return_index else df
+
+    def query_tile(self, ix, iy, tile_size, usecols=None, return_index=False):
+        """
+        Punkte einer quadratischen Kachel (ix, iy) mit Kantenlänge tile_size ab dem Ursprung
+        des Index (Kachel halb offen: [x0, x0 + tile_size)).
+        """
+        x0, y0 = self.origin + np.array([ix, iy]) * tile_size
+        eps = 1e-9 * max(1.0, tile_size)
+        return self.query_bbox(x0, y0, x0 + tile_size - eps, y0 + tile_size - eps, usecols=usecols,
+                               return_index=return_index)
@@ -0,0 +1,106 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Aufteilen einer Punktwolke in eine Datei pro Klasse / Cluster in einem Durchgang.
+Die bisherige Schleife  for cid in unique(): df[df[col] == cid].to_csv(...)  liest für
+jede Klasse die ganze Tabelle (Aufwand k·N, bei 200-2000 KMeans-Clustern der Engpass).
+Hier werden die Labels einmal stabil sortiert (argsort), die Gruppengrenzen bestimmt
+und jede Klasse als zusammenhängender Ausschnitt der Sortierreihenfolge geschrieben.
+Die Reihenfolge der Punkte innerhalb einer Klasse bleibt dabei erhalten.
+
+Das Schreiben der Klassendateien läuft parallel in einem Thread-Pool: die Daten liegen
+bereits im Speicher, ein Prozesspool müsste sie erst kopieren. Dateizugriffe und das
+Schreiben der .pwc-Spalten geben den GIL frei; bei ";"-TXT bremst die Formatierung
+in pandas, der Gewinn ist dort kleiner.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from punktwolke.store import PointColumns, save_points
+
+
+def group_labels(labels):
+    """
+    Gruppiert ein Label-Array mit einer einzigen stabilen Sortierung.
+
+    Parameter:
+    labels : 1D-Array der Klassen / Cluster-IDs (Länge n_punkte)
+
+    Rückgabe:
+    ids    : Array der vorkommenden Labels (aufsteigend)
+    order  : Zeilenindizes sortiert nach Label (innerhalb einer Klasse in Originalreihenfolge)
+    starts : Startposition jeder Klasse in order
+    ends   : Endposition (exklusiv) jeder Klasse in order
+    """
+    labels = np.asarray(labels)
+    if labels.ndim != 1:
+        raise ValueError(f"Labels müssen 1D sein, erhalten: Form {labels.shape}")
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    if len(sorted_labels) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return sorted_labels, order, empty, empty
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    ends = np.r_[starts[1:], len(sorted_labels)]
+    return sorted_labels[starts], order, starts, ends
+
+
+def _rows(data, index):
+    """Zeilen index aus DataFrame oder PointColumns (memmap) als DataFrame."""
+    if isinstance(data, PointColumns):
+        return data.take(index)
+    return data.iloc[index]
+
+
+def split_points(data, labels, path_for, label_column=None, max_workers=None, progress=None):
+    """
+    Schreibt pro Klasse eine eigene Datei (.txt oder .pwc je nach Endung).
+
+    Parameter:
+    data         : DataFrame oder PointColumns (open_points) mit allen Punkten
+    labels       : Label pro Punkt (Array, Series oder Spaltenname in data)
+    path_for     : Funktion path_for(label) → Zieldatei der Klasse
+    label_column : optional, hängt das Label als Spalte an, falls es in data fehlt
+    max_workers  : Anzahl Schreib-Threads, Standard: CPU-Kerne
+    progress     : optionale Funktion progress(label, n_punkte) nach jeder Datei, z.B. für tqdm
+
+    Rückgabe:
+    DataFrame mit Klasse, Punkte, Datei (eine Zeile pro Klasse, nach Label sortiert)
+    """
+    if isinstance(labels, str):
+        labels = data[labels]
+    labels = np.asarray(labels)
+    if len(labels) != len(data):
+        raise ValueError(f"{len(labels)} Labels für {len(data)} Punkte")
+    ids, order, starts, ends = group_labels(labels)
+
+    def write_group(i):
+        index = order[starts[i]:ends[i]]
+        group = _rows(data, index)
+        if label_column is not None and label_column not in group.columns:
+            group = group.assign(**{label_column: labels[index]})
+        path = Path(path_for(ids[i]))
+        save_points(group, path)
+        return i, len(index), path
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    rows = [None] * len(ids)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(write_group, i) for i in range(len(ids))]
+        for future in as_completed(futures):
+            i, n_points, path = future.result()
+            rows[i] = {"Klasse": ids[i], "Punkte": n_points, "Datei": str(path)}
+            if progress is not None:
+                progress(ids[i], n_points)
+    return pd.DataFrame(rows, columns=["Klasse", "Punkte", "Datei"])
@@ -0,0 +1,611 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Binäres, spaltenweises Speicherformat für Punktwolken (.pwc). Statt die gleichen
+12 Spalten bei jedem Arbeitsschritt als ";"-getrennten Text zu parsen und wieder zu
+formatieren, liegt jede Spalte typisiert (float32 / uint8 / int32) in einer eigenen
+Binärdatei. Ein JSON-Header beschreibt Spaltennamen, Datentypen und Kodierung.
+
+Aufbau eines .pwc-Ordners:
+    schema.json   Punktanzahl + Spaltenbeschreibung (Name, Datei, dtype, divisor, offset)
+    col_00.bin    Rohdaten der 1. Spalte (little endian, ohne Header)
+    col_01.bin    ...
+
+Kodierung pro Spalte:  Wert = gespeichert / divisor + offset
+- Koordinaten: float32 relativ zu einem float64-Offset (LV95-Werte sonst zu ungenau)
+- Farben:      uint8 (0-255), Spalten "(0-1)" mit divisor 255
+- Normalen:    float32
+- Labels:      int32, Vorhersagen ("predicted_label") uint8
+- Rest:        float32
+Die Zuordnung Spaltenname → Kodierung steht in punktwolke/schema.py.
+
+Genauigkeit:
+float32 relativ zum Offset ist bei einer Platte von 1 km nur auf ~6e-5 m genau
+(2611636.962 → 2611636.96197...). Darum wird beim Schreiben die Anzahl Nachkommastellen
+der Koordinaten bestimmt ("decimals") und beim Lesen wieder darauf gerundet; das ergibt
+exakt die Werte der Quelle. Reicht float32 dafür nicht (grosse Ausdehnung, mehr als
+MAX_DECIMALS Stellen), wird die Spalte als float64 gespeichert. Alle übrigen float-Spalten
+haben float32-Genauigkeit (~7 signifikante Stellen), gleich wie beim Einlesen des TXT mit
+load_points(); ein TXT-Export schreibt damit wieder die Zahlen der Quelle (z.B. -0.631747).
+Ältere Ordner (Version 1) enthalten Normalen als float16 (Fehler bis ~2.4e-4) und werden
+von open_points() neu konvertiert.
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from punktwolke.schema import (
+    apply_dtypes, check_ranges, column_encoding, detect_layout, pandas_dtypes,
+)
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 2  # 2: Normalen float32, Koordinaten mit "decimals"
+MAX_DECIMALS = 6    # höchstens so viele Nachkommastellen werden bei Koordinaten erkannt
+
+
+def is_pwc(path):
+    """Prüft, ob path ein .pwc-Ordner ist (Endung oder vorhandenes schema.json)."""
+    path = Path(path)
+    return path.suffix == ".pwc" or (path / SCHEMA_FILE).is_file()
+
+
+def read_schema(path):
+    """Liest den JSON-Header eines .pwc-Ordners."""
+    schema_path = Path(path) / SCHEMA_FILE
+    if not schema_path.is_file():
+        raise FileNotFoundError(f"Kein {SCHEMA_FILE} gefunden in: {path}")
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    if schema.get("format") != "pwc":
+        raise ValueError(f"{schema_path} ist kein .pwc-Header")
+    return schema
+
+
+class PointWriter:
+    """
+    Schreibt eine Punktwolke blockweise in einen .pwc-Ordner.
+
+    Die Blöcke werden direkt an die Spaltendateien angehängt, der Header wird
+    erst bei close() geschrieben. Damit lassen sich auch sehr grosse Dateien
+    mit begrenztem Speicher erzeugen.
+
+    Parameter:
+    path    : Zielordner (.pwc), wird überschrieben falls vorhanden
+    columns : Liste der Spaltennamen in Dateireihenfolge
+
+    Beispiel:
+    with PointWriter("PW_P3A1.pwc", columns) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    """
+
+    def __init__(self, path, columns):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.n_points = 0
+        self._specs = []
+        self._files = []
+
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        self.path.mkdir(parents=True)
+
+        for i, name in enumerate(self.columns):
+            enc = column_encoding(name)
+            file_name = f"col_{i:02d}.bin"
+            spec = {
+                "name": name,
+                "file": file_name,
+                "dtype": enc["dtype"],
+                "divisor": enc["divisor"],
+                "offset": None if enc["use_offset"] else 0.0,
+            }
+            if enc.get("decimals"):
+                spec["decimals"] = None  # wird aus dem ersten Block bestimmt
+            self._specs.append(spec)
+            self._files.append(open(self.path / file_name, "wb"))
+
+    def _encode(self, spec, values):
+        values = np.asarray(values, dtype=np.float64)
+        if spec["offset"] is None:
+            # Offset einmalig aus dem ersten Block (ganzzahlig, damit gut lesbar)
+            spec["offset"] = float(np.floor(np.nanmin(values))) if len(values) else 0.0
+
+        scaled = (values - spec["offset"]) * spec["divisor"]
+        dtype = np.dtype(spec["dtype"])
+        if dtype.kind in "ui":
+            stored = np.rint(scaled)
+            info = np.iinfo(dtype)
+            if len(stored) and (stored.min() < info.min or stored.max() > info.max):
+                raise ValueError(f"Spalte '{spec['name']}' liegt ausserhalb des Wertebereichs von {dtype}")
+            decoded = stored / spec["divisor"] + spec["offset"]
+            if np.allclose(decoded, values, rtol=0, atol=1e-9):
+                return stored.astype(dtype)
+            if self.n_points > 0:
+                raise ValueError(f"Spalte '{spec['name']}' ist nicht verlustfrei als {dtype} speicherbar")
+            # Erster Block passt nicht (z.B. gerundete Farbwerte) → Spalte als float32
+            spec["dtype"], spec["divisor"] = "<f4", 1.0
+            return (values - spec["offset"]).astype(np.float32)
+        stored = scaled.astype(dtype)
+        if "decimals" in spec and spec["dtype"] == "<f4":
+            if self.n_points == 0:
+                spec["decimals"] = _source_decimals(values)
+            if spec["decimals"] is None or not _same(_decode(spec, stored), values):
+                if self.n_points > 0:
+                    raise ValueError(f"Spalte '{spec['name']}' ist nicht verlustfrei als float32 speicherbar")
+                # zu viele Nachkommastellen oder zu grosse Ausdehnung → float64
+                spec["dtype"], spec["decimals"] = "<f8", None
+                return values - spec["offset"]
+        return stored
+
+    def write(self, data):
+        """
+        Hängt einen Block an.
+
+        Parameter:
+        data : DataFrame mit den Spalten in gleicher Reihenfolge
+               oder 2D-Array (n_punkte x n_spalten)
+        """
+        if isinstance(data, pd.DataFrame):
+            data = data.to_numpy()
+        data = np.asarray(data)
+        if data.ndim != 2 or data.shape[1] != len(self.columns):
+            raise ValueError(f"Block hat {data.shape} Werte, erwartet werden {len(self.columns)} Spalten")
+
+        for j, (spec, f) in enumerate(zip(self._specs, self._files)):
+            self._encode(spec, data[:, j]).tofile(f)
+        self.n_points += data.shape[0]
+
+    def close(self):
+        """Schliesst die Spaltendateien und schreibt den Header."""
+        for f in self._files:
+            f.close()
+        self._files = []
+        for spec in self._specs:
+            if spec["offset"] is None:
+                spec["offset"] = 0.0
+        schema = {
+            "format": "pwc",
+            "version": FORMAT_VERSION,
+            "n_points": int(self.n_points),
+            "columns": self._specs,
+        }
+        with open(self.path / SCHEMA_FILE, "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=2, ensure_ascii=False)
+
+    def abort(self):
+        """Bricht ab und löscht den halbfertigen Ordner (kein gültiger Header)."""
+        for f in self._files:
+            f.close()
+        self._files = []
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _same(a, b):
+    # gleich bis auf wenige ulp (Rundung beim Parsen des Texts)
+    return np.allclose(a, b, rtol=4 * np.finfo(np.float64).eps, atol=0, equal_nan=True)
+
+
+def _source_decimals(values):
+    """Kleinste Anzahl Nachkommastellen (0 bis MAX_DECIMALS), die alle Werte exakt darstellt, sonst None."""
+    for decimals in range(MAX_DECIMALS + 1):
+        if _same(np.round(values, decimals), values):
+            return decimals
+    return None
+
+
+def _decode(spec, raw):
+    if spec["dtype"] == "<f2":
+        # float16 nur als Speicherformat (Version 1), gerechnet wird mit float32
+        return raw.astype(np.float32)
+    decimals = spec.get("decimals")
+    if decimals is not None:
+        # float32-Rundung entfernen → exakt die Werte der Quelle
+        return np.round(raw.astype(np.float64) / spec["divisor"] + spec["offset"], decimals)
+    if spec["divisor"] == 1.0 and spec["offset"] == 0.0:
+        return raw
+    return raw.astype(np.float64) / spec["divisor"] + spec["offset"]
+
+
+def read_points(path, usecols=None):
+    """
+    Liest einen .pwc-Ordner als DataFrame (dekodierte Werte).
+
+    Parameter:
+    path    : Pfad zum .pwc-Ordner
+    usecols : optionale Liste von Spaltennamen, nur diese werden gelesen
+
+    Rückgabe:
+    DataFrame mit den gespeicherten Spaltennamen
+    """
+    path = Path(path)
+    schema = read_schema(path)
+    specs = schema["columns"]
+    if usecols is not None:
+        by_name = {spec["name"]: spec for spec in specs}
+        missing = [c for c in usecols if c not in by_name]
+        if missing:
+            raise KeyError(f"Spalten nicht in {path.name}: {missing}")
+        specs = [by_name[c] for c in usecols]
+
+    data = {}
+    for spec in specs:
+        raw = np.fromfile(path / spec["file"], dtype=np.dtype(spec["dtype"]))
+        if len(raw) != schema["n_points"]:
+            raise ValueError(f"{spec['file']} hat {len(raw)} statt {schema['n_points']} Werte")
+        data[spec["name"]] = _decode(spec, raw)
+    return pd.DataFrame(data)
+
+
+def write_points(df, path):
+    """Schreibt einen DataFrame komplett als .pwc-Ordner."""
+    with PointWriter(path, df.columns) as writer:
+        writer.write(df)
+
+
+def load_points(path, columns=None):
+    """
+    Lädt eine Punktwolke, egal ob als ";"-TXT oder als .pwc-Ordner.
+
+    Bei TXT werden die Spalten direkt kompakt eingelesen (siehe schema.py) und die
+    Wertebereiche geprüft. Ohne columns wird das Layout automatisch erkannt.
+
+    Parameter:
+    path    : Pfad zur .txt-Datei oder zum .pwc-Ordner
+    columns : Spaltennamen in Dateireihenfolge (wie bisher df.columns = [...]).
+              Bei .pwc werden die gespeicherten Namen damit positionsweise ersetzt.
+
+    Rückgabe:
+    DataFrame
+    """
+    if is_pwc(path):
+        df = read_points(path)
+        if columns is not None:
+            if len(columns) != df.shape[1]:
+                raise ValueError(f"{Path(path).name}: {df.shape[1]} Spalten gespeichert, {len(columns)} Namen angegeben")
+            df.columns = list(columns)
+        return df
+
+    if columns is None:
+        sample = pd.read_csv(path, sep=";", header=None, decimal=".", nrows=10_000)
+        _, columns = detect_layout(sample)
+    columns = list(columns)
+    df = pd.read_csv(path, sep=";", header=None, decimal=".", names=columns,
+                     dtype=pandas_dtypes(columns))
+    if df.shape[1] != len(columns) or df.isna().all(axis=0).any():
+        raise ValueError(f"{Path(path).name}: Spaltenanzahl passt nicht zu {len(columns)} Namen")
+    try:
+        check_ranges(df)
+    except ValueError as err:
+        raise ValueError(f"{Path(path).name}: {err}") from None
+    return apply_dtypes(df)
+
+
+def save_points(df, path):
+    """
+    Speichert eine Punktwolke je nach Endung als .pwc-Ordner oder ";"-TXT
+    (ohne Header, wie in allen Arbeitsschritten üblich).
+    """
+    if Path(path).suffix == ".pwc":
+        write_points(df, path)
+    else:
+        df.to_csv(path, sep=";", index=False, header=False, decimal=".")
+
+
+def convert_txt(txt_path, pwc_path=None, columns=None, chunksize=2_000_000):
+    """
+    Konvertiert eine bestehende ";"-TXT-Punktwolke blockweise nach .pwc.
+
+    Parameter:
+    txt_path  : Eingabedatei (.txt, ohne Header)
+    pwc_path  : Zielordner, Standard: gleicher Name mit Endung .pwc
+    columns   : Spaltennamen in Dateireihenfolge (bestimmen die Kodierung),
+                ohne Angabe wird das Layout erkannt (schema.detect_layout)
+    chunksize : Anzahl Zeilen pro Block
+
+    Rückgabe:
+    Pfad zum erzeugten .pwc-Ordner
+    """
+    txt_path = Path(txt_path)
+    pwc_path = Path(pwc_path) if pwc_path is not None else txt_path.with_suffix(".pwc")
+
+    reader = pd.read_csv(txt_path, sep=";", header=None, decimal=".", chunksize=chunksize)
+    writer = None
+    try:
+        for chunk in reader:
+            if writer is None:
+                names = list(columns) if columns is not None else detect_layout(chunk)[1]
+                writer = PointWriter(pwc_path, names)
+            check_ranges(chunk, names)
+            writer.write(chunk)
+    except ValueError as err:
+        if writer is not None:
+            writer.abort()
+        raise ValueError(f"{txt_path.name}: {err}") from None
+    if writer is None:
+        raise ValueError(f"{txt_path} enthält keine Punkte")
+    writer.close()
+    return pwc_path
+
+
+# ================================================================
+# Memory-Mapping: Spalten direkt aus den Binärdateien lesen
+# ================================================================
+XYZ_NAMES = [
+    ("X coordinate", "Y coordinate", "Z coordinate"),
+    ("X", "Y", "Z"),
+]
+
+
+class PointColumns:
+    """
+    Spaltenzugriff auf einen .pwc-Ordner über numpy.memmap.
+
+    Es wird nichts vorab in den Speicher geladen: pts["Hue (0-1)"] liefert eine
+    memmap-Sicht auf die Datei (ohne Kopie), nur kodierte Spalten (Koordinaten mit
+    Offset, Farben "(0-1)") werden beim Zugriff dekodiert.
+
+    Parameter:
+    path    : Pfad zum .pwc-Ordner
+    columns : optionale Spaltennamen, ersetzen die gespeicherten positionsweise
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = Path(path)
+        self.schema = read_schema(self.path)
+        self.n_points = self.schema["n_points"]
+        specs = self.schema["columns"]
+        if columns is not None:
+            if len(columns) != len(specs):
+                raise ValueError(f"{self.path.name}: {len(specs)} Spalten gespeichert, {len(columns)} Namen angegeben")
+            specs = [dict(spec, name=name) for spec, name in zip(specs, columns)]
+        self.columns = [spec["name"] for spec in specs]
+        self._specs = {spec["name"]: spec for spec in specs}
+
+    def __len__(self):
+        return self.n_points
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def _spec(self, name):
+        if name not in self._specs:
+            raise KeyError(f"Spalte '{name}' nicht in {self.path.name}")
+        return self._specs[name]
+
+    def raw(self, name):
+        """Gespeicherte (nicht dekodierte) Werte einer Spalte als read-only memmap."""
+        spec = self._spec(name)
+        dtype = np.dtype(spec["dtype"])
+        if self.n_points == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path / spec["file"], dtype=dtype, mode="r", shape=(self.n_points,))
+
+    def offset(self, name):
+        """Offset einer Spalte (bei Koordinaten der float64-Ursprung, sonst 0)."""
+        return self._spec(name)["offset"]
+
+    def __getitem__(self, name):
+        return _decode(self._spec(name), self.raw(name))
+
+    def stack(self, names, dtype=np.float64):
+        """
+        Stapelt mehrere Spalten zu einem (n_punkte x k)-Array, z.B. als Fit-Variablen
+        für scikit-learn. Es wird nur dieses eine Array angelegt, ohne DataFrame.
+        """
+        out = np.empty((self.n_points, len(names)), dtype=dtype)
+        for j, name in enumerate(names):
+            spec = self._spec(name)
+            if spec.get("decimals") is not None:
+                out[:, j] = _decode(spec, self.raw(name))
+                continue
+            out[:, j] = self.raw(name)
+            if spec["divisor"] != 1.0:
+                out[:, j] /= spec["divisor"]
+            if spec["offset"] != 0.0:
+                out[:, j] += spec["offset"]
+        return out
+
+    def xyz_names(self):
+        """Namen der Koordinatenspalten (X/Y/Z) in dieser Datei."""
+        for names in XYZ_NAMES:
+            if all(n in self._specs for n in names):
+                return list(names)
+        raise KeyError(f"Keine X/Y/Z-Spalten in {self.path.name}")
+
+    def xyz(self, local=False):
+        """
+        Koordinaten als (n_punkte x 3)-Array.
+
+        Parameter:
+        local : False → float64 in Landeskoordinaten (z.B. für o3d.utility.Vector3dVector)
+                True  → float32 relativ zu xyz_offset() (halber Speicher, für sklearn)
+        """
+        names = self.xyz_names()
+        if local:
+            return np.column_stack([self.raw(n) for n in names])
+        return self.stack(names, dtype=np.float64)
+
+    def xyz_offset(self):
+        """float64-Ursprung der lokalen Koordinaten aus xyz(local=True)."""
+        return np.array([self.offset(n) for n in self.xyz_names()], dtype=np.float64)
+
+    def take(self, index, usecols=None):
+        """
+        Liest nur ausgewählte Zeilen (Indexarray oder Bool-Maske) als DataFrame.
+
+        Parameter:
+        index   : Zeilenindizes oder Bool-Maske der Länge n_punkte
+        usecols : optionale Liste von Spaltennamen
+        """
+        names = self.columns if usecols is None else list(usecols)
+        return pd.DataFrame({n: _decode(self._spec(n), self.raw(n)[index]) for n in names})
+
+    def to_frame(self, usecols=None):
+        """Liest alle (oder die gewählten) Spalten als DataFrame."""
+        names = self.columns if usecols is None else list(usecols)
+        return pd.DataFrame({n: np.asarray(self[n]) for n in names})
+
+
+def open_points(path, columns=None):
+    """
+    Öffnet eine Punktwolke spaltenweise als memmap (siehe PointColumns).
+
+    Eine ";"-TXT-Datei wird beim ersten Aufruf einmalig nach .pwc konvertiert
+    (gleicher Name, Endung .pwc) und danach nur noch gemappt. Ist die TXT-Datei
+    neuer als der .pwc-Ordner oder dieser in einer älteren Formatversion, wird neu
+    konvertiert.
+
+    Parameter:
+    path    : Pfad zur .txt-Datei oder zum .pwc-Ordner
+    columns : Spaltennamen in Dateireihenfolge (bei TXT für die Kodierung nötig)
+
+    Rückgabe:
+    PointColumns
+    """
+    path = Path(path)
+    if not is_pwc(path):
+        pwc_path = path.with_suffix(".pwc")
+        schema_path = pwc_path / SCHEMA_FILE
+        if (not schema_path.is_file() or schema_path.stat().st_mtime < path.stat().st_mtime
+                or read_schema(pwc_path).get("version", 1) < FORMAT_VERSION):
+            print(f"Konvertiere {path.name} → {pwc_path.name} ...")
+            convert_txt(path, pwc_path, columns=columns)
+        path = pwc_path
+    return PointColumns(path, columns=columns)
+
+
+# ================================================================
+# Blockweises Lesen und Schreiben (begrenzter Speicher)
+# ================================================================
+def iter_points(path, columns=None, chunksize=1_000_000):
+    """
+    Liest eine Punktwolke blockweise, egal ob ";"-TXT oder .pwc-Ordner.
+
+    Parameter:
+    path      : Pfad zur .txt-Datei oder zum .pwc-Ordner
+    columns   : Spaltennamen in Dateireihenfolge, ohne Angabe wird das Layout erkannt
+    chunksize : Anzahl Punkte pro Block
+
+    Rückgabe:
+    Generator von DataFrames (Index läuft über die ganze Datei durch)
+    """
+    path = Path(path)
+    if is_pwc(path):
+        pts = PointColumns(path, columns=columns)
+        for start in range(0, len(pts), chunksize):
+            chunk = pts.take(slice(start, start + chunksize))
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            yield chunk
+        return
+
+    if columns is None:
+        sample = pd.read_csv(path, sep=";", header=None, decimal=".", nrows=10_000)
+        _, columns = detect_layout(sample)
+    columns = list(columns)
+    reader = pd.read_csv(path, sep=";", header=None, decimal=".", names=columns,
+                         dtype=pandas_dtypes(columns), chunksize=chunksize)
+    for chunk in reader:
+        try:
+            check_ranges(chunk)
+        except ValueError as err:
+            raise ValueError(f"{path.name}: {err}") from None
+        yield apply_dtypes(chunk)
+
+
+class TxtWriter:
+    """
+    Gegenstück zu PointWriter für ";"-TXT: hängt Blöcke ohne Header an die Datei an.
+
+    Parameter:
+    path    : Zieldatei (.txt), wird überschrieben falls vorhanden
+    columns : Liste der Spaltennamen (nur zur Kontrolle der Spaltenanzahl)
+    """
+
+    def __init__(self, path, columns):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.n_points = 0
+        self._file = open(self.path, "w", encoding="utf-8", newline="")
+
+    def write(self, data):
+        """Hängt einen Block (DataFrame oder 2D-Array) an."""
+        if not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame(np.asarray(data))
+        if data.shape[1] != len(self.columns):
+            raise ValueError(f"Block hat {data.shape[1]} Spalten, erwartet werden {len(self.columns)}")
+        data.to_csv(self._file, sep=";", index=False, header=False, decimal=".")
+        self.n_points += len(data)
+
+    def close(self):
+        self._file.close()
+
+    def abort(self):
+        """Bricht ab und löscht die halbfertige Datei."""
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def open_writer(path, columns):
+    """Blockweiser Writer je nach Endung: .pwc → PointWriter, sonst TxtWriter."""
+    if Path(path).suffix == ".pwc":
+        return PointWriter(path, columns)
+    return TxtWriter(path, columns)
+
+
+def append_columns(source, output_path, table, columns=None, chunksize=1_000_000):
+    """
+    Schreibt eine Punktwolke blockweise mit zusätzlichen Spalten neu (z.B. berechnete Merkmale).
+
+    Parameter:
+    source      : Punktwolke (.txt oder .pwc)
+    output_path : Zieldatei (.pwc oder ";"-TXT), Textspalten (z.B. Klassenname) nur mit TXT
+    table       : DataFrame mit den neuen Spalten, eine Zeile pro Punkt in der Reihenfolge von source
+    columns     : Spaltennamen der Quelle, ohne Angabe wird das Layout erkannt
+    chunksize   : Anzahl Punkte pro Block
+
+    Rückgabe:
+    Spaltenliste der Ausgabedatei
+    """
+    writer = None
+    offset = 0
+    for chunk in iter_points(source, columns=columns, chunksize=chunksize):
+        block = table.iloc[offset:offset + len(chunk)].set_axis(chunk.index)
+        chunk = pd.concat([chunk, block], axis=1)
+        if writer is None:
+            writer = open_writer(output_path, list(chunk.columns))
+        writer.write(chunk)
+        offset += len(chunk)
+    if writer is None:
+        raise ValueError(f"{source} enthält keine Punkte")
+    writer.close()
+    if offset != len(table):
+        raise ValueError(f"{len(table)} Zeilen für {offset} Punkte in {Path(source).name}")
+    return writer.columns
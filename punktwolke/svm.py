@@ -0,0 +1,101 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Skalierbare SVM für die Punktklassifikation. Ein exaktes RBF-SVC wächst beim Training
+etwa quadratisch bis kubisch mit der Punktanzahl und ist auf einer ganzen Platte nicht
+brauchbar. Hier wird der RBF-Kern approximiert und mit einem linearen Löser trainiert:
+- "nystroem" : Nyström-Approximation mit n_components Stützpunkten aus den Trainingsdaten
+               (Budget an "Stützvektoren"), danach LinearSVC
+- "rff"      : Random Fourier Features (RBFSampler), danach LinearSVC
+- "exact"    : SVC(kernel="rbf") wie bisher, aber nur auf der budgetierten Stichprobe
+Trainiert wird auf einer klassenbalancierten Stichprobe (höchstens budget Punkte pro Klasse).
+Die Vorhersage ganzer Platten läuft kachelweise über punktwolke/inference.py.
+"""
+
+import numpy as np
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC, LinearSVC
+
+SVM_MODES = ("nystroem", "rff", "exact")
+
+
+def balanced_sample(y, budget, random_state=42):
+    """
+    Indizes einer klassenbalancierten Stichprobe.
+
+    Parameter:
+    y      : Labels aller Kandidaten
+    budget : höchstens so viele Punkte pro Klasse (kleinere Klassen vollständig)
+
+    Rückgabe:
+    sortiertes Indexarray
+    """
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    index = []
+    for label in np.unique(y):
+        members = np.flatnonzero(y == label)
+        if len(members) > budget:
+            members = rng.choice(members, budget, replace=False)
+        index.append(members)
+    return np.sort(np.concatenate(index))
+
+
+def make_svm(mode="nystroem", C=10.0, gamma=0.1, n_components=2000, scale=True, random_state=42):
+    """
+    Baut die SVM-Pipeline (StandardScaler → Kern-Approximation → linearer Löser).
+
+    Parameter:
+    mode         : "nystroem", "rff" oder "exact" (siehe SVM_MODES)
+    C            : Regularisierung wie bei SVC
+    gamma        : RBF-Parameter wie bei SVC
+    n_components : Anzahl Stützpunkte (Nyström) bzw. Fourier-Merkmale (RFF)
+    scale        : Merkmale vorher standardisieren (LV95-Koordinaten und Farben haben
+                   sonst völlig unterschiedliche Grössenordnungen für denselben gamma)
+
+    Rückgabe:
+    sklearn-Pipeline mit fit / predict
+    """
+    if mode not in SVM_MODES:
+        raise ValueError(f"Unbekannter SVM-Modus '{mode}', erlaubt: {SVM_MODES}")
+    steps = [StandardScaler()] if scale else []
+    if mode == "exact":
+        steps.append(SVC(kernel="rbf", C=C, gamma=gamma))
+    else:
+        if mode == "nystroem":
+            steps.append(Nystroem(kernel="rbf", gamma=gamma, n_components=n_components, random_state=random_state))
+        else:
+            steps.append(RBFSampler(gamma=gamma, n_components=n_components, random_state=random_state))
+        steps.append(LinearSVC(C=C, dual=False, random_state=random_state))
+    return make_pipeline(*steps)
+
+
+def fit_svm(X, y, mode="nystroem", budget=20_000, C=10.0, gamma=0.1, n_components=2000,
+            scale=True, random_state=42):
+    """
+    Trainiert die SVM auf einer klassenbalancierten, budgetierten Stichprobe.
+
+    Parameter:
+    X, y   : Merkmale und Labels aller Trainingspunkte
+    budget : höchstens so viele Punkte pro Klasse
+    übrige : siehe make_svm
+
+    Rückgabe:
+    gefittete Pipeline
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    index = balanced_sample(y, budget, random_state=random_state)
+    if mode == "nystroem":
+        # nicht mehr Stützpunkte als Trainingspunkte möglich (RFF ist davon unabhängig)
+        n_components = min(n_components, len(index))
+    model = make_svm(mode, C=C, gamma=gamma, n_components=n_components, scale=scale,
+                     random_state=random_state)
+    return model.fit(X[index], y[index])
@@ -0,0 +1,371 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Parameterstudie für die Baumsegmentierung (0_250427_Final_Watershed.py) mit Zwischenständen
+pro Arbeitsschritt. Die Schritte bilden eine Kette
+
+    load → filter → dbscan → diameter → chm → maxima → watershed → regions
+
+und jeder Schritt hängt nur von einem Teil der Parameter ab (STAGES). Über ein
+Parameterraster entsteht daraus ein Baum: Läufe, die sich nur in sigma unterscheiden, teilen
+Punktwolke, DBSCAN und CHM. Jeder Zwischenstand wird einmal als .npz im Cache-Ordner
+gespeichert, pro Quelle in einem eigenen Unterordner (Name + Hash über Pfad, Grösse,
+Änderungszeit); der Dateiname enthält die Parameter, die ihn beeinflussen
+(z.B. cache/PW_Baeume_3f2a.../dbscan/minH1_eps0.8_minSam130.npz). Ein Zwischenstand gilt, solange er nicht
+älter ist als seine Eingaben (Quelle bzw. vorheriger Schritt); spätere Studien mit
+überlappenden Rastern rechnen nur die fehlenden Schritte.
+
+Die Schritte werden stufenweise abgearbeitet, alle fehlenden Zwischenstände einer Stufe
+laufen unabhängig voneinander im Prozesspool.
+
+Ausgabe pro Lauf wie im Einzelskript, damit 5_250520_create_HTML_report.py die Ordner lesen
+kann: output_dir/<Lauf>/baumdaten_watershed_RunID_<Lauf>.csv und <RunID>_Lauf.json mit den
+Parametern (RunID = "Parameter_res..._DM...bis...", siehe run_id()).
+Unter Windows muss der Aufruf im Skript unter  if __name__ == "__main__":  stehen.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import ndimage as ndi
+from skimage.segmentation import watershed
+
+from .crowns import find_peaks, markers_from_peaks
+from .dbscan import dbscan_grid
+from .groups import diameter_mask
+from .raster import grid_extent, raster_grid, rasterize, region_properties
+from .store import load_points
+
+PARAMETERS = ["res", "min_distance", "sigma", "min_height", "eps", "min_samples", "diameter_min", "diameter_max"]
+
+# Kürzel im Dateinamen wie in der RunID
+SHORT_NAMES = {"res": "res", "min_distance": "minPix", "sigma": "sig", "min_height": "minH", "eps": "eps",
+               "min_samples": "minSam", "diameter_min": "DMmin", "diameter_max": "DMmax"}
+
+# Schritt → Parameter, die ihn (inkl. aller vorherigen Schritte) beeinflussen
+STAGES = {
+    "load": [],
+    "filter": ["min_height"],
+    "dbscan": ["min_height", "eps", "min_samples"],
+    "diameter": ["min_height", "eps", "min_samples", "diameter_min", "diameter_max"],
+    "chm": ["min_height", "eps", "min_samples", "diameter_min", "diameter_max", "res"],
+    "maxima": ["min_height", "eps", "min_samples", "diameter_min", "diameter_max", "res", "min_distance", "sigma"],
+    "watershed": ["min_height", "eps", "min_samples", "diameter_min", "diameter_max", "res", "min_distance", "sigma"],
+}
+
+# Eingaben der Schritte (Zwischenstände anderer Schritte)
+INPUTS = {
+    "load": [],
+    "filter": ["load"],
+    "dbscan": ["filter"],
+    "diameter": ["filter", "dbscan"],
+    "chm": ["filter", "diameter"],
+    "maxima": ["chm"],
+    "watershed": ["chm", "maxima"],
+    "regions": ["chm", "watershed"],
+}
+
+
+def run_id(params):
+    """RunID wie in 0_250427_Final_Watershed.py (wird vom HTML-Report aus dem Dateinamen gelesen)."""
+    p = params
+    return (f"Parameter_res{p['res']}_minPix{p['min_distance']}_sig{p['sigma']}_minH{p['min_height']}"
+            f"_eps{p['eps']}_minSam{p['min_samples']}_DM{p['diameter_min']}bis{p['diameter_max']}")
+
+
+def parameter_grid(grid):
+    """
+    Alle Kombinationen eines Parameterrasters.
+
+    Parameter:
+    grid : dict Parameter → Wert oder Liste von Werten, alle PARAMETERS müssen vorkommen
+
+    Rückgabe:
+    Liste von dicts (Reihenfolge wie itertools.product über PARAMETERS)
+    """
+    missing = [name for name in PARAMETERS if name not in grid]
+    unknown = [name for name in grid if name not in PARAMETERS]
+    if missing or unknown:
+        raise KeyError(f"Parameterraster: fehlend {missing}, unbekannt {unknown}")
+    values = [grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]] for name in PARAMETERS]
+    return [dict(zip(PARAMETERS, combo)) for combo in itertools.product(*values)]
+
+
+def source_id(source):
+    """
+    Kennung der Quelle für den Cache: Dateiname + Kurz-Hash über vollständigen Pfad, Grösse
+    und Änderungszeit. Eine andere oder geänderte Punktwolke erhält einen eigenen Cache-Ordner.
+    """
+    path = Path(source).resolve()
+    stat = path.stat()
+    digest = hashlib.sha1(f"{path}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:10]
+    return f"{path.stem}_{digest}"
+
+
+def stage_key(stage, params, source):
+    """Dateiname (ohne Endung) eines Zwischenstands, z.B. minH1_eps0.8_minSam130."""
+    if stage == "load":
+        return Path(source).stem
+    return "_".join(f"{SHORT_NAMES[name]}{params[name]}" for name in STAGES[stage])
+
+
+def stage_path(cache_dir, stage, params, source):
+    """Pfad eines Zwischenstands im Cache-Ordner (pro Quelle ein Unterordner, siehe source_id())."""
+    return Path(cache_dir) / source_id(source) / stage / f"{stage_key(stage, params, source)}.npz"
+
+
+def _is_current(path, inputs):
+    """Zwischenstand vorhanden und nicht älter als seine Eingaben."""
+    if not path.is_file():
+        return False
+    mtime = path.stat().st_mtime
+    return all(Path(p).stat().st_mtime <= mtime for p in inputs)
+
+
+# ================================================================
+# Schritte (laufen im Prozesspool, lesen/schreiben nur Dateien)
+# ================================================================
+def _load(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _stage_load(params, inputs, source, columns):
+    df = load_points(source, columns=columns)
+    return {"points": df[["X", "Y", "Z"]].to_numpy(dtype=np.float64)}
+
+
+def _stage_filter(params, inputs, source, columns):
+    points = inputs["load"]["points"]
+    return {"points": points[points[:, 2] > params["min_height"]]}
+
+
+def _stage_dbscan(params, inputs, source, columns):
+    points = inputs["filter"]["points"]
+    return {"labels": dbscan_grid(points[:, :2], eps=params["eps"], min_samples=params["min_samples"])}
+
+
+def _stage_diameter(params, inputs, source, columns):
+    points, labels = inputs["filter"]["points"], inputs["dbscan"]["labels"]
+    keep, kronen = diameter_mask(points, labels, params["diameter_min"], params["diameter_max"],
+                                 measure="perimeter")
+    # Reihenfolge wie im Einzelskript: Cluster nach Label, innerhalb in Punktreihenfolge
+    auswahl = np.flatnonzero(keep)
+    auswahl = auswahl[np.argsort(labels[auswahl], kind="stable")]
+    if len(auswahl) == 0:
+        raise ValueError("Keine gültigen Cluster gefunden!")
+    return {"auswahl": auswahl, "cluster": np.array([len(kronen), int(kronen["Behalten"].sum())])}
+
+
+def _stage_chm(params, inputs, source, columns):
+    points = inputs["filter"]["points"][inputs["diameter"]["auswahl"]]
+    grid = raster_grid(points, params["res"])
+    rasters, grid = rasterize(points, grid=grid, stats=("max",))
+    return {"chm": rasters["max"], "grid": np.array(json.dumps(grid))}
+
+
+def _stage_maxima(params, inputs, source, columns):
+    chm = inputs["chm"]["chm"]
+    chm_smooth = ndi.gaussian_filter(chm, sigma=params["sigma"])
+    local_max = find_peaks(chm, chm_smooth, min_distance=params["min_distance"], min_height=params["min_height"])
+    return {"chm_smooth": chm_smooth, "local_max": local_max}
+
+
+def _stage_watershed(params, inputs, source, columns):
+    chm, maxima = inputs["chm"]["chm"], inputs["maxima"]
+    markers = markers_from_peaks(chm.shape, maxima["local_max"])
+    return {"labels": watershed(-maxima["chm_smooth"], markers, mask=chm > 0)}
+
+
+STAGE_FUNCTIONS = {
+    "load": _stage_load,
+    "filter": _stage_filter,
+    "dbscan": _stage_dbscan,
+    "diameter": _stage_diameter,
+    "chm": _stage_chm,
+    "maxima": _stage_maxima,
+    "watershed": _stage_watershed,
+}
+
+
+def tree_table(labels, chm, grid):
+    """Baumdaten wie im Einzelskript (Tree_ID, E, N, Height_m, Crown_Diameter_m)."""
+    y_min, _, x_min, _ = grid_extent(grid)
+    res = grid["res"]
+    regionen = region_properties(labels, chm, res, min_pixels=3)
+    return pd.DataFrame({
+        "Tree_ID": regionen["Label"],
+        "E": y_min + regionen["Zeile"] * res,  # Ostwert
+        "N": x_min + regionen["Spalte"] * res,  # Nordwert
+        "Height_m": regionen["Hoehe_max"].round(2),
+        "Crown_Diameter_m": regionen["Durchmesser_m"].round(2),
+    })
+
+
+def _run_job(job):
+    """Worker: einen Zwischenstand berechnen und speichern (bzw. die Baumdaten eines Laufs)."""
+    stage, params, inputs, out_path, source, columns = job
+    start = time.time()
+    try:
+        data = {name: _load(path) for name, path in inputs.items()}
+        if stage == "regions":
+            grid = json.loads(str(data["chm"]["grid"]))
+            df = tree_table(data["watershed"]["labels"], data["chm"]["chm"], grid)
+            df.to_csv(out_path, decimal=".", columns=["Tree_ID", "E", "N", "Height_m", "Crown_Diameter_m"],
+                      index=False)
+            return stage, str(out_path), len(df), None, time.time() - start
+        result = STAGE_FUNCTIONS[stage](params, data, source, columns)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = out_path.with_name(out_path.stem + ".tmp.npz")
+        np.savez(tmp_path, **result)
+        os.replace(tmp_path, out_path)  # nie halb geschriebene Zwischenstände im Cache
+        return stage, str(out_path), None, None, time.time() - start
+    except ValueError as err:
+        return stage, str(out_path), None, str(err), time.time() - start
+
+
+def _run_pool(jobs, max_workers):
+    if max_workers == 1 or len(jobs) <= 1:
+        return [_run_job(job) for job in jobs]
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for job in jobs:
+            pending.add(pool.submit(_run_job, job))
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                results += [f.result() for f in done]
+        results += [f.result() for f in pending]
+    return results
+
+
+def _prepare_run_dir(run_dir, rid, log=print):
+    """
+    Laufordner für die RunID vorbereiten. Gehörte er bisher zu anderen Parametern (z.B. nach
+    einem erweiterten Raster mit gleichem datum), werden dessen *_Lauf.json, Baumdaten-CSV
+    und Plots entfernt; der HTML-Report liest die Parameter aus dem ersten passenden Dateinamen.
+    """
+    run_dir.mkdir(parents=True, exist_ok=True)
+    stale = [f for f in run_dir.glob("*_Lauf.json") if f.name != f"{rid}_Lauf.json"]
+    if not stale:
+        return
+    for f in stale + list(run_dir.glob("*.png")) + list(run_dir.glob("baumdaten_watershed_RunID_*.csv")):
+        f.unlink()
+    if log is not None:
+        log(f"  {run_dir.name}: Ergebnisse von {stale[0].name[:-len('_Lauf.json')]} entfernt")
+
+
+def run_sweep(source, grid, output_dir, datum, cache_dir, columns=None, max_workers=None, log=print):
+    """
+    Führt alle Kombinationen eines Parameterrasters aus und verwendet Zwischenstände wieder.
+
+    Parameter:
+    source      : Punktwolke (.txt oder .pwc) mit Vegetation ohne Boden
+    grid        : dict Parameter → Wert oder Liste (siehe parameter_grid())
+    output_dir  : Output-Ordner des Baum-Workflows, pro Lauf ein Unterordner <datum>_<Nr>
+                  (Nummer = Position im Raster; Ordner mit anderer RunID werden geleert)
+    datum       : Präfix der Laufordner (wie datum im Einzelskript)
+    cache_dir   : Ordner für die Zwischenstände (nicht in output_dir, sonst erscheint er im Report)
+    columns     : Spaltennamen der Quelle (z.B. schema.get_layout("xyz"))
+    max_workers : Prozesse, 1 = ohne Prozesspool, None = CPU-Kerne
+
+    Rückgabe:
+    DataFrame pro Lauf mit Lauf, RunID, Parametern, Bäumen, Fehler und Anzahl neu gerechneter
+    Schritte (auch als parameterstudie_<datum>.csv in output_dir gespeichert)
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    start = time.time()
+    combos = parameter_grid(grid)
+    output_dir, cache_dir = Path(output_dir), Path(cache_dir)
+    runs = [f"{datum}_{nr:02d}" for nr in range(1, len(combos) + 1)]
+    failed = {}  # Ausgabepfad → Fehlermeldung, wird an alle folgenden Schritte weitergegeben
+    computed = [0] * len(combos)
+    trees = [None] * len(combos)
+    errors = [None] * len(combos)
+    for c, params in enumerate(combos):
+        _prepare_run_dir(output_dir / runs[c], run_id(params), log=log)
+
+    for stage in list(STAGES) + ["regions"]:
+        jobs, owners = {}, {}
+        for c, params in enumerate(combos):
+            inputs = {name: stage_path(cache_dir, name, params, source) for name in INPUTS[stage]}
+            if stage == "regions":
+                out_path = output_dir / runs[c] / f"baumdaten_watershed_RunID_{runs[c]}.csv"
+            else:
+                out_path = stage_path(cache_dir, stage, params, source)
+            broken = [failed[str(path)] for path in inputs.values() if str(path) in failed]
+            if broken:
+                failed[str(out_path)] = broken[0]
+                errors[c] = broken[0]
+                continue
+            if stage == "regions":
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+            elif _is_current(out_path, list(inputs.values()) or [source]):
+                continue
+            owners.setdefault(str(out_path), []).append(c)
+            jobs[str(out_path)] = (stage, params, inputs, out_path, source, columns)
+
+        if jobs and log is not None:
+            log(f"{stage}: {len(jobs)} neu berechnet")
+        for _, out_path, n_trees, error, duration in _run_pool(list(jobs.values()), max_workers):
+            for c in owners[out_path]:
+                computed[c] += 1
+                trees[c] = n_trees if stage == "regions" else trees[c]
+                errors[c] = error if error is not None else errors[c]
+            if error is not None:
+                failed[out_path] = error
+                if log is not None:
+                    log(f"  {Path(out_path).name}: {error}")
+
+    rows = []
+    for c, params in enumerate(combos):
+        rid = run_id(params)
+        row = {"Lauf": runs[c], "RunID": rid, **params, "Baeume": trees[c], "Fehler": errors[c],
+               "Schritte_neu": computed[c]}
+        rows.append(row)
+        run_dir = output_dir / runs[c]
+        run_dir.mkdir(parents=True, exist_ok=True)
+        # "_Lauf" nach der RunID, sonst liest der Report die Endung ".json" als Teil von diameter_max
+        with open(run_dir / f"{rid}_Lauf.json", "w", encoding="utf-8") as f:
+            json.dump(dict(row, Quelle=str(source)), f, indent=2)
+    summary = pd.DataFrame(rows)
+    summary["Baeume"] = summary["Baeume"].astype("Int64")
+    summary.to_csv(output_dir / f"parameterstudie_{datum}.csv", index=False)
+    if log is not None:
+        log(f"{len(combos)} Läufe, {sum(computed)} Schritte neu gerechnet, "
+            f"{int(summary['Fehler'].notna().sum())} Fehler, {time.time() - start:.1f} s")
+    return summary
+
+
+def load_run(cache_dir, params, source):
+    """
+    Zwischenstände eines Laufs für Visualisierungen (z.B. utils.visualize_processing_steps).
+
+    Rückgabe:
+    dict mit filtered_points, filtered_labels, chm, chm_smooth, local_max, labels_ws, grid
+    """
+    data = {stage: _load(stage_path(cache_dir, stage, params, source))
+            for stage in ["filter", "dbscan", "diameter", "chm", "maxima", "watershed"]}
+    auswahl = data["diameter"]["auswahl"]
+    return {
+        "filtered_points": data["filter"]["points"][auswahl],
+        "filtered_labels": data["dbscan"]["labels"][auswahl],
+        "chm": data["chm"]["chm"],
+        "chm_smooth": data["maxima"]["chm_smooth"],
+        "local_max": data["maxima"]["local_max"],
+        "labels_ws": data["watershed"]["labels"],
+        "grid": json.loads(str(data["chm"]["grid"])),
+    }
@@ -0,0 +1,245 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Räumliche Kachelung für Segmentierungsschritte, damit ganze Platten statt von Hand
+zugeschnittener Ausschnitte verarbeitet werden können.
+
+Ablauf von run_tiled():
+1. Die Platte wird in quadratische Kacheln (tile_size) geteilt. Jede Kachel erhält zusätzlich
+   alle Punkte in einem Rand (halo) um die Kachel.
+2. Ein Arbeitsschritt (stage, z.B. dbscan_xy) läuft pro Kachel (Kern + Rand) in einem
+   Prozesspool und liefert eine Objekt-ID pro Punkt (-1 = kein Objekt).
+3. Jeder Punkt gehört genau einer Kachel (Kern) und übernimmt deren ID. Punkte im Rand einer
+   Nachbarkachel tragen dort eine zweite ID. Kommen zwei IDs gemeinsam auf mindestens
+   min_overlap Punkten vor, werden sie als dasselbe Objekt zusammengeführt (Zusammenhangs-
+   komponenten). Objekte über Kachelgrenzen erhalten so eine gemeinsame ID.
+
+Verbinden dürfen nur Punkte, die das Objekt wirklich tragen. Bei DBSCAN sind das die
+Kernpunkte: Ein Randpunkt kann im Umkreis zweier Cluster liegen, ohne sie zu verbinden.
+Ein Arbeitsschritt kann daher (labels, core) zurückgeben; dann verbinden nur Punkte, die in
+ihrer eigenen Kachel und in der Nachbarkachel Kernpunkt sind (dbscan_xy, dbscan_grid_xy).
+Mit einem Rand von mindestens 2 * eps sind die Cluster der Kernpunkte dann identisch zu
+DBSCAN auf der ganzen Platte; ein Randpunkt zwischen zwei Clustern kann wie bei sklearn
+(abhängig von der Reihenfolge) dem anderen der beiden Cluster zugeordnet werden.
+Arbeitsschritte ohne Kernpunkte (z.B. kmeans_block) verbinden über alle Randpunkte; das ist
+eine Näherung, min_overlap > 1 macht sie robuster gegen einzelne Brückenpunkte.
+
+Ohne Zusammenführen (stitch=False) werden die IDs nur pro Kachel verschoben, z.B. für eine
+Vorsegmentierung, die danach global zusammengefasst wird.
+
+Unter Windows muss der Aufruf im Skript unter  if __name__ == "__main__":  stehen.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN, KMeans
+
+from .dbscan import dbscan_grid
+
+
+def make_tiles(xy, tile_size, halo=0.0):
+    """
+    Teilt Punkte in quadratische Kacheln mit Rand.
+
+    Parameter:
+    xy        : (n, 2) Koordinaten (Lage)
+    tile_size : Kantenlänge der Kacheln in m
+    halo      : Breite des Rands in m (höchstens tile_size)
+
+    Rückgabe:
+    Liste der nicht leeren Kacheln als dicts mit tile (ix, iy), index (globale Punktindizes,
+    zuerst die n_core Kernpunkte, danach der Rand) und n_core
+    """
+    if halo > tile_size:
+        raise ValueError(f"halo ({halo}) darf nicht grösser als tile_size ({tile_size}) sein")
+    xy = np.asarray(xy, dtype=np.float64)
+    origin = np.floor(xy.min(axis=0))
+    cell = np.floor((xy - origin) / tile_size).astype(np.int64)
+    n_cols = int(cell[:, 1].max()) + 1
+    tile = cell[:, 0] * n_cols + cell[:, 1]
+    order = np.argsort(tile, kind="stable")
+    ids, starts, counts = np.unique(tile[order], return_index=True, return_counts=True)
+    lookup = {int(t): (s, s + c) for t, s, c in zip(ids, starts, counts)}
+
+    tiles = []
+    for t, (s, e) in lookup.items():
+        ix, iy = divmod(t, n_cols)
+        core = order[s:e]
+        if halo > 0:
+            lo = origin + np.array([ix, iy]) * tile_size - halo
+            hi = lo + tile_size + 2 * halo
+            cand = [order[slice(*lookup[nb])] for nb in
+                    ((ix + dx) * n_cols + iy + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                     if (dx or dy) and 0 <= iy + dy < n_cols) if nb in lookup]
+            cand = np.concatenate(cand) if cand else np.empty(0, dtype=np.int64)
+            inside = np.all((xy[cand] >= lo) & (xy[cand] < hi), axis=1)
+            index = np.concatenate([core, cand[inside]])
+        else:
+            index = core
+        tiles.append({"tile": (ix, iy), "index": index, "n_core": len(core)})
+    return tiles
+
+
+def _run_stage(job):
+    """Worker: führt den Arbeitsschritt auf einer Kachel aus."""
+    i, stage, block, kwargs = job
+    start = time.time()
+    result = stage(block, **kwargs)
+    labels, core = result if isinstance(result, tuple) else (result, None)
+    labels = np.asarray(labels, dtype=np.int64)
+    if len(labels) != len(block):
+        raise ValueError(f"Arbeitsschritt lieferte {len(labels)} Labels für {len(block)} Punkte")
+    if core is not None:
+        core = np.asarray(core, dtype=bool)
+    return i, (labels, core), time.time() - start
+
+
+def stitch_labels(n_points, tiles, results, min_overlap=1, cores=None):
+    """
+    Führt die Kachel-IDs zu globalen Objekt-IDs zusammen.
+
+    Parameter:
+    n_points    : Anzahl Punkte der Platte
+    tiles       : Rückgabe von make_tiles()
+    results     : Labels pro Kachel (gleiche Reihenfolge wie tile["index"])
+    min_overlap : so viele gemeinsame Randpunkte braucht es, um zwei IDs zu verbinden
+    cores       : optional Kernpunkt-Masken pro Kachel (wie results); dann verbinden nur
+                  Randpunkte, die in beiden Kacheln Kernpunkt sind
+
+    Rückgabe:
+    labels  : (n_points,) globale IDs 0..k-1, -1 = kein Objekt
+    n_links : Anzahl zusammengeführter ID-Paare
+    """
+    labels = np.full(n_points, -1, dtype=np.int64)
+    is_core = np.zeros(n_points, dtype=bool) if cores is not None else None
+    halo_index, halo_labels, halo_core = [], [], []
+    offset = 0
+    for k, (tile, local) in enumerate(zip(tiles, results)):
+        glob = np.where(local >= 0, local + offset, -1)
+        offset += int(local.max()) + 1 if len(local) and local.max() >= 0 else 0
+        labels[tile["index"][:tile["n_core"]]] = glob[:tile["n_core"]]
+        halo_index.append(tile["index"][tile["n_core"]:])
+        halo_labels.append(glob[tile["n_core"]:])
+        if cores is not None:
+            is_core[tile["index"][:tile["n_core"]]] = cores[k][:tile["n_core"]]
+            halo_core.append(cores[k][tile["n_core"]:])
+    if offset == 0:
+        return labels, 0
+
+    n_links = 0
+    if halo_index:
+        index = np.concatenate(halo_index)
+        a = labels[index]
+        b = np.concatenate(halo_labels)
+        keep = (a >= 0) & (b >= 0) & (a != b)
+        if cores is not None:
+            keep &= is_core[index] & np.concatenate(halo_core)
+        pairs, counts = np.unique(np.column_stack([a[keep], b[keep]]), axis=0, return_counts=True)
+        pairs = pairs[counts >= min_overlap]
+        n_links = len(pairs)
+    else:
+        pairs = np.empty((0, 2), dtype=np.int64)
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(offset, offset))
+    _, component = connected_components(graph, directed=False)
+    valid = labels >= 0
+    _, labels[valid] = np.unique(component[labels[valid]], return_inverse=True)
+    return labels, n_links
+
+
+def run_tiled(stage, data, xy=None, tile_size=100.0, halo=0.0, stitch=True, min_overlap=1,
+              max_workers=None, log=print, **stage_kwargs):
+    """
+    Führt einen Segmentierungsschritt kachelweise im Prozesspool aus und setzt die IDs zusammen.
+
+    Parameter:
+    stage        : Funktion stage(block, **stage_kwargs) → Objekt-ID pro Zeile von block
+                   (-1 = kein Objekt) oder (IDs, Kernpunkt-Maske), muss auf Modulebene
+                   definiert sein (pickle)
+    data         : (n, d) Array, das zeilenweise an stage übergeben wird
+    xy           : (n, 2) Lagekoordinaten für die Kachelung, Standard: data[:, :2]
+    tile_size    : Kantenlänge der Kacheln in m
+    halo         : Rand in m, der zusätzlich an jede Kachel übergeben wird
+    stitch       : IDs über die Randpunkte zusammenführen (sonst nur pro Kachel verschoben)
+    min_overlap  : minimale Anzahl gemeinsamer Randpunkte zum Zusammenführen
+    max_workers  : Anzahl Prozesse, Standard: CPU-Kerne
+    stage_kwargs : weitere Parameter für stage (z.B. eps, min_samples)
+
+    Rückgabe:
+    labels  : (n,) globale Objekt-IDs, -1 = kein Objekt
+    summary : DataFrame pro Kachel mit Kachel_X, Kachel_Y, Punkte_Kern, Punkte_Rand, Objekte, Dauer_s
+    """
+    data = np.asarray(data)
+    xy = data[:, :2] if xy is None else np.asarray(xy)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    start = time.time()
+    tiles = make_tiles(xy, tile_size, halo=halo if stitch else 0.0)
+    results = [None] * len(tiles)
+    durations = [0.0] * len(tiles)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for i, tile in enumerate(tiles):
+            pending.add(pool.submit(_run_stage, (i, stage, data[tile["index"]], stage_kwargs)))
+            # höchstens 2 Kacheln pro Worker gleichzeitig unterwegs (Speicher begrenzen)
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    j, results[j], durations[j] = f.result()
+        for f in pending:
+            j, results[j], durations[j] = f.result()
+
+    # ohne Rand (stitch=False) werden die IDs nur pro Kachel verschoben
+    cores = [c for _, c in results]
+    results = [r for r, _ in results]
+    if any(c is None for c in cores):
+        cores = None
+    labels, n_links = stitch_labels(len(data), tiles, results, min_overlap=min_overlap, cores=cores)
+    summary = pd.DataFrame([{
+        "Kachel_X": t["tile"][0], "Kachel_Y": t["tile"][1], "Punkte_Kern": t["n_core"],
+        "Punkte_Rand": len(t["index"]) - t["n_core"],
+        "Objekte": len(np.unique(r[r >= 0])), "Dauer_s": round(d, 2),
+    } for t, r, d in zip(tiles, results, durations)])
+    if log is not None:
+        log(f"{len(tiles)} Kacheln à {tile_size} m (Rand {halo} m): {labels.max() + 1} Objekte, "
+            f"{n_links} Verbindungen über Kachelgrenzen, {time.time() - start:.1f} s")
+    return labels, summary
+
+
+# ================================================================
+# Arbeitsschritte pro Kachel (Modulebene, damit sie im Prozesspool laufen)
+# ================================================================
+def dbscan_xy(block, eps=0.8, min_samples=130):
+    """DBSCAN auf den ersten beiden Spalten (Lage), wie im Baum-Workflow; liefert (labels, core)."""
+    db = DBSCAN(eps=eps, min_samples=min_samples).fit(block[:, :2])
+    core = np.zeros(len(block), dtype=bool)
+    core[db.core_sample_indices_] = True
+    return db.labels_, core
+
+
+def dbscan_grid_xy(block, eps=0.8, min_samples=130):
+    """Wie dbscan_xy, aber mit dbscan.dbscan_grid (gleiche Labels, schneller)."""
+    return dbscan_grid(block[:, :2], eps=eps, min_samples=min_samples, return_core=True)
+
+
+def kmeans_block(block, points_per_cluster=1000, random_state=42, n_init=10):
+    """
+    KMeans-Vorsegmentierung einer Kachel, Clusteranzahl proportional zur Punktanzahl.
+
+    Parameter:
+    block              : Merkmale der Kachel (z.B. X, Y, Z scan dir)
+    points_per_cluster : mittlere Punktanzahl pro Cluster (Platte: Punkte / gewünschte Cluster)
+    """
+    n_clusters = max(1, min(len(block), int(np.ceil(len(block) / points_per_cluster))))
+    return KMeans(n_clusters=n_clusters, random_state=random_state, n_init=n_init).fit_predict(block)
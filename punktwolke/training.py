@@ -0,0 +1,231 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Out-of-core-Training von Klassifikatoren mit partial_fit (z.B. SGDClassifier) über eine
+oder mehrere Platten, ohne die Punktwolken ganz in den Speicher zu laden.
+
+Ablauf:
+1. prepare_training_data(): ein Durchgang über alle Eingabedateien. Dabei werden die Klassen
+   gezählt und Merkmale + codierte Labels in einen binären Cache (.pwc) geschrieben. Der
+   StandardScaler wird danach inkrementell (partial_fit) auf den Werten im Cache gefittet,
+   also auf genau den Werten, die das Training sieht. Die Epochen lesen nur noch den Cache
+   (memmap) statt den Text neu zu parsen.
+2. train_partial_fit(): mehrere Epochen über den Cache. Die Reihenfolge der Blöcke wird pro
+   Epoche gemischt, die Punkte innerhalb eines Blocks ebenfalls. Klassengewichte
+   ("balanced") werden aus den Zählungen berechnet, da partial_fit "balanced" nicht kennt.
+   Ein Teil der Blöcke wird als Validierung zurückgehalten. Nach jeder Epoche wird ein
+   Checkpoint (Modell, Scaler, Label-Mapping, Verlauf) gespeichert.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from punktwolke.store import PointWriter, iter_points, open_points
+
+LABEL_CODE = "Label"  # Spaltenname der codierten Labels im Cache
+
+
+def cache_name(source):
+    """
+    Name der Cache-Datei einer Eingabedatei: <name>_<Hash des vollständigen Pfads>_train.pwc.
+    Platten mit gleichem Dateinamen aus verschiedenen Ordnern (z.B. PW_*.txt pro Platte)
+    erhalten so getrennte Caches.
+    """
+    path = Path(source).resolve()
+    return f"{path.stem}_{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]}_train.pwc"
+
+
+def prepare_training_data(sources, features, label_column, cache_dir, columns=None,
+                          chunksize=500_000, log=print):
+    """
+    Durchgang 0: Klassen zählen, Trainings-Cache schreiben, Scaler auf dem Cache fitten.
+
+    Parameter:
+    sources      : Liste von Eingabedateien (.txt / .pwc), z.B. mehrere Platten
+    features     : Liste der Merkmalsspalten
+    label_column : Spalte mit der Klasse (Text oder Zahl), z.B. "Klassenname"
+    cache_dir    : Ordner für die Cache-Dateien (siehe cache_name())
+    columns      : Spaltennamen der Eingabedateien, ohne Angabe wird das Layout erkannt
+    chunksize    : Punkte pro gelesenem Block
+
+    Rückgabe:
+    dict mit
+      caches        : Liste der Cache-Pfade
+      classes       : sortierte Klassenwerte (Code i ↔ classes[i], wie pandas cat.categories)
+      counts        : Punkte pro Klasse
+      scaler        : auf den Cache-Werten inkrementell gefitteter StandardScaler
+      label_mapping : {Code: Klasse}
+      remap         : vorläufiger Code im Cache → endgültiger Code
+      features      : Merkmalsspalten
+    """
+    features = list(features)
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    scaler = StandardScaler()
+    seen = {}  # Klasse → vorläufiger Code (Reihenfolge des Auftretens)
+    counts = []
+    caches = []
+
+    for source in sources:
+        start = time.time()
+        cache = cache_dir / cache_name(source)
+        with PointWriter(cache, features + [LABEL_CODE]) as writer:
+            for chunk in iter_points(source, columns=columns, chunksize=chunksize):
+                X = chunk[features].to_numpy(dtype=np.float64)
+                labels = chunk[label_column].to_numpy()
+                names, inverse = np.unique(labels, return_inverse=True)
+                for name in names:
+                    if name not in seen:
+                        seen[name] = len(seen)
+                        counts.append(0)
+                codes = np.array([seen[name] for name in names], dtype=np.int64)[inverse]
+                for code, n in zip(*np.unique(codes, return_counts=True)):
+                    counts[code] += int(n)
+                writer.write(np.column_stack([X, codes]))
+        # Scaler auf den gespeicherten (kodierten) Werten, so wie sie _read_block() liest
+        cached = open_points(cache)
+        for block_start in range(0, len(cached), chunksize):
+            scaler.partial_fit(_read_features(cached, slice(block_start, block_start + chunksize), features))
+        caches.append(cache)
+        if log is not None:
+            log(f"✔ {Path(source).name} → {cache.name} ({writer.n_points} Punkte, {time.time() - start:.1f} s)")
+
+    if not seen:
+        raise ValueError("Keine Trainingspunkte in den Eingabedateien")
+    # Codes so umsortieren, dass sie den sortierten Klassen entsprechen
+    classes = np.array(sorted(seen))
+    remap = np.empty(len(seen), dtype=np.int64)
+    for name, code in seen.items():
+        remap[code] = int(np.searchsorted(classes, name))
+    sorted_counts = np.zeros(len(classes), dtype=np.int64)
+    sorted_counts[remap] = counts
+    return {
+        "caches": caches,
+        "classes": classes,
+        "counts": sorted_counts,
+        "scaler": scaler,
+        "label_mapping": {i: c for i, c in enumerate(classes.tolist())},
+        "remap": remap,
+        "features": features,
+    }
+
+
+def balanced_class_weight(counts):
+    """Klassengewichte wie class_weight="balanced": n / (k * n_klasse)."""
+    counts = np.asarray(counts, dtype=np.float64)
+    weights = counts.sum() / (len(counts) * np.maximum(counts, 1))
+    return {i: float(w) for i, w in enumerate(weights)}
+
+
+def _blocks(caches, block_size):
+    """Liste aller Blöcke als (Cache-Nr., Start, Ende)."""
+    blocks = []
+    for i, cache in enumerate(caches):
+        n = len(cache)
+        blocks += [(i, start, min(start + block_size, n)) for start in range(0, n, block_size)]
+    return blocks
+
+
+def _read_features(cache, sl, features):
+    """Merkmale eines Cache-Abschnitts als float64 (nur der Abschnitt wird dekodiert)."""
+    return cache.take(sl, usecols=features).to_numpy(dtype=np.float64)
+
+
+def _read_block(caches, block, features, remap, scaler):
+    i, start, end = block
+    sl = slice(start, end)
+    X = _read_features(caches[i], sl, features)
+    y = remap[np.asarray(caches[i].raw(LABEL_CODE)[sl], dtype=np.int64)]
+    return scaler.transform(X), y
+
+
+def train_partial_fit(model, data, epochs=5, block_size=200_000, validation_fraction=0.1,
+                      max_validation=500_000, checkpoint_dir=None, random_state=42, log=print):
+    """
+    Trainiert ein Modell mit partial_fit über mehrere Epochen aus dem Cache.
+
+    Parameter:
+    model               : Klassifikator mit partial_fit (z.B. SGDClassifier); class_weight
+                          "balanced" wird durch die Gewichte aus den Klassenzählungen ersetzt
+    data                : Rückgabe von prepare_training_data()
+    epochs              : Anzahl Epochen
+    block_size          : Punkte pro Block (Einheit des Mischens)
+    validation_fraction : Anteil der Blöcke, die nur zur Validierung dienen
+    max_validation      : maximale Anzahl Validierungspunkte pro Epoche
+    checkpoint_dir      : Ordner für checkpoint_epoche_XX.pkl, None = keine Checkpoints
+    random_state        : Zufallsstartwert für das Mischen
+
+    Rückgabe:
+    model      : trainiertes Modell
+    history    : DataFrame mit Epoche, Punkte, Dauer_s, Validierung_Score
+    validation : (X_val skaliert, y_val) für Bericht und Confusion Matrix
+    """
+    features = data["features"]
+    remap = data["remap"]
+    scaler = data["scaler"]
+    classes = np.arange(len(data["classes"]))
+    caches = [open_points(c) for c in data["caches"]]
+
+    if getattr(model, "class_weight", None) == "balanced":
+        model.set_params(class_weight=balanced_class_weight(data["counts"]))
+
+    rng = np.random.default_rng(random_state)
+    blocks = _blocks(caches, block_size)
+    order = rng.permutation(len(blocks))
+    n_val = int(round(len(blocks) * validation_fraction)) if len(blocks) > 1 else 0
+    val_blocks = [blocks[i] for i in order[:n_val]]
+    train_blocks = [blocks[i] for i in order[n_val:]]
+
+    # Validierungsdaten einmal lesen (begrenzt auf max_validation Punkte)
+    X_val, y_val = [], []
+    n_loaded = 0
+    for block in val_blocks:
+        if n_loaded >= max_validation:
+            break
+        X, y = _read_block(caches, block, features, remap, scaler)
+        X_val.append(X)
+        y_val.append(y)
+        n_loaded += len(y)
+    if X_val:
+        X_val, y_val = np.concatenate(X_val)[:max_validation], np.concatenate(y_val)[:max_validation]
+
+    if checkpoint_dir is not None:
+        checkpoint_dir = Path(checkpoint_dir)
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    history = []
+    for epoch in range(1, epochs + 1):
+        start = time.time()
+        n_points = 0
+        for b in rng.permutation(len(train_blocks)):
+            X, y = _read_block(caches, train_blocks[b], features, remap, scaler)
+            perm = rng.permutation(len(y))
+            model.partial_fit(X[perm], y[perm], classes=classes)
+            n_points += len(y)
+        score = float(model.score(X_val, y_val)) if len(X_val) else np.nan
+        history.append({"Epoche": epoch, "Punkte": n_points, "Dauer_s": round(time.time() - start, 2),
+                        "Validierung_Score": score})
+        if log is not None:
+            log(f"Epoche {epoch}/{epochs}: {n_points} Punkte, {time.time() - start:.1f} s, Validierung {score:.4f}")
+        if checkpoint_dir is not None:
+            joblib.dump({
+                "model": model,
+                "scaler": scaler,
+                "label_mapping": data["label_mapping"],
+                "features": features,
+                "epoch": epoch,
+                "history": pd.DataFrame(history),
+            }, checkpoint_dir / f"checkpoint_epoche_{epoch:02d}.pkl")
+
+    return model, pd.DataFrame(history), (X_val, y_val)
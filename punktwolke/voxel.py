@@ -0,0 +1,169 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Mehrstufige Voxel-Pyramide für Nachbarschaftsmerkmale. Merkmale mit 0.5 / 1 / 2 m Radius
+sind in voller Punktdichte teuer, obwohl sie sich auf diesen Skalen kaum von Punkt zu Punkt
+ändern. Deshalb wird die Punktwolke in Voxel-Gitter mit wachsender Kantenlänge eingeteilt
+(Schwerpunkt + Punktanzahl pro Voxel, gleicher Ursprung, damit die Stufen ineinander
+verschachtelt sind). Die Merkmale aus punktwolke/geometry.py werden auf den Schwerpunkten der
+groben Stufen berechnet und über den Voxel-Index jedes Punkts auf die Originalpunkte
+zurückverteilt.
+
+Eingabe sind Koordinaten-Arrays, Punktwolken-Dateien (.txt / .pwc) oder die
+open3d.geometry.PointCloud-Objekte der Skripte. to_open3d() erzeugt aus einer Stufe
+wieder eine Open3D-Punktwolke (z.B. zum Anzeigen).
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from punktwolke.geometry import GEOMETRY_FEATURES, build_neighbor_graph, eigen_features, load_xyz
+
+# Standardstufen: (Voxelgrösse, Radius) in m
+DEFAULT_LEVELS = ((0.25, 0.5), (0.5, 1.0), (1.0, 2.0))
+
+
+def as_xyz(points, columns=None):
+    """
+    Koordinaten als lokales float32-Array + float64-Ursprung.
+
+    Parameter:
+    points  : (n, 3)-Array, open3d.geometry.PointCloud oder Pfad (.txt / .pwc)
+    columns : Spaltennamen bei Dateien, ohne Angabe wird das Layout erkannt
+    """
+    if isinstance(points, np.ndarray):
+        xyz = np.asarray(points, dtype=np.float64)
+    elif hasattr(points, "points"):  # open3d.geometry.PointCloud
+        xyz = np.asarray(points.points, dtype=np.float64)
+    else:
+        return load_xyz(points, columns=columns)
+    offset = np.floor(xyz.min(axis=0)) if len(xyz) else np.zeros(3)
+    return (xyz - offset).astype(np.float32), offset
+
+
+def voxel_downsample(xyz, size, weights=None, origin=None):
+    """
+    Fasst Punkte pro Voxel zusammen.
+
+    Parameter:
+    xyz     : (n, 3) Koordinaten
+    size    : Kantenlänge der Voxel in m
+    weights : optionale Gewichte pro Punkt (z.B. Punktanzahl einer feineren Stufe)
+    origin  : Ursprung des Gitters, Standard: Minimum von xyz
+
+    Rückgabe:
+    centroids : (m, 3) gewichteter Schwerpunkt pro Voxel (float32)
+    counts    : (m,) Summe der Gewichte bzw. Punktanzahl pro Voxel
+    inverse   : (n,) Voxelnummer jedes Eingabepunkts
+    """
+    xyz = np.asarray(xyz)
+    if origin is None:
+        origin = xyz.min(axis=0)
+    cell = np.floor((xyz - origin) / size).astype(np.int64)
+    # drei Zellindizes in einen int64-Schlüssel packen (je 21 Bit)
+    key = (cell[:, 0] << 42) | (cell[:, 1] << 21) | cell[:, 2]
+    _, inverse = np.unique(key, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    m = int(inverse.max()) + 1 if len(inverse) else 0
+    w = np.ones(len(xyz)) if weights is None else np.asarray(weights, dtype=np.float64)
+    counts = np.bincount(inverse, weights=w, minlength=m)
+    centroids = np.column_stack([np.bincount(inverse, weights=w * xyz[:, j], minlength=m) for j in range(3)])
+    centroids /= counts[:, None]
+    if weights is None:
+        counts = counts.astype(np.int64)
+    return centroids.astype(np.float32), counts, inverse
+
+
+def build_pyramid(xyz, sizes, log=print):
+    """
+    Verschachtelte Voxel-Stufen; jede Stufe wird aus der vorherigen (gewichtet) gebildet.
+
+    Parameter:
+    xyz   : (n, 3) lokale Koordinaten
+    sizes : aufsteigende Voxelgrössen in m, idealerweise Vielfache voneinander
+
+    Rückgabe:
+    Liste von dicts mit size, centroids, counts (Originalpunkte pro Voxel) und
+    inverse (Voxelnummer jedes Originalpunkts)
+    """
+    sizes = list(sizes)
+    if sizes != sorted(sizes):
+        raise ValueError(f"Voxelgrössen müssen aufsteigend sein: {sizes}")
+    origin = np.floor(np.asarray(xyz).min(axis=0)) if len(xyz) else np.zeros(3)
+    levels = []
+    points, weights, inverse = xyz, None, None
+    for size in sizes:
+        start = time.time()
+        centroids, counts, parent = voxel_downsample(points, size, weights=weights, origin=origin)
+        inverse = parent if inverse is None else parent[inverse]
+        levels.append({"size": size, "centroids": centroids, "counts": np.rint(counts).astype(np.int64),
+                       "inverse": inverse})
+        if log is not None:
+            log(f"Voxel {size:g} m: {len(centroids)} Voxel ({len(xyz) / max(len(centroids), 1):.1f} Punkte/Voxel), "
+                f"{time.time() - start:.1f} s")
+        points, weights = centroids, counts
+    return levels
+
+
+def pyramid_columns(levels=DEFAULT_LEVELS):
+    """Spaltennamen der Pyramiden-Merkmale, z.B. "Planarity (r=1, v=0.5)"."""
+    return [f"{name} (r={r:g}, v={v:g})" for v, r in levels for name in GEOMETRY_FEATURES + ["Voxel count"]]
+
+
+def multiscale_features(points, levels=DEFAULT_LEVELS, k=20, tile_size=50.0, batch_size=100_000,
+                        columns=None, log=print):
+    """
+    Nachbarschaftsmerkmale auf groben Voxel-Stufen, zurückverteilt auf alle Originalpunkte.
+
+    Parameter:
+    points     : (n, 3)-Array, open3d.geometry.PointCloud oder Pfad (.txt / .pwc)
+    levels     : Liste von (Voxelgrösse, Radius) in m
+    k          : Nachbarn pro Voxel-Schwerpunkt im kNN-Graphen
+    tile_size  : Kantenlänge der Kacheln für die KD-Bäume
+    batch_size : Voxel pro Rechenblock
+    columns    : Spaltennamen bei Dateien, ohne Angabe wird das Layout erkannt
+
+    Rückgabe:
+    DataFrame mit den Spalten pyramid_columns(levels), gleiche Reihenfolge wie points.
+    Density bezieht sich auf Voxel-Schwerpunkte pro m³, "Voxel count" ist die Punktanzahl
+    des eigenen Voxels.
+    """
+    levels = list(levels)
+    xyz, _ = as_xyz(points, columns=columns)
+    pyramid = build_pyramid(xyz, [v for v, _ in levels], log=log)
+    blocks = []
+    for (v, r), level in zip(levels, pyramid):
+        start = time.time()
+        indices, distances = build_neighbor_graph(level["centroids"], k=k, tile_size=max(tile_size, r),
+                                                  halo=r, log=None)
+        values, _ = eigen_features(level["centroids"], indices, distances, r, batch_size=batch_size)
+        values = np.column_stack([values, level["counts"].astype(np.float32)])
+        blocks.append(values[level["inverse"]])
+        if log is not None:
+            log(f"  Merkmale v={v:g} m, r={r:g} m: {time.time() - start:.1f} s")
+    return pd.DataFrame(np.hstack(blocks), columns=pyramid_columns(levels))
+
+
+def to_open3d(level, offset=None):
+    """
+    Eine Pyramiden-Stufe als open3d.geometry.PointCloud (Schwerpunkte).
+
+    Parameter:
+    level  : Eintrag aus build_pyramid()
+    offset : optionaler float64-Ursprung, um wieder Landeskoordinaten zu erhalten
+    """
+    import open3d as o3d  # nur für die Anzeige nötig
+
+    centroids = level["centroids"].astype(np.float64)
+    if offset is not None:
+        centroids = centroids + offset
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(centroids)
+    return pcd
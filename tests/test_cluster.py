@@ -0,0 +1,203 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für das KMeans-Backend: jeder Modus gegenüber sklearn, gleiche Merkmale aus
+DataFrame, .pwc und TXT, blockweise Label-Zuweisung und Warmstart über mehrere k sowie
+die Wahl von k (Quoten der geschichteten Stichprobe, Elbow-Tabelle und ihr Neuberechnen) und
+der Modus "histogram" (gleiche Cluster wie KMeans, exakte WCSS aus den Zellsummen).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+from punktwolke.cluster import (
+    BinnedKMeans, compare_with_kmeans, elbow_table, find_elbow, fit_kmeans, fit_kmeans_series,
+    inertia, iter_features, kmeans_sweep, label_agreement, predict_labels, stratified_sample,
+)
+from punktwolke.store import write_points
+
+FEATURES = ["Hue (0-1)", "Z scan dir"]
+CENTERS = np.array([[0.1, 0.9], [0.35, 0.1], [0.6, -0.8], [0.85, 0.5]])
+
+
+def _blobs(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    truth = rng.integers(0, len(CENTERS), n)
+    X = CENTERS[truth] + rng.normal(0, 0.04, (n, 2))
+    df = pd.DataFrame(np.clip(X, [0, -1], [1, 1]), columns=FEATURES).astype(np.float32)
+    return df, truth
+
+
+def _sorted_centers(centers):
+    return centers[np.lexsort(centers.T[::-1])]
+
+
+def test_full_like_sklearn():
+    df, _ = _blobs()
+    model, timings = fit_kmeans(df, FEATURES, 4, mode="full", n_init=3, log=None)
+    reference = KMeans(n_clusters=4, n_init=3, random_state=42).fit(df.to_numpy(dtype=np.float64))
+    np.testing.assert_allclose(model.cluster_centers_, reference.cluster_centers_)
+    assert timings["Punkte"].tolist() == [len(df)]
+
+
+def test_minibatch_like_sklearn():
+    df, _ = _blobs()
+    model, _ = fit_kmeans(df, FEATURES, 4, mode="minibatch", n_init=3, batch_size=2048, log=None)
+    reference = MiniBatchKMeans(n_clusters=4, n_init=3, batch_size=2048, random_state=42)
+    reference.fit(df.to_numpy(dtype=np.float64))
+    np.testing.assert_allclose(model.cluster_centers_, reference.cluster_centers_)
+
+
+def test_streaming_matches_kmeans():
+    df, truth = _blobs()
+    model, timings = fit_kmeans(df, FEATURES, 4, mode="streaming", batch_size=2048, chunksize=5000, log=None)
+    reference = KMeans(n_clusters=4, n_init=3, random_state=42).fit(df.to_numpy(dtype=np.float64))
+    np.testing.assert_allclose(_sorted_centers(model.cluster_centers_),
+                               _sorted_centers(reference.cluster_centers_), atol=0.01)
+    labels = predict_labels(model, df, FEATURES, chunksize=3000)
+    assert label_agreement(labels, truth) > 0.99
+    assert timings["Punkte"].sum() == len(df)
+
+
+def test_features_from_every_source(tmp_path):
+    df, _ = _blobs(n=1000)
+    write_points(df, tmp_path / "PW.pwc")
+    df.to_csv(tmp_path / "PW.txt", sep=";", index=False, header=False)
+    expected = df.to_numpy(dtype=np.float64)
+    for source in (df, tmp_path / "PW.pwc", tmp_path / "PW.txt"):
+        blocks = list(iter_features(source, FEATURES, chunksize=300, columns=FEATURES))
+        assert [len(b) for b in blocks] == [300, 300, 300, 100]
+        np.testing.assert_array_equal(np.concatenate(blocks), expected)
+
+
+def test_label_agreement():
+    assert label_agreement([0, 0, 1, 1, 2], [5, 5, 3, 3, 3]) == pytest.approx(0.8)
+
+
+def test_series_warm_start():
+    df, _ = _blobs(n=5000)
+    lines = []
+    results = fit_kmeans_series(df, FEATURES, [4, 2, 3], mode="minibatch", sample_size=2000, log=lines.append)
+    assert sorted(results) == [2, 3, 4]
+    assert [len(results[k][0].cluster_centers_) for k in (2, 3, 4)] == [2, 3, 4]
+    headers = [line for line in lines if line.startswith("k = ")]
+    assert headers == ["k = 2 (k-means++)", "k = 3 (Warmstart)", "k = 4 (Warmstart)"]
+
+
+def test_invalid_mode_and_too_few_points():
+    df, _ = _blobs(n=10)
+    with pytest.raises(ValueError, match="Unbekannter Modus"):
+        fit_kmeans(df, FEATURES, 2, mode="elkan")
+    with pytest.raises(ValueError, match="Zu wenige Punkte"):
+        fit_kmeans(df, FEATURES, 20, mode="streaming", log=None)
+
+
+# ----------------------------------------------------------------
+# Wahl von k (stratified_sample, kmeans_sweep, elbow_table)
+# ----------------------------------------------------------------
+def _cell_counts(X, bins):
+    lo, hi = X.min(axis=0), X.max(axis=0)
+    idx = np.clip(((X - lo) / ((hi - lo) / bins)).astype(np.int64), 0, bins - 1)
+    return np.unique(np.ravel_multi_index(idx.T, (bins, bins)), return_inverse=True, return_counts=True)
+
+
+def test_stratified_sample_quotas():
+    df, _ = _blobs()
+    df.iloc[:3] = [[0.99, -0.99], [0.98, -0.98], [0.99, -0.98]]  # seltene Farbe
+    X_all = df.to_numpy(dtype=np.float64)
+    X, weights = stratified_sample(df, FEATURES, sample_size=2000, bins=8, min_per_stratum=2)
+
+    assert weights.sum() == pytest.approx(len(df), rel=1e-12)
+    assert len(np.unique(X, axis=0)) == len(X)
+    assert any((X == X_all[0]).all(axis=1))  # seltene Zelle ist vertreten
+
+    cells, inverse, counts = _cell_counts(X_all, 8)
+    quota = np.clip(np.rint(counts * 2000 / len(df)), 2, counts)
+    lookup = {tuple(row): inverse[i] for i, row in enumerate(X_all)}
+    cell = np.array([lookup[tuple(row)] for row in X])  # KeyError, falls ein Punkt nicht aus df stammt
+    np.testing.assert_array_equal(np.bincount(cell, minlength=len(cells)), quota)
+    np.testing.assert_allclose(weights, counts[cell] / quota[cell])
+
+
+def test_stratified_sample_reproducible(tmp_path):
+    df, _ = _blobs(n=3000)
+    write_points(df, tmp_path / "PW.pwc")
+    a = stratified_sample(df, FEATURES, sample_size=500, random_state=1)
+    b = stratified_sample(tmp_path / "PW.pwc", FEATURES, sample_size=500, random_state=1)
+    np.testing.assert_array_equal(a[0], b[0])
+    np.testing.assert_array_equal(a[1], b[1])
+
+
+def test_find_elbow():
+    assert find_elbow([1, 2, 3, 4, 5, 6], [100, 40, 15, 12, 10, 9]) == 2
+    assert find_elbow([2, 3], [5, 5]) == 0
+
+
+def test_kmeans_sweep():
+    df, _ = _blobs()
+    table = kmeans_sweep(df, FEATURES, [6, 2, 3, 4, 5], sample_size=3000, n_init=2, max_workers=2)
+    assert table["k"].tolist() == [2, 3, 4, 5, 6]
+    assert table["Elbow"].sum() == 1 and table.loc[table["Elbow"], "k"].item() == 4
+    assert (np.diff(table["WCSS"]) < 0).all()
+    full = KMeans(n_clusters=4, n_init=2, random_state=42).fit(df.to_numpy(dtype=np.float64))
+    assert table.loc[2, "WCSS"] == pytest.approx(full.inertia_, rel=0.05)
+
+
+def test_elbow_table_recomputes_on_change(tmp_path):
+    df, _ = _blobs(n=3000)
+    source = tmp_path / "PW.pwc"
+    write_points(df, source)
+    table_path = tmp_path / "elbow" / "elbow.csv"
+    kwargs = dict(sample_size=1000, n_init=1, max_workers=1)
+
+    lines = []
+    first = elbow_table(source, FEATURES, [2, 3, 4], table_path, log=lines.append, **kwargs)
+    second = elbow_table(source, FEATURES, [4, 3, 2], table_path, log=lines.append, **kwargs)
+    pd.testing.assert_frame_equal(first, second, check_exact=False)
+    assert "geladen" in lines[-1]
+
+    elbow_table(source, FEATURES, [2, 3], table_path, log=lines.append, **kwargs)
+    assert lines[-1].startswith("Berechne")
+    assert len(pd.read_csv(table_path)) == 2
+
+    mtime = table_path.stat().st_mtime_ns + 10**9
+    os.utime(source, ns=(mtime, mtime))
+    elbow_table(source, FEATURES, [2, 3], table_path, log=lines.append, **kwargs)
+    assert lines[-1].startswith("Berechne")
+
+
+# ----------------------------------------------------------------
+# Modus "histogram" (BinnedKMeans)
+# ----------------------------------------------------------------
+def test_histogram_matches_kmeans():
+    df, truth = _blobs()
+    model, timings = fit_kmeans(df, FEATURES, 4, mode="histogram", hist_bins=128, n_init=3, chunksize=6000,
+                                log=None)
+    assert isinstance(model, BinnedKMeans)
+    assert timings["Punkte"].tolist() == [len(df), model.n_cells_]
+    agreement, shift = compare_with_kmeans(model, df, FEATURES, sample_size=10_000, n_init=3)
+    assert agreement > 0.99 and shift < 0.01
+    assert label_agreement(predict_labels(model, df, FEATURES, chunksize=7000), truth) > 0.99
+
+
+def test_histogram_inertia_exact():
+    df, _ = _blobs(n=5000)
+    model, _ = fit_kmeans(df, FEATURES, 3, mode="histogram", hist_bins=32, log=None)
+    assert model.inertia_ == pytest.approx(inertia(model, df, FEATURES), rel=1e-9)
+
+
+def test_histogram_cell_limit():
+    df, _ = _blobs(n=100)
+    with pytest.raises(ValueError, match="Rasterzellen, Maximum"):
+        fit_kmeans(df, FEATURES, 2, mode="histogram", hist_bins=10_000, log=None)
+    with pytest.raises(ValueError, match="besetzte Rasterzellen"):
+        fit_kmeans(df.iloc[:3], FEATURES, 4, mode="histogram", hist_bins=4, log=None)
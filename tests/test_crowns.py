@@ -0,0 +1,68 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Regressionstest: tiled_segment_crowns() muss auf einem synthetischen CHM mit kontinuierlichen
+Höhen dieselben Gipfel und Kronen liefern wie segment_crowns() in einem Stück. Bei gerundeten
+Höhen (Gleichstand) muss die Zusammenfassung die betroffenen Pixel ausweisen.
+"""
+
+import numpy as np
+import pytest
+
+from punktwolke.crowns import segment_crowns, tiled_segment_crowns, tied_pixels
+
+
+def _chm(seed, n=400, n_trees=600, r_max=7):
+    """Paraboloid-Kronen mit zufälligem Radius und Höhe plus Rauschen, ausserhalb 0."""
+    rng = np.random.default_rng(seed)
+    chm = np.zeros((n, n))
+    yy, xx = np.mgrid[:n, :n]
+    for cy, cx in rng.random((n_trees, 2)) * n:
+        r, h = rng.uniform(2, r_max), rng.uniform(5, 25)
+        sl = (slice(max(int(cy - r_max - 1), 0), int(cy + r_max + 2)),
+              slice(max(int(cx - r_max - 1), 0), int(cx + r_max + 2)))
+        d = np.hypot(yy[sl] - cy, xx[sl] - cx)
+        crown = np.where(d < r, h * (1 - (d / r) ** 2) + 1 + rng.random(d.shape) * 0.3, 0)
+        chm[sl] = np.maximum(chm[sl], crown)
+    return chm
+
+
+@pytest.mark.parametrize("seed, sigma, min_distance, tile_size, halo", [
+    (0, 0, 2, 128, 16),
+    (1, 1.0, 3, 100, 16),
+    (2, 0.5, 2, 150, 4),  # zu kleiner Rand, muss vergrössert werden
+])
+def test_tiled_like_single(seed, sigma, min_distance, tile_size, halo):
+    chm = _chm(seed)
+    labels, local_max, chm_smooth = segment_crowns(chm, min_distance, sigma, 1.0)
+    labels_t, local_max_t, chm_smooth_t, summary = tiled_segment_crowns(
+        chm, min_distance, sigma, 1.0, tile_size=tile_size, halo=halo, max_workers=2, log=None)
+
+    np.testing.assert_array_equal(chm_smooth_t, chm_smooth)
+    np.testing.assert_array_equal(local_max_t, local_max)
+    np.testing.assert_array_equal(labels_t, labels)
+    assert summary["Konflikte"].sum() == 0
+    assert summary["Gleiche_Hoehe_px"].sum() == 0
+    assert len(summary) == int(np.ceil(chm.shape[0] / tile_size)) ** 2
+
+
+def test_ties_reported():
+    chm = np.round(_chm(3), 1)
+    *_, summary = tiled_segment_crowns(chm, 2, 0, 1.0, tile_size=128, max_workers=2, log=None)
+    assert summary["Gleiche_Hoehe_px"].sum() == tied_pixels(chm, chm > 0).sum() > 0
+
+
+def test_tied_pixels():
+    values = np.array([[1.0, 1.0, 2.0],
+                       [3.0, 4.0, 5.0],
+                       [6.0, 0.0, 3.0]])
+    tied = tied_pixels(values, values > 0)
+    expected = np.array([[True, True, False],
+                         [False, False, False],
+                         [False, False, False]])
+    np.testing.assert_array_equal(tied, expected)
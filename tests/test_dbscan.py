@@ -0,0 +1,67 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Regressionstest: dbscan_grid() muss dieselben Labels liefern wie sklearn.cluster.DBSCAN
+(zufällige Cluster mit Rauschen und ganzzahlige Gitter, bei denen viele Abstände genau eps sind).
+"""
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+
+from punktwolke.dbscan import core_mask, dbscan_grid
+
+
+def _blobs(seed, n_centers=40, extent=60.0):
+    rng = np.random.default_rng(seed)
+    centers = rng.random((n_centers, 2)) * extent
+    parts = [c + rng.normal(0, rng.uniform(0.3, 2.0), (rng.integers(20, 300), 2)) for c in centers]
+    parts.append(rng.random((1500, 2)) * extent)  # Rauschen
+    xy = np.vstack(parts)
+    return xy[rng.permutation(len(xy))] + [2_611_000.0, 1_267_000.0]  # LV95-Grössenordnung
+
+
+def _lattice(seed):
+    """Ganzzahliges Gitter mit Lücken: Abstände von genau 1, √2, 2 kommen sehr oft vor."""
+    rng = np.random.default_rng(seed)
+    xy = np.mgrid[0:40, 0:40].reshape(2, -1).T.astype(np.float64)
+    xy = xy[rng.random(len(xy)) < 0.7]
+    return xy[rng.permutation(len(xy))]
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("eps, min_samples", [(0.8, 10), (1.2, 25), (0.5, 4)])
+def test_blobs_like_sklearn(seed, eps, min_samples):
+    xy = _blobs(seed)
+    expected = DBSCAN(eps=eps, min_samples=min_samples).fit(xy)
+    np.testing.assert_array_equal(dbscan_grid(xy, eps=eps, min_samples=min_samples), expected.labels_)
+    core = np.zeros(len(xy), dtype=bool)
+    core[expected.core_sample_indices_] = True
+    np.testing.assert_array_equal(core_mask(xy, eps=eps, min_samples=min_samples), core)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("eps, min_samples", [(1.0, 4), (1.0, 5), (2.0, 9), (np.sqrt(2), 6)])
+def test_lattice_ties_like_sklearn(seed, eps, min_samples):
+    xy = _lattice(seed)
+    expected = DBSCAN(eps=eps, min_samples=min_samples).fit_predict(xy)
+    np.testing.assert_array_equal(dbscan_grid(xy, eps=eps, min_samples=min_samples), expected)
+
+
+def test_border_point_between_two_clusters():
+    """Randpunkt im Umkreis zweier Cluster: sklearn vergibt die kleinere Cluster-Nummer."""
+    a = np.mgrid[0:3, 0:3].reshape(2, -1).T * 0.3
+    xy = np.vstack([a + [5.0, 0.0], [[4.0, 0.3]], a + [2.4, 0.0]])
+    expected = DBSCAN(eps=1.0, min_samples=9).fit_predict(xy)
+    np.testing.assert_array_equal(dbscan_grid(xy, eps=1.0, min_samples=9), expected)
+
+
+def test_empty_and_all_noise():
+    assert len(dbscan_grid(np.empty((0, 2)))) == 0
+    xy = np.arange(20, dtype=np.float64).reshape(-1, 2) * 10
+    np.testing.assert_array_equal(dbscan_grid(xy, eps=1.0, min_samples=2), np.full(10, -1))
@@ -0,0 +1,102 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die baumbasierte Klassifikation: Klassengrenzen des BinQuantizer, Stichprobe aus
+dem Trainings-Cache und Auswertung (Bericht, Confusion Matrix, Wichtigkeit der Merkmale).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.forest import (
+    BinQuantizer, class_report, confusion_table, feature_importances, make_forest, sample_training_data,
+)
+from punktwolke.schema import get_layout
+from punktwolke.training import prepare_training_data
+
+FEATURES = ["Hue (0-1)", "Saturation (0-1)", "Z scan dir"]
+CLASSES = ["Baum", "Dach", "Strasse"]
+
+
+def test_quantizer_edges():
+    X = np.column_stack([np.arange(1000, dtype=np.float64), np.repeat([0.0, 1.0, 2.0, 2.0], 250)])
+    quantizer = BinQuantizer(n_bins=10).fit(X)
+    edges0, edges1 = quantizer.edges_
+    assert len(edges0) == 9
+    assert len(edges1) < 9 and np.all(np.diff(edges1) > 0)  # doppelte Quantile zusammengefasst
+
+    Xt = quantizer.transform(X)
+    assert Xt.dtype == np.float32
+    np.testing.assert_array_equal(Xt[:, 0], np.digitize(X[:, 0].astype(np.float32), edges0))
+    # Wert genau auf einer Grenze gehört zur oberen Klasse
+    assert quantizer.transform([[edges0[0], 1.0]]).tolist() == [[1.0, 2.0]]
+    assert Xt[:, 0].max() == 9 and np.unique(Xt[:, 1]).size == len(np.unique(X[:, 1]))
+
+
+def test_quantizer_errors():
+    with pytest.raises(ValueError, match="n_bins"):
+        BinQuantizer(n_bins=300).fit(np.zeros((10, 1)))
+    quantizer = BinQuantizer(n_bins=4).fit(np.random.default_rng(0).random((50, 2)))
+    with pytest.raises(ValueError, match="3 Merkmale"):
+        quantizer.transform(np.zeros((2, 3)))
+
+
+@pytest.fixture
+def training_data(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 6000
+    names = rng.choice(CLASSES, n, p=[0.7, 0.2, 0.1])
+    code = np.searchsorted(CLASSES, names)
+    colours = np.clip(rng.normal(0.2 + 0.3 * code[:, None], 0.08, (n, 6)), 0, 1)
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    df = pd.DataFrame(np.column_stack([rng.random((n, 3)) * 100, np.round(colours, 6), np.round(normals, 6)]))
+    df["name"] = names
+    source = tmp_path / "PW_Klass.txt"
+    df.to_csv(source, sep=";", index=False, header=False, decimal=".")
+    return prepare_training_data([source], FEATURES, "Klassenname", tmp_path / "cache",
+                                 columns=get_layout("normalisiert_klassenname"), log=None)
+
+
+def test_sample_training_data(training_data):
+    X_train, y_train, X_val, y_val, timing = sample_training_data(training_data, budget=500,
+                                                                  validation_size=1000, log=None)
+    assert X_train.dtype == np.float32 and X_train.shape == (len(y_train), 3)
+    counts = training_data["counts"]
+    assert np.bincount(y_train).tolist() == np.minimum(counts, 500).tolist()
+    assert len(y_val) == 1000
+    assert timing["Klasse"].tolist() == CLASSES
+    assert timing["Training"].tolist() == np.minimum(counts, 500).tolist()
+    # Training und Validierung überschneiden sich nicht
+    train_rows = {tuple(r) for r in X_train}
+    assert not any(tuple(r) in train_rows for r in X_val)
+
+
+@pytest.mark.parametrize("mode, method", [("rf", "Gini"), ("hgb", "Permutation")])
+def test_forest_modes(training_data, mode, method):
+    X_train, y_train, X_val, y_val, _ = sample_training_data(training_data, budget=500,
+                                                             validation_size=1000, log=None)
+    model = make_forest(mode, n_estimators=20, n_bins=32, n_jobs=1).fit(X_train, y_train)
+    report, y_pred = class_report(model, X_val, y_val, CLASSES)
+    assert report["Klasse"].tolist() == CLASSES
+    assert (report["F1"] > 0.9).all()
+    np.testing.assert_array_equal(y_pred, model.predict(X_val))
+
+    matrix = confusion_table(y_val, y_pred, CLASSES)
+    assert matrix.to_numpy().sum() == len(y_val) and list(matrix.columns) == CLASSES
+
+    importances = feature_importances(model, FEATURES, X_val, y_val, n_repeats=2, n_jobs=1)
+    assert sorted(importances["Merkmal"]) == sorted(FEATURES)
+    assert (importances["Methode"] == method).all()
+    assert importances["Wichtigkeit"].is_monotonic_decreasing
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError, match="Unbekannter Modus"):
+        make_forest("xgb")
@@ -0,0 +1,124 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die Nachbarschaftsmerkmale: gekachelter kNN-Graph gegen einen globalen cKDTree,
+Wiederverwendung des gespeicherten Graphen und Eigenwert-Merkmale auf Ebene und Linie.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.spatial import cKDTree
+
+from punktwolke.geometry import (
+    GEOMETRY_FEATURES, build_neighbor_graph, eigen_features, feature_columns, geometric_features,
+    neighbor_graph,
+)
+
+COLUMNS = ["X", "Y", "Z"]
+
+
+def _points(n=4000, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n, 3)) * [40.0, 30.0, 5.0]).astype(np.float32)
+
+
+def _write(path, xyz):
+    pd.DataFrame(xyz.astype(np.float64)).to_csv(path, sep=";", index=False, header=False)
+    return path
+
+
+def test_tiled_graph_matches_global_tree():
+    xyz = _points()
+    k, halo = 8, 3.0
+    indices, distances = build_neighbor_graph(xyz, k=k, tile_size=5.0, halo=halo, log=None)
+    d, i = cKDTree(xyz).query(xyz, k=k)
+    assert indices.dtype == np.int32 and distances.dtype == np.float16
+    # alle Nachbarn innerhalb halo sind exakt (Distanzen bis auf float16-Rundung)
+    exact = d[:, -1] <= halo
+    assert exact.mean() > 0.99
+    np.testing.assert_allclose(distances[exact].astype(np.float64), d[exact], rtol=1e-3, atol=1e-3)
+    assert np.all(indices[:, 0] == np.arange(len(xyz)))
+
+
+def test_small_tiles_pad_with_self():
+    xyz = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32)
+    indices, distances = build_neighbor_graph(xyz, k=5, tile_size=10.0, halo=2.0, log=None)
+    assert np.all(indices[:, 3:] == np.arange(3)[:, None])
+    assert np.all(np.isinf(distances[:, 3:].astype(np.float32)))
+
+
+def test_halo_larger_than_tile():
+    with pytest.raises(ValueError, match="halo"):
+        build_neighbor_graph(_points(10), tile_size=1.0, halo=2.0, log=None)
+
+
+def test_graph_cache(tmp_path):
+    source = _write(tmp_path / "PW.txt", _points(500))
+    logs = []
+    xyz, indices, _ = neighbor_graph(source, k=6, radius=2.0, columns=COLUMNS, log=logs.append)
+    assert (tmp_path / "PW.knn" / "indices.npy").is_file()
+    assert not any("geladen" in line for line in logs)
+
+    for radius in (2.0, 1.0):  # kleinerer Radius nutzt denselben Graphen
+        logs.clear()
+        _, cached, _ = neighbor_graph(source, k=6, radius=radius, columns=COLUMNS, log=logs.append)
+        assert logs == ["kNN-Graph aus PW.knn geladen"]
+        np.testing.assert_array_equal(cached, indices)
+
+    for kwargs in ({"k": 7, "radius": 2.0}, {"k": 6, "radius": 3.0}):
+        logs.clear()
+        neighbor_graph(source, columns=COLUMNS, log=logs.append, **kwargs)
+        assert not any("geladen" in line for line in logs)
+
+    # neuere Quelle → neu bauen
+    meta = tmp_path / "PW.knn" / "graph.json"
+    os.utime(source, (meta.stat().st_mtime + 10, meta.stat().st_mtime + 10))
+    logs.clear()
+    neighbor_graph(source, k=6, radius=3.0, columns=COLUMNS, log=logs.append)
+    assert not any("geladen" in line for line in logs)
+
+
+def _shape_features(xyz, radius=1.0):
+    indices, distances = build_neighbor_graph(xyz, k=20, tile_size=50.0, halo=radius, log=None)
+    features, _ = eigen_features(xyz, indices, distances, radius, batch_size=333)
+    return pd.DataFrame(features, columns=GEOMETRY_FEATURES)
+
+
+def test_plane_and_line():
+    rng = np.random.default_rng(1)
+    plane = np.column_stack([rng.random((3000, 2)) * 10, np.zeros(3000)]).astype(np.float32)
+    features = _shape_features(plane)
+    assert features["Planarity"].median() > features["Linearity"].median()
+    assert features["Sphericity"].max() < 1e-4
+    assert features["Verticality"].max() < 1e-3
+    assert features["Height range"].max() == 0
+
+    wall = plane[:, [0, 2, 1]]
+    assert _shape_features(wall)["Verticality"].min() > 0.999
+
+    line = np.column_stack([np.linspace(0, 10, 1000), np.zeros(1000), np.zeros(1000)]).astype(np.float32)
+    assert _shape_features(line)["Linearity"].min() > 0.999
+
+
+def test_density_and_saturation():
+    xyz = _points(2000)
+    indices, distances = build_neighbor_graph(xyz, k=10, tile_size=50.0, halo=5.0, log=None)
+    features, saturated = eigen_features(xyz, indices, distances, 5.0)
+    counts = (distances.astype(np.float32) <= 5.0).sum(axis=1)
+    np.testing.assert_allclose(features[:, 5], counts / (4 / 3 * np.pi * 125), rtol=1e-6)
+    assert saturated == np.mean(counts == 10)
+
+
+def test_geometric_features_columns(tmp_path):
+    source = _write(tmp_path / "PW.txt", _points(300))
+    table = geometric_features(source, radii=(0.5, 2.0), k=6, columns=COLUMNS, log=None)
+    assert list(table.columns) == feature_columns([0.5, 2.0])
+    assert table.columns[0] == "Linearity (r=0.5)" and len(table) == 300
@@ -0,0 +1,92 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die Geometrie pro Gruppe: sortierte Abschnitte, Hüllen und Durchmesserfilter gegen
+die bisherige Schleife mit einer Bool-Maske und ConvexHull pro Cluster.
+"""
+
+import numpy as np
+import pytest
+from scipy.spatial import ConvexHull
+
+from punktwolke.groups import crown_diameter, diameter_mask, group_geometry, group_slices
+
+
+def _clusters(seed=0, n_groups=60):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 80, n_groups)
+    centres = rng.random((n_groups, 2)) * 500
+    xy = np.concatenate([rng.normal(c, rng.uniform(0.5, 4), (s, 2)) for c, s in zip(centres, sizes)])
+    labels = np.repeat(rng.permutation(n_groups) * 3, sizes)
+    noise = rng.random(len(xy)) < 0.1
+    labels[noise] = -1
+    shuffle = rng.permutation(len(xy))
+    return xy[shuffle], labels[shuffle]
+
+
+def _loop_mask(xy, labels, diameter_min, diameter_max, min_points=5):
+    """Bisheriger Filter: eine Maske und eine Hülle pro Cluster."""
+    keep = np.zeros(len(labels), dtype=bool)
+    for label in np.unique(labels[labels >= 0]):
+        mask = labels == label
+        if mask.sum() < min_points:
+            continue
+        diameter = np.sqrt(4 * ConvexHull(xy[mask]).area / np.pi)
+        if diameter_min <= diameter <= diameter_max:
+            keep |= mask
+    return keep
+
+
+def test_group_slices():
+    labels = np.array([3, -1, 1, 3, 1, -1, 7])
+    order, groups, starts = group_slices(labels)
+    assert order.tolist() == [2, 4, 0, 3, 6] and groups.tolist() == [1, 3, 7] and starts.tolist() == [0, 2, 4]
+    order, groups, _ = group_slices(labels, ignore=None)
+    assert order.tolist() == [1, 5, 2, 4, 0, 3, 6] and groups.tolist() == [-1, 1, 3, 7]
+
+
+@pytest.mark.parametrize("max_workers, groups_per_job", [(1, 500), (1, 7), (2, 7)])
+def test_geometry_like_loop(max_workers, groups_per_job):
+    xy, labels = _clusters()
+    table = group_geometry(xy, labels, max_workers=max_workers, groups_per_job=groups_per_job)
+    assert table.index.tolist() == np.unique(labels[labels >= 0]).tolist()
+    for label, row in table.iterrows():
+        pts = xy[labels == label]
+        assert row["Punkte"] == len(pts)
+        assert (row["X_min"], row["Y_max"]) == (pts[:, 0].min(), pts[:, 1].max())
+        if len(pts) < 5:
+            assert np.isnan(row["Flaeche_m2"]) and np.isnan(row["Umfang_m"])
+        else:
+            hull = ConvexHull(pts)
+            assert row["Flaeche_m2"] == pytest.approx(hull.volume)
+            assert row["Umfang_m"] == pytest.approx(hull.area)
+
+
+def test_degenerate_and_empty():
+    xy = np.column_stack([np.arange(6.0), np.zeros(6)])  # alle Punkte auf einer Linie
+    table = group_geometry(xy, np.zeros(6, dtype=int))
+    assert np.isnan(table.loc[0, "Flaeche_m2"]) and table.loc[0, "Punkte"] == 6
+    empty = group_geometry(xy, np.full(6, -1))
+    assert len(empty) == 0 and empty.index.name == "Label"
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_diameter_mask_like_loop(seed):
+    xy, labels = _clusters(seed)
+    keep, table = diameter_mask(xy, labels, 4.0, 8.0)
+    np.testing.assert_array_equal(keep, _loop_mask(xy, labels, 4.0, 8.0))
+    assert table["Behalten"].dtype == bool and not keep[labels == -1].any()
+
+
+def test_crown_diameter():
+    square = np.array([[0, 0], [2, 0], [2, 2], [0, 2], [1, 1]], dtype=float)
+    table = group_geometry(square, np.zeros(5, dtype=int))
+    assert crown_diameter(table, "area")[0] == pytest.approx(np.sqrt(16 / np.pi))
+    assert crown_diameter(table, "perimeter")[0] == pytest.approx(np.sqrt(32 / np.pi))
+    with pytest.raises(ValueError, match="Unbekanntes Mass"):
+        crown_diameter(table, "radius")
@@ -0,0 +1,96 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die kachelweise Klassifikation: gleiche Vorhersagen in gleicher Reihenfolge wie
+ein einziges model.predict(), für .pwc und TXT, mit Scaler und Speichergrenze.
+"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from punktwolke.inference import (
+    PREDICTED_LABEL, block_size_for_memory, run_inference, to_label_codes,
+)
+from punktwolke.schema import get_layout
+from punktwolke.store import load_points, read_schema, write_points
+
+LAYOUT = get_layout("normalisiert")
+FEATURES = ["Hue (0-1)", "Saturation (0-1)", "Z scan dir"]
+
+
+def _points(n=12_000, seed=0):
+    rng = np.random.default_rng(seed)
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    values = np.column_stack([np.round(rng.random((n, 3)) * 100, 3), np.round(rng.random((n, 6)), 6),
+                              np.round(normals, 6)])
+    return pd.DataFrame(values, columns=LAYOUT)
+
+
+@pytest.fixture
+def model_files(tmp_path):
+    df = _points(n=3000, seed=1)
+    X = df[FEATURES].to_numpy()
+    y = (X[:, 0] * 4).astype(int) + 4 * (X[:, 2] > 0)  # 8 Klassen
+    scaler = StandardScaler().fit(X)
+    model = DecisionTreeClassifier(random_state=0).fit(scaler.transform(X), y)
+    joblib.dump(model, tmp_path / "model.pkl")
+    joblib.dump(scaler, tmp_path / "scaler.pkl")
+    return tmp_path / "model.pkl", tmp_path / "scaler.pkl", model, scaler
+
+
+@pytest.mark.parametrize("suffix", [".pwc", ".txt"])
+def test_inference_keeps_input_order(tmp_path, model_files, suffix):
+    model_path, scaler_path, model, scaler = model_files
+    df = _points()
+    source = tmp_path / f"PW{suffix}"
+    if suffix == ".pwc":
+        write_points(df, source)
+    else:
+        df.to_csv(source, sep=";", index=False, header=False, decimal=".")
+    X = load_points(source, columns=LAYOUT)[FEATURES].to_numpy(dtype=np.float64)
+    expected = model.predict(scaler.transform(X))
+
+    labels, stats = run_inference(model_path, source, FEATURES, output_path=tmp_path / "pred.pwc",
+                                  scaler_path=scaler_path, columns=LAYOUT, block_size=1000, max_workers=3,
+                                  log=None)
+    assert labels.dtype == np.uint8
+    np.testing.assert_array_equal(labels, expected)
+    assert stats["Punkte"] == len(df) and stats["Bloecke"] == 12
+    assert stats["Worker_Tabelle"]["Punkte"].sum() == len(df)
+
+    assert read_schema(tmp_path / "pred.pwc")["columns"][0]["dtype"] == "|u1"
+    np.testing.assert_array_equal(load_points(tmp_path / "pred.pwc")[PREDICTED_LABEL], expected)
+
+
+def test_memory_limit_sets_block_size(tmp_path, model_files):
+    model_path, scaler_path, model, scaler = model_files
+    write_points(_points(n=5000), tmp_path / "PW.pwc")
+    lines = []
+    labels, stats = run_inference(model_path, tmp_path / "PW.pwc", FEATURES, scaler_path=scaler_path,
+                                  max_memory_mb=0.01, max_workers=2, probe_size=500, log=lines.append)
+    assert stats["Block_Punkte"] == 1000  # Untergrenze min_block
+    assert lines[0].startswith("Speicher:")
+    assert len(labels) == 5000
+
+
+def test_block_size_for_memory():
+    assert block_size_for_memory(100, 1024) == 102_400
+    assert block_size_for_memory(1, 10**9) == 1_000
+
+
+def test_to_label_codes():
+    assert to_label_codes(np.array([0.0, 3.0, 255.0])).tolist() == [0, 3, 255]
+    with pytest.raises(ValueError, match="keine Klassencodes"):
+        to_label_codes(np.array(["Dach", "Baum"]))
+    with pytest.raises(ValueError, match="uint8"):
+        to_label_codes(np.array([0, 300]))
@@ -0,0 +1,97 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die Normalisierung: rgb_to_hsv() gegenüber colorsys, blockweises Normalisieren
+einer Datei (gleiches Resultat wie in einem Stück, Zusatzspalten bleiben erhalten) und
+parallele Normalisierung mehrerer Dateien mit Manifest.
+"""
+
+import colorsys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.normalize import (
+    normalize_batch, normalize_chunk, normalize_file, output_columns, rgb_to_hsv,
+)
+from punktwolke.schema import get_layout
+from punktwolke.store import load_points
+
+ROH_KLASSE = get_layout("roh") + ["Klasse"]
+
+
+def _roh(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, (n, 3)).astype(np.float64)
+    rgb[:30] = rgb[:30, :1]  # Grauwerte
+    rgb[30:40] = [255, 255, 0]  # zwei gleiche Maxima
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    xyz = rng.random((n, 3)) * 100 + [2_611_000.0, 1_267_000.0, 260.0]
+    values = np.column_stack([np.round(xyz, 3), rgb, np.round(normals, 6), rng.integers(0, 5, n)])
+    return pd.DataFrame(values, columns=ROH_KLASSE)
+
+
+def test_rgb_to_hsv_like_colorsys():
+    rgb = _roh()[["Red", "Green", "Blue"]].to_numpy() / 255.0
+    rgb = np.vstack([rgb, np.eye(3), [[0, 0, 0], [1, 1, 1], [0, 1, 1], [1, 0, 1]]])
+    h, s, v = rgb_to_hsv(*rgb.T)
+    expected = np.array([colorsys.rgb_to_hsv(*row) for row in rgb])
+    np.testing.assert_array_equal(np.column_stack([h, s, v]), expected)
+
+
+def test_output_columns():
+    assert output_columns(ROH_KLASSE) == get_layout("normalisiert") + ["Klasse"]
+    with pytest.raises(KeyError, match="Spaltengruppen"):
+        output_columns(["X", "Y", "Z"])
+
+
+@pytest.mark.parametrize("suffix", [".txt", ".pwc"])
+def test_normalize_file_in_blocks(tmp_path, suffix):
+    df = _roh()
+    source = tmp_path / "PW_Klasse.txt"
+    df.to_csv(source, sep=";", index=False, header=False, decimal=".")
+    ticks = []
+    n_points = normalize_file(source, tmp_path / f"out{suffix}", columns=ROH_KLASSE, chunksize=300,
+                              progress=ticks.append)
+    assert n_points == len(df)
+    assert ticks[-1] == len(df) and len(ticks) == 7
+
+    out = load_points(tmp_path / f"out{suffix}", columns=output_columns(ROH_KLASSE))
+    expected = normalize_chunk(load_points(source, columns=ROH_KLASSE))
+    assert list(out.columns) == list(expected.columns)
+    np.testing.assert_allclose(out.to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64),
+                               rtol=1e-6, atol=1e-7)
+    np.testing.assert_array_equal(out["Klasse"], df["Klasse"])
+
+
+
+def test_normalize_batch(tmp_path):
+    jobs = []
+    for i in range(3):
+        source = tmp_path / f"PW_Klasse_{i}.txt"
+        _roh(n=500 + 100 * i, seed=i).to_csv(source, sep=";", index=False, header=False, decimal=".")
+        jobs.append((source, tmp_path / f"PW_Klasse_{i}_normalisiert.txt"))
+
+    manifest = normalize_batch(jobs, columns=ROH_KLASSE, chunksize=200, max_workers=2,
+                               manifest_path=tmp_path / "manifest.csv")
+    assert manifest["Eingabe"].tolist() == [str(i) for i, _ in jobs] + ["GESAMT"]
+    assert manifest["Punkte"].tolist() == [500, 600, 700, 1800]
+    assert manifest.iloc[-1]["Ausgabe"] == "2 Worker"
+    assert (tmp_path / "manifest.csv").is_file()
+
+    for source, output in jobs:
+        single = tmp_path / "single.txt"
+        normalize_file(source, single, columns=ROH_KLASSE)
+        assert output.read_text() == single.read_text()
+
+
+def test_normalize_batch_without_jobs():
+    with pytest.raises(ValueError, match="Keine Dateien"):
+        normalize_batch([])
@@ -0,0 +1,78 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für das Aufteilen nach Orientierung: Klassengrenzen wie im bisherigen Skript,
+Spaltenreihenfolge der Ausgabe und gleiche Zählungen in split_orientation() und
+sweep_thresholds().
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.orientation import (
+    angle_to_xy_plane, orientation_index, read_normals, split_orientation, sweep_thresholds,
+)
+from punktwolke.store import load_points
+
+COLUMNS = ["X", "Y", "Z", "R", "G", "B", "X scan dir", "Y scan dir", "Z scan dir"]
+THRESHOLDS = [0.25, 0.985]
+
+
+def _write_txt(path, n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    normals[:20, 2] = THRESHOLDS[0]  # Werte genau auf den Grenzen
+    normals[20:40, 2] = -THRESHOLDS[1]
+    df = pd.DataFrame(np.column_stack([rng.random((n, 3)) * 100, rng.integers(0, 256, (n, 3)), normals]))
+    df.to_csv(path, sep=";", index=False, header=False, decimal=".", float_format="%.6f")
+    return path
+
+
+def _baseline(nz, flat_thresh, upright_thresh):
+    """Einteilung wie im bisherigen classify_orientation() pro Zeile."""
+    z_abs = np.abs(nz)
+    return np.where(z_abs >= upright_thresh, 2, np.where(z_abs <= flat_thresh, 0, 1))
+
+
+def test_orientation_index_like_baseline():
+    nz = np.r_[np.linspace(-1, 1, 2001), THRESHOLDS, -np.asarray(THRESHOLDS)]
+    np.testing.assert_array_equal(orientation_index(nz, THRESHOLDS), _baseline(nz, *THRESHOLDS))
+
+
+def test_angle_to_xy_plane():
+    np.testing.assert_allclose(angle_to_xy_plane([1.0, -1.0, 0.0, 0.5]), [0.0, 0.0, 90.0, 60.0])
+
+
+def test_split_and_sweep_agree(tmp_path):
+    source = _write_txt(tmp_path / "PW.txt")
+    summary, histogram = split_orientation(
+        source, lambda i, name: tmp_path / f"punkte_{name}.txt", THRESHOLDS, columns=COLUMNS, chunksize=700)
+
+    nz = read_normals(source, columns=COLUMNS)
+    expected = np.bincount(_baseline(nz, *THRESHOLDS), minlength=3)
+    assert summary["Punkte"].tolist() == expected.tolist()
+    assert histogram["Punkte"].sum() == len(nz)
+
+    sweep = sweep_thresholds(nz, [THRESHOLDS, (0.2, 0.98)])
+    assert sweep.loc[0, ["waagrecht", "schräg", "aufrecht"]].tolist() == expected.tolist()
+    shifted = np.bincount(_baseline(nz, 0.2, 0.98), minlength=3)
+    assert sweep.loc[1, ["waagrecht", "schräg", "aufrecht"]].tolist() == shifted.tolist()
+
+    for name, n in zip(summary["Orientation"], summary["Punkte"]):
+        part = load_points(tmp_path / f"punkte_{name}.txt", columns=COLUMNS + ["Orientation", "Winkel (°)"])
+        assert len(part) == n
+        assert (part["Orientation"] == name).all()
+
+
+def test_invalid_thresholds():
+    with pytest.raises(ValueError, match="aufsteigend"):
+        orientation_index([0.5], [0.9, 0.2])
+    with pytest.raises(ValueError, match="zwischen 0 und 1"):
+        orientation_index([0.5], [0.2, 1.5])
@@ -0,0 +1,122 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die CHM-Rasterung: Ursprung wie binned_statistic_2d (E/N der Baumdaten),
+Statistiken pro Zelle gegenüber einer Berechnung Zelle für Zelle, Zwischenspeicher und
+Regionseigenschaften gegenüber scipy.ndimage.
+"""
+
+import numpy as np
+import pytest
+from scipy import ndimage as ndi
+from scipy.stats import binned_statistic_2d
+
+from punktwolke.raster import (
+    REGION_COLUMNS, grid_extent, load_rasters, raster_grid, rasterize, region_properties, save_rasters,
+)
+
+
+def _points(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.random((n, 2)) * [83.7, 41.2] + [2_611_003.37, 1_267_001.91]
+    return np.column_stack([xy, rng.random(n) * 30])
+
+
+def test_origin_like_binned_statistic():
+    points = _points()
+    grid = raster_grid(points, 1.0)
+    _, edges0, edges1, _ = binned_statistic_2d(points[:, 0], points[:, 1], points[:, 2], statistic="max",
+                                               bins=[84, 42])
+    assert grid["origin"] == [edges0[0], edges1[0]]
+    y_min, y_max, x_min, x_max = grid_extent(grid)
+    assert (y_min, x_min) == (points[:, 0].min(), points[:, 1].min())
+    assert grid["shape"] == [84, 42]
+    assert y_max >= points[:, 0].max() and x_max >= points[:, 1].max()
+
+
+def test_snapped_origin():
+    grid = raster_grid(_points(), 0.5, snap=True)
+    assert grid["origin"] == [2_611_003.0, 1_267_001.5]
+    assert raster_grid(_points(), 0.5, origin=(10.0, 20.0))["origin"] == [10.0, 20.0]
+
+
+def test_statistics_per_cell():
+    points = _points()
+    rasters, grid = rasterize(points, res=2.0, stats=("max", "min", "mean", "count", "sum"),
+                              percentiles=(50, 95), fill=np.nan)
+    i = np.floor((points[:, 0] - grid["origin"][0]) / 2.0).astype(int)
+    j = np.floor((points[:, 1] - grid["origin"][1]) / 2.0).astype(int)
+    for cell in [(0, 0), (10, 5), (i[0], j[0]), (i[-1], j[-1])]:
+        z = points[(i == cell[0]) & (j == cell[1]), 2]
+        assert rasters["count"][cell] == len(z)
+        if len(z) == 0:
+            assert np.isnan(rasters["max"][cell])
+            continue
+        assert rasters["max"][cell] == z.max()
+        assert rasters["min"][cell] == z.min()
+        assert rasters["sum"][cell] == pytest.approx(z.sum())
+        assert rasters["mean"][cell] == pytest.approx(z.mean())
+        assert rasters["p50"][cell] == pytest.approx(np.percentile(z, 50))
+        assert rasters["p95"][cell] == pytest.approx(np.percentile(z, 95))
+    assert rasters["count"].sum() == len(points)
+
+
+def test_points_outside_fixed_grid_ignored():
+    points = _points()
+    grid = raster_grid(points, 1.0, origin=(2_611_003.37, 1_267_001.91), shape=(10, 10))
+    rasters, _ = rasterize(points, grid=grid, stats=("count",))
+    inside = ((points[:, 0] < 2_611_013.37) & (points[:, 1] < 1_267_011.91)).sum()
+    assert rasters["count"].sum() == inside
+
+
+def test_unknown_statistic():
+    with pytest.raises(ValueError, match="Unbekannte Statistik"):
+        rasterize(_points(), res=1.0, stats=("median",))
+
+
+def test_save_load(tmp_path):
+    rasters, grid = rasterize(_points(), res=1.0, stats=("max", "count"))
+    save_rasters(tmp_path / "chm.npz", rasters, grid)
+    loaded, loaded_grid = load_rasters(tmp_path / "chm.npz")
+    assert loaded_grid == grid
+    np.testing.assert_array_equal(loaded["max"], rasters["max"])
+
+
+def _regions(seed=0):
+    rng = np.random.default_rng(seed)
+    chm = ndi.gaussian_filter(rng.random((120, 90)), 2) * 30
+    labels, _ = ndi.label(chm > np.percentile(chm, 60))
+    labels[labels % 5 == 0] = 0  # Lücken in der Nummerierung
+    return labels, chm
+
+
+def test_regions_like_ndimage():
+    labels, chm = _regions()
+    table = region_properties(labels, chm, res=0.5)
+    ids = np.unique(labels[labels > 0])
+    assert list(table.columns) == REGION_COLUMNS and table["Label"].tolist() == ids.tolist()
+    np.testing.assert_allclose(table[["Zeile", "Spalte"]].to_numpy(),
+                               ndi.center_of_mass(np.ones_like(chm), labels, ids))
+    np.testing.assert_array_equal(table["Hoehe_max"], ndi.maximum(chm, labels, ids))
+    np.testing.assert_array_equal(table["Pixel"], ndi.sum(np.ones_like(chm), labels, ids))
+    np.testing.assert_allclose(table["Flaeche_m2"], table["Pixel"] * 0.25)
+    np.testing.assert_allclose(table["Durchmesser_m"], np.sqrt(4 * table["Flaeche_m2"] / np.pi))
+    objects = ndi.find_objects(labels)
+    for row in table.itertuples():
+        rs, cs = objects[row.Label - 1]
+        assert (row.Zeile_min, row.Zeile_max, row.Spalte_min, row.Spalte_max) == \
+            (rs.start, rs.stop - 1, cs.start, cs.stop - 1)
+
+
+def test_regions_min_pixels_and_empty():
+    labels, chm = _regions(1)
+    table = region_properties(labels, chm, res=1.0, min_pixels=20)
+    assert (table["Pixel"] >= 20).all()
+    assert len(table) == np.count_nonzero(np.bincount(labels.ravel())[1:] >= 20)
+    empty = region_properties(np.zeros((4, 4), dtype=int), np.zeros((4, 4)), res=1.0)
+    assert len(empty) == 0 and list(empty.columns) == REGION_COLUMNS
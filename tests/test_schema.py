@@ -0,0 +1,104 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die Layout-Registry: Layout-Erkennung (detect_layout, auch Trainingsdateien mit
+dem Klassennamen als Textspalte am Schluss), Bereichsprüfung und Kodierung pro Spalte.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.schema import (
+    apply_dtypes, check_ranges, column_encoding, detect_layout, get_layout, pandas_dtypes,
+)
+from punktwolke.store import iter_points, load_points
+
+
+def _normalised(n=50, seed=0):
+    rng = np.random.default_rng(seed)
+    xyz = rng.random((n, 3)) * 100 + [2_611_000.0, 1_267_000.0, 260.0]
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return pd.DataFrame(np.column_stack([xyz, rng.random((n, 6)), normals]))
+
+
+def _write_txt(df, path):
+    df.to_csv(path, sep=";", index=False, header=False, decimal=".")
+    return path
+
+
+def test_detect_klassenname():
+    sample = _normalised().assign(name=np.where(np.arange(50) % 2, "Dach", "Baum"))
+    assert detect_layout(sample)[0] == "normalisiert_klassenname"
+
+
+def test_detect_cluster_before_klassenname():
+    sample = _normalised().assign(cluster=np.arange(50) % 3)
+    assert detect_layout(sample)[0] == "normalisiert_cluster"
+
+
+def test_text_in_numeric_column_is_no_match():
+    with pytest.raises(ValueError, match="nicht-numerische"):
+        check_ranges(_normalised().assign(name="Dach"), get_layout("normalisiert_cluster"))
+
+
+def test_training_file_without_columns(tmp_path):
+    df = _normalised().assign(name="Dach")
+    path = _write_txt(df, tmp_path / "PW_Klass_normalisiert.txt")
+
+    loaded = load_points(path)
+    assert list(loaded.columns) == get_layout("normalisiert_klassenname")
+    assert (loaded["Klassenname"] == "Dach").all()
+
+    chunks = list(iter_points(path, chunksize=20))
+    assert [len(c) for c in chunks] == [20, 20, 10]
+    assert list(chunks[0].columns) == get_layout("normalisiert_klassenname")
+
+
+def test_get_layout_is_copy():
+    cols = get_layout("roh")
+    cols.append("extra")
+    assert get_layout("roh")[-1] == "Z scan dir"
+    with pytest.raises(KeyError, match="Unbekanntes Layout"):
+        get_layout("unbekannt")
+
+
+def test_detect_rgb_255_vs_01():
+    sample = _normalised()
+    roh = pd.concat([sample.iloc[:, :3], (sample.iloc[:, 3:6] * 255).round(), sample.iloc[:, 9:]], axis=1)
+    assert detect_layout(roh)[0] == "roh"
+    assert detect_layout(sample)[0] == "normalisiert"
+    with pytest.raises(ValueError, match="Kein bekanntes Layout mit 5 Spalten"):
+        detect_layout(sample.iloc[:, :5])
+
+
+def test_check_ranges_reports_all_columns():
+    sample = _normalised()
+    sample.iloc[0, 3] = 200.0  # Red (0-1)
+    sample.iloc[1, 11] = -1.5  # Z scan dir
+    with pytest.raises(ValueError) as err:
+        check_ranges(sample, get_layout("normalisiert"))
+    assert "'Red (0-1)': Maximum 200 > 1" in str(err.value)
+    assert "'Z scan dir': Minimum -1.5 < -1" in str(err.value)
+    with pytest.raises(ValueError, match="nicht-ganzzahlige"):
+        check_ranges(pd.DataFrame({"Klasse": [1.0, 2.5]}))
+    check_ranges(pd.DataFrame({"Z scan dir": [1.00001, -1.0]}))  # Rundung im Textexport
+
+
+def test_encodings_and_dtypes():
+    assert column_encoding("X coordinate")["use_offset"]
+    assert column_encoding("Red (0-1)") == {"dtype": "|u1", "divisor": 255.0, "use_offset": False}
+    assert column_encoding("Z scan dir")["dtype"] == "<f4"
+    assert column_encoding("Klasse")["dtype"] == "<i4"
+    with pytest.raises(ValueError, match="Textspalte"):
+        column_encoding("Klassenname")
+
+    assert pandas_dtypes(["X", "Red", "Klassenname"]) == {"X": np.float64, "Red": np.float32, "Klassenname": str}
+    df = apply_dtypes(pd.DataFrame({"Red": [1.0, 255.0], "Klasse": [-1.0, 3.0], "Hue (0-1)": [0.1, 0.2]}))
+    assert df.dtypes.tolist() == [np.uint8, np.int32, np.float64]
@@ -0,0 +1,172 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für den räumlichen Index: Box-, Radius- und Kachelabfragen gegen eine Suche über alle
+Punkte, Rückführung in die Reihenfolge der Quelle und Morton-Sortierung (Z-Kurve).
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.schema import get_layout
+from punktwolke.spatial import (
+    SPATIAL_FILE, SpatialIndex, build_spatial_index, has_spatial_index, morton_2d, morton_order, to_original_order,
+    write_permuted,
+)
+from punktwolke.store import open_points, write_points
+
+LAYOUT = get_layout("normalisiert")
+X, Y, Z = LAYOUT[:3]
+
+
+def _normalised(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    xyz = np.round(rng.random((n, 3)) * [300, 200, 60] + [2_611_000, 1_267_000, 250], 3)
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    values = np.column_stack([xyz, np.round(rng.random((n, 6)), 6), np.round(normals, 6)])
+    return pd.DataFrame(values, columns=LAYOUT)
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    df = _normalised()
+    write_points(df, tmp_path / "PW.pwc")
+    index = build_spatial_index(tmp_path / "PW.pwc", cell_size=25.0)
+    return df, index
+
+
+def _source_rows(index, found):
+    return np.sort(np.asarray(index.order)[found])
+
+
+def test_points_sorted_by_cell(indexed):
+    df, index = indexed
+    assert has_spatial_index(index.path) and len(index) == len(df)
+    pts = index.points.to_frame()
+    restored = pd.DataFrame(to_original_order(pts.to_numpy(), index.order), columns=LAYOUT)
+    pd.testing.assert_frame_equal(restored, df)
+
+    cell = np.floor((pts[[X, Y]].to_numpy() - index.origin) / 25.0).astype(np.int64)
+    for code, ix, iy, start, end in index.cells:
+        assert np.all(cell[start:end] == [ix, iy])
+    assert np.all(np.diff(index.cells[:, 0]) > 0)
+
+
+@pytest.mark.parametrize("box", [(2_611_010.5, 1_267_020.25, 2_611_090.0, 1_267_150.0),
+                                 (2_610_000.0, 1_266_000.0, 2_612_000.0, 1_268_000.0),
+                                 (2_611_400.0, 1_267_000.0, 2_611_500.0, 1_267_100.0)])
+def test_bbox_like_brute_force(indexed, box):
+    df, index = indexed
+    xmin, ymin, xmax, ymax = box
+    result, found = index.query_bbox(*box, usecols=[X, "Hue (0-1)"], return_index=True)
+    expected = np.flatnonzero(df[X].between(xmin, xmax) & df[Y].between(ymin, ymax))
+    np.testing.assert_array_equal(_source_rows(index, found), expected)
+    assert list(result.columns) == [X, "Hue (0-1)"]
+    np.testing.assert_array_equal(np.sort(result[X].to_numpy()), np.sort(df[X].to_numpy()[expected]))
+
+
+def test_bbox_edges_included(indexed):
+    df, index = indexed
+    row = df.iloc[123]
+    _, found = index.query_bbox(row[X], row[Y], row[X], row[Y], return_index=True)
+    assert 123 in np.asarray(index.order)[found]
+
+
+@pytest.mark.parametrize("centre", [(2_611_150.0, 1_267_100.0), (2_611_001.0, 1_267_199.0, 270.0)])
+def test_radius_like_brute_force(indexed, centre):
+    df, index = indexed
+    result, found = index.query_radius(centre, 12.5, usecols=["Z scan dir"], return_index=True)
+    cols = [X, Y, Z][:len(centre)]
+    d2 = ((df[cols].to_numpy() - np.asarray(centre)) ** 2).sum(axis=1)
+    np.testing.assert_array_equal(_source_rows(index, found), np.flatnonzero(d2 <= 12.5 ** 2))
+    assert list(result.columns) == ["Z scan dir"]
+
+
+def test_tiles_partition_points(indexed):
+    df, index = indexed
+    found = [index.query_tile(ix, iy, 50.0, usecols=[X], return_index=True)[1]
+             for ix in range(7) for iy in range(5)]
+    all_found = np.concatenate(found)
+    assert len(all_found) == len(df) == len(np.unique(all_found))  # halb offene Kacheln
+
+
+def test_ranges_merged(indexed):
+    _, index = indexed
+    ranges = index.ranges_in_bbox(2_611_000.0, 1_267_000.0, 2_611_300.0, 1_267_200.0)
+    assert ranges.tolist() == [[0, len(index)]]
+    ranges = index.ranges_in_bbox(2_611_030.0, 1_267_030.0, 2_611_120.0, 1_267_080.0)
+    assert np.all(ranges[1:, 0] > ranges[:-1, 1])
+    assert len(index.ranges_in_bbox(2_600_000.0, 1_260_000.0, 2_600_010.0, 1_260_010.0)) == 0
+
+
+def test_rebuild_keeps_source_order(indexed, tmp_path):
+    df, index = indexed
+    rebuilt = build_spatial_index(index.path, tmp_path / "PW5.pwc", cell_size=5.0)
+    restored = to_original_order(rebuilt.points[X], rebuilt.order)
+    np.testing.assert_array_equal(restored, df[X].to_numpy())
+
+
+def test_missing_index(tmp_path):
+    write_points(_normalised(100), tmp_path / "PW.pwc")
+    assert not has_spatial_index(tmp_path / "PW.pwc")
+    with pytest.raises(FileNotFoundError, match="Kein räumlicher Index"):
+        SpatialIndex(tmp_path / "PW.pwc")
+
+
+def _interleave(ix, iy):
+    return sum(((ix >> b) & 1) << (2 * b) | ((iy >> b) & 1) << (2 * b + 1) for b in range(32))
+
+
+def test_morton_code():
+    rng = np.random.default_rng(2)
+    ix, iy = rng.integers(0, 2 ** 32, 200), rng.integers(0, 2 ** 32, 200)
+    codes = morton_2d(ix, iy)
+    assert codes.dtype == np.uint64
+    assert codes.tolist() == [_interleave(int(a), int(b)) for a, b in zip(ix, iy)]
+    assert morton_2d([0, 1, 0, 1, 2], [0, 0, 1, 1, 0]).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_morton_order_locality():
+    rng = np.random.default_rng(3)
+    xy = rng.random((20_000, 2)) * 100
+    order, codes = morton_order(xy, resolution=0.5)
+    assert np.array_equal(np.sort(order), np.arange(len(xy)))
+    assert np.all(np.diff(codes[order].astype(np.float64)) >= 0)
+    # gleiche Rasterzelle: ursprüngliche Reihenfolge bleibt (stabil)
+    same = codes[order][1:] == codes[order][:-1]
+    assert np.all(order[1:][same] > order[:-1][same])
+    step = np.linalg.norm(np.diff(xy[order], axis=0), axis=1).mean()
+    assert step < 0.05 * np.linalg.norm(np.diff(xy, axis=0), axis=1).mean()
+
+
+def test_index_with_resolution(tmp_path):
+    df = _normalised(5000)
+    write_points(df, tmp_path / "PW.pwc")
+    index = build_spatial_index(tmp_path / "PW.pwc", cell_size=25.0, resolution=0.3)
+    with open(index.path / SPATIAL_FILE, "r", encoding="utf-8") as f:
+        assert json.load(f)["resolution"] == 25.0 / 128  # auf cell_size / 2^k abgerundet
+    pts = index.points.to_frame()
+    cell = np.floor((pts[[X, Y]].to_numpy() - index.origin) / 25.0).astype(np.int64)
+    for code, ix, iy, start, end in index.cells:
+        assert np.all(cell[start:end] == [ix, iy])
+    _, found = index.query_bbox(2_611_020.0, 1_267_020.0, 2_611_080.0, 1_267_090.0, return_index=True)
+    expected = np.flatnonzero(df[X].between(2_611_020.0, 2_611_080.0) & df[Y].between(1_267_020.0, 1_267_090.0))
+    np.testing.assert_array_equal(_source_rows(index, found), expected)
+
+
+def test_write_permuted(tmp_path):
+    df = _normalised(1000)
+    write_points(df, tmp_path / "PW.pwc")
+    order = np.random.default_rng(4).permutation(len(df))
+    write_permuted(tmp_path / "PW.pwc", tmp_path / "perm.pwc", order, chunksize=300)
+    pd.testing.assert_frame_equal(open_points(tmp_path / "perm.pwc").to_frame(),
+                                  df.iloc[order].reset_index(drop=True), check_dtype=False)
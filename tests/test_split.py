@@ -0,0 +1,75 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für das Aufteilen in eine Datei pro Klasse: gleiche Dateien wie die bisherige
+Filterung df[df[col] == cid] pro Klasse, Reihenfolge der Punkte bleibt erhalten.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.schema import get_layout
+from punktwolke.split import group_labels, split_points
+from punktwolke.store import load_points, open_points, write_points
+
+LAYOUT = get_layout("normalisiert")
+
+
+def _points(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.column_stack([np.round(rng.random((n, 3)) * 100, 3), np.round(rng.random((n, 9)), 6)])
+    return pd.DataFrame(values, columns=LAYOUT), rng.integers(0, 12, n)
+
+
+def test_group_labels():
+    labels = np.array([3, 1, 3, 2, 1, 3])
+    ids, order, starts, ends = group_labels(labels)
+    assert ids.tolist() == [1, 2, 3]
+    assert [order[s:e].tolist() for s, e in zip(starts, ends)] == [[1, 4], [3], [0, 2, 5]]
+
+    ids, order, starts, ends = group_labels(np.array([], dtype=int))
+    assert len(ids) == len(order) == len(starts) == 0
+    with pytest.raises(ValueError, match="1D"):
+        group_labels(np.zeros((2, 2)))
+
+
+def test_split_like_filter_per_class(tmp_path):
+    df, labels = _points()
+    df["Color Cluster"] = labels
+    done = []
+    summary = split_points(df, "Color Cluster", lambda cid: tmp_path / f"PW_Klasse_{cid}.txt",
+                           max_workers=3, progress=lambda cid, n: done.append(cid))
+
+    assert summary["Klasse"].tolist() == sorted(set(labels))
+    assert sorted(done) == summary["Klasse"].tolist()
+    for cid, n in zip(summary["Klasse"], summary["Punkte"]):
+        expected = tmp_path / "expected.txt"
+        df[df["Color Cluster"] == cid].to_csv(expected, sep=";", index=False, header=False, decimal=".")
+        assert (tmp_path / f"PW_Klasse_{cid}.txt").read_text() == expected.read_text()
+        assert n == np.count_nonzero(labels == cid)
+
+
+def test_split_point_columns_with_label_column(tmp_path):
+    df, labels = _points()
+    write_points(df, tmp_path / "PW.pwc")
+    pts = open_points(tmp_path / "PW.pwc")
+    summary = split_points(pts, labels, lambda cid: tmp_path / f"PW_Klasse_{cid}.pwc", label_column="Klasse")
+
+    assert summary["Punkte"].sum() == len(df)
+    for cid in summary["Klasse"]:
+        part = load_points(tmp_path / f"PW_Klasse_{cid}.pwc")
+        assert list(part.columns) == LAYOUT + ["Klasse"]
+        assert (part["Klasse"] == cid).all()
+        np.testing.assert_array_equal(part["X coordinate"], df["X coordinate"][labels == cid])
+
+
+def test_label_count_mismatch(tmp_path):
+    df, labels = _points(n=10)
+    with pytest.raises(ValueError, match="Labels für"):
+        split_points(df, labels[:5], lambda cid: tmp_path / f"{cid}.txt")
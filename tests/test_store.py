@@ -0,0 +1,215 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für das .pwc-Format: Genauigkeit der Kodierung (TXT → .pwc → TXT ohne Abweichung),
+Rundreise, Ausweichen auf float32/float64 und Spaltenzugriff über memmap.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.schema import get_layout
+from punktwolke.store import (
+    PointWriter, convert_txt, is_pwc, load_points, open_points, read_points, read_schema, save_points,
+    write_points,
+)
+
+LAYOUT = get_layout("normalisiert")
+
+
+def _normalised(n=20_000, seed=0, extent=1500.0):
+    rng = np.random.default_rng(seed)
+    xyz = np.round(rng.random((n, 3)) * [extent, extent, 60] + [2_611_000, 1_267_000, 250], 3)
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    values = np.column_stack([xyz, np.round(rng.random((n, 6)), 6), np.round(normals, 6)])
+    return pd.DataFrame(values, columns=LAYOUT)
+
+
+def _write_txt(df, path):
+    df.to_csv(path, sep=";", index=False, header=False, decimal=".")
+    return path
+
+
+def _dtypes(path):
+    return {c["name"]: c["dtype"] for c in read_schema(path)["columns"]}
+
+
+def test_txt_export_unchanged(tmp_path):
+    source = _write_txt(_normalised(), tmp_path / "PW.txt")
+    pts = open_points(source, columns=LAYOUT)
+    assert _dtypes(pts.path)["X coordinate"] == "<f4"
+    assert _dtypes(pts.path)["Z scan dir"] == "<f4"
+
+    save_points(pts.to_frame(), tmp_path / "export.txt")
+    exported = pd.read_csv(tmp_path / "export.txt", sep=";", header=None)
+    original = pd.read_csv(source, sep=";", header=None)
+    pd.testing.assert_frame_equal(exported, original, check_exact=True)
+
+
+def test_coordinates_exact(tmp_path):
+    df = _normalised()
+    write_points(df, tmp_path / "PW.pwc")
+    pts = open_points(tmp_path / "PW.pwc")
+    np.testing.assert_array_equal(pts["X coordinate"], df["X coordinate"])
+    np.testing.assert_array_equal(pts.stack(["X coordinate", "Y coordinate"]), df[["X coordinate", "Y coordinate"]])
+    np.testing.assert_array_equal(pts.take([5, 7], usecols=["Z coordinate"])["Z coordinate"],
+                                  df["Z coordinate"].to_numpy()[[5, 7]])
+
+
+def test_large_extent_falls_back_to_float64(tmp_path):
+    df = _normalised(extent=50_000.0)
+    write_points(df, tmp_path / "PW.pwc")
+    assert _dtypes(tmp_path / "PW.pwc")["X coordinate"] == "<f8"
+    np.testing.assert_array_equal(read_points(tmp_path / "PW.pwc")["X coordinate"], df["X coordinate"])
+
+
+def test_old_version_is_reconverted(tmp_path):
+    source = _write_txt(_normalised(n=100), tmp_path / "PW.txt")
+    pts = open_points(source, columns=LAYOUT)
+    schema_path = pts.path / "schema.json"
+    schema = json.loads(schema_path.read_text(encoding="utf-8"))
+    schema["version"] = 1
+    schema_path.write_text(json.dumps(schema), encoding="utf-8")
+
+    assert read_schema(open_points(source, columns=LAYOUT).path)["version"] == 2
+
+
+# ----------------------------------------------------------------
+# Rundreise und Kodierung (PointWriter, read_points, convert_txt)
+# ----------------------------------------------------------------
+def test_round_trip_in_blocks(tmp_path):
+    df = _normalised(n=1000)
+    df["Klasse"] = np.arange(1000) % 7 - 1
+    with PointWriter(tmp_path / "PW.pwc", df.columns) as writer:
+        for start in range(0, 1000, 300):
+            writer.write(df.iloc[start:start + 300])
+    assert is_pwc(tmp_path / "PW.pwc")
+    assert read_schema(tmp_path / "PW.pwc")["n_points"] == 1000
+
+    back = read_points(tmp_path / "PW.pwc")
+    assert list(back.columns) == list(df.columns)
+    assert back["Klasse"].dtype == np.int32
+    np.testing.assert_array_equal(back["Klasse"], df["Klasse"])
+    np.testing.assert_array_equal(back[LAYOUT[:3]], df[LAYOUT[:3]])
+    np.testing.assert_array_equal(back[LAYOUT[3:]], df[LAYOUT[3:]].astype(np.float32))
+
+    subset = read_points(tmp_path / "PW.pwc", usecols=["Klasse", "X coordinate"])
+    assert list(subset.columns) == ["Klasse", "X coordinate"]
+
+
+def test_colour_encodings(tmp_path):
+    df = pd.DataFrame({"Red": [0.0, 17.0, 255.0], "Red (0-1)": [0.0, 1 / 255, 1.0],
+                       "Green (0-1)": [0.0, 0.5, 1.0]})
+    write_points(df, tmp_path / "PW.pwc")
+    assert _dtypes(tmp_path / "PW.pwc") == {"Red": "|u1", "Red (0-1)": "|u1", "Green (0-1)": "<f4"}
+    back = read_points(tmp_path / "PW.pwc")
+    np.testing.assert_allclose(back, df, rtol=0, atol=1e-7)
+
+
+def test_lossy_block_after_uint8_raises(tmp_path):
+    writer = PointWriter(tmp_path / "PW.pwc", ["Red"])
+    writer.write(np.array([[1.0], [2.0]]))
+    with pytest.raises(ValueError, match="nicht verlustfrei"):
+        writer.write(np.array([[2.5]]))
+    writer.abort()
+    assert not (tmp_path / "PW.pwc").exists()
+
+
+def test_out_of_range_and_text(tmp_path):
+    with pytest.raises(ValueError, match="ausserhalb des Wertebereichs"):
+        write_points(pd.DataFrame({"Red": [1.0, 300.0]}), tmp_path / "a.pwc")
+    assert not (tmp_path / "a.pwc").exists()
+    with pytest.raises(ValueError, match="Textspalte"):
+        PointWriter(tmp_path / "b.pwc", ["X", "Klassenname"])
+
+
+def test_convert_txt(tmp_path):
+    df = _normalised(n=500)
+    source = _write_txt(df, tmp_path / "PW.txt")
+    pwc = convert_txt(source, chunksize=120)
+    assert pwc == tmp_path / "PW.pwc"
+    assert read_schema(pwc)["n_points"] == 500
+    np.testing.assert_array_equal(load_points(pwc)["Y coordinate"], df["Y coordinate"])
+
+    bad = df.copy()
+    bad.loc[400, "Red (0-1)"] = 7.0  # Farbe ausserhalb 0-1 erst in einem späteren Block
+    with pytest.raises(ValueError, match="Red \\(0-1\\)"):
+        convert_txt(_write_txt(bad, tmp_path / "bad.txt"), columns=LAYOUT, chunksize=120)
+    assert not (tmp_path / "bad.pwc").exists()
+
+
+def test_load_and_save_points(tmp_path):
+    df = _normalised(n=200)
+    save_points(df, tmp_path / "PW.pwc")
+    save_points(df, tmp_path / "PW.txt")
+    from_pwc = load_points(tmp_path / "PW.pwc")
+    from_txt = load_points(tmp_path / "PW.txt", columns=LAYOUT)
+    pd.testing.assert_frame_equal(from_pwc, from_txt, check_dtype=False)
+    renamed = load_points(tmp_path / "PW.pwc", columns=[f"c{i}" for i in range(12)])
+    assert renamed.columns[0] == "c0"
+    with pytest.raises(ValueError, match="Spalten gespeichert"):
+        load_points(tmp_path / "PW.pwc", columns=["X", "Y", "Z"])
+
+
+# ----------------------------------------------------------------
+# Spaltenzugriff über memmap (PointColumns, open_points)
+# ----------------------------------------------------------------
+def test_point_columns(tmp_path):
+    df = _normalised(n=300)
+    write_points(df, tmp_path / "PW.pwc")
+    pts = open_points(tmp_path / "PW.pwc")
+    assert len(pts) == 300 and "Hue (0-1)" in pts
+
+    hue = pts["Hue (0-1)"]
+    assert isinstance(hue, np.memmap) and not hue.flags.writeable
+    np.testing.assert_array_equal(hue, df["Hue (0-1)"].astype(np.float32))
+
+    features = pts.stack(["Hue (0-1)", "Z scan dir"])
+    assert features.shape == (300, 2) and features.dtype == np.float64
+    np.testing.assert_array_equal(features[:, 1], df["Z scan dir"].astype(np.float32))
+
+    local = pts.xyz(local=True)
+    assert local.dtype == np.float32
+    np.testing.assert_allclose(local + pts.xyz_offset(), df[LAYOUT[:3]], rtol=0, atol=1e-3)
+    np.testing.assert_array_equal(pts.xyz(), df[LAYOUT[:3]])
+
+    mask = np.arange(300) % 4 == 0
+    taken = pts.take(mask, usecols=["X coordinate", "Hue (0-1)"])
+    assert len(taken) == 75
+    np.testing.assert_array_equal(taken["X coordinate"], df["X coordinate"][mask])
+    pd.testing.assert_frame_equal(pts.to_frame(), read_points(tmp_path / "PW.pwc"))
+
+    with pytest.raises(KeyError, match="nicht in"):
+        pts["Klasse"]
+
+
+def test_point_columns_renamed(tmp_path):
+    write_points(_normalised(n=10), tmp_path / "PW.pwc")
+    names = ["X", "Y", "Z"] + LAYOUT[3:]
+    pts = open_points(tmp_path / "PW.pwc", columns=names)
+    assert pts.xyz_names() == ["X", "Y", "Z"]
+    with pytest.raises(ValueError, match="Namen angegeben"):
+        open_points(tmp_path / "PW.pwc", columns=names[:3])
+
+
+def test_open_points_converts_once(tmp_path):
+    source = _write_txt(_normalised(n=100), tmp_path / "PW.txt")
+    schema_path = open_points(source, columns=LAYOUT).path / "schema.json"
+    mtime = schema_path.stat().st_mtime_ns
+    open_points(source, columns=LAYOUT)
+    assert schema_path.stat().st_mtime_ns == mtime
+
+    # neuere TXT-Datei → neu konvertieren
+    _write_txt(_normalised(n=120, seed=1), source)
+    os.utime(source, ns=(mtime + 10**9, mtime + 10**9))
+    assert len(open_points(source, columns=LAYOUT)) == 120
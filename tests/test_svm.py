@@ -0,0 +1,48 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die skalierbare SVM: klassenbalancierte Stichprobe, Anzahl Stützpunkte bzw.
+Fourier-Merkmale und Qualität der Kern-Approximation gegenüber dem exakten SVC.
+"""
+
+import numpy as np
+import pytest
+
+from punktwolke.svm import SVM_MODES, balanced_sample, fit_svm, make_svm
+
+
+def _classes(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 3, n)
+    X = rng.normal(size=(n, 4)) * 0.5 + y[:, None]
+    return X, y
+
+
+def test_balanced_sample():
+    y = np.r_[np.zeros(1000), np.ones(50), np.full(300, 2)]
+    index = balanced_sample(y, 200, random_state=0)
+    assert np.all(np.diff(index) > 0)
+    assert np.bincount(y[index].astype(int)).tolist() == [200, 50, 200]
+
+
+def test_n_components_cap_only_for_nystroem():
+    X, y = _classes(n=300)
+    assert fit_svm(X, y, mode="nystroem", n_components=1000)[1].n_components == 300
+    assert fit_svm(X, y, mode="rff", n_components=1000)[1].n_components == 1000
+
+
+@pytest.mark.parametrize("mode", SVM_MODES)
+def test_modes_fit(mode):
+    X, y = _classes()
+    model = fit_svm(X, y, mode=mode, budget=500, n_components=300, gamma=0.5)
+    assert model.score(X, y) > 0.9
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError, match="Unbekannter SVM-Modus"):
+        make_svm("linear")
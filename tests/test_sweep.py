@@ -0,0 +1,125 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die Parameterstudie: Parameterraster, RunID und Cache-Schlüssel, Wiederverwendung
+der Zwischenstände und Neuberechnung nach geänderter Quelle, geänderten Parametern oder
+neueren Eingaben.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.schema import get_layout
+from punktwolke.sweep import (
+    PARAMETERS, load_run, parameter_grid, run_id, run_sweep, source_id, stage_key, stage_path,
+)
+
+COLUMNS = get_layout("xyz")
+GRID = {"res": 0.5, "min_distance": 3, "sigma": [0.5, 1.0], "min_height": 1, "eps": 1.0,
+        "min_samples": 10, "diameter_min": 2, "diameter_max": 10}
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Sechs kegelförmige Kronen im Abstand von 12 m."""
+    rng = np.random.default_rng(0)
+    parts = []
+    for cx, cy in [(x, y) for x in (12.0, 24.0, 36.0) for y in (12.0, 24.0)]:
+        r = 2.5 * np.sqrt(rng.random(800))
+        phi = rng.random(800) * 2 * np.pi
+        z = 15 - 3 * r + rng.normal(0, 0.1, 800)
+        parts.append(np.column_stack([2_611_000 + cx + r * np.cos(phi), 1_267_000 + cy + r * np.sin(phi), z]))
+    path = tmp_path / "PW_Baeume.txt"
+    pd.DataFrame(np.round(np.concatenate(parts), 3)).to_csv(path, sep=";", index=False, header=False)
+    return path
+
+
+def _sweep(source, tmp_path, grid=GRID, datum="250610"):
+    return run_sweep(source, grid, tmp_path / "output", datum, tmp_path / "cache", columns=COLUMNS,
+                     max_workers=1, log=None)
+
+
+def test_parameter_grid():
+    combos = parameter_grid(dict(GRID, eps=(0.8, 1.0)))
+    assert len(combos) == 4 and list(combos[0]) == PARAMETERS
+    assert [(c["eps"], c["sigma"]) for c in combos] == [(0.8, 0.5), (1.0, 0.5), (0.8, 1.0), (1.0, 1.0)]
+    with pytest.raises(KeyError, match=r"fehlend \['res'\]"):
+        parameter_grid({k: v for k, v in GRID.items() if k != "res"})
+    with pytest.raises(KeyError, match=r"unbekannt \['alpha'\]"):
+        parameter_grid(dict(GRID, alpha=1))
+
+
+def test_names(source):
+    params = parameter_grid(GRID)[0]
+    assert run_id(params) == "Parameter_res0.5_minPix3_sig0.5_minH1_eps1.0_minSam10_DM2bis10"
+    assert stage_key("load", params, source) == "PW_Baeume"
+    assert stage_key("dbscan", params, source) == "minH1_eps1.0_minSam10"
+    assert stage_key("maxima", params, source).endswith("_res0.5_minPix3_sig0.5")
+    assert stage_path("cache", "filter", params, source).parts[-3:-1] == (source_id(source), "filter")
+
+    before = source_id(source)
+    assert before.startswith("PW_Baeume_") and source_id(source) == before
+    os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 10 ** 9))
+    assert source_id(source) != before
+
+
+def test_sweep_outputs(source, tmp_path):
+    summary = _sweep(source, tmp_path)
+    assert summary["Lauf"].tolist() == ["250610_01", "250610_02"]
+    assert summary["Baeume"].tolist() == [6, 6] and summary["Fehler"].isna().all()
+    assert summary["Schritte_neu"].tolist() == [8, 8]  # gemeinsame Schritte zählen für beide Läufe
+
+    run_dir = tmp_path / "output" / "250610_01"
+    trees = pd.read_csv(run_dir / "baumdaten_watershed_RunID_250610_01.csv")
+    assert list(trees.columns) == ["Tree_ID", "E", "N", "Height_m", "Crown_Diameter_m"]
+    assert np.allclose(np.sort(trees["Height_m"]), 15, atol=0.5)
+    with open(run_dir / f"{summary['RunID'][0]}_Lauf.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["sigma"] == 0.5
+    assert (tmp_path / "output" / "parameterstudie_250610.csv").is_file()
+
+    data = load_run(tmp_path / "cache", parameter_grid(GRID)[0], source)
+    assert len(data["filtered_points"]) == len(data["filtered_labels"]) == 4800
+    assert data["labels_ws"].shape == data["chm"].shape
+    assert data["grid"]["res"] == 0.5
+
+
+def test_cache_reuse_and_invalidation(source, tmp_path):
+    _sweep(source, tmp_path)
+    # gleiches Raster: nur die Baumdaten werden neu geschrieben
+    assert _sweep(source, tmp_path)["Schritte_neu"].tolist() == [1, 1]
+
+    # neuer eps-Wert: load und filter bleiben, ab dbscan neu
+    summary = _sweep(source, tmp_path, dict(GRID, eps=0.9))
+    assert summary["Schritte_neu"].tolist() == [6, 6]
+
+    # neuere Eingabe: Schritte danach werden neu gerechnet
+    params = parameter_grid(GRID)[0]
+    os.utime(stage_path(tmp_path / "cache", "chm", params, source))
+    assert _sweep(source, tmp_path)["Schritte_neu"].tolist() == [3, 3]
+
+    # geänderte Quelle: eigener Cache-Ordner, alles neu
+    os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 10 ** 9))
+    assert _sweep(source, tmp_path)["Schritte_neu"].tolist() == [8, 8]
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_failed_stage_propagates(source, tmp_path):
+    summary = _sweep(source, tmp_path, dict(GRID, diameter_min=50, diameter_max=60, sigma=1.0))
+    assert summary["Fehler"].tolist() == ["Keine gültigen Cluster gefunden!"]
+    assert summary["Baeume"].isna().all() and summary["Schritte_neu"].tolist() == [4]
+
+
+def test_stale_run_dir_cleared(source, tmp_path):
+    _sweep(source, tmp_path)
+    summary = _sweep(source, tmp_path, dict(GRID, sigma=[2.0, 1.0]))
+    run_dir = tmp_path / "output" / "250610_01"
+    assert [f.name for f in run_dir.glob("*_Lauf.json")] == [f"{summary['RunID'][0]}_Lauf.json"]
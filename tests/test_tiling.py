@@ -0,0 +1,107 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die Kachelung: Kern und Rand der Kacheln, Zusammenführen der IDs über eine
+Kachelgrenze und run_tiled mit DBSCAN gegen DBSCAN auf der ganzen Platte.
+"""
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+
+from punktwolke.tiling import _run_stage, dbscan_xy, make_tiles, run_tiled, stitch_labels
+
+
+def _blobs(seed=0):
+    """Cluster mit Lücken, einige davon über den Kachelgrenzen bei 10 / 20 m."""
+    rng = np.random.default_rng(seed)
+    centres = [(10.0, 5.0), (20.0, 20.0), (5.0, 25.0), (25.0, 8.0), (15.0, 15.0)]
+    parts = [rng.normal(c, 0.8, (300, 2)) for c in centres]
+    parts.append(rng.random((200, 2)) * 30)
+    return np.concatenate(parts)
+
+
+def _same_partition(a, b):
+    """Gleiche Einteilung bis auf die Nummerierung."""
+    pairs = np.unique(np.column_stack([a, b]), axis=0)
+    return len(pairs) == len(np.unique(a)) == len(np.unique(b))
+
+
+def test_tiles_core_and_halo():
+    xy = _blobs()
+    tiles = make_tiles(xy, 10.0, halo=1.5)
+    core = np.concatenate([t["index"][:t["n_core"]] for t in tiles])
+    assert np.array_equal(np.sort(core), np.arange(len(xy)))  # jeder Punkt genau einmal Kern
+
+    origin = np.floor(xy.min(axis=0))
+    for t in tiles:
+        lo = origin + np.array(t["tile"]) * 10.0 - 1.5
+        inside = np.flatnonzero(np.all((xy >= lo) & (xy < lo + 13.0), axis=1))
+        np.testing.assert_array_equal(np.sort(t["index"]), inside)
+
+    with pytest.raises(ValueError, match="halo"):
+        make_tiles(xy, 1.0, halo=2.0)
+
+
+def test_stitch_across_seam():
+    # zwei Kacheln, Punkt 2 und 3 liegen im Rand der jeweils anderen Kachel
+    tiles = [{"tile": (0, 0), "index": np.array([0, 1, 2, 3]), "n_core": 3},
+             {"tile": (1, 0), "index": np.array([3, 4, 5, 2]), "n_core": 3}]
+    results = [np.array([0, 0, 0, 0]), np.array([0, 0, 1, 0])]
+    labels, n_links = stitch_labels(6, tiles, results)
+    assert labels.tolist() == [0, 0, 0, 0, 0, 1] and n_links == 2
+
+    # ohne Rand-Überlappung bleiben die Objekte getrennt
+    labels, n_links = stitch_labels(6, tiles, results, min_overlap=2)
+    assert labels.tolist() == [0, 0, 0, 1, 1, 2] and n_links == 0
+
+    # nur Kernpunkte verbinden: Punkt 2 ist in der eigenen Kachel kein Kernpunkt, Punkt 3 im Rand nicht
+    cores = [np.array([1, 1, 0, 0], bool), np.array([1, 1, 1, 1], bool)]
+    labels, n_links = stitch_labels(6, tiles, results, cores=cores)
+    assert labels.tolist() == [0, 0, 0, 1, 1, 2] and n_links == 0
+    cores[0][2] = True
+    labels, n_links = stitch_labels(6, tiles, results, cores=cores)
+    assert labels.tolist() == [0, 0, 0, 0, 0, 1] and n_links == 1
+
+
+def test_stitch_noise_only():
+    tiles = [{"tile": (0, 0), "index": np.array([0, 1]), "n_core": 2}]
+    labels, n_links = stitch_labels(2, tiles, [np.array([-1, -1])])
+    assert labels.tolist() == [-1, -1] and n_links == 0
+
+
+@pytest.mark.parametrize("tile_size", [10.0, 7.5])
+def test_run_tiled_like_dbscan(tile_size):
+    xy = _blobs()
+    eps, min_samples = 0.6, 8
+    labels, summary = run_tiled(dbscan_xy, xy, tile_size=tile_size, halo=2 * eps, max_workers=2,
+                                log=None, eps=eps, min_samples=min_samples)
+    db = DBSCAN(eps=eps, min_samples=min_samples).fit(xy)
+    core = np.zeros(len(xy), dtype=bool)
+    core[db.core_sample_indices_] = True
+    assert _same_partition(labels[core], db.labels_[core])
+    np.testing.assert_array_equal(labels == -1, db.labels_ == -1)
+    assert summary["Punkte_Kern"].sum() == len(xy)
+    assert list(summary.columns) == ["Kachel_X", "Kachel_Y", "Punkte_Kern", "Punkte_Rand", "Objekte", "Dauer_s"]
+
+
+def test_run_tiled_without_stitch():
+    xy = _blobs()
+    labels, summary = run_tiled(dbscan_xy, xy, tile_size=10.0, halo=1.2, stitch=False, max_workers=1,
+                                log=None, eps=0.6, min_samples=8)
+    assert (summary["Punkte_Rand"] == 0).all()
+    assert labels.max() + 1 == summary["Objekte"].sum()
+
+
+def _wrong_length(block):
+    return np.zeros(len(block) - 1)
+
+
+def test_stage_label_count():
+    with pytest.raises(ValueError, match="Labels für 4 Punkte"):
+        _run_stage((0, _wrong_length, np.zeros((4, 2)), {}))
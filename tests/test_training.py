@@ -0,0 +1,75 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für das Out-of-core-Training: Trainings-Cache pro Eingabedatei, Klassencodes,
+Scaler auf den Cache-Werten und Epochen mit partial_fit.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+
+from punktwolke.schema import get_layout
+from punktwolke.store import open_points
+from punktwolke.training import (
+    balanced_class_weight, cache_name, prepare_training_data, train_partial_fit,
+)
+
+FEATURES = ["Hue (0-1)", "Saturation (0-1)", "Z scan dir"]
+CLASSES = ["Baum", "Dach", "Strasse"]
+
+
+def _training_file(path, n, seed):
+    rng = np.random.default_rng(seed)
+    names = rng.choice(CLASSES, n, p=[0.6, 0.3, 0.1])
+    code = np.searchsorted(CLASSES, names)
+    xyz = rng.random((n, 3)) * 100 + [2_611_000.0, 1_267_000.0, 260.0]
+    colours = np.clip(rng.normal(0.2 + 0.3 * code[:, None], 0.1, (n, 6)), 0, 1)
+    normals = rng.normal(size=(n, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    df = pd.DataFrame(np.column_stack([xyz, np.round(colours, 6), np.round(normals, 6)]))
+    df["name"] = names
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, sep=";", index=False, header=False, decimal=".")
+    return path, names
+
+
+def test_cache_name_per_path(tmp_path):
+    assert cache_name(tmp_path / "P1" / "PW.txt") != cache_name(tmp_path / "P2" / "PW.txt")
+    assert cache_name(tmp_path / "P1" / "PW.txt").startswith("PW_")
+
+
+def test_balanced_class_weight():
+    assert balanced_class_weight([30, 10]) == {0: 40 / 60, 1: 40 / 20}
+
+
+def test_prepare_and_train(tmp_path):
+    sources, names = zip(*[_training_file(tmp_path / f"P{i}" / "PW.txt", 3000, i) for i in range(2)])
+    data = prepare_training_data(sources, FEATURES, "Klassenname", tmp_path / "cache",
+                                 columns=get_layout("normalisiert_klassenname"), chunksize=700, log=None)
+
+    assert len({c.name for c in data["caches"]}) == 2
+    assert data["classes"].tolist() == CLASSES
+    expected = [int(np.sum(np.concatenate(names) == c)) for c in CLASSES]
+    assert data["counts"].tolist() == expected
+
+    # Scaler sieht dieselben Werte wie das Training (dekodierter Cache)
+    cached = np.concatenate([open_points(c).stack(FEATURES) for c in data["caches"]])
+    np.testing.assert_allclose(data["scaler"].mean_, cached.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(data["scaler"].var_, cached.var(axis=0), rtol=1e-9)
+
+    labels = np.concatenate([data["remap"][open_points(c).raw("Label")] for c in data["caches"]])
+    np.testing.assert_array_equal(data["classes"][labels], np.concatenate(names))
+
+    model = SGDClassifier(class_weight="balanced", random_state=0)
+    model, history, (X_val, y_val) = train_partial_fit(
+        model, data, epochs=2, block_size=500, checkpoint_dir=tmp_path / "ckpt", log=None)
+    assert history["Epoche"].tolist() == [1, 2]
+    assert history["Punkte"].iloc[0] + len(y_val) == 6000
+    assert history["Validierung_Score"].iloc[-1] > 0.8
+    assert (tmp_path / "ckpt" / "checkpoint_epoche_02.pkl").is_file()
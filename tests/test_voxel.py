@@ -0,0 +1,90 @@
+# ================================================================
+# Beschreibung:     BTH 04 - Rekonstruktion Stadtmodell Basel 1960
+# Erstellt mit:     Unterstützung durch ChatGPT (OpenAI)
+# Version:          GPT-4, Juni 2025
+# Autor:            Marco Stampfli und Vania Fernandes Pereira
+# ================================================================
+"""
+Abstract:
+Tests für die Voxel-Pyramide: Schwerpunkte und Punktanzahlen gegen ein groupby, verschachtelte
+Stufen gegen eine direkte Einteilung der Originalpunkte und Rückverteilung der Merkmale.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from punktwolke.voxel import as_xyz, build_pyramid, multiscale_features, pyramid_columns, voxel_downsample
+
+
+def _points(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n, 3)) * [12.0, 8.0, 4.0]).astype(np.float32)
+
+
+def _groupby(xyz, size, origin):
+    cell = np.floor((xyz.astype(np.float64) - origin) / size).astype(np.int64)
+    df = pd.DataFrame(xyz.astype(np.float64), columns=["x", "y", "z"])
+    return df.groupby([cell[:, 0], cell[:, 1], cell[:, 2]]).agg(["mean", "size"])
+
+
+def test_downsample_matches_groupby():
+    xyz = _points()
+    centroids, counts, inverse = voxel_downsample(xyz, 0.5, origin=np.zeros(3))
+    expected = _groupby(xyz, 0.5, np.zeros(3))
+    assert len(centroids) == len(expected)
+    # gleiche Voxel: Reihenfolge über den Schlüssel (x, y, z) lexikografisch
+    np.testing.assert_allclose(centroids, expected.xs("mean", axis=1, level=1).to_numpy(), atol=1e-5)
+    np.testing.assert_array_equal(counts, expected[("x", "size")].to_numpy())
+    assert counts.dtype == np.int64 and counts.sum() == len(xyz)
+    np.testing.assert_allclose(centroids[inverse], xyz, atol=0.5 * np.sqrt(3))
+
+
+def test_weighted_downsample():
+    xyz = np.array([[0.1, 0.1, 0.1], [0.3, 0.1, 0.1], [1.5, 0.1, 0.1]], dtype=np.float32)
+    centroids, counts, inverse = voxel_downsample(xyz, 1.0, weights=[3, 1, 2], origin=np.zeros(3))
+    np.testing.assert_allclose(centroids[0], [0.15, 0.1, 0.1], rtol=1e-6)
+    assert counts.tolist() == [4.0, 2.0] and inverse.tolist() == [0, 0, 1]
+
+
+def test_pyramid_nested():
+    xyz = _points()
+    levels = build_pyramid(xyz, [0.25, 0.5, 1.0], log=None)
+    origin = np.floor(xyz.min(axis=0))
+    for level in levels:
+        centroids, counts, inverse = voxel_downsample(xyz, level["size"], origin=origin)
+        # gewichtete Zusammenfassung der feineren Stufe = direkte Einteilung der Originalpunkte
+        np.testing.assert_array_equal(level["counts"], counts)
+        np.testing.assert_array_equal(level["inverse"], inverse)
+        np.testing.assert_allclose(level["centroids"], centroids, atol=1e-5)
+    assert [len(level["centroids"]) for level in levels] == sorted((len(lv["centroids"]) for lv in levels),
+                                                                   reverse=True)
+
+
+def test_pyramid_sizes_ascending():
+    with pytest.raises(ValueError, match="aufsteigend"):
+        build_pyramid(_points(10), [1.0, 0.5], log=None)
+
+
+def test_as_xyz_offset():
+    xyz = _points(100).astype(np.float64) + [2_600_000.0, 1_200_000.0, 250.0]
+    local, offset = as_xyz(xyz)
+    assert local.dtype == np.float32
+    np.testing.assert_array_equal(offset, np.floor(xyz.min(axis=0)))
+    np.testing.assert_allclose(local + offset, xyz, atol=1e-3)
+
+
+def test_multiscale_features():
+    xyz = _points(3000)
+    levels = [(0.5, 1.0), (1.0, 2.0)]
+    table = multiscale_features(xyz, levels=levels, k=10, log=None)
+    assert list(table.columns) == pyramid_columns(levels) and len(table) == len(xyz)
+    assert table.columns[0] == "Linearity (r=1, v=0.5)"
+
+    # Punkte im selben Voxel erhalten dieselben Merkmale, Voxel count = Punkte im Voxel
+    pyramid = build_pyramid(as_xyz(xyz)[0], [0.5, 1.0], log=None)
+    inverse = pyramid[0]["inverse"]
+    counts = table["Voxel count (r=1, v=0.5)"].to_numpy()
+    np.testing.assert_array_equal(counts, np.bincount(inverse)[inverse])
+    same = inverse == inverse[0]
+    assert (table[same].nunique() == 1).all()